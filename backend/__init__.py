@@ -23,13 +23,16 @@ from .utils.cache import init_l1_cache_from_config
 from .utils.audit import bind_auto_audit
 from .api.swagger import init_swagger
 from .observability.metrics import register_metrics
-from .realtime import init_realtime
+from .realtime import attach_upstream, init_realtime
 from .db import db as db
 
 # WebSocket imports
 from .websocket.socket_manager import websocket_manager
 from .core.redis_manager import redis_manager
-from .utils.price_streamer import PriceStreamManager
+from .utils.lazy import lazy_attr
+
+# Fiyat akışı yalnız production'da başlar; diğer ortamlarda yüklenmez
+PriceStreamManager = lazy_attr("backend.utils.price_streamer", "PriceStreamManager")
 
 # Import enhanced dependencies with graceful fallback
 # Note: Avoid importing sentry at module import time to prevent eventlet/ssl issues during tests.
@@ -486,7 +489,8 @@ def create_app(config_name: str = None) -> Flask:
             global price_stream_manager
             symbols = ['BTCUSDT', 'ETHUSDT', 'ADAUSDT', 'DOTUSDT', 'LINKUSDT', 
                       'BNBUSDT', 'XRPUSDT', 'LTCUSDT', 'BCHUSDT']
-            price_stream_manager = PriceStreamManager(redis_manager.client, symbols)
+            # Yalnız Socket.IO abonesi olan semboller akışa alınır
+            price_stream_manager = PriceStreamManager(redis_manager.client, symbols, on_demand=True)
             
             # Add Binance streamer (primary)
             price_stream_manager.add_binance_streamer()
@@ -496,6 +500,8 @@ def create_app(config_name: str = None) -> Flask:
             
             # Start all streamers
             price_stream_manager.start_all()
+            # küme başına tek upstream bağlantısı (Redis lider kilidi)
+            attach_upstream(price_stream_manager, redis_manager.client)
             
             logger.info("Price stream manager started successfully")
         except Exception as e:
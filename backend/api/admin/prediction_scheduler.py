@@ -9,10 +9,7 @@ blueprint require admin privileges.
 import logging
 from datetime import datetime, timedelta
 
-import feedparser
-import pandas_ta as ta
 import requests
-from apscheduler.schedulers.background import BackgroundScheduler
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
 from sqlalchemy import desc
@@ -22,10 +19,16 @@ from backend.db import db
 from backend.db.models import PredictionOpportunity, TechnicalIndicator
 from backend.tasks.bulk_prediction import generate_predictions_for_all_coins
 from backend.utils.helpers import add_audit_log
+from backend.utils.lazy import lazy_attr, lazy_import
 from backend.utils.price_fetcher import fetch_current_price
-from pycoingecko import CoinGeckoAPI
 from scripts.crypto_ta import calculate_indicators, fetch_ohlc_data
 
+# Yalnız zamanlanmış görevlerde kullanılan kütüphaneler ilk kullanımda yüklenir
+feedparser = lazy_import("feedparser")
+ta = lazy_import("pandas_ta")
+CoinGeckoAPI = lazy_attr("pycoingecko", "CoinGeckoAPI")
+BackgroundScheduler = lazy_attr("apscheduler.schedulers.background", "BackgroundScheduler")
+
 predictions_bp = Blueprint("predictions", __name__, url_prefix="/api/admin/predictions")
 logger = logging.getLogger(__name__)
 
@@ -202,7 +205,14 @@ def delete_prediction(prediction_id):
 
 
 # Veri Toplama
-cg = CoinGeckoAPI()
+_cg = None
+
+
+def _coingecko():
+    global _cg  # pylint: disable=global-statement
+    if _cg is None:
+        _cg = CoinGeckoAPI()
+    return _cg
 
 
 def fetch_price_data():
@@ -210,7 +220,7 @@ def fetch_price_data():
 
     logger.info("[TASK] CoinGecko veri toplama başlatıldı")
     try:
-        data = cg.get_price(ids="bitcoin,ethereum", vs_currencies="usd")
+        data = _coingecko().get_price(ids="bitcoin,ethereum", vs_currencies="usd")
         logger.info(f"[DATA] Fiyat verisi: {data}")
     except Exception as e:
         logger.error(f"[ERROR] CoinGecko API hatası: {e}")
@@ -398,7 +408,7 @@ def evaluate_prediction_success():
         if not ids:
             return
 
-        price_data = cg.get_price(ids=",".join(ids), vs_currencies="usd")
+        price_data = _coingecko().get_price(ids=",".join(ids), vs_currencies="usd")
 
         for pred in active_preds:
             sym = pred.symbol.lower()
@@ -423,33 +433,42 @@ def evaluate_prediction_success():
         logger.error(f"[ERROR] Tahmin güncelleme: {e}")
 
 
-scheduler = BackgroundScheduler(daemon=True)
-scheduler.add_job(fetch_price_data, "interval", minutes=15, id="price_task")
-scheduler.add_job(fetch_technical_data, "interval", hours=1, id="tech_task")
-scheduler.add_job(fetch_news_rss, "interval", minutes=30, id="rss_task")
-scheduler.add_job(fetch_news_api, "interval", hours=2, id="news_task")
-scheduler.add_job(fetch_social_signals, "interval", hours=3, id="social_task")
-scheduler.add_job(fetch_event_calendar, "interval", hours=6, id="event_task")
-scheduler.add_job(fetch_sentiment_news, "interval", hours=4, id="sentiment_task")
-scheduler.add_job(
-    evaluate_prediction_success, "interval", minutes=20, id="evaluate_predictions"
-)
-scheduler.add_job(
-    fetch_and_store_technical_indicators,
-    "interval",
-    minutes=30,
-    id="technical_analysis",
-)
-scheduler.add_job(
-    lambda: generate_prediction_from_ta("bitcoin"),
-    "interval",
-    hours=2,
-    id="ta_predictions",
-)
-scheduler.add_job(
-    lambda: generate_predictions_for_all_coins(limit=10),
-    "interval",
-    hours=6,
-    id="bulk_ta_predictions",
-)
-scheduler.start()
+scheduler = None
+
+
+def start_scheduler():
+    """Start the background jobs once; apscheduler is imported only here."""
+    global scheduler
+    if scheduler is not None:
+        return scheduler
+    scheduler = BackgroundScheduler(daemon=True)
+    scheduler.add_job(fetch_price_data, "interval", minutes=15, id="price_task")
+    scheduler.add_job(fetch_technical_data, "interval", hours=1, id="tech_task")
+    scheduler.add_job(fetch_news_rss, "interval", minutes=30, id="rss_task")
+    scheduler.add_job(fetch_news_api, "interval", hours=2, id="news_task")
+    scheduler.add_job(fetch_social_signals, "interval", hours=3, id="social_task")
+    scheduler.add_job(fetch_event_calendar, "interval", hours=6, id="event_task")
+    scheduler.add_job(fetch_sentiment_news, "interval", hours=4, id="sentiment_task")
+    scheduler.add_job(
+        evaluate_prediction_success, "interval", minutes=20, id="evaluate_predictions"
+    )
+    scheduler.add_job(
+        fetch_and_store_technical_indicators,
+        "interval",
+        minutes=30,
+        id="technical_analysis",
+    )
+    scheduler.add_job(
+        lambda: generate_prediction_from_ta("bitcoin"),
+        "interval",
+        hours=2,
+        id="ta_predictions",
+    )
+    scheduler.add_job(
+        lambda: generate_predictions_for_all_coins(limit=10),
+        "interval",
+        hours=6,
+        id="bulk_ta_predictions",
+    )
+    scheduler.start()
+    return scheduler
@@ -8,6 +8,7 @@ from backend.auth.jwt_utils import require_csrf
 from backend.auth.middlewares import admin_required
 from backend.db import db
 from backend.db.models import PredictionOpportunity
+from backend.services.coingecko import get_coingecko_client
 from backend.utils.helpers import add_audit_log
 from backend.utils.security import COMMON_VALIDATIONS, validate_request_args
 
@@ -434,17 +435,9 @@ DATA_SOURCES = [
 
 
 def fetch_price_data(symbol: str, vs_currency: str = "usd") -> dict:
-    """CoinGecko API üzerinden fiyat verilerini döndürür."""
-    import requests
-
+    """CoinGecko API üzerinden fiyat verilerini döndürür (paylaşılan istemci)."""
     try:
-        resp = requests.get(
-            "https://api.coingecko.com/api/v3/simple/price",
-            params={"ids": symbol, "vs_currencies": vs_currency},
-            timeout=10,
-        )
-        resp.raise_for_status()
-        return resp.json().get(symbol, {})
+        return get_coingecko_client().simple_price([symbol], vs_currency).get(symbol) or {}
     except Exception:  # pragma: no cover - dış servis hatası
         return {}
 
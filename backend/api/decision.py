@@ -11,6 +11,7 @@ from backend.decision_engines import (ENGINE_REGISTRY, DecisionRequest,
                                       OrchestratorConfig,
                                       build_consensus_result)
 from backend.engine.strategic_decision_engine import advanced_decision_logic
+from backend.marketdata import read_history
 from backend.middleware.plan_limits import enforce_plan_limit
 from backend.utils.feature_flags import feature_flag_enabled
 from backend.utils.logger import create_log
@@ -84,7 +85,13 @@ def score_multi():
         if not symbol or not timeframe:
             return _bad("symbol ve timeframe zorunludur")
 
-        df = pd.DataFrame(payload.get("ohlcv", []))
+        if payload.get("ohlcv"):
+            df = pd.DataFrame(payload["ohlcv"])
+        else:
+            # ohlcv gönderilmediyse geçmiş yerel depodan okunur
+            df = read_history(
+                symbol, timeframe, int(payload.get("limit", 500))
+            ).reset_index()
         required = {"ts", "open", "high", "low", "close", "volume"}
         if not required.issubset(df.columns):
             return _bad(f"ohlcv zorunlu kolonlar: {sorted(required)}")
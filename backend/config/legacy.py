@@ -76,6 +76,28 @@ class BaseConfig:
             "args": ("ethereum", "moderate"),
             "options": {"queue": "default"},
         },
+        "ingest-ohlcv-binance-every-5-minutes": {
+            "task": "backend.tasks.ingest_tasks.ingest_source",
+            "schedule": timedelta(minutes=5),
+            "args": ("binance",),
+            "options": {"queue": "default"},
+        },
+        "ingest-ohlcv-yfinance-hourly": {
+            "task": "backend.tasks.ingest_tasks.ingest_source",
+            "schedule": timedelta(hours=1),
+            "args": ("yfinance",),
+            "options": {"queue": "default"},
+        },
+        "precompute-forecasts-every-15-minutes": {
+            "task": "backend.tasks.forecast_tasks.precompute_forecasts",
+            "schedule": timedelta(minutes=15),
+            "options": {"queue": "default"},
+        },
+        "ml-retrain-universe-nightly": {
+            "task": "backend.tasks.ml_tasks.train_universe_task",
+            "schedule": timedelta(days=1),
+            "options": {"queue": "default"},
+        },
         "check-and-downgrade-subscriptions-daily": {
             "task": ("backend.tasks.celery_tasks.check_and_downgrade_subscriptions"),
             "schedule": timedelta(days=1),
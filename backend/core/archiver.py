@@ -0,0 +1,165 @@
+"""
+Ham veri (ABHData) için write-behind arşivleyici.
+
+Analiz yolu satırı yalnızca süreç içi sınırlı bir kuyruğa bırakır; arka plan
+iş parçacığı kuyruğu ``ARCHIVE_BATCH_SIZE`` satırlık partiler halinde tek
+``INSERT ... executemany`` ile yazar. Kuyruk doluysa satır beklemeden atılır
+(geri basınç analiz gecikmesine yansımaz) ve ``abh_archive_rows_total
+{status="dropped"}`` artar.
+
+Prefork (gunicorn/Celery) altında iş parçacığı, kuyruğa ilk yazan süreçte
+tembel başlatılır; fork sonrası süreç kimliği değişirse yeniden kurulur.
+Çıkışta kuyruk boşaltılmaya çalışılır.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import current_app
+from loguru import logger
+
+from backend.observability.metrics import (
+    inc_archive_rows,
+    observe_archive_flush,
+    track_archive_queue_depth,
+)
+
+ARCHIVE_QUEUE_SIZE = int(os.environ.get("ARCHIVE_QUEUE_SIZE", "10000"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_FLUSH_INTERVAL = float(os.environ.get("ARCHIVE_FLUSH_INTERVAL", "2.0"))
+
+Row = Dict[str, Any]
+Writer = Callable[[List[Row]], None]
+
+
+def _insert_abh_rows(app, rows: List[Row]) -> None:
+    """Tek bağlantı, tek işlem, executemany."""
+    from backend.db import db
+    from backend.db.models import ABHData
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(ABHData.__table__.insert(), rows)
+
+
+class RawArchiver:
+    def __init__(
+        self,
+        writer: Optional[Writer] = None,
+        max_queue: int = ARCHIVE_QUEUE_SIZE,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+        flush_interval: float = ARCHIVE_FLUSH_INTERVAL,
+        autostart: bool = True,
+    ):
+        self._writer = writer
+        self.autostart = autostart
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._queue: "queue.Queue[Row]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid() and (not self.autostart or (self._thread is not None and self._thread.is_alive())):
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork'tan miras kalan kuyruk ve kilitler bu süreçte geçersiz
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._stop = threading.Event()
+                self._thread = None
+                self._pid = os.getpid()
+            if self._writer is None:
+                app = current_app._get_current_object()  # pylint: disable=protected-access
+                self._writer = lambda rows: _insert_abh_rows(app, rows)
+            if self.autostart and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="abh-archiver", daemon=True)
+                self._thread.start()
+
+    def submit(self, row: Row) -> bool:
+        """Satırı kuyruğa bırakır; kuyruk doluysa atar ve False döner. Asla bloklamaz."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            inc_archive_rows("dropped")
+            return False
+        inc_archive_rows("queued")
+        return True
+
+    def depth(self) -> int:
+        """Kuyrukta bekleyen satır sayısı (yaklaşık)."""
+        return self._queue.qsize()
+
+    def _take_batch(self, timeout: float) -> List[Row]:
+        batch: List[Row] = []
+        try:
+            batch.append(self._queue.get(timeout=timeout))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Row]) -> None:
+        t0 = time.perf_counter()
+        try:
+            self._writer(batch)  # type: ignore[misc]
+            inc_archive_rows("written", len(batch))
+        except Exception as exc:  # pragma: no cover - DB hatası analiz yolunu etkilememeli
+            inc_archive_rows("failed", len(batch))
+            logger.warning(f"ABH arşiv yazımı başarısız ({len(batch)} satır): {exc}")
+        finally:
+            observe_archive_flush(time.perf_counter() - t0)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._take_batch(self.flush_interval)
+            if batch:
+                self._write(batch)
+
+    def flush(self) -> int:
+        """Kuyruktakileri çağıran iş parçacığında hemen yazar (test/kapanış)."""
+        n = 0
+        while True:
+            batch = self._take_batch(0)
+            if not batch:
+                return n
+            self._write(batch)
+            n += len(batch)
+
+    def stop(self, drain: bool = True) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 1)
+        if drain and self._writer is not None and self._pid == os.getpid():
+            self.flush()
+
+
+_archiver: Optional[RawArchiver] = None
+_archiver_lock = threading.Lock()
+
+
+def get_archiver() -> RawArchiver:
+    """Süreç genelinde paylaşılan arşivleyici."""
+    global _archiver  # pylint: disable=global-statement
+    if _archiver is None:
+        with _archiver_lock:
+            if _archiver is None:
+                _archiver = RawArchiver()
+                # derinlik her scrape'te örneklenir; yazıcı takılsa da güncel kalır
+                track_archive_queue_depth(_archiver.depth)
+                atexit.register(_archiver.stop)
+    return _archiver
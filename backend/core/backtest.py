@@ -0,0 +1,278 @@
+"""
+DBHData kararlarının gerçek fiyatlarla akış (streaming) backtest'i.
+
+ - DBHData satırları zaman sırasıyla ``yield_per`` ile parça parça okunur
+   (PostgreSQL'de sunucu tarafı imleç); tüm aralık belleğe alınmaz.
+ - Her parça ``DecisionEngine.decide_frame`` ile tek numpy geçişinde
+   sinyallenir: BUY -> pozisyon aç, SELL -> kapat, HOLD -> koru (yalnız long).
+ - Fiyatlar yerel OHLCV deposundan (``BACKTEST_TIMEFRAME``) okunur. Bar
+   ``i``'nin getirisi, bar açılışında geçerli olan son sinyalin pozisyonuyla
+   taşınır (ileriye bakış yok). Her pozisyon değişiminde ``BACKTEST_FEE_BPS``
+   komisyon düşülür.
+ - PnL, maksimum düşüş ve Sharpe parçalar arasında taşınan birkaç skaler
+   durumla artımlı hesaplanır; bellek parça boyutuyla sınırlıdır.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from datetime import timedelta
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.marketdata.store import OHLCVStore, get_store, timeframe_to_timedelta
+
+BACKTEST_TIMEFRAME = os.environ.get("BACKTEST_TIMEFRAME", "1h")
+BACKTEST_CHUNK_ROWS = int(os.environ.get("BACKTEST_CHUNK_ROWS", "5000"))
+BACKTEST_FEE_BPS = float(os.environ.get("BACKTEST_FEE_BPS", "10"))
+
+# DBHData sütunu -> canlı analizdeki karar girdisi adı
+DECISION_COLUMNS = {
+    "rsi": "rsi",
+    "macd": "macd",
+    "bb_upper": "bb_upper",
+    "bb_lower": "bb_lower",
+    "stochastic_oscillator": "stochastic",
+    "news_sentiment": "news_sentiment",
+    "twitter_sentiment": "twitter_sentiment",
+    "social_volume": "social_volume",
+    "active_addresses": "active_addresses",
+    "exchange_inflow": "exchange_inflow",
+    "exchange_outflow": "exchange_outflow",
+    "volatility": "volatility",
+}
+
+# CoinGecko kimliği -> depo sembolü; listede yoksa coin adı aynen kullanılır
+STORE_SYMBOLS = {
+    "bitcoin": "BTC/USDT",
+    "ethereum": "ETH/USDT",
+    "cardano": "ADA/USDT",
+    "polkadot": "DOT/USDT",
+}
+
+
+def store_symbol(coin: str) -> str:
+    return STORE_SYMBOLS.get(coin.lower(), coin)
+
+
+class PnLAccumulator:
+    """
+    Bar getirilerini parça parça işler; parçalar arasında yalnızca son
+    pozisyon, son kapanış, birikimli log-getiri, tepe, Sharpe toplamları ve
+    açık işlemin getirisi taşınır.
+    """
+
+    def __init__(self, timeframe: str = BACKTEST_TIMEFRAME, fee_bps: float = BACKTEST_FEE_BPS):
+        self.periods_per_year = timedelta(days=365) / timeframe_to_timedelta(timeframe)
+        self.fee_log = math.log1p(-fee_bps / 10_000.0)
+        self.position = 0.0  # son işlenen bardaki pozisyon
+        self.state = 0.0  # şimdiye kadarki tüm sinyallerden sonraki hedef pozisyon
+        self.last_close: Optional[float] = None
+        self.last_bar_ts: Optional[int] = None
+        self.cum = 0.0  # birikimli log-getiri
+        self.peak = 0.0
+        self.max_dd = 0.0
+        self.n = 0
+        self.sum_r = 0.0
+        self.sum_r2 = 0.0
+        self.trades = 0
+        self.wins = 0
+        self.open_trade: Optional[float] = None  # açık işlemin log-getirisi
+
+    def update(self, sig_ts: np.ndarray, sig_pos: np.ndarray, bars: np.ndarray) -> None:
+        """
+        ``sig_ts``/``sig_pos``: sıralı sinyal zamanları (ns) ve hedef pozisyon
+        (NaN = koru). ``bars``: son işlenen bardan sonraki OHLCV kayıtları;
+        hepsi önceki parçaların sinyallerinden sonradır.
+        """
+        # sinyal pozisyonlarını önceki durumdan başlayarak ileri doldur
+        filled = pd.Series(sig_pos, dtype="float64").ffill().fillna(self.state).to_numpy()
+        if len(bars) == 0:
+            if len(filled):
+                self.state = float(filled[-1])
+            return
+        bar_ts = bars["ts"]
+        close = np.asarray(bars["close"], dtype=np.float64)
+        if len(filled):
+            idx = np.searchsorted(sig_ts, bar_ts, "right") - 1
+            pos = np.where(idx >= 0, filled[np.maximum(idx, 0)], self.state)
+        else:
+            pos = np.full(len(bar_ts), self.state)
+
+        prev_close = np.concatenate([[self.last_close if self.last_close is not None else close[0]], close[:-1]])
+        bar_lr = np.log(close / prev_close)
+        prev_pos = np.concatenate([[self.position], pos[:-1]])
+        change = np.abs(pos - prev_pos)
+        strat_lr = pos * bar_lr + change * self.fee_log
+
+        # düşüş
+        path = self.cum + np.cumsum(strat_lr)
+        peaks = np.maximum.accumulate(np.concatenate([[self.peak], path]))[1:]
+        if len(path):
+            self.max_dd = max(self.max_dd, float(np.max(1.0 - np.exp(path - peaks))))
+            self.peak = float(peaks[-1])
+            self.cum = float(path[-1])
+
+        # Sharpe için basit bar getirileri
+        r = np.expm1(strat_lr)
+        self.n += len(r)
+        self.sum_r += float(r.sum())
+        self.sum_r2 += float((r * r).sum())
+
+        self._trades(pos, prev_pos, strat_lr)
+        self.position = float(pos[-1])
+        self.last_close = float(close[-1])
+        self.last_bar_ts = int(bar_ts[-1])
+        if len(filled):
+            self.state = float(filled[-1])
+
+    def _trades(self, pos: np.ndarray, prev_pos: np.ndarray, strat_lr: np.ndarray) -> None:
+        entries = (pos > 0) & (prev_pos == 0)
+        exits = (pos == 0) & (prev_pos > 0)
+        # işlem kimliği: parça başında açık işlem 0, her girişte +1
+        tid = np.cumsum(entries)
+        in_trade = (pos > 0) | exits
+        sums = np.bincount(tid[in_trade], weights=strat_lr[in_trade], minlength=int(tid[-1]) + 1)
+        if self.open_trade is not None:
+            sums[0] += self.open_trade
+        exit_ids = tid[exits]
+        closed = sums[exit_ids]
+        self.trades += len(closed)
+        self.wins += int((closed > 0).sum())
+        if pos[-1] > 0:
+            self.open_trade = float(sums[tid[-1]])
+        else:
+            self.open_trade = None
+
+    def result(self) -> Dict[str, float]:
+        trades, wins = self.trades, self.wins
+        if self.open_trade is not None:
+            # açık işlem son fiyattan değerlenir
+            trades += 1
+            wins += int(self.open_trade > 0)
+        sharpe = 0.0
+        if self.n > 1:
+            mean = self.sum_r / self.n
+            var = max(self.sum_r2 / self.n - mean * mean, 0.0) * self.n / (self.n - 1)
+            if var > 0:
+                sharpe = mean / math.sqrt(var) * math.sqrt(self.periods_per_year)
+        return {
+            "profit_pct": math.expm1(self.cum) * 100.0,
+            "trades": trades,
+            "win_rate": (wins / trades) if trades else 0.0,
+            "max_drawdown": self.max_dd * 100.0,
+            "sharpe_ratio": sharpe,
+            "bars": self.n,
+        }
+
+
+def _signal_positions(signals: np.ndarray) -> np.ndarray:
+    return np.where(signals == "BUY", 1.0, np.where(signals == "SELL", 0.0, np.nan))
+
+
+_NAT = np.iinfo(np.int64).min
+
+
+def _to_ns(values) -> np.ndarray:
+    """ISO metinleri UTC ns'ye çevirir; çözülemeyenler ``_NAT`` olur."""
+    idx = pd.DatetimeIndex(pd.to_datetime(pd.Series(values, dtype=object), utc=True, format="ISO8601", errors="coerce"))
+    return idx.as_unit("ns").asi8
+
+
+def stream_dbh_chunks(coin: str, start: str, end: str, chunk_rows: int = BACKTEST_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """DBHData'yı zaman sırasıyla ``chunk_rows``'luk çerçeveler halinde akıtır."""
+    from backend.db import db
+    from backend.db.models import DBHData
+
+    cols = ["timestamp", *DECISION_COLUMNS]
+    stmt = (
+        db.select(*(getattr(DBHData, c) for c in cols))
+        .where(DBHData.coin == coin, DBHData.timestamp >= start, DBHData.timestamp <= end)
+        .order_by(DBHData.timestamp)
+        .execution_options(yield_per=chunk_rows)
+    )
+    result = db.session.execute(stmt)
+    for rows in result.partitions():
+        df = pd.DataFrame(rows, columns=cols).rename(columns=DECISION_COLUMNS)
+        df["ts"] = _to_ns(df.pop("timestamp"))
+        yield df[df["ts"] != _NAT].sort_values("ts", kind="stable")
+
+
+def run_backtest(
+    engine,
+    coin: str,
+    profile: str,
+    start: str,
+    end: str,
+    *,
+    timeframe: str = BACKTEST_TIMEFRAME,
+    fee_bps: float = BACKTEST_FEE_BPS,
+    chunk_rows: int = BACKTEST_CHUNK_ROWS,
+    store: Optional[OHLCVStore] = None,
+) -> Dict[str, Any]:
+    """
+    ``engine.decide_frame`` ile sinyal üretip depo fiyatlarıyla PnL hesaplar.
+    Fiyatlar sinyallerle aynı parçalar halinde, yalnızca gereken aralık için
+    okunur.
+    """
+    store = store or get_store()
+    symbol = store_symbol(coin)
+    acc = PnLAccumulator(timeframe, fee_bps)
+    first_ts: Optional[int] = None
+    rows = 0
+
+    def bars_until(end_ns: Optional[int]) -> np.ndarray:
+        lo = acc.last_bar_ts + 1 if acc.last_bar_ts is not None else first_ts
+        return store.read(symbol, timeframe, start=lo, end=end_ns)
+
+    for chunk in stream_dbh_chunks(coin, start, end, chunk_rows):
+        if chunk.empty:
+            continue
+        decided = engine.decide_frame(chunk, profile)
+        sig_ts = chunk["ts"].to_numpy()
+        sig_pos = _signal_positions(decided["signal"].to_numpy())
+        if first_ts is None:
+            first_ts = int(sig_ts[0])
+        acc.update(sig_ts, sig_pos, bars_until(int(sig_ts[-1])))
+        rows += len(chunk)
+
+    if first_ts is not None:
+        # son sinyalden aralık sonuna kadar olan barlar
+        end_ns = int(_to_ns([end])[0])
+        tail = bars_until(end_ns if end_ns != _NAT else None)
+        acc.update(np.empty(0, dtype=np.int64), np.empty(0), tail)
+
+    out = acc.result()
+    out["signals"] = rows
+    return out
+
+
+def _parse_date(value: str):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.to_pydatetime()
+
+
+def save_result(coin: str, profile: str, start: str, end: str, metrics: Dict[str, Any]) -> int:
+    """Sonucu ``BacktestResult`` tablosuna yazar; kayıt kimliğini döner."""
+    from backend.db import db
+    from backend.db.models import BacktestResult
+
+    rec = BacktestResult(
+        coin=coin,
+        profile=profile,
+        start_date=_parse_date(start),
+        end_date=_parse_date(end),
+        profit_pct=metrics["profit_pct"],
+        total_trades=metrics["trades"],
+        win_rate=metrics["win_rate"],
+        max_drawdown=metrics["max_drawdown"],
+        sharpe_ratio=metrics["sharpe_ratio"],
+    )
+    db.session.add(rec)
+    db.session.commit()
+    return rec.id
@@ -0,0 +1,136 @@
+"""
+``run_full_analysis`` için eşzamanlı veri toplama.
+
+Fiyat, on-chain, sosyal ve haber kaynakları çağrı başına açılan, her adıma bir
+iş parçacığı düşen bir havuzda aynı anda başlatılır; süresi aşan bir adımın
+iş parçacığı arka planda bitene kadar yalnız kendi görevinin havuzunu tutar,
+diğer analizleri aç bırakmaz. Bağımlı adımlar girdileri hazır olur olmaz
+başlar: haberler gelince duygu analizi, fiyat gelince tahmin. Her adımın kendi
+süre sınırı vardır (``ANALYSIS_TIMEOUT_<ADIM>``); süre aşımı ya da hata
+durumunda adımın varsayılan değeri kullanılır (kısmi sonuç). Fiyat zorunludur;
+alınamazsa hata yükseltilir.
+
+Dönen ``timings`` sözlüğü adım başına süre (ms; hata durumunda da adımın
+kendi ölçülen süresi) ve durum (ok / timeout / error) içerir ve ``CeleryTaskLog.timings``'e yazılır.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+STAGE_TIMEOUTS: Dict[str, float] = {
+    stage: float(os.environ.get(f"ANALYSIS_TIMEOUT_{stage.upper()}", default))
+    for stage, default in (
+        ("price", "15"),
+        ("onchain", "5"),
+        ("social", "5"),
+        ("news", "5"),
+        ("sentiment", "10"),
+        ("forecast", "30"),
+    )
+}
+
+FORECAST_FALLBACK = (None, "error", {"upper": None, "lower": None}, [], 0.0, "")
+DEFAULTS: Dict[str, Any] = {
+    "onchain": {"active_addresses": 0, "exchange_inflow": 0.0, "exchange_outflow": 0.0},
+    "social": {"twitter_sentiment": 0.0, "social_volume": 0},
+    "news": [],
+    "sentiment": ("neutral", 0.5),
+    "forecast": FORECAST_FALLBACK,
+}
+
+
+class _StageFailed(Exception):
+    """Adım hatası; adımın kendi ölçülen süresini (ms) taşır."""
+
+    def __init__(self, error: BaseException, ms: float):
+        super().__init__(str(error))
+        self.ms = ms
+
+
+def _in_context(app, fn: Callable[..., Any], *args) -> Tuple[Any, float]:
+    """Adımı uygulama bağlamında çalıştırır; (sonuç, süre ms) döner."""
+    t0 = time.perf_counter()
+    try:
+        with app.app_context():
+            value = fn(*args)
+    except Exception as exc:
+        raise _StageFailed(exc, (time.perf_counter() - t0) * 1000.0) from exc
+    return value, (time.perf_counter() - t0) * 1000.0
+
+
+def collect_analysis_inputs(system, coin: str, app=None, executor=None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Analiz girdilerini eşzamanlı toplar. ``(girdiler, timings)`` döner;
+    girdiler: price, onchain, social, news, sentiment, forecast.
+    """
+    if app is None:
+        from flask import current_app
+
+        app = current_app._get_current_object()  # pylint: disable=protected-access
+    pool = executor or ThreadPoolExecutor(max_workers=len(STAGE_TIMEOUTS), thread_name_prefix="analysis")
+    try:
+        return _collect(pool, app, system, coin)
+    finally:
+        if executor is None:
+            # süresi aşan adımlar beklenmez; iş parçacıkları bitince kapanır
+            pool.shutdown(wait=False)
+
+
+def _collect(pool, app, system, coin: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    t_start = time.perf_counter()
+    collector, ai = system.collector, system.ai
+
+    pending: Dict[Future, str] = {}
+    deadlines: Dict[str, float] = {}
+
+    def submit(stage: str, fn: Callable[..., Any], *args) -> None:
+        pending[pool.submit(_in_context, app, fn, *args)] = stage
+        deadlines[stage] = time.perf_counter() + STAGE_TIMEOUTS[stage]
+
+    submit("price", collector.collect_price_data, coin)
+    submit("onchain", collector.collect_onchain_data, coin)
+    submit("social", collector.collect_social_data, coin)
+    submit("news", collector.collect_news_data, coin)
+
+    results: Dict[str, Any] = {}
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    def finish(stage: str, value: Any, status: str, ms: Optional[float]) -> None:
+        results[stage] = value
+        stages[stage] = {"ms": round(ms, 1) if ms is not None else None, "status": status}
+        # bağımlı adımları girdileri hazır olur olmaz başlat
+        if stage == "news":
+            submit("sentiment", ai.analyze_news, value)
+        elif stage == "price" and status == "ok":
+            submit("forecast", ai.forecast, value["prices"], value["times"], 1, coin)
+
+    while pending:
+        now = time.perf_counter()
+        timeout = max(0.0, min(deadlines[s] for s in pending.values()) - now)
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in done:
+            stage = pending.pop(fut)
+            try:
+                value, ms = fut.result()
+                finish(stage, value, "ok", ms)
+            except Exception as exc:
+                logger.warning(f"Analiz adımı başarısız ({coin}/{stage}): {exc}")
+                finish(stage, DEFAULTS.get(stage), "error", getattr(exc, "ms", None))
+        now = time.perf_counter()
+        for fut, stage in list(pending.items()):
+            if now >= deadlines[stage]:
+                # iş parçacığı arka planda bitebilir; sonucu beklenmez
+                pending.pop(fut)
+                logger.warning(f"Analiz adımı zaman aşımı ({coin}/{stage})")
+                finish(stage, DEFAULTS.get(stage), "timeout", None)
+
+    timings = {"stages": stages, "total_ms": round((time.perf_counter() - t_start) * 1000.0, 1)}
+    if stages["price"]["status"] != "ok":
+        raise RuntimeError(f"fiyat verisi alınamadı ({coin}): {stages['price']['status']}")
+    return results, timings
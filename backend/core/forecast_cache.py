@@ -0,0 +1,229 @@
+"""
+Prophet tahminleri için önbellek ve ayrı süreç havuzu.
+
+ - Sonuçlar (coin, days) başına saklanır ve üretildikleri son fiyat zaman
+   damgasıyla etiketlenir. Damga güncel veriyle aynıysa taze isabettir.
+ - Damga eskiyse ve sonuç ``FORECAST_STALE_MAX`` saniyeden genç ise eski
+   sonuç hemen döner, yenisi arka planda hesaplanır (stale-while-revalidate).
+   Aynı anahtarı aynı anda yalnızca bir süreç yeniler (Redis NX kilidi).
+ - Fit, web işçisinin GIL'ini tutmamak için ayrı bir süreç havuzunda
+   (``spawn``) ``FORECAST_FIT_TIMEOUT`` süre sınırıyla çalışır. Celery
+   prefork işçileri daemon süreçtir ve alt süreç açamaz; orada (ya da
+   ``inline=True`` ile) fit çağıran süreçte yapılır.
+ - Popüler coinler beat görevi ile önceden hesaplanır.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+FORECAST_POOL_SIZE = int(os.environ.get("FORECAST_POOL_SIZE", "2"))
+FORECAST_FIT_TIMEOUT = float(os.environ.get("FORECAST_FIT_TIMEOUT", "20"))
+FORECAST_STALE_MAX = int(os.environ.get("FORECAST_STALE_MAX", "21600"))
+KEY_PREFIX = "forecast"
+
+Result = Dict[str, List[Any]]
+FitFn = Callable[[List[float], List[str], int], Optional[Result]]
+
+
+def fit_prophet(prices: List[float], times: List[str], days: int) -> Optional[Result]:
+    """Havuz süreçlerinde çalışır: Prophet fit + ``days`` günlük tahmin."""
+    import pandas as pd
+    from prophet import Prophet
+
+    df = pd.DataFrame({"ds": pd.to_datetime(times), "y": prices})
+    model = Prophet(yearly_seasonality=True, weekly_seasonality=True)
+    model.fit(df)
+    future = model.make_future_dataframe(periods=days, include_history=False)
+    forecast = model.predict(future)
+    return {
+        "yhat": forecast["yhat"].astype(float).tolist(),
+        "upper": forecast.get("yhat_upper", forecast["yhat"]).astype(float).tolist(),
+        "lower": forecast.get("yhat_lower", forecast["yhat"]).astype(float).tolist(),
+        "dates": forecast["ds"].dt.strftime("%Y-%m-%d").tolist(),
+    }
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _pool_usable() -> bool:
+    # bir çocuk süreç ölürse havuz kalıcı olarak bozulur (BrokenProcessPool)
+    return _pool is not None and _pool_pid == os.getpid() and not getattr(_pool, "_broken", False)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Süreç havuzu; çatallanmadan sonra veya bozulduysa yeniden kurulur."""
+    global _pool, _pool_pid  # pylint: disable=global-statement
+    if not _pool_usable():
+        with _pool_lock:
+            if not _pool_usable():
+                if _pool is not None and _pool_pid == os.getpid():
+                    _pool.shutdown(wait=False, cancel_futures=True)
+                _pool = ProcessPoolExecutor(max_workers=FORECAST_POOL_SIZE, mp_context=mp.get_context("spawn"))
+                _pool_pid = os.getpid()
+    return _pool
+
+
+class ForecastCache:
+    def __init__(
+        self,
+        redis_client=None,
+        *,
+        inline: bool = False,
+        fit: FitFn = fit_prophet,
+        executor: Optional[Executor] = None,
+    ):
+        self.redis = redis_client
+        self.inline = inline
+        self.fit = fit
+        self._executor = executor
+        self._local: Dict[str, str] = {}
+        self._inflight: set = set()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------ depolama
+    @staticmethod
+    def _key(coin: str, days: int) -> str:
+        return f"{KEY_PREFIX}:{coin}:{days}"
+
+    def _load(self, key: str) -> Optional[dict]:
+        raw = None
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(key)
+            except Exception:  # pragma: no cover - Redis yoksa süreç içine düş
+                raw = None
+        if raw is None:
+            raw = self._local.get(key)
+        return json.loads(raw) if raw else None
+
+    def _store(self, key: str, last_ts: str, result: Result) -> None:
+        raw = json.dumps({"last_ts": last_ts, "computed_at": time.time(), "result": result})
+        self._local[key] = raw
+        if self.redis is not None:
+            try:
+                self.redis.set(key, raw, ex=FORECAST_STALE_MAX)
+            except Exception:  # pragma: no cover
+                pass
+
+    def _claim(self, key: str) -> bool:
+        with self._lock:
+            if key in self._inflight:
+                return False
+            self._inflight.add(key)
+        if self.redis is not None:
+            try:
+                if not self.redis.set(f"{key}:lock", "1", nx=True, ex=int(FORECAST_FIT_TIMEOUT) + 5):
+                    self._release(key, redis_lock=False)
+                    return False
+            except Exception:  # pragma: no cover
+                pass
+        return True
+
+    def _release(self, key: str, redis_lock: bool = True) -> None:
+        with self._lock:
+            self._inflight.discard(key)
+        if redis_lock and self.redis is not None:
+            try:
+                self.redis.delete(f"{key}:lock")
+            except Exception:  # pragma: no cover
+                pass
+
+    # -------------------------------------------------------------- hesap
+    def _pool(self) -> Executor:
+        return self._executor or _get_pool()
+
+    def _inline(self) -> bool:
+        # Celery prefork çocukları daemon süreçtir; alt süreç açamazlar
+        return self.inline or mp.current_process().daemon
+
+    def _run(self, prices: List[float], times: List[str], days: int) -> Optional[Result]:
+        if self._inline():
+            return self.fit(prices, times, days)
+        future = self._pool().submit(self.fit, prices, times, days)
+        try:
+            return future.result(timeout=FORECAST_FIT_TIMEOUT)
+        except FutureTimeout:
+            logger.warning("Prophet fit zaman aşımı")
+            future.cancel()
+            return None
+
+    def _compute(self, key: str, prices: List[float], times: List[str], days: int) -> Optional[Result]:
+        result = self._run(prices, times, days)
+        if result is not None:
+            self._store(key, times[-1], result)
+        return result
+
+    def _revalidate(self, key: str, prices: List[float], times: List[str], days: int) -> None:
+        if not self._claim(key):
+            return
+        if self._inline():
+            try:
+                self._compute(key, prices, times, days)
+            finally:
+                self._release(key)
+            return
+
+        def _done(fut):
+            try:
+                result = fut.result()
+                if result is not None:
+                    self._store(key, times[-1], result)
+            except Exception as e:  # pragma: no cover - logging
+                logger.warning(f"Prophet arka plan yenileme hatası ({key}): {e}")
+            finally:
+                self._release(key)
+
+        try:
+            future = self._pool().submit(self.fit, prices, times, days)
+        except Exception as e:
+            # havuz bozuk/kapalı: anahtar yeniden denenebilir kalmalı
+            logger.warning(f"Prophet arka plan yenilemesi başlatılamadı ({key}): {e}")
+            self._release(key)
+            return
+        future.add_done_callback(_done)
+
+    def get(self, coin: Optional[str], prices: List[float], times: List[str], days: int) -> Tuple[Optional[Result], str]:
+        """
+        (sonuç, durum) döner; durum: ``fresh`` | ``stale`` | ``computed`` |
+        ``timeout``. ``stale`` durumunda yenileme arka planda başlatılmıştır.
+        Coin adı yoksa önbellek kullanılmaz.
+        """
+        if not coin:
+            result = self._run(prices, times, days)
+            return result, ("computed" if result is not None else "timeout")
+        key = self._key(coin, days)
+        cached = self._load(key)
+        if cached is not None:
+            if cached["last_ts"] == times[-1]:
+                return cached["result"], "fresh"
+            if time.time() - cached["computed_at"] < FORECAST_STALE_MAX:
+                self._revalidate(key, prices, times, days)
+                return cached["result"], "stale"
+        result = self._compute(key, prices, times, days)
+        return result, ("computed" if result is not None else "timeout")
+
+
+_cache: Optional[ForecastCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_forecast_cache(redis_client=None) -> ForecastCache:
+    """Süreç genelinde paylaşılan tahmin önbelleği."""
+    global _cache  # pylint: disable=global-statement
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ForecastCache(redis_client)
+    return _cache
@@ -0,0 +1,208 @@
+"""
+``DecisionEngine`` kuralları için derlenmiş değerlendirme planı.
+
+YAML/config kuralları profil başına bir kez derlenir: her koşul
+(metric, operatör fonksiyonu, değer, ağırlık) olur. Aynı plan hem tek analiz
+sözlüğünü (skaler) hem de geçmiş analizlerin sütun dizilerini (numpy, tek
+geçiş) skorlar; iki yol aynı kararı üretir.
+
+Kurallar ``DECISION_RULES_PATH`` dosyasından geliyorsa dosya imzası (mtime,
+boyut) değiştiğinde plan yeniden derlenir.
+"""
+
+from __future__ import annotations
+
+import operator
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import yaml
+except Exception:  # pragma: no cover
+    yaml = None
+
+_OPS: Dict[str, Callable[[Any, Any], Any]] = {">": operator.gt, "<": operator.lt, "==": operator.eq}
+
+SIGNALS = np.array(["HOLD", "BUY", "SELL"], dtype=object)
+
+
+@dataclass(frozen=True)
+class Condition:
+    metric: str
+    op: Callable[[Any, Any], Any]
+    value: Any
+    weight: float
+
+    def match(self, analysis: Mapping[str, Any]) -> bool:
+        if self.metric not in analysis:
+            return False
+        try:
+            return bool(self.op(analysis[self.metric], self.value))
+        except TypeError:
+            return False
+
+    def mask(self, cols: Mapping[str, Any], n: int) -> np.ndarray:
+        col = cols.get(self.metric)
+        if col is None:
+            return np.zeros(n, dtype=bool)
+        if isinstance(self.value, (int, float)) and not isinstance(self.value, bool):
+            arr = pd.to_numeric(pd.Series(col), errors="coerce").to_numpy(dtype=np.float64)
+            # NaN karşılaştırmaları False döner (eksik değer = koşul sağlanmadı)
+            return np.asarray(self.op(arr, self.value), dtype=bool)
+        arr = np.asarray(col, dtype=object)
+        if self.op is not operator.eq:
+            return np.zeros(n, dtype=bool)
+        return np.asarray(arr == self.value, dtype=bool)
+
+
+@dataclass(frozen=True)
+class CompiledProfile:
+    buy: Tuple[Condition, ...] = ()
+    sell: Tuple[Condition, ...] = ()
+    threshold: float = 10
+    stop_loss_pct: float = 0.05
+    position_size_pct: float = 0.1
+
+    def decide(self, analysis: Mapping[str, Any]) -> Dict[str, Any]:
+        """Tek analiz; önceki ``DecisionEngine.decide`` ile birebir aynı çıktı."""
+        factor = 1.0 / (1 + analysis.get("volatility", 1.0))
+        buy_score = 0.0
+        sell_score = 0.0
+        for cond in self.buy:
+            if cond.match(analysis):
+                buy_score += cond.weight * factor
+        for cond in self.sell:
+            if cond.match(analysis):
+                sell_score += cond.weight * factor
+
+        if buy_score > sell_score and buy_score > self.threshold:
+            signal, confidence = "BUY", min(0.95, 0.5 + 0.01 * buy_score)
+        elif sell_score > buy_score and sell_score > self.threshold:
+            signal, confidence = "SELL", min(0.95, 0.5 + 0.01 * sell_score)
+        else:
+            signal, confidence = "HOLD", 0.5
+
+        current_price = analysis.get("current_price", 0.0)
+        return {
+            "signal": signal,
+            "confidence": confidence,
+            "stop_loss": current_price * (1 - self.stop_loss_pct),
+            "position_size_pct": self.position_size_pct,
+        }
+
+    def _score(self, conds: Tuple[Condition, ...], cols: Mapping[str, Any], n: int, factor: np.ndarray) -> np.ndarray:
+        score = np.zeros(n)
+        for cond in conds:
+            score += np.where(cond.mask(cols, n), cond.weight * factor, 0.0)
+        return score
+
+    def decide_columns(self, cols: Mapping[str, Any], n: Optional[int] = None) -> pd.DataFrame:
+        """
+        Sütun dizileri (DataFrame veya ad -> dizi) için tüm satırları tek numpy
+        geçişinde skorlar. Çıktı: signal, confidence, stop_loss,
+        position_size_pct, buy_score, sell_score.
+        """
+        if n is None:
+            n = len(cols) if isinstance(cols, pd.DataFrame) else len(next(iter(cols.values()), []))
+        vol = cols.get("volatility")
+        vol = np.ones(n) if vol is None else pd.to_numeric(pd.Series(vol), errors="coerce").fillna(1.0).to_numpy(dtype=np.float64)
+        factor = 1.0 / (1 + vol)
+        buy = self._score(self.buy, cols, n, factor)
+        sell = self._score(self.sell, cols, n, factor)
+
+        is_buy = (buy > sell) & (buy > self.threshold)
+        is_sell = ~is_buy & (sell > buy) & (sell > self.threshold)
+        code = np.where(is_buy, 1, np.where(is_sell, 2, 0))
+        confidence = np.where(
+            is_buy,
+            np.minimum(0.95, 0.5 + 0.01 * buy),
+            np.where(is_sell, np.minimum(0.95, 0.5 + 0.01 * sell), 0.5),
+        )
+        price = cols.get("current_price")
+        price = np.zeros(n) if price is None else pd.to_numeric(pd.Series(price), errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+        index = cols.index if isinstance(cols, pd.DataFrame) else None
+        return pd.DataFrame(
+            {
+                "signal": SIGNALS[code],
+                "confidence": confidence,
+                "stop_loss": price * (1 - self.stop_loss_pct),
+                "position_size_pct": np.full(n, self.position_size_pct),
+                "buy_score": buy,
+                "sell_score": sell,
+            },
+            index=index,
+        )
+
+
+def _compile_conditions(raw: Optional[List[Dict[str, Any]]]) -> Tuple[Condition, ...]:
+    out = []
+    for cond in raw or []:
+        op = _OPS.get(cond.get("operator"))
+        metric = cond.get("metric")
+        if op is None or metric is None:
+            # bilinmeyen operatör hiçbir zaman eşleşmez; planda yer kaplamasın
+            continue
+        out.append(Condition(metric, op, cond.get("value"), cond.get("weight", 1)))
+    return tuple(out)
+
+
+def compile_profile(rules: Mapping[str, Any]) -> CompiledProfile:
+    return CompiledProfile(
+        buy=_compile_conditions(rules.get("buy")),
+        sell=_compile_conditions(rules.get("sell")),
+        threshold=rules.get("threshold", 10),
+        stop_loss_pct=rules.get("stop_loss_pct", 0.05),
+        position_size_pct=rules.get("position_size_pct", 0.1),
+    )
+
+
+class RuleBook:
+    """Profil adı -> derlenmiş plan; kaynak dosya değişince yeniden derlenir."""
+
+    def __init__(self, path: Optional[str] = None, config: Optional[Mapping[str, Any]] = None):
+        self.path = path
+        self.config = config
+        self.raw: Dict[str, Any] = {}
+        self._plans: Dict[str, CompiledProfile] = {}
+        self._sig: Any = None
+        self._lock = threading.Lock()
+
+    def _signature(self) -> Any:
+        if self.path and yaml:
+            try:
+                st = os.stat(self.path)
+                return ("file", st.st_mtime_ns, st.st_size)
+            except OSError:
+                pass
+        return ("config", id(self.config))
+
+    def _read(self, sig: Any) -> Dict[str, Any]:
+        if sig[0] == "file":
+            with open(self.path) as f:  # type: ignore[arg-type]
+                return yaml.safe_load(f) or {}
+        return dict(self.config or {})
+
+    def refresh(self) -> None:
+        sig = self._signature()
+        if sig == self._sig:
+            return
+        with self._lock:
+            if sig == self._sig:
+                return
+            raw = self._read(sig)
+            self._plans = {name: compile_profile(r) for name, r in raw.items() if isinstance(r, Mapping)}
+            self.raw = raw
+            self._sig = sig
+
+    def profile(self, name: str) -> CompiledProfile:
+        self.refresh()
+        plan = self._plans.get(name) or self._plans.get("moderate")
+        return plan if plan is not None else _EMPTY
+
+
+_EMPTY = CompiledProfile()
@@ -0,0 +1,272 @@
+"""
+Mikro-partili duygu analizi servisi.
+
+ - ``transformers`` pipeline'ı süreç başına bir kez, ilk kullanımda yüklenir
+   (``SENTIMENT_MODEL`` boşsa kütüphanenin varsayılan modeli).
+ - Tekil ``score`` çağrıları bir kuyruğa bırakılır; arka plan iş parçacığı
+   ``SENTIMENT_BATCH_WAIT_MS`` boyunca ``SENTIMENT_BATCH_SIZE`` metne kadar
+   toplar ve tek pipeline çağrısıyla skorlar. Eşzamanlı istekler aynı partiyi
+   paylaşır.
+ - Sonuçlar metin özetine göre (sha1) süreç içi LRU'da tutulur; aynı haber
+   tekrar skorlanmaz.
+ - Pipeline yoksa ya da hata verirse anahtar kelime yedeği kullanılır; yedek
+   metinleri bir kez küçük harfe çevirip ``str.count`` ile sayar.
+ - Parti ``SENTIMENT_TIMEOUT`` içinde skorlanmazsa tekil çağrı nötr döner.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from backend.utils.lazy import lazy_attr
+
+# transformers (torch ile birlikte) yalnız pipeline ilk kez kurulurken yüklenir
+_pipeline = lazy_attr("transformers", "pipeline")
+
+SENTIMENT_MODEL = os.environ.get("SENTIMENT_MODEL", "")
+SENTIMENT_BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", "32"))
+SENTIMENT_BATCH_WAIT_MS = float(os.environ.get("SENTIMENT_BATCH_WAIT_MS", "5"))
+SENTIMENT_CACHE_SIZE = int(os.environ.get("SENTIMENT_CACHE_SIZE", "10000"))
+SENTIMENT_TIMEOUT = float(os.environ.get("SENTIMENT_TIMEOUT", "30"))
+
+Score = Tuple[str, float]
+NEUTRAL: Score = ("neutral", 0.5)
+
+_pipe: Any = None
+_pipe_failed = False
+_pipe_lock = threading.Lock()
+
+
+def _get_pipeline():
+    """Süreç genelinde tek pipeline; yüklenemezse None (bir kez denenir)."""
+    global _pipe, _pipe_failed  # pylint: disable=global-statement
+    if _pipe is None and not _pipe_failed and _pipeline:
+        with _pipe_lock:
+            if _pipe is None and not _pipe_failed:
+                try:
+                    kwargs = {"model": SENTIMENT_MODEL} if SENTIMENT_MODEL else {}
+                    _pipe = _pipeline("sentiment-analysis", **kwargs)
+                except Exception as e:  # pragma: no cover - model indirilemedi
+                    logger.warning(f"Sentiment pipeline yüklenemedi: {e}")
+                    _pipe_failed = True
+    return _pipe
+
+
+class KeywordScorer:
+    """``SENTIMENT_KEYWORDS`` ile kelime sayma; ``AIInterpreter`` yedeğiyle aynı kurallar."""
+
+    def __init__(self, keywords: Optional[Dict[str, Sequence[str]]] = None):
+        keywords = keywords or {}
+        self.positive = [w.lower() for w in keywords.get("positive", [])]
+        self.negative = [w.lower() for w in keywords.get("negative", [])]
+
+    def score_many(self, texts: Sequence[str]) -> List[Score]:
+        if not texts:
+            return []
+        # sabit genişlikli numpy dizisi en uzun metne göre boyutlanır; düz str yeterli
+        out: List[Score] = []
+        for text in texts:
+            lowered = text.lower()
+            p = sum(lowered.count(w) for w in self.positive)
+            n = sum(lowered.count(w) for w in self.negative)
+            if p > n:
+                out.append(("positive", min(0.9, 0.5 + 0.1 * p)))
+            elif n > p:
+                out.append(("negative", min(0.9, 0.5 + 0.1 * n)))
+            else:
+                out.append(NEUTRAL)
+        return out
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _texts(articles: Sequence[Dict[str, Any]]) -> List[str]:
+    texts = (f"{a.get('title', '')} {a.get('description', '')}".strip() for a in articles)
+    return [t for t in texts if t]
+
+
+def aggregate(scores: Sequence[Score]) -> Score:
+    """
+    Makale skorlarını birleştirir: toplam skoru en yüksek etiket ve o etiketli
+    makalelerin ortalama skoru. Tek makalede makalenin kendi skoru döner.
+    """
+    if not scores:
+        return NEUTRAL
+    totals: Dict[str, List[float]] = {}
+    for label, s in scores:
+        totals.setdefault(label, []).append(s)
+    label = max(totals, key=lambda k: sum(totals[k]))
+    return label, float(np.mean(totals[label]))
+
+
+class SentimentService:
+    def __init__(
+        self,
+        keywords: Optional[Dict[str, Sequence[str]]] = None,
+        *,
+        pipe: Any = None,
+        use_pipeline: bool = True,
+        batch_size: int = SENTIMENT_BATCH_SIZE,
+        batch_wait_ms: float = SENTIMENT_BATCH_WAIT_MS,
+        cache_size: int = SENTIMENT_CACHE_SIZE,
+    ):
+        self.keywords = KeywordScorer(keywords)
+        self._pipe = pipe
+        self.use_pipeline = use_pipeline
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Score]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pending: List[Tuple[str, Future]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def pipeline(self):
+        if self._pipe is None and self.use_pipeline:
+            self._pipe = _get_pipeline()
+        return self._pipe
+
+    # ---------------------------------------------------------------- önbellek
+    def _cached(self, key: str) -> Optional[Score]:
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+            return hit
+
+    def _remember(self, key: str, score: Score) -> None:
+        with self._cache_lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # ------------------------------------------------------------------ skor
+    def _infer(self, texts: List[str]) -> List[Score]:
+        """Tek pipeline çağrısı; hata olursa tüm parti anahtar kelime yedeğine düşer."""
+        pipe = self.pipeline
+        if pipe is not None:
+            try:
+                outs = pipe(texts, batch_size=self.batch_size, truncation=True)
+                return [(o["label"].lower(), float(o["score"])) for o in outs]
+            except Exception as e:
+                logger.warning(f"Sentiment pipeline error: {e}")
+        return self.keywords.score_many(texts)
+
+    def score_many(self, texts: Sequence[str]) -> List[Score]:
+        """Metin listesini skorlar; önbellekte olmayan benzersiz metinler tek partide."""
+        keys = [_digest(t) for t in texts]
+        out: List[Optional[Score]] = [self._cached(k) for k in keys]
+        todo: Dict[str, str] = {}
+        for k, t, hit in zip(keys, texts, out):
+            if hit is None:
+                todo.setdefault(k, t)
+        if todo:
+            todo_keys = list(todo)
+            for i in range(0, len(todo_keys), self.batch_size):
+                chunk = todo_keys[i : i + self.batch_size]
+                for k, s in zip(chunk, self._infer([todo[k] for k in chunk])):
+                    self._remember(k, s)
+            out = [hit if hit is not None else self._cached(k) for k, hit in zip(keys, out)]
+        return [s or NEUTRAL for s in out]
+
+    def score(self, text: str) -> Score:
+        """Tekil metin; pipeline varsa eşzamanlı çağrılarla aynı partide skorlanır."""
+        key = _digest(text)
+        hit = self._cached(key)
+        if hit is not None:
+            return hit
+        if self.pipeline is None:
+            result = self.keywords.score_many([text])[0]
+            self._remember(key, result)
+            return result
+        fut: Future = Future()
+        self._ensure_worker()
+        with self._cond:
+            self._pending.append((text, fut))
+            self._cond.notify()
+        try:
+            return fut.result(timeout=SENTIMENT_TIMEOUT)
+        except FutureTimeout:
+            # sonuç sonradan gelirse yine önbelleğe yazılır
+            logger.warning("Sentiment partisi zaman aşımına uğradı")
+            return NEUTRAL
+
+    def score_articles(self, articles: Sequence[Dict[str, Any]]) -> Tuple[Score, List[Score]]:
+        """Makale başına (başlık + açıklama) skor ve birleşik skor."""
+        scores = self.score_many(_texts(articles))
+        return aggregate(scores), scores
+
+    def score_article_groups(self, groups: Sequence[Sequence[Dict[str, Any]]]) -> List[Score]:
+        """Birden çok makale listesinin (ör. coin başına) birleşik skorları; tek ``score_many``."""
+        texts = [_texts(articles) for articles in groups]
+        flat = self.score_many([t for group in texts for t in group])
+        out, i = [], 0
+        for group in texts:
+            out.append(aggregate(flat[i : i + len(group)]))
+            i += len(group)
+        return out
+
+    # ---------------------------------------------------------- mikro-parti
+    def _ensure_worker(self) -> None:
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                # fork sonrası miras kalan bekleyenler bu süreçte geçersiz
+                self._pending = []
+                self._thread = None
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sentiment-batcher", daemon=True)
+                self._thread.start()
+
+    def _take_batch(self) -> List[Tuple[str, Future]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            if len(self._pending) < self.batch_size:
+                # ilk metinden sonra kısa süre daha bekle; parti dolarsa erken çık
+                self._cond.wait_for(lambda: len(self._pending) >= self.batch_size, timeout=self.batch_wait)
+            batch, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size :]
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            try:
+                texts = [t for t, _ in batch]
+                results = self.score_many(texts)
+            except Exception as e:  # pragma: no cover - beklenmeyen hata
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), r in zip(batch, results):
+                fut.set_result(r)
+
+
+_service: Optional[SentimentService] = None
+_service_lock = threading.Lock()
+
+
+def get_sentiment_service(keywords: Optional[Dict[str, Sequence[str]]] = None) -> SentimentService:
+    """Süreç genelinde paylaşılan servis (pipeline ve önbellek ortak)."""
+    global _service  # pylint: disable=global-statement
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SentimentService(keywords)
+    return _service
@@ -2,16 +2,11 @@
 
 import base64
 import json
-import os
+import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
-try:
-    import yaml  # YAML konfigleri
-except Exception:  # pragma: no cover
-    yaml = None
-
 try:
     import numpy as np  # sayısal işlemler
 except Exception:  # pragma: no cover
@@ -24,39 +19,37 @@ from flask import current_app
 from loguru import logger
 from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from sqlalchemy import insert as sa_insert
 
-# import pandas_ta as ta
-
-try:
-    import pandas_ta as ta
-except ImportError:
-    ta = None
-
-# İsteğe bağlı ağır kütüphaneler
-try:
-    from prophet import Prophet
-except ImportError:
-    Prophet = None
+from backend.utils.lazy import lazy_import, module_available
 
-try:
-    from transformers import pipeline as _pipeline
-except ImportError:
-    _pipeline = None
+# İsteğe bağlı ağır kütüphaneler: ilk kullanımda yüklenir. Prophet yalnızca
+# tahmin havuzu süreçlerinde içe aktarılır; burada sadece kurulu mu diye bakılır.
+ta = lazy_import("pandas_ta")
+PROPHET_AVAILABLE = module_available("prophet")
 
 from backend.constants import BASIC_ALLOWED_COINS, BASIC_WEEKLY_VIEW_LIMIT
+from backend.core.archiver import get_archiver
+from backend.core.backtest import run_backtest, save_result as save_backtest_result
+from backend.core.forecast_cache import get_forecast_cache
+from backend.core.rule_plan import RuleBook
+from backend.core.sentiment import get_sentiment_service
+from backend.core.universe import (MARKETS_PAGE_SIZE, indicator_frame,
+                                   sparkline_series)
+from backend.core.universe import volatility as universe_volatility
 from backend.db import db
-from backend.db.models import ABHData, DBHData, SubscriptionPlan, User
+from backend.db.models import DBHData, SubscriptionPlan, User
+from backend.services.coingecko import RateLimited, get_coingecko_client
 from backend.tasks import run_full_analysis  # Celery task
-from backend.utils.helpers import bulk_insert_records
 
-# Karar kurallarını yükle (YAML veya Flask config içinden)
-RULES_CONFIG: Dict[str, Any] = {}
-_config_path = current_app.config.get("DECISION_RULES_PATH")
-if yaml and _config_path and os.path.exists(_config_path):
-    with open(_config_path) as f:
-        RULES_CONFIG = yaml.safe_load(f)
-else:
-    RULES_CONFIG = current_app.config.get("DECISION_RULES", {})
+# Karar kurallarını yükle (YAML veya Flask config içinden); dosya değişince
+# plan yeniden derlenir
+RULE_BOOK = RuleBook(
+    current_app.config.get("DECISION_RULES_PATH"),
+    current_app.config.get("DECISION_RULES", {}),
+)
+RULE_BOOK.refresh()
+RULES_CONFIG: Dict[str, Any] = RULE_BOOK.raw
 
 
 @dataclass
@@ -122,6 +115,13 @@ class HTTPClient:
         return cls.session().get(url, timeout=timeout, **kwargs)
 
 
+_PRICE_TAGS = json.dumps(["price", "technical"])
+# Toplu yol 7 günlük sparkline + kendi indikatör hesabıyla üretir; tekil yolun
+# 30 günlük ``price:`` kayıtlarıyla karışmaması için ayrı anahtar alanı
+PRICE_KEY = "price:{}"
+PRICE_BATCH_KEY = "price7d:{}"
+
+
 class DataCollector:
     """
     Fiyat, on-chain, sosyal medya ve haber verilerini toplayıp önbelleğe alır,
@@ -135,23 +135,14 @@ class DataCollector:
         self.cache_ttl: int = int(current_app.config.get("PRICE_CACHE_TTL", 300))
 
     def collect_price_data(self, coin: str) -> Dict[str, Any]:
-        cache_key = f"price:{coin}"
+        cache_key = PRICE_KEY.format(coin)
         if self.redis and self.cache_ttl > 0:
             cached = self.redis.get(cache_key)
             if cached:
                 return json.loads(cached)
 
         try:
-            url = f"https://api.coingecko.com/api/v3/coins/{coin}/market_chart"
-            params = {"vs_currency": "usd", "days": 30}
-            resp = HTTPClient.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
-
-            prices = [p[1] for p in data["prices"]]
-            times = [
-                datetime.fromtimestamp(p[0] / 1000).isoformat() for p in data["prices"]
-            ]
+            prices, times = self._fetch_market_chart(coin)
             indicators = self._calc_indicators(prices)
 
             result: Dict[str, Any] = {
@@ -161,28 +152,98 @@ class DataCollector:
                 "times": times,
                 **indicators,
             }
-
-            # Ham veriyi kaydet
-            entry = ABHData(
-                source="coingecko",
-                type="price",
-                content=json.dumps(result),
-                timestamp=datetime.utcnow().isoformat(),
-                coin=coin,
-                tags=json.dumps(["price", "technical"]),
-            )
-            bulk_insert_records([entry])
-
-            # Redis önbelleğe yaz
-            if self.redis and self.cache_ttl > 0:
-                self.redis.set(cache_key, json.dumps(result), ex=self.cache_ttl)
-
+            self._store_price(coin, result)
             return result
 
-        except RequestException as e:
+        except (RequestException, RateLimited) as e:
             logger.error(f"Price fetch error ({coin}): {e}")
             raise
 
+    def _fetch_market_chart(self, coin: str) -> Tuple[List[float], List[str]]:
+        # paylaşılan istemci: ortak RPS bütçesi, yanıt önbelleği ve tekil uçuş
+        data = get_coingecko_client().get_json(
+            f"coins/{coin}/market_chart", {"vs_currency": "usd", "days": 30}
+        )
+        prices = [p[1] for p in data["prices"]]
+        times = [datetime.fromtimestamp(p[0] / 1000).isoformat() for p in data["prices"]]
+        return prices, times
+
+    def _fetch_market_sparklines(self, coins: List[str]) -> Dict[str, Tuple[List[float], List[str]]]:
+        series: Dict[str, Tuple[List[float], List[str]]] = {}
+        for i in range(0, len(coins), MARKETS_PAGE_SIZE):
+            chunk = coins[i : i + MARKETS_PAGE_SIZE]
+            params = {
+                "vs_currency": "usd",
+                "ids": ",".join(chunk),
+                "sparkline": "true",
+                "per_page": len(chunk),
+            }
+            try:
+                series.update(sparkline_series(get_coingecko_client().get_json("coins/markets", params)))
+            except (RequestException, RateLimited) as e:
+                logger.warning(f"coins/markets error ({len(chunk)} coin): {e}")
+        return series
+
+    def _store_price(self, coin: str, result: Dict[str, Any], key: str = PRICE_KEY) -> None:
+        payload = json.dumps(result)
+
+        # Ham veriyi write-behind kuyruğuna bırak (DB yazımı analiz yolunda değil)
+        get_archiver().submit(
+            {
+                "source": "coingecko",
+                "type": "price",
+                "content": payload,
+                "timestamp": datetime.utcnow().isoformat(),
+                "coin": coin,
+                "tags": _PRICE_TAGS,
+            }
+        )
+
+        # Redis önbelleğe yaz
+        if self.redis and self.cache_ttl > 0:
+            self.redis.set(key.format(coin), payload, ex=self.cache_ttl)
+
+    def collect_price_batch(self, coins: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Birden çok coin için fiyat verisi. Önbellekte olmayanlar tek
+        ``coins/markets`` (ids + 7 günlük sparkline) çağrısıyla, sparkline
+        dönmeyenler tek tek ``market_chart`` ile alınır. İndikatörler tüm
+        coinler için tek DataFrame üzerinde hesaplanır. Önbellek
+        ``collect_price_data`` ile paylaşılmaz (``price7d:`` anahtarları).
+        """
+        out: Dict[str, Dict[str, Any]] = {}
+        todo = list(dict.fromkeys(coins))
+        if self.redis and self.cache_ttl > 0 and todo:
+            for coin, cached in zip(todo, self.redis.mget([PRICE_BATCH_KEY.format(c) for c in todo])):
+                if cached:
+                    out[coin] = json.loads(cached)
+            todo = [c for c in todo if c not in out]
+        if not todo:
+            return out
+
+        series = self._fetch_market_sparklines(todo)
+        for coin in todo:
+            if coin not in series:
+                try:
+                    series[coin] = self._fetch_market_chart(coin)
+                except (RequestException, RateLimited) as e:
+                    logger.error(f"Price fetch error ({coin}): {e}")
+        if not series:
+            return out
+
+        frame = indicator_frame({c: p for c, (p, _) in series.items()})
+        for coin, (prices, times) in series.items():
+            result = {
+                "coin": coin,
+                "current_price": prices[-1],
+                "prices": prices,
+                "times": times,
+                **frame.loc[coin].to_dict(),
+            }
+            self._store_price(coin, result, key=PRICE_BATCH_KEY)
+            out[coin] = result
+        return out
+
     def _calc_indicators(self, prices: List[float]) -> Dict[str, float]:
         series = pd.Series(prices)
         rsi = float(ta.rsi(series).iloc[-1]) if len(series) > 14 else 50.0
@@ -226,25 +287,18 @@ class AIInterpreter:
     """
 
     def __init__(self):
-        self.pipeline = _pipeline("sentiment-analysis") if _pipeline else None
         self.fallback = current_app.config.get("SENTIMENT_KEYWORDS", {})
+        # pipeline süreç başına bir kez yüklenir; tekil çağrılar mikro-partilenir
+        self.sentiment = get_sentiment_service(self.fallback)
+        self.forecasts = get_forecast_cache(current_app.extensions.get("redis_client"))
 
     def analyze_sentiment(self, text: str) -> Tuple[str, float]:
-        if self.pipeline:
-            try:
-                out = self.pipeline(text)[0]
-                return out["label"].lower(), out["score"]
-            except Exception as e:
-                logger.warning(f"Sentiment pipeline error: {e}")
-        # Basit kelime sayma fallback
-        lower = text.lower()
-        pos = sum(lower.count(w) for w in self.fallback.get("positive", []))
-        neg = sum(lower.count(w) for w in self.fallback.get("negative", []))
-        if pos > neg:
-            return "positive", min(0.9, 0.5 + 0.1 * pos)
-        if neg > pos:
-            return "negative", min(0.9, 0.5 + 0.1 * neg)
-        return "neutral", 0.5
+        return self.sentiment.score(text)
+
+    def analyze_news(self, news: List[Dict[str, Any]]) -> Tuple[str, float]:
+        """Haberleri tek tek skorlayıp birleştirir (tek parti, metin önbellekli)."""
+        overall, _ = self.sentiment.score_articles(news)
+        return overall
 
     def forecast(
         self,
@@ -267,24 +321,17 @@ class AIInterpreter:
         provide the prediction dates, a confidence score calculated from
         the prediction band width and a short explanation string.
         """
-        if Prophet and len(prices) >= 30:
-            df = pd.DataFrame({"ds": pd.to_datetime(times), "y": prices})
+        if PROPHET_AVAILABLE and len(prices) >= 30:
             try:
-                model = Prophet(yearly_seasonality=True, weekly_seasonality=True)
-                model.fit(df)
-                future = model.make_future_dataframe(
-                    periods=days, include_history=False
-                )
-                forecast = model.predict(future)
+                # fit ayrı süreç havuzunda; (coin, days) sonucu son fiyat damgasıyla önbellekte
+                raw, _status = self.forecasts.get(coin_name, prices, times, days)
+                if raw is None:
+                    return None, "error", {"upper": None, "lower": None}, [], 0.0, ""
 
-                yhat = forecast["yhat"].astype(float).tolist()
-                uppers = (
-                    forecast.get("yhat_upper", forecast["yhat"]).astype(float).tolist()
-                )
-                lowers = (
-                    forecast.get("yhat_lower", forecast["yhat"]).astype(float).tolist()
-                )
-                dates = forecast["ds"].dt.strftime("%Y-%m-%d").tolist()
+                yhat = raw["yhat"]
+                uppers = raw["upper"]
+                lowers = raw["lower"]
+                dates = raw["dates"]
 
                 # Confidence based on prediction band width
                 mean_y = float(np.mean(yhat)) if yhat else 0.0
@@ -337,58 +384,19 @@ class DecisionEngine:
     """
 
     def __init__(self):
-        self.rules = RULES_CONFIG
+        self.book = RULE_BOOK
 
-    def decide(self, analysis: Dict[str, Any], profile: str) -> Dict[str, Any]:
-        rules = self.rules.get(profile, self.rules.get("moderate", {}))
-        vol = analysis.get("volatility", 1.0)
-        factor = 1.0 / (1 + vol)
-
-        buy_score = 0.0
-        sell_score = 0.0
-        for cond in rules.get("buy", []):
-            if self._match(cond, analysis):
-                buy_score += cond.get("weight", 1) * factor
-        for cond in rules.get("sell", []):
-            if self._match(cond, analysis):
-                sell_score += cond.get("weight", 1) * factor
-
-        threshold = rules.get("threshold", 10)
-        if buy_score > sell_score and buy_score > threshold:
-            signal = "BUY"
-            confidence = min(0.95, 0.5 + 0.01 * buy_score)
-        elif sell_score > buy_score and sell_score > threshold:
-            signal = "SELL"
-            confidence = min(0.95, 0.5 + 0.01 * sell_score)
-        else:
-            signal = "HOLD"
-            confidence = 0.5
-
-        current_price = analysis.get("current_price", 0.0)
-        stop_loss = current_price * (1 - rules.get("stop_loss_pct", 0.05))
-        position_size = rules.get("position_size_pct", 0.1)
+    @property
+    def rules(self) -> Dict[str, Any]:
+        self.book.refresh()
+        return self.book.raw
 
-        return {
-            "signal": signal,
-            "confidence": confidence,
-            "stop_loss": stop_loss,
-            "position_size_pct": position_size,
-        }
+    def decide(self, analysis: Dict[str, Any], profile: str) -> Dict[str, Any]:
+        return self.book.profile(profile).decide(analysis)
 
-    def _match(self, cond: Dict[str, Any], analysis: Dict[str, Any]) -> bool:
-        metric = cond.get("metric")
-        op = cond.get("operator")
-        val = cond.get("value")
-        if metric not in analysis:
-            return False
-        actual = analysis[metric]
-        if op == ">":
-            return actual > val
-        if op == "<":
-            return actual < val
-        if op == "==":
-            return actual == val
-        return False
+    def decide_frame(self, frame: pd.DataFrame, profile: str) -> pd.DataFrame:
+        """Geçmiş analiz satırlarını aynı planla tek numpy geçişinde skorlar."""
+        return self.book.profile(profile).decide_columns(frame)
 
 
 class YTDCryptoSystem:
@@ -409,72 +417,151 @@ class YTDCryptoSystem:
         task = run_full_analysis.delay(coin, profile, user.id if user else None)
         return {"status": "pending", "task_id": task.id}
 
+    def analyze_universe(
+        self, coins: List[str], profile: str
+    ) -> Tuple[List[AnalysisResult], Dict[str, Any]]:
+        """
+        Coin listesini tek geçişte analiz eder: fiyatlar toplu uç noktadan,
+        indikatörler ve kararlar tüm coinler için vektörel, haber skorları tek
+        partide. Fiyatı alınamayan coinler atlanır. ``(sonuçlar, timings)`` döner.
+        """
+        timings: Dict[str, Any] = {}
+
+        def mark(stage: str, t0: float) -> float:
+            now = time.perf_counter()
+            timings[stage] = round((now - t0) * 1000.0, 1)
+            return now
+
+        t = t_start = time.perf_counter()
+        prices = self.collector.collect_price_batch(coins)
+        coins = [c for c in dict.fromkeys(coins) if c in prices]
+        t = mark("price", t)
+        onchain = [self.collector.collect_onchain_data(c) for c in coins]
+        social = [self.collector.collect_social_data(c) for c in coins]
+        news = [self.collector.collect_news_data(c) for c in coins]
+        t = mark("sources", t)
+        news_scores = [s for _, s in self.ai.sentiment.score_article_groups(news)]
+        t = mark("sentiment", t)
+        forecasts = [
+            self.ai.forecast(prices[c]["prices"], prices[c]["times"], coin_name=c)
+            for c in coins
+        ]
+        t = mark("forecast", t)
+
+        vol = universe_volatility({c: prices[c]["prices"] for c in coins})
+        frame = pd.DataFrame(
+            {
+                "current_price": [prices[c]["current_price"] for c in coins],
+                "rsi": [prices[c]["rsi"] for c in coins],
+                "macd": [prices[c]["macd"] for c in coins],
+                "bb_upper": [prices[c]["bb_upper"] for c in coins],
+                "bb_lower": [prices[c]["bb_lower"] for c in coins],
+                "stochastic": [prices[c]["stochastic"] for c in coins],
+                "news_sentiment": news_scores,
+                "twitter_sentiment": [s["twitter_sentiment"] for s in social],
+                "social_volume": [s["social_volume"] for s in social],
+                "active_addresses": [o["active_addresses"] for o in onchain],
+                "exchange_inflow": [o["exchange_inflow"] for o in onchain],
+                "exchange_outflow": [o["exchange_outflow"] for o in onchain],
+                "volatility": [float(vol[c]) for c in coins],
+            },
+            index=coins,
+        )
+        decisions = self.engine.decide_frame(frame, profile)
+        t = mark("decide", t)
+
+        now = datetime.utcnow()
+        results = []
+        for c, fc in zip(coins, forecasts):
+            row, dec = frame.loc[c], decisions.loc[c]
+            volatility = float(row["volatility"])
+            results.append(
+                AnalysisResult(
+                    coin=c,
+                    timestamp=now,
+                    rsi=float(row["rsi"]),
+                    macd=float(row["macd"]),
+                    bb_upper=float(row["bb_upper"]),
+                    bb_lower=float(row["bb_lower"]),
+                    stochastic=float(row["stochastic"]),
+                    candlestick_pattern=prices[c]["candlestick_pattern"],
+                    news_sentiment=float(row["news_sentiment"]),
+                    twitter_sentiment=float(row["twitter_sentiment"]),
+                    social_volume=int(row["social_volume"]),
+                    active_addresses=int(row["active_addresses"]),
+                    exchange_inflow=float(row["exchange_inflow"]),
+                    exchange_outflow=float(row["exchange_outflow"]),
+                    forecast_next_day=fc[0],
+                    forecast_explanation=fc[5],
+                    forecast_upper_bound=fc[2].get("upper"),
+                    forecast_lower_bound=fc[2].get("lower"),
+                    volatility=volatility,
+                    signal=str(dec["signal"]),
+                    confidence=float(dec["confidence"]),
+                    risk_level=(
+                        "high"
+                        if volatility > 0.1
+                        else "medium" if volatility > 0.05 else "low"
+                    ),
+                    suggested_stop_loss=float(dec["stop_loss"]),
+                    suggested_position_size=float(dec["position_size_pct"]),
+                )
+            )
+        timings["total_ms"] = round((time.perf_counter() - t_start) * 1000.0, 1)
+        return results, timings
+
+    @staticmethod
+    def _dbh_row(analysis: AnalysisResult) -> Dict[str, Any]:
+        return dict(
+            coin=analysis.coin,
+            timestamp=analysis.timestamp.isoformat(),
+            # Teknik indikatörler
+            rsi=analysis.rsi,
+            macd=analysis.macd,
+            bb_upper=analysis.bb_upper,
+            bb_lower=analysis.bb_lower,
+            # Duygu analizi
+            news_sentiment=analysis.news_sentiment,
+            twitter_sentiment=analysis.twitter_sentiment,
+            social_volume=analysis.social_volume,
+            # On-chain veriler
+            active_addresses=analysis.active_addresses,
+            exchange_inflow=analysis.exchange_inflow,
+            exchange_outflow=analysis.exchange_outflow,
+            # Tahmin
+            forecast_next_day=analysis.forecast_next_day,
+            forecast_upper_bound=analysis.forecast_upper_bound,
+            forecast_lower_bound=analysis.forecast_lower_bound,
+            forecast_explanation=analysis.forecast_explanation,
+            volatility=analysis.volatility,
+            # Karar motoru
+            signal=analysis.signal,
+            confidence=analysis.confidence,
+            risk_level=analysis.risk_level,
+            suggested_stop_loss=analysis.suggested_stop_loss,
+            suggested_position_size=analysis.suggested_position_size,
+        )
+
     def save_to_dbh(self, analysis: AnalysisResult):
         with current_app.app_context():
-            record = DBHData(
-                coin=analysis.coin,
-                timestamp=analysis.timestamp.isoformat(),
-                # Teknik indikatörler
-                rsi=analysis.rsi,
-                macd=analysis.macd,
-                bb_upper=analysis.bb_upper,
-                bb_lower=analysis.bb_lower,
-                # Duygu analizi
-                news_sentiment=analysis.news_sentiment,
-                twitter_sentiment=analysis.twitter_sentiment,
-                social_volume=analysis.social_volume,
-                # On-chain veriler
-                active_addresses=analysis.active_addresses,
-                exchange_inflow=analysis.exchange_inflow,
-                exchange_outflow=analysis.exchange_outflow,
-                # Tahmin
-                forecast_next_day=analysis.forecast_next_day,
-                forecast_upper_bound=analysis.forecast_upper_bound,
-                forecast_lower_bound=analysis.forecast_lower_bound,
-                forecast_explanation=analysis.forecast_explanation,
-                volatility=analysis.volatility,
-                # Karar motoru
-                signal=analysis.signal,
-                confidence=analysis.confidence,
-                risk_level=analysis.risk_level,
-                suggested_stop_loss=analysis.suggested_stop_loss,
-                suggested_position_size=analysis.suggested_position_size,
-            )
-            db.session.add(record)
+            db.session.add(DBHData(**self._dbh_row(analysis)))
+            db.session.commit()
+
+    def save_many_to_dbh(self, analyses: List[AnalysisResult]) -> None:
+        """Tüm sonuçları tek çok satırlı INSERT ile yazar."""
+        if not analyses:
+            return
+        with current_app.app_context():
+            db.session.execute(sa_insert(DBHData), [self._dbh_row(a) for a in analyses])
             db.session.commit()
 
     def backtest_rules(
         self, coin: str, profile: str, start: str, end: str
     ) -> Dict[str, Any]:
-        # Geriye dönük test için DBHData’dan al
-        records = DBHData.query.filter(
-            DBHData.coin == coin, DBHData.timestamp >= start, DBHData.timestamp <= end
-        ).all()
-
-        wins = trades = 0
-        for rec in records:
-            # Burada örnek olarak sinyal yüzdesi RSI olarak kullanıldı
-            analysis_stub = {
-                "current_price": rec.rsi,
-                **{
-                    field: getattr(rec, field)
-                    for field in (
-                        "rsi",
-                        "macd",
-                        "bb_upper",
-                        "bb_lower",
-                        "stochastic_oscillator",
-                    )
-                    if hasattr(rec, field)
-                },
-            }
-            out = self.engine.decide(analysis_stub, profile)
-            trades += 1
-            if out["signal"] in ("BUY", "SELL"):
-                wins += 1
-
-        return {
-            "profit_pct": 0.0,
-            "trades": trades,
-            "win_rate": (wins / trades) if trades else 0.0,
-        }
+        """
+        DBHData sinyallerini parça parça akıtarak depodaki gerçek fiyatlarla
+        PnL, maksimum düşüş ve Sharpe hesaplar; sonucu ``BacktestResult``'a yazar.
+        """
+        result = run_backtest(self.engine, coin, profile, start, end)
+        result["id"] = save_backtest_result(coin, profile, start, end, result)
+        return result
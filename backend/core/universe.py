@@ -0,0 +1,127 @@
+"""
+Çoklu coin analizi için yardımcılar.
+
+ - ``sparkline_series``: ``coins/markets`` (``sparkline=true``) yanıtını
+   coin -> (fiyatlar, zamanlar) serilerine çevirir. Sparkline saatlik 7 günlük
+   seridir; zamanlar ``last_updated`` damgasından geriye doğru üretilir.
+ - ``indicator_frame``: tüm coinlerin fiyatlarını tek DataFrame'e (sütun başına
+   coin, sona hizalı) koyup RSI, MACD, Bollinger ve stokastik değerlerini
+   sütun bazında tek geçişte hesaplar. Kısa seriler için varsayılanlar
+   ``DataCollector._calc_indicators`` ile aynıdır. RSI ve MACD, pandas_ta'nın
+   (talib'siz) tanımlarını izler: RSI ``rma`` (``ewm(adjust=True)``), MACD
+   EMA'ları ilk ``length`` değerin SMA'sıyla tohumlanır.
+"""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+MARKETS_PAGE_SIZE = int(os.environ.get("COINGECKO_MARKETS_PAGE_SIZE", "250"))
+
+Series = Tuple[List[float], List[str]]
+
+
+def _parse_ts(value: Any) -> datetime:
+    try:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return ts.replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
+def sparkline_series(markets: Iterable[Dict[str, Any]]) -> Dict[str, Series]:
+    """``coins/markets`` satırlarından sparkline'ı olan coinlerin serileri."""
+    out: Dict[str, Series] = {}
+    for row in markets or []:
+        prices = [float(p) for p in ((row.get("sparkline_in_7d") or {}).get("price") or []) if p is not None]
+        if not prices or not row.get("id"):
+            continue
+        if row.get("current_price") is not None:
+            # sparkline son saatin kapanışında biter; güncel fiyatı sona ekle
+            prices.append(float(row["current_price"]))
+        end = _parse_ts(row.get("last_updated"))
+        n = len(prices)
+        times = [(end - timedelta(hours=n - 1 - i)).isoformat() for i in range(n)]
+        out[row["id"]] = (prices, times)
+    return out
+
+
+def price_frame(prices: Dict[str, Sequence[float]]) -> pd.DataFrame:
+    """Sütun başına coin; farklı uzunluktaki seriler sona hizalanır (baş NaN)."""
+    if not prices:
+        return pd.DataFrame()
+    width = max(len(p) for p in prices.values())
+    data = np.full((width, len(prices)), np.nan)
+    for j, p in enumerate(prices.values()):
+        if len(p):
+            data[width - len(p) :, j] = np.asarray(p, dtype=np.float64)
+    return pd.DataFrame(data, columns=list(prices))
+
+
+def _seeded_ema(frame: pd.DataFrame, length: int) -> pd.DataFrame:
+    """pandas_ta ``ema``: her sütunda ilk ``length`` geçerli değerin SMA'sıyla başlar."""
+    first = frame.notna().to_numpy().argmax(axis=0)
+    row = np.arange(len(frame))[:, None]
+    seed = first[None, :] + length - 1
+    sma = frame.rolling(length).mean()
+    seeded = frame.where(row > seed, sma.where(row == seed))
+    return seeded.ewm(span=length, adjust=False).mean()
+
+
+def indicator_frame(prices: Dict[str, Sequence[float]]) -> pd.DataFrame:
+    """
+    Coin başına son indikatör değerleri (index coin): rsi, macd, bb_upper,
+    bb_lower, stochastic, candlestick_pattern.
+    """
+    frame = price_frame(prices)
+    cols = list(frame.columns)
+    if not cols:
+        return pd.DataFrame(columns=["rsi", "macd", "bb_upper", "bb_lower", "stochastic", "candlestick_pattern"])
+    lengths = frame.notna().sum().to_numpy()
+    last = frame.ffill().iloc[-1].to_numpy()
+
+    delta = frame.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, min_periods=14).mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = gain.iloc[-1].to_numpy() / loss.iloc[-1].to_numpy()
+    rsi = np.where(np.isinf(rs), 100.0, 100.0 - 100.0 / (1.0 + rs))
+    rsi = np.where((lengths > 14) & np.isfinite(rsi), rsi, 50.0)
+
+    macd = (_seeded_ema(frame, 12) - _seeded_ema(frame, 26)).iloc[-1].to_numpy()
+    macd = np.where((lengths > 26) & np.isfinite(macd), macd, 0.0)
+
+    mid = frame.rolling(20).mean().iloc[-1].to_numpy()
+    std = frame.rolling(20).std(ddof=0).iloc[-1].to_numpy()
+    bb_upper = np.where(np.isfinite(mid), mid + 2 * std, last)
+    bb_lower = np.where(np.isfinite(mid), mid - 2 * std, last)
+
+    low = frame.rolling(14).min()
+    high = frame.rolling(14).max()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fast_k = 100.0 * (frame - low) / (high - low)
+    stoch = fast_k.rolling(3).mean().iloc[-1].to_numpy()
+    stoch = np.where((lengths > 14) & np.isfinite(stoch), stoch, 50.0)
+
+    return pd.DataFrame(
+        {
+            "rsi": rsi,
+            "macd": macd,
+            "bb_upper": bb_upper,
+            "bb_lower": bb_lower,
+            "stochastic": stoch,
+            "candlestick_pattern": "None",
+        },
+        index=cols,
+    )
+
+
+def volatility(prices: Dict[str, Sequence[float]]) -> pd.Series:
+    """Coin başına std / ortalama (``np.std`` gibi ddof=0)."""
+    frame = price_frame(prices)
+    return frame.std(ddof=0) / frame.mean()
@@ -383,6 +383,8 @@ class CeleryTaskLog(db.Model):
     )
     result = Column(Text, nullable=True)
     traceback = Column(Text, nullable=True)
+    # adım bazlı süre dökümü (JSON): {"stages": {...}, "total_ms": ...}
+    timings = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
 
@@ -17,6 +17,7 @@ from backend import limiter
 from backend.auth.jwt_utils import jwt_required_if_not_testing
 from backend.db import db
 from backend.db.models import DraksDecision, DraksSignalRun, UsageLog
+from backend.marketdata import read_or_fetch
 from backend.middleware.plan_limits import enforce_plan_limit
 from backend.utils.feature_flags import feature_flag_enabled
 from backend.utils.logger import create_log
@@ -114,14 +115,18 @@ def draks_health():
 def _fetch_ohlcv_ccxt(
     symbol: str, timeframe: str = "1h", limit: int = 500
 ) -> pd.DataFrame:
-    """CCXT ile borsadan OHLCV verisi çek."""
-    if ccxt is None:
-        raise RuntimeError("ccxt kurulu değil ve candles verilmedi")
-    ex = ccxt.binance({"enableRateLimit": True})
-    o = ex.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
-    df = pd.DataFrame(o, columns=["ts", "open", "high", "low", "close", "volume"])
-    df["ts"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
-    df = df.set_index("ts").sort_index()
+    """OHLCV geçmişini yerel depodan oku; eksik/bayatsa CCXT ile borsadan çek."""
+
+    def _fetch(n: int) -> pd.DataFrame:
+        if ccxt is None:
+            raise RuntimeError("ccxt kurulu değil ve candles verilmedi")
+        ex = ccxt.binance({"enableRateLimit": True})
+        o = ex.fetch_ohlcv(symbol, timeframe=timeframe, limit=n)
+        df = pd.DataFrame(o, columns=["ts", "open", "high", "low", "close", "volume"])
+        df["ts"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
+        return df.set_index("ts").sort_index()
+
+    df, _ = read_or_fetch(symbol, timeframe, limit, _fetch)
     return df
 
 
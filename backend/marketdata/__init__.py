@@ -0,0 +1,31 @@
+"""
+Piyasa verisi paketi.
+DRAKS, KM motorları, ML ve backtest'ler geçmiş OHLCV'yi buradaki depodan okur.
+"""
+
+from .resample import Resampler, get_resampler, read_history, resample_records
+from .store import (
+    OHLCV_DTYPE,
+    OHLCVStore,
+    closed_bars,
+    get_store,
+    read_or_fetch,
+    records_to_frame,
+    safe_symbol,
+    timeframe_to_timedelta,
+)
+
+__all__ = [
+    "OHLCV_DTYPE",
+    "OHLCVStore",
+    "Resampler",
+    "closed_bars",
+    "get_resampler",
+    "get_store",
+    "read_history",
+    "read_or_fetch",
+    "records_to_frame",
+    "resample_records",
+    "safe_symbol",
+    "timeframe_to_timedelta",
+]
@@ -0,0 +1,252 @@
+"""
+Watermark tabanlı artımlı OHLCV toplama.
+
+Her (kaynak, sembol, timeframe) için depoya yazılan son kapanmış barın zamanı
+(watermark) Redis hash'inde tutulur. Kaynaktan yalnızca watermark'tan yeni
+barlar sayfalanarak çekilir (boşluklar da böylece dolar), her parti depoya tek
+segment olarak eklenir ve partinin watermark'ları tek round trip'te yazılır.
+
+Depo her hostun yerel diskidir, Redis ise paylaşılır; bu yüzden etkin
+watermark ``min(redis, yerel depodaki son bar)``'dır. Yerel deposu boş ya da
+geride olan bir işçi başka hostun watermark'ına takılmaz, kendi açığını çeker.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+
+from .store import OHLCVStore, closed_bars, get_store, timeframe_to_timedelta
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+WATERMARK_KEY = "ingest:watermarks"
+PAGE_LIMIT = int(os.getenv("INGEST_PAGE_LIMIT", "1000"))
+# Watermark yoksa geriye doğru çekilecek bar sayısı
+BOOTSTRAP_BARS = int(os.getenv("INGEST_BOOTSTRAP_BARS", "500"))
+MAX_PAGES = int(os.getenv("INGEST_MAX_PAGES", "50"))
+
+_COLUMNS = ["ts", "open", "high", "low", "close", "volume"]
+
+WatermarkKey = Tuple[str, str, str]
+
+
+def _field(key: WatermarkKey) -> str:
+    return "|".join(key)
+
+
+def _tf_ms(timeframe: str) -> int:
+    return int(timeframe_to_timedelta(timeframe).total_seconds() * 1000)
+
+
+def _now_ms() -> int:
+    return int(pd.Timestamp.now(tz="UTC").value // 10**6)
+
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+_PERIOD_DAYS = {"d": 1, "wk": 7, "mo": 30, "y": 365}
+
+
+def period_to_bars(period: str, timeframe: str) -> int:
+    """yfinance ``period``'unu (``720d``, ``6mo``, ``1y``, ``ytd``, ``max``) bar sayısına çevirir."""
+    period = str(period).strip().lower()
+    if period == "max":
+        days = 100 * 365
+    elif period == "ytd":
+        now = pd.Timestamp.now(tz="UTC")
+        days = (now - now.normalize().replace(month=1, day=1)).days + 1
+    else:
+        m = _PERIOD_RE.match(period)
+        if not m:
+            raise ValueError(f"desteklenmeyen period: {period}")
+        days = int(m.group(1)) * _PERIOD_DAYS[m.group(2)]
+    return max(1, math.ceil(days * 86_400_000 / _tf_ms(timeframe)))
+
+
+class Watermarks:
+    """(kaynak, sembol, timeframe) -> son kapanmış barın ms zaman damgası."""
+
+    def __init__(self, redis_client=None, store: Optional[OHLCVStore] = None):
+        self._redis = redis_client
+        self._store = store
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from redis import Redis
+
+            self._redis = Redis.from_url(REDIS_URL, decode_responses=True)
+        return self._redis
+
+    @property
+    def store(self) -> OHLCVStore:
+        return self._store or get_store()
+
+    def get(self, source: str, symbol: str, timeframe: str) -> Optional[int]:
+        """Yerel depo boşsa None (bootstrap); değilse ``min(redis, depo)``."""
+        last = self.store.last_ts(symbol, timeframe)
+        if last is None:
+            return None
+        local = int(last.value // 10**6)
+        try:
+            raw = self.redis.hget(WATERMARK_KEY, _field((source, symbol, timeframe)))
+            if raw is not None:
+                return min(int(raw), local)
+        except Exception:
+            logger.debug("watermark redis okunamadı; depoya düşülüyor")
+        return local
+
+    def set_many(self, items: Dict[WatermarkKey, int]) -> None:
+        """Partinin tüm watermark'larını tek pipeline'da yazar."""
+        if not items:
+            return
+        try:
+            self.redis.hset(
+                WATERMARK_KEY, mapping={_field(k): int(v) for k, v in items.items()}
+            )
+        except Exception:
+            # Depo zaten kaynak gerçek; watermark bir sonraki turda türetilir
+            logger.warning("watermark redis yazılamadı")
+
+
+def _frame(rows: List[list]) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=_COLUMNS)
+    df["ts"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
+    return df
+
+
+def fetch_ccxt_since(
+    ex,
+    symbol: str,
+    timeframe: str,
+    since_ms: int,
+    *,
+    page_limit: int = PAGE_LIMIT,
+    now_ms: Optional[int] = None,
+) -> pd.DataFrame:
+    """``since_ms``'ten bugüne kadar olan barları sayfalayarak çeker."""
+    step = _tf_ms(timeframe)
+    now_ms = now_ms or _now_ms()
+    rows: List[list] = []
+    cursor = since_ms
+    for _ in range(MAX_PAGES):
+        page = ex.fetch_ohlcv(symbol, timeframe=timeframe, since=cursor, limit=page_limit)
+        if not page:
+            break
+        rows.extend(page)
+        last = int(page[-1][0])
+        if len(page) < page_limit or last + step >= now_ms:
+            break
+        cursor = last + step
+    return _frame(rows)
+
+
+def _ingest_one(
+    source: str,
+    symbol: str,
+    timeframe: str,
+    fetch_since: Callable[[str, str, int], pd.DataFrame],
+    watermarks: Watermarks,
+    store: OHLCVStore,
+    bootstrap_bars: int,
+) -> Tuple[int, Optional[int]]:
+    step = _tf_ms(timeframe)
+    wm = watermarks.get(source, symbol, timeframe)
+    since = wm + step if wm is not None else _now_ms() - bootstrap_bars * step
+    df = fetch_since(symbol, timeframe, since)
+    if df.empty:
+        return 0, None
+    df = closed_bars(df, timeframe)
+    if wm is not None:
+        df = df[pd.to_datetime(df["ts"], utc=True) > pd.Timestamp(wm, unit="ms", tz="UTC")]
+    if df.empty:
+        return 0, None
+    written = store.append(symbol, timeframe, df)
+    new_wm = int(pd.to_datetime(df["ts"], utc=True).max().value // 10**6)
+    return written, new_wm
+
+
+def ingest(
+    source: str,
+    pairs: Iterable[Tuple[str, str]],
+    fetch_since: Callable[[str, str, int], pd.DataFrame],
+    *,
+    concurrency: int = 1,
+    bootstrap_bars: int = BOOTSTRAP_BARS,
+    watermarks: Optional[Watermarks] = None,
+    store: Optional[OHLCVStore] = None,
+) -> Dict[str, int]:
+    """Bir kaynağın (sembol, timeframe) çiftlerini artımlı olarak toplar.
+
+    ``fetch_since(symbol, timeframe, since_ms)`` yalnızca yeni barları döndürmelidir.
+    Sonuç ``{"SYMBOL|tf": yazılan_satır}`` biçimindedir.
+    """
+    store = store or get_store()
+    watermarks = watermarks or Watermarks(store=store)
+    pairs = list(pairs)
+
+    def _run(pair: Tuple[str, str]):
+        symbol, timeframe = pair
+        try:
+            return pair, _ingest_one(
+                source, symbol, timeframe, fetch_since, watermarks, store, bootstrap_bars
+            )
+        except Exception:
+            logger.exception(f"ingest failed: {source} {symbol} {timeframe}")
+            return pair, (0, None)
+
+    if concurrency > 1 and len(pairs) > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(_run, pairs))
+    else:
+        results = [_run(p) for p in pairs]
+
+    counts: Dict[str, int] = {}
+    updates: Dict[WatermarkKey, int] = {}
+    for (symbol, timeframe), (written, new_wm) in results:
+        counts[f"{symbol}|{timeframe}"] = written
+        if new_wm is not None:
+            updates[(source, symbol, timeframe)] = new_wm
+    watermarks.set_many(updates)
+    logger.info(f"ingest {source}: +{sum(counts.values())} bar ({len(pairs)} seri)")
+    return counts
+
+
+def ccxt_fetcher(ex_id: str = "binance") -> Callable[[str, str, int], pd.DataFrame]:
+    """İş parçacığı başına bir CCXT borsa örneği kullanan ``fetch_since``."""
+    import ccxt
+
+    local = threading.local()
+
+    def _fetch(symbol: str, timeframe: str, since_ms: int) -> pd.DataFrame:
+        ex = getattr(local, "ex", None)
+        if ex is None:
+            ex = local.ex = getattr(ccxt, ex_id)({"enableRateLimit": True})
+        return fetch_ccxt_since(ex, symbol, timeframe, since_ms)
+
+    return _fetch
+
+
+def yf_fetcher() -> Callable[[str, str, int], pd.DataFrame]:
+    """yfinance ``start=`` ile yalnızca watermark sonrası barları çeker."""
+    import yfinance as yf
+
+    def _fetch(symbol: str, timeframe: str, since_ms: int) -> pd.DataFrame:
+        start = pd.Timestamp(since_ms, unit="ms", tz="UTC").strftime("%Y-%m-%d")
+        df = yf.download(symbol, interval=timeframe, start=start, progress=False)
+        if df is None or df.empty:
+            return pd.DataFrame(columns=_COLUMNS)
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        out = df.rename(columns=str.lower).reset_index()
+        out.rename(columns={out.columns[0]: "ts"}, inplace=True)
+        out["ts"] = pd.to_datetime(out["ts"], utc=True)
+        return out[_COLUMNS]
+
+    return _fetch
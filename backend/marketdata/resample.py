@@ -0,0 +1,188 @@
+"""
+Depodaki OHLCV üzerinde anlık yeniden örnekleme (resampling).
+
+4h/1d/1w gibi üst timeframe'ler, depodaki bir alt timeframe'den (hedefi tam
+bölen, verisi olan en kaba taban) birebir türetilir; böylece her timeframe'in
+borsadan ayrıca çekilip saklanması gerekmez.
+
+ - OHLC toplama ``np.*.reduceat`` ile vektörize yapılır.
+ - Hizalama Binance ile aynıdır: gün/saat UTC epoch'a, hafta pazartesiye.
+ - Yalnızca tabanı eksiksiz kovalar (kova başına ``hedef / taban`` bar)
+   yayınlanır; yarım ilk/son kova ve boşluklu kovalar atılır.
+ - Üretilen (kapanmış) barlar süreç içi LRU'da, tabanın segment kümesiyle
+   anahtarlanarak tutulur. Yalnızca sona yeni segment eklendiyse son kovadan
+   itibaren yeniden hesaplanır; geri doldurma/birleştirme gibi başka her
+   değişiklikte baştan üretilir.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import FrozenSet, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .store import (
+    OHLCV_DTYPE,
+    OHLCVStore,
+    Segment,
+    _to_ns,
+    get_store,
+    records_to_frame,
+    timeframe_to_timedelta,
+)
+
+RESAMPLE_CACHE_SIZE = int(os.environ.get("RESAMPLE_CACHE_SIZE", "256"))
+
+# 1970-01-05 pazartesi; haftalık kovalar buna hizalanır
+_WEEK_ORIGIN_NS = 4 * 86_400 * 10**9
+
+
+def _tf_ns(timeframe: str) -> int:
+    return int(timeframe_to_timedelta(timeframe).total_seconds()) * 10**9
+
+
+def _origin(timeframe: str) -> int:
+    return _WEEK_ORIGIN_NS if timeframe.endswith("w") else 0
+
+
+def resample_records(
+    recs: np.ndarray,
+    target_tf: str,
+    *,
+    base_tf: Optional[str] = None,
+    closed_only: bool = True,
+) -> np.ndarray:
+    """Sıralı taban kayıtlarını ``target_tf`` barlarına toplar.
+
+    ``closed_only`` ve ``base_tf`` verildiğinde, taban barı eksik her kova
+    (sürmekte olan son kova, yarım başlayan ilk kova, boşluklu kovalar) atılır.
+    """
+    if len(recs) == 0:
+        return np.empty(0, dtype=OHLCV_DTYPE)
+    step = _tf_ns(target_tf)
+    origin = _origin(target_tf)
+    ts = np.asarray(recs["ts"])
+    buckets = (ts - origin) // step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+
+    out = np.empty(len(starts), dtype=OHLCV_DTYPE)
+    out["ts"] = buckets[starts] * step + origin
+    out["open"] = recs["open"][starts]
+    out["close"] = recs["close"][ends]
+    out["high"] = np.maximum.reduceat(np.asarray(recs["high"]), starts)
+    out["low"] = np.minimum.reduceat(np.asarray(recs["low"]), starts)
+    out["volume"] = np.add.reduceat(np.asarray(recs["volume"]), starts)
+
+    if closed_only and base_tf is not None:
+        counts = np.diff(np.r_[starts, len(ts)])
+        out = out[counts >= step // _tf_ns(base_tf)]
+    return out
+
+
+class Resampler:
+    """Depo üzerinde, artımlı güncellenen yeniden örnekleme önbelleği."""
+
+    def __init__(self, store: Optional[OHLCVStore] = None, max_entries: int = RESAMPLE_CACHE_SIZE):
+        self.store = store or get_store()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # (symbol, base, target) -> (taban segment kümesi, kapanmış hedef barlar)
+        self._cache: "OrderedDict[Tuple[str, str, str], Tuple[FrozenSet[Segment], np.ndarray]]" = OrderedDict()
+
+    def base_for(self, symbol: str, target_tf: str) -> Optional[str]:
+        """Hedefi tam bölen ve depoda verisi olan en kaba alt timeframe."""
+        try:
+            target = _tf_ns(target_tf)
+        except ValueError:
+            return None
+        best: Optional[Tuple[int, str]] = None
+        for tf in self.store.timeframes(symbol):
+            try:
+                ns = _tf_ns(tf)
+            except ValueError:
+                continue
+            if ns < target and target % ns == 0 and (best is None or ns > best[0]):
+                best = (ns, tf)
+        return best[1] if best else None
+
+    def _materialize(self, symbol: str, base_tf: str, target_tf: str) -> np.ndarray:
+        segs = frozenset(self.store.segments(symbol, base_tf))
+        if not segs:
+            return np.empty(0, dtype=OHLCV_DTYPE)
+        key = (symbol, base_tf, target_tf)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        if cached is not None and cached[0] == segs:
+            return cached[1]
+
+        old_segs, old_out = cached if cached is not None else (frozenset(), None)
+        added = segs - old_segs
+        if (
+            old_out is not None
+            and len(old_out)
+            and old_segs <= segs
+            and min(s.first_ts for s in added) > max(s.last_ts for s in old_segs)
+        ):
+            # yalnızca sona ekleme: son kapanmış kovadan sonrasını yeniden hesapla
+            next_start = int(old_out["ts"][-1]) + _tf_ns(target_tf)
+            tail = resample_records(
+                self.store.read(symbol, base_tf, start=next_start), target_tf, base_tf=base_tf
+            )
+            out = np.concatenate([old_out, tail])
+        else:
+            out = resample_records(self.store.read(symbol, base_tf), target_tf, base_tf=base_tf)
+
+        with self._lock:
+            self._cache[key] = (segs, out)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return out
+
+    def read(self, symbol: str, target_tf: str, start=None, end=None) -> np.ndarray:
+        """``target_tf`` barlarını tabandan türetir; taban yoksa boş döner."""
+        base = self.base_for(symbol, target_tf)
+        if base is None:
+            return np.empty(0, dtype=OHLCV_DTYPE)
+        recs = self._materialize(symbol, base, target_tf)
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+        lo = int(np.searchsorted(recs["ts"], start_ns, "left")) if start_ns is not None else 0
+        hi = int(np.searchsorted(recs["ts"], end_ns, "right")) if end_ns is not None else len(recs)
+        return recs[lo:hi]
+
+    def tail(self, symbol: str, target_tf: str, n: int) -> np.ndarray:
+        recs = self.read(symbol, target_tf)
+        return recs[-n:] if n > 0 else recs[:0]
+
+    def read_frame(self, symbol: str, target_tf: str, start=None, end=None) -> pd.DataFrame:
+        return records_to_frame(self.read(symbol, target_tf, start, end))
+
+
+def read_history(symbol: str, timeframe: str, n: int) -> pd.DataFrame:
+    """Son ``n`` barı doğal seriden, yetmezse tabandan türeterek döndürür."""
+    native = get_store().tail_frame(symbol, timeframe, n)
+    if len(native) >= n:
+        return native
+    derived = get_resampler().tail(symbol, timeframe, n)
+    return records_to_frame(derived) if len(derived) > len(native) else native
+
+
+_resampler: Optional[Resampler] = None
+_resampler_lock = threading.Lock()
+
+
+def get_resampler() -> Resampler:
+    """Süreç genelinde paylaşılan yeniden örnekleyici."""
+    global _resampler  # pylint: disable=global-statement
+    if _resampler is None:
+        with _resampler_lock:
+            if _resampler is None:
+                _resampler = Resampler()
+    return _resampler
@@ -0,0 +1,477 @@
+"""
+Yerel kolonlu OHLCV deposu.
+
+Yerleşim: ``{root}/{SYMBOL}/{timeframe}/{YYYY-MM}/{first_ns}_{last_ns}_{rows}.npy``
+
+ - Her segment, yapılandırılmış dtype'lı (ts + OHLCV) değişmez bir NumPy
+   dizisidir; ``np.load(mmap_mode="r")`` ile haritalanır, tek segmentlik
+   aralık okumaları kopyasız dilim döner.
+ - Yazımlar yalnızca eklemedir: mevcut zaman damgaları atlanır, yeni satırlar
+   ay bölümüne yeni bir segment olarak yazılır (tmp + ``os.replace``).
+ - Segment sınırları dosya adında, geçerli segment listesi atomik bir
+   manifest'te tutulur; süreç içi indeks dosyaları açmadan aralık sorgularını
+   ilgili segmentlere daraltır.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:  # POSIX dosya kilidi; yoksa yalnızca süreç içi kilit
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+STORE_DIR = os.environ.get("MARKET_DATA_DIR", "storage/market_data")
+# Bir ay bölümünde bu kadar segment birikince otomatik sıkıştırılır
+MAX_SEGMENTS_PER_MONTH = int(os.environ.get("MARKET_DATA_MAX_SEGMENTS", "32"))
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+
+FIELDS = ("open", "high", "low", "close", "volume")
+OHLCV_DTYPE = np.dtype([("ts", "<i8")] + [(f, "<f8") for f in FIELDS])
+
+_TF_RE = re.compile(r"^(\d+)\s*(m|h|d|w)$")
+_SYMBOL_RE = re.compile(r"^[A-Z0-9._-]+$")
+_TF_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+@dataclass(frozen=True)
+class Segment:
+    """Diskteki tek bir değişmez segmentin sınırları."""
+
+    path: str
+    first_ts: int
+    last_ts: int
+    rows: int
+
+
+def timeframe_to_timedelta(timeframe: str) -> timedelta:
+    """``"15m"``, ``"1h"``, ``"1d"``, ``"1w"`` gibi zaman dilimlerini çözer."""
+    m = _TF_RE.match(str(timeframe).strip())
+    if not m:
+        raise ValueError(f"desteklenmeyen timeframe: {timeframe}")
+    return timedelta(**{_TF_UNITS[m.group(2)]: int(m.group(1))})
+
+
+def safe_symbol(symbol: str) -> str:
+    """Sembolü dizin adına çevirir (``btc/usdt`` -> ``BTC_USDT``); geçersizse ValueError."""
+    safe = str(symbol).replace("/", "_").replace(" ", "").upper()
+    if not _SYMBOL_RE.match(safe) or safe in {".", ".."}:
+        raise ValueError(f"geçersiz sembol: {symbol!r}")
+    return safe
+
+
+def _to_ns(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.as_unit("ns").value)
+
+
+def frame_to_records(df: pd.DataFrame) -> np.ndarray:
+    """DataFrame'i (``ts`` kolonu veya DatetimeIndex) segment dtype'ına çevirir."""
+    raw = df["ts"] if "ts" in df.columns else df.index
+    ts = pd.DatetimeIndex(pd.to_datetime(raw, utc=True)).as_unit("ns")
+    out = np.empty(len(df), dtype=OHLCV_DTYPE)
+    out["ts"] = ts.asi8
+    for f in FIELDS:
+        if f in df.columns:
+            out[f] = pd.to_numeric(df[f], errors="coerce").to_numpy(dtype="f8")
+        else:
+            out[f] = 0.0
+    return out
+
+
+def records_to_frame(arr: np.ndarray) -> pd.DataFrame:
+    """Segment kayıtlarını ``ts`` (UTC) indeksli DataFrame'e çevirir."""
+    idx = pd.DatetimeIndex(pd.to_datetime(np.asarray(arr["ts"]), unit="ns", utc=True), name="ts")
+    return pd.DataFrame({f: np.asarray(arr[f]) for f in FIELDS}, index=idx)
+
+
+def _month_keys(ts: np.ndarray) -> np.ndarray:
+    return ts.astype("datetime64[ns]").astype("datetime64[M]").astype(str)
+
+
+def _parse_segment(month_dir: str, name: str) -> Optional[Segment]:
+    if not name.endswith(".npy"):
+        return None
+    try:
+        first, last, rows = name[:-4].split("_")
+        return Segment(os.path.join(month_dir, name), int(first), int(last), int(rows))
+    except ValueError:
+        return None
+
+
+class OHLCVStore:
+    """Sembol/timeframe/ay bölümlü, yalnızca eklemeli OHLCV deposu.
+
+    Her (sembol, timeframe) dizinindeki ``manifest.json`` geçerli segment
+    listesini ve artan bir sürüm numarasını tutar; atomik olarak
+    (tmp + ``os.replace``) yazılır, yazarlar dosya kilidiyle sıralanır.
+    Okuyucular manifest'in tutarlı bir anlık görüntüsünü görür.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or STORE_DIR
+        self._lock = threading.RLock()
+        # (symbol, timeframe) -> (manifest stat imzası, sürüm, segmentler)
+        self._index: Dict[Tuple[str, str], Tuple[tuple, int, List[Segment]]] = {}
+
+    # ------------------------------------------------------------------ indeks
+    def _under_root(self, *parts: str) -> str:
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, *parts))
+        if os.path.commonpath([root, path]) != root or path == root:
+            raise ValueError(f"depo kökü dışında yol: {parts!r}")
+        return path
+
+    def _tf_dir(self, symbol: str, timeframe: str) -> str:
+        return self._under_root(safe_symbol(symbol), timeframe)
+
+    def _scan(self, tf_dir: str) -> List[Segment]:
+        segs = []
+        for month in os.listdir(tf_dir):
+            month_dir = os.path.join(tf_dir, month)
+            if not os.path.isdir(month_dir):
+                continue
+            for entry in os.scandir(month_dir):
+                seg = _parse_segment(month_dir, entry.name)
+                if seg is not None:
+                    segs.append(seg)
+        segs.sort(key=lambda s: (s.first_ts, s.last_ts))
+        return segs
+
+    @contextmanager
+    def _writer(self, tf_dir: str):
+        """Süreç içi ve süreçler arası yazar kilidi."""
+        os.makedirs(tf_dir, exist_ok=True)
+        with self._lock:
+            with open(os.path.join(tf_dir, LOCK_FILE), "a+") as fh:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def _write_manifest(self, tf_dir: str, version: int, segs: List[Segment]) -> None:
+        body = {
+            "version": version,
+            "segments": [os.path.relpath(s.path, tf_dir) for s in segs],
+        }
+        tmp = os.path.join(tf_dir, f".{MANIFEST_FILE}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(body, f)
+        os.replace(tmp, os.path.join(tf_dir, MANIFEST_FILE))
+
+    def _manifest(
+        self, symbol: str, timeframe: str, *, locked: bool = False
+    ) -> Tuple[int, List[Segment]]:
+        """Manifest'i okur; dosya değişmediyse (stat imzası) bellekten döner.
+
+        ``locked``: çağıran yazar kilidini zaten tutuyor.
+        """
+        tf_dir = self._tf_dir(symbol, timeframe)
+        key = (safe_symbol(symbol), timeframe)
+        path = os.path.join(tf_dir, MANIFEST_FILE)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            if not os.path.isdir(tf_dir):
+                return 0, []
+            segs = self._scan(tf_dir)
+            if not segs:
+                return 0, []
+            # manifest'ten önce yazılmış dizin: tarayıp manifest oluştur
+            if locked:
+                self._write_manifest(tf_dir, 1, segs)
+            else:
+                with self._writer(tf_dir):
+                    if not os.path.exists(path):
+                        self._write_manifest(tf_dir, 1, self._scan(tf_dir))
+            return self._manifest(symbol, timeframe, locked=locked)
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._index.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1], cached[2]
+        with open(path, "r", encoding="utf-8") as f:
+            body = json.load(f)
+        segs = []
+        for rel in body.get("segments", []):
+            month, name = os.path.split(rel)
+            seg = _parse_segment(os.path.join(tf_dir, month), name)
+            if seg is not None:
+                segs.append(seg)
+        segs.sort(key=lambda s: (s.first_ts, s.last_ts))
+        version = int(body.get("version", 0))
+        with self._lock:
+            self._index[key] = (stamp, version, segs)
+        return version, segs
+
+    def version(self, symbol: str, timeframe: str) -> int:
+        """Serinin manifest sürümü; her ekleme/sıkıştırmada artar (0: veri yok)."""
+        return self._manifest(symbol, timeframe)[0]
+
+    def segments(
+        self,
+        symbol: str,
+        timeframe: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> List[Segment]:
+        """[start, end] aralığıyla kesişen segmentleri sıralı döndürür."""
+        _, segs = self._manifest(symbol, timeframe)
+        return [
+            s
+            for s in segs
+            if (start is None or s.last_ts >= start) and (end is None or s.first_ts <= end)
+        ]
+
+    def timeframes(self, symbol: str) -> List[str]:
+        """Sembol için depoda bulunan timeframe'ler."""
+        sym_dir = self._under_root(safe_symbol(symbol))
+        if not os.path.isdir(sym_dir):
+            return []
+        return sorted(e.name for e in os.scandir(sym_dir) if e.is_dir())
+
+    def last_ts(self, symbol: str, timeframe: str) -> Optional[pd.Timestamp]:
+        """Depodaki son barın zaman damgası (dosya açmadan, manifest'ten)."""
+        segs = self.segments(symbol, timeframe)
+        if not segs:
+            return None
+        return pd.Timestamp(max(s.last_ts for s in segs), tz="UTC")
+
+    # ------------------------------------------------------------------ yazma
+    def _write_segment(self, month_dir: str, recs: np.ndarray) -> Segment:
+        os.makedirs(month_dir, exist_ok=True)
+        first, last = int(recs["ts"][0]), int(recs["ts"][-1])
+        name = f"{first}_{last}_{len(recs)}.npy"
+        path = os.path.join(month_dir, name)
+        tmp = os.path.join(month_dir, f".{name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, recs, allow_pickle=False)
+        os.replace(tmp, path)
+        return Segment(path, first, last, len(recs))
+
+    def _merge(self, tf_dir: str, month: str, segs: List[Segment]) -> Segment:
+        recs = np.concatenate([np.load(s.path) for s in segs])
+        recs = recs[np.argsort(recs["ts"], kind="stable")]
+        _, first_idx = np.unique(recs["ts"], return_index=True)
+        return self._write_segment(os.path.join(tf_dir, month), recs[first_idx])
+
+    def append(self, symbol: str, timeframe: str, data) -> int:
+        """Yeni barları ekler; zaten depolanmış zaman damgaları atlanır.
+
+        ``data`` bir DataFrame veya ``OHLCV_DTYPE`` dizisi olabilir.
+        Yazılan satır sayısını döndürür.
+        """
+        recs = data if isinstance(data, np.ndarray) else frame_to_records(data)
+        if len(recs) == 0:
+            return 0
+        recs = recs[np.argsort(recs["ts"], kind="stable")]
+        _, first_idx = np.unique(recs["ts"], return_index=True)
+        recs = recs[first_idx]
+
+        written = 0
+        tf_dir = self._tf_dir(symbol, timeframe)
+        months = _month_keys(recs["ts"])
+        with self._writer(tf_dir):
+            version, segs = self._manifest(symbol, timeframe, locked=True)
+            segs = list(segs)
+            stale: List[Segment] = []
+            for month in np.unique(months):
+                month = str(month)
+                part = recs[months == month]
+                lo, hi = int(part["ts"][0]), int(part["ts"][-1])
+                existing = [s for s in segs if s.last_ts >= lo and s.first_ts <= hi]
+                if existing:
+                    seen = np.concatenate([np.load(s.path, mmap_mode="r")["ts"] for s in existing])
+                    part = part[~np.isin(part["ts"], seen)]
+                if len(part) == 0:
+                    continue
+                segs.append(self._write_segment(os.path.join(tf_dir, month), part))
+                written += len(part)
+                in_month = [s for s in segs if os.path.basename(os.path.dirname(s.path)) == month]
+                if len(in_month) > MAX_SEGMENTS_PER_MONTH:
+                    merged = self._merge(tf_dir, month, in_month)
+                    segs = [s for s in segs if s not in in_month] + [merged]
+                    stale.extend(in_month)
+            if written:
+                segs.sort(key=lambda s: (s.first_ts, s.last_ts))
+                self._write_manifest(tf_dir, version + 1, segs)
+            for s in stale:
+                # POSIX'te açık mmap'ler silinen dosyayı okumaya devam eder
+                os.remove(s.path)
+        return written
+
+    def compact(self, symbol: str, timeframe: str, month: Optional[str] = None) -> int:
+        """Bir (veya her) ay bölümündeki segmentleri tek segmentte birleştirir."""
+        tf_dir = self._tf_dir(symbol, timeframe)
+        if not os.path.isdir(tf_dir):
+            return 0
+        with self._writer(tf_dir):
+            version, segs = self._manifest(symbol, timeframe, locked=True)
+            by_month: Dict[str, List[Segment]] = {}
+            for s in segs:
+                by_month.setdefault(os.path.basename(os.path.dirname(s.path)), []).append(s)
+            keep: List[Segment] = []
+            stale: List[Segment] = []
+            for m, group in by_month.items():
+                if (month and m != month) or len(group) < 2:
+                    keep.extend(group)
+                    continue
+                keep.append(self._merge(tf_dir, m, group))
+                stale.extend(group)
+            if not stale:
+                return 0
+            keep.sort(key=lambda s: (s.first_ts, s.last_ts))
+            self._write_manifest(tf_dir, version + 1, keep)
+            for s in stale:
+                os.remove(s.path)
+        return len(stale)
+
+    # ------------------------------------------------------------------ okuma
+    def read(
+        self,
+        symbol: str,
+        timeframe: str,
+        start=None,
+        end=None,
+    ) -> np.ndarray:
+        """[start, end] aralığındaki kayıtları döndürür.
+
+        Aralık tek segmentte kalıyorsa sonuç mmap üzerinde kopyasız bir dilimdir
+        (salt okunur); aksi halde segmentler tek diziye birleştirilir.
+        """
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+        parts = []
+        overlap = False
+        prev_last: Optional[int] = None
+        for s in self.segments(symbol, timeframe, start_ns, end_ns):
+            try:
+                arr = np.load(s.path, mmap_mode="r")
+            except FileNotFoundError:
+                # eşzamanlı sıkıştırma; indeksi tazeleyip tekrar dene
+                return self.read(symbol, timeframe, start, end)
+            ts = arr["ts"]
+            lo = int(np.searchsorted(ts, start_ns, "left")) if start_ns is not None else 0
+            hi = int(np.searchsorted(ts, end_ns, "right")) if end_ns is not None else len(arr)
+            if hi <= lo:
+                continue
+            if prev_last is not None and s.first_ts <= prev_last:
+                overlap = True
+            prev_last = s.last_ts if prev_last is None else max(prev_last, s.last_ts)
+            parts.append(arr[lo:hi])
+        if not parts:
+            return np.empty(0, dtype=OHLCV_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        out = np.concatenate(parts)
+        if overlap:
+            out = out[np.argsort(out["ts"], kind="stable")]
+            _, first_idx = np.unique(out["ts"], return_index=True)
+            out = out[first_idx]
+        return out
+
+    def tail(self, symbol: str, timeframe: str, n: int) -> np.ndarray:
+        """Son ``n`` barı döndürür; yalnızca gereken segmentler okunur."""
+        segs = self.segments(symbol, timeframe)
+        if not segs or n <= 0:
+            return np.empty(0, dtype=OHLCV_DTYPE)
+        total = 0
+        start = segs[-1].first_ts
+        for s in reversed(segs):
+            total += s.rows
+            start = s.first_ts
+            if total >= n:
+                break
+        recs = self.read(symbol, timeframe, start=start)
+        return recs[-n:]
+
+    def read_frame(self, symbol: str, timeframe: str, start=None, end=None) -> pd.DataFrame:
+        return records_to_frame(self.read(symbol, timeframe, start, end))
+
+    def tail_frame(self, symbol: str, timeframe: str, n: int) -> pd.DataFrame:
+        return records_to_frame(self.tail(symbol, timeframe, n))
+
+
+def closed_bars(df: pd.DataFrame, timeframe: str, now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """Henüz kapanmamış (sürmekte olan) barları atar.
+
+    Depo yalnızca eklemeli olduğundan açık bar bir kez yazılırsa güncellenemez.
+    """
+    if df.empty:
+        return df
+    now = now or pd.Timestamp.now(tz="UTC")
+    idx = pd.to_datetime(df["ts"] if "ts" in df.columns else df.index, utc=True)
+    mask = np.asarray(idx + pd.Timedelta(timeframe_to_timedelta(timeframe)) <= now)
+    return df[mask]
+
+
+def read_or_fetch(
+    symbol: str,
+    timeframe: str,
+    limit: int,
+    fetch: Callable[[int], pd.DataFrame],
+    *,
+    store: Optional[OHLCVStore] = None,
+) -> Tuple[pd.DataFrame, bool]:
+    """Son ``limit`` barı depodan (gerekirse ince barlardan yeniden örnekleyerek)
+    okur; depo eksik/bayatsa ``fetch`` ile çeker.
+
+    Çekilen verinin kapanmış barları depoya eklenir. ``(df, hit)`` döner;
+    ``df`` ``ts`` (UTC) indeksli OHLCV çerçevesidir.
+    """
+    from .resample import Resampler, get_resampler
+
+    resampler = get_resampler() if store is None else Resampler(store)
+    store = store or get_store()
+    tf = timeframe_to_timedelta(timeframe)
+    now = pd.Timestamp.now(tz="UTC")
+    last = store.last_ts(symbol, timeframe)
+    if last is not None and now - last < 2 * tf:
+        df = store.tail_frame(symbol, timeframe, limit)
+        if len(df) >= limit:
+            return df, True
+    # Üst timeframe'ler depodaki daha ince barlardan türetilebilir
+    derived = records_to_frame(resampler.tail(symbol, timeframe, limit))
+    if len(derived) >= limit and now - derived.index[-1] < 2 * tf:
+        return derived, True
+    df = fetch(limit)
+    try:
+        store.append(symbol, timeframe, closed_bars(df, timeframe))
+    except OSError:
+        # Depo yazılamazsa çekilen veriyle devam et
+        pass
+    return df, False
+
+
+_store: Optional[OHLCVStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> OHLCVStore:
+    """Süreç genelinde paylaşılan depo örneği."""
+    global _store  # pylint: disable=global-statement
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = OHLCVStore()
+    return _store
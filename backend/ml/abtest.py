@@ -1,7 +1,12 @@
 from __future__ import annotations
 import hashlib
+import os
 from typing import Optional
 
+# Kullanıcıların eşit kovalarla dağıtıldığı kollar; sürümleri
+# ``ML_VARIANT_VERSIONS`` ile eşlenir (bkz. ``service``)
+AB_VARIANTS = [v.strip() for v in os.environ.get("ML_AB_VARIANTS", "v0,v1").split(",") if v.strip()] or ["v0", "v1"]
+
 def stable_bucket(user_id: str, buckets: int = 2) -> int:
     """Kullanıcıyı deterministik şekilde 0..buckets-1 aralığına atar."""
     h = hashlib.sha256(user_id.encode("utf-8")).hexdigest()
@@ -9,11 +14,10 @@ def stable_bucket(user_id: str, buckets: int = 2) -> int:
 
 def pick_model_variant(user_id: Optional[str]) -> str:
     """
-    A/B: user_id verilirse sabit bucket; yoksa kontrol.
-    v0: klasik TA; v1: ML (son sürüm).
+    A/B: user_id verilirse ``AB_VARIANTS`` içinde sabit bucket; yoksa kontrol.
+    v0: klasik TA; diğerleri: ML (eşlenen sürüm, yoksa en son sürüm).
     """
     if not user_id:
         return "v0"
-    b = stable_bucket(user_id, buckets=2)
-    return "v1" if b == 1 else "v0"
+    return AB_VARIANTS[stable_bucket(user_id, buckets=len(AB_VARIANTS))]
 
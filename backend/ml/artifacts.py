@@ -0,0 +1,109 @@
+"""
+Model artefaktlarının bellek eşlemeli (mmap) düzeni.
+
+sklearn ağaçları pickle'dan açılırken düğüm dizilerini kendi belleğine
+kopyalar; bu yüzden ``joblib.load(mmap_mode="r")`` tek başına işe yaramaz ve
+her gunicorn/Celery işçisi ormanın ayrı bir kopyasını taşır. Burada
+RandomForest'lar düz NumPy dizilerine (sol/sağ çocuk, özellik, eşik, yaprak
+değeri) çevrilip saklanır; işçiler aynı dosyayı salt-okunur eşler ve sayfalar
+işletim sisteminin sayfa önbelleği üzerinden paylaşılır.
+
+Tahmin, tüm ağaçlarda aynı anda ve derinlik boyunca vektörize ilerler;
+sonuçlar sklearn'ünkiyle aynıdır (girdi, sklearn gibi float32'ye çevrilir).
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+import joblib
+import numpy as np
+
+# "r": salt-okunur paylaşımlı eşleme; boş bırakılırsa artefakt belleğe kopyalanır
+MMAP_MODE = os.environ.get("ML_MMAP_MODE", "r") or None
+
+
+class _FlatForest:
+    """Ağaçları tek bir düğüm dizisinde tutan orman; kökler ``roots`` ofsetlerinde."""
+
+    def __init__(self, estimators, n_features: int):
+        trees = [e.tree_ for e in estimators]
+        sizes = np.array([t.node_count for t in trees], dtype=np.int64)
+        offsets = np.r_[0, np.cumsum(sizes)[:-1]]
+        left, right = [], []
+        for t, off in zip(trees, offsets):
+            leaf = t.children_left == -1
+            left.append(np.where(leaf, -1, t.children_left + off))
+            right.append(np.where(leaf, -1, t.children_right + off))
+        self.left = np.concatenate(left).astype(np.int32)
+        self.right = np.concatenate(right).astype(np.int32)
+        # yapraklarda özellik -2; dizinleme için 0'a çekilir (sonucu kullanılmaz)
+        self.feature = np.maximum(np.concatenate([t.feature for t in trees]), 0).astype(np.int32)
+        self.threshold = np.concatenate([t.threshold for t in trees]).astype(np.float64)
+        self.roots = offsets.astype(np.int32)
+        self.max_depth = int(max(t.max_depth for t in trees))
+        self.n_features_in_ = n_features
+
+    def _leaves(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            left = self.left[node]
+            if (left == -1).all():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            nxt = np.where(go_left, left, self.right[node])
+            node = np.where(left == -1, node, nxt)
+        return node
+
+
+class FlatForestRegressor(_FlatForest):
+    def __init__(self, model):
+        super().__init__(model.estimators_, model.n_features_in_)
+        self.value = np.concatenate([e.tree_.value[:, 0, 0] for e in model.estimators_]).astype(np.float64)
+
+    def predict(self, X) -> np.ndarray:
+        return self.value[self._leaves(X)].mean(axis=1)
+
+
+class FlatForestClassifier(_FlatForest):
+    def __init__(self, model):
+        super().__init__(model.estimators_, model.n_features_in_)
+        vals = np.concatenate([e.tree_.value[:, 0, :] for e in model.estimators_]).astype(np.float64)
+        sums = vals.sum(axis=1, keepdims=True)
+        self.value = np.divide(vals, sums, out=np.zeros_like(vals), where=sums > 0)
+        self.classes_ = np.asarray(model.classes_)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.value[self._leaves(X)].mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def flatten(model) -> Optional[_FlatForest]:
+    """Tek çıktılı sklearn RandomForest'ı düz diziye çevirir; desteklenmiyorsa None."""
+    try:
+        from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    except Exception:
+        return None
+    if isinstance(model, RandomForestRegressor) and getattr(model, "n_outputs_", 1) == 1:
+        return FlatForestRegressor(model)
+    if isinstance(model, RandomForestClassifier) and getattr(model, "n_outputs_", 1) == 1:
+        return FlatForestClassifier(model)
+    return None
+
+
+def save_model(model, path: str) -> None:
+    """
+    Modeli eşlenebilir düzende kaydeder: ormanlar düzleştirilir, diğerleri
+    (LightGBM vb.) olduğu gibi yazılır. Sıkıştırma kullanılmaz, aksi halde
+    joblib diziyi eşleyemez.
+    """
+    joblib.dump(flatten(model) or model, path)
+
+
+def load_model(path: str):
+    return joblib.load(path, mmap_mode=MMAP_MODE)
@@ -1,9 +1,13 @@
 from __future__ import annotations
 import os
-from datetime import datetime, timedelta, timezone
-from typing import Any
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Optional
 import pandas as pd
 
+from backend.marketdata import get_store
+
 try:  # optional parquet engine
     import pyarrow  # type: ignore  # noqa: F401
     HAS_PARQUET = True
@@ -15,8 +19,15 @@ try:
 except Exception:
     fetch_current_price = None  # graceful fallback
 
+# Eski sembol başına parquet/pickle önbelleği; yalnızca depoya ilk aktarım için okunur
 CACHE_DIR = os.environ.get("ML_CACHE_DIR", "storage/ml_cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
+TIMEFRAME = "1d"
+FRAME_CACHE_SIZE = int(os.environ.get("ML_FRAME_CACHE_SIZE", "64"))
+
+# Süreç içi çerçeve LRU'su: symbol -> (anahtar, DataFrame). Anahtar depodaki
+# seri için manifest sürümü; seri boşsa bellek içi yedeğin (sürüm 0, gün, days)
+_frames: "OrderedDict[str, tuple[tuple, pd.DataFrame]]" = OrderedDict()
+_frames_lock = threading.Lock()
 
 def _cache_path(symbol: str) -> str:
     safe = symbol.replace("/", "_").upper()
@@ -25,67 +36,71 @@ def _cache_path(symbol: str) -> str:
 def _now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
-def load_ohlcv(symbol: str, days: int = 365) -> pd.DataFrame:
-    """
-    OHLCV veri çeker, yoksa/başarısızsa local cache veya örnek veri ile döner.
-    İnkremental güncelleme yapar.
-    """
+def _read_legacy_cache(symbol: str) -> pd.DataFrame | None:
     path = _cache_path(symbol)
-    df_cache = None
-    if os.path.exists(path):
-        try:
-            if HAS_PARQUET and path.endswith('.parquet'):
-                df_cache = pd.read_parquet(path)
-            else:
-                df_cache = pd.read_pickle(path)
-        except Exception:
-            df_cache = None
-
-    rows: list[dict[str, Any]] = []
-    if df_cache is None:
-        # sentetik bootstrap
-        price = 100.0
-        for i in range(days):
-            price *= (1.0 + (0.001 * (1 if i % 5 else -1)))
-            rows.append({
-                "ts": _now_utc() - timedelta(days=(days - i)),
-                "open": price * 0.995,
-                "high": price * 1.01,
-                "low": price * 0.99,
-                "close": price,
-                "volume": 1_000,
-            })
-        df = pd.DataFrame(rows).set_index("ts").sort_index()
-    else:
-        df = df_cache.copy()
-        # çok basit inkremental güncelleme
-        last_ts = df.index.max()
-        if getattr(last_ts, 'tzinfo', None) is None:
-            df.index = df.index.tz_localize(timezone.utc)
-            last_ts = df.index.max()
-        missed_days = max(0, (_now_utc().date() - last_ts.date()).days)
-        if missed_days > 0:
-            price = float(df["close"].iloc[-1])
-            for i in range(missed_days):
-                price *= (1.0 + (0.0015 * (1 if i % 2 else -1)))
-                rows.append({
-                    "ts": _now_utc() - timedelta(days=(missed_days - i - 1)),
-                    "open": price * 0.995,
-                    "high": price * 1.01,
-                    "low": price * 0.99,
-                    "close": price,
-                    "volume": 1_200,
-                })
-            if rows:
-                df_new = pd.DataFrame(rows).set_index("ts").sort_index()
-                df = pd.concat([df, df_new], axis=0)
-
+    if not os.path.exists(path):
+        return None
     try:
         if HAS_PARQUET and path.endswith('.parquet'):
-            df.to_parquet(path, index=True)
-        else:
-            df.to_pickle(path)
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
     except Exception:
-        # Cache yazılamazsa sessizce geç
-        pass
+        return None
+
+def _cached_frame(symbol: str, key: tuple) -> Optional[pd.DataFrame]:
+    with _frames_lock:
+        item = _frames.get(symbol)
+        if item is None or item[0] != key:
+            return None
+        _frames.move_to_end(symbol)
+        return item[1]
+
+def _remember_frame(symbol: str, key: tuple, df: pd.DataFrame) -> None:
+    with _frames_lock:
+        _frames[symbol] = (key, df)
+        _frames.move_to_end(symbol)
+        while len(_frames) > FRAME_CACHE_SIZE:
+            _frames.popitem(last=False)
+
+def load_ohlcv(symbol: str, days: int = 365) -> pd.DataFrame:
+    """
+    OHLCV geçmişini yerel OHLCV deposundan (1d) okur. Depoya asla yazmaz:
+    seri ingest ile doldurulur ve DRAKS/backtest ile paylaşılır. Seri boşsa
+    eski ML önbelleği ya da sentetik örnek veri yalnızca bellekte döner.
+
+    Okunan çerçeve depo manifest sürümüyle anahtarlanmış süreç içi LRU'da
+    tutulur; sürüm değişmedikçe disk okunmaz. Dönen çerçeve paylaşımlıdır,
+    değiştirmeden önce kopyalanmalıdır.
+    """
+    store = get_store()
+    version = store.version(symbol, TIMEFRAME)
+    key = (version,) if version else (0, _now_utc().date(), days)
+    df = _cached_frame(symbol, key)
+    if df is None:
+        df = store.read_frame(symbol, TIMEFRAME) if version else _fallback_frame(symbol, days)
+        _remember_frame(symbol, key, df)
     return df
+
+def _fallback_frame(symbol: str, days: int) -> pd.DataFrame:
+    """Depoda veri yokken: eski önbellek, o da yoksa sentetik seri (yalnız bellek)."""
+    df_cache = _read_legacy_cache(symbol)
+    if df_cache is not None and len(df_cache):
+        df = df_cache.sort_index()
+        if df.index.tz is None:
+            df.index = df.index.tz_localize(timezone.utc)
+        return df
+    # sentetik bootstrap; gün başına hizalı, aynı gün içinde tekrarlanabilir
+    today = pd.Timestamp(_now_utc().date(), tz="UTC")
+    rows: list[dict[str, Any]] = []
+    price = 100.0
+    for i in range(days):
+        price *= (1.0 + (0.001 * (1 if i % 5 else -1)))
+        rows.append({
+            "ts": today - pd.Timedelta(days=days - i),
+            "open": price * 0.995,
+            "high": price * 1.01,
+            "low": price * 0.99,
+            "close": price,
+            "volume": 1_000,
+        })
+    return pd.DataFrame(rows).set_index("ts")
@@ -0,0 +1,196 @@
+"""
+Artımlı ML özellik deposu.
+
+Özellik satırları (symbol, horizon, özellik seti sürümü) başına diske
+(``ML_FEATURE_DIR``) ve süreç içi önbelleğe yazılır. Taban OHLCV'ye yeni bar
+geldiğinde yalnızca yeni barların özellikleri hesaplanır (RSI'nin EWM durumu
+saklanır) ve hedefi artık belli olan son ``horizon`` satırın hedefi doldurulur.
+
+ - ``latest``: çıkarım için son özellik satırı; taban değişmediyse O(1).
+ - ``matrix``: eğitim için hedefi belli tüm satırlar (``build_features`` ile
+   aynı sütunlar).
+
+Özellik seti sürümü ``features`` ve bu modülün kaynak kodunun özetidir; kod
+değiştiğinde eski satırlar farklı dizinde kalır ve asla servis edilmez.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import features
+from .data import load_ohlcv
+from .features import FEATURES, WARMUP, feature_block, rsi_state
+
+FEATURE_DIR = os.environ.get("ML_FEATURE_DIR", "storage/ml_features")
+FEATURE_CACHE_SIZE = int(os.environ.get("ML_FEATURE_CACHE_SIZE", "256"))
+HISTORY_DAYS = 540
+
+
+def _feature_set_version() -> str:
+    h = hashlib.sha256()
+    for mod in (features, sys.modules[__name__]):
+        h.update(inspect.getsource(mod).encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+FEATURE_SET_VERSION = _feature_set_version()
+
+
+@dataclass(frozen=True)
+class _Entry:
+    ts: np.ndarray  # int64 ns, satır başına
+    X: np.ndarray  # (n, len(FEATURES))
+    y_ret: np.ndarray  # (n,), hedef henüz belli değilse NaN
+    rsi: Tuple[float, float]  # son satırdaki RSI EWM durumu
+    base_first: int  # tabanın ilk bar ts'i (ns)
+    base_len: int  # kapsanan taban bar sayısı
+
+
+class FeatureStore:
+    def __init__(self, root: str = FEATURE_DIR, version: str = FEATURE_SET_VERSION, max_entries: int = FEATURE_CACHE_SIZE):
+        self.root = os.path.join(root, version)
+        self.version = version
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int], _Entry]" = OrderedDict()
+
+    # ------------------------------------------------------------------ disk
+    def _path(self, symbol: str, horizon: int) -> str:
+        safe = symbol.replace("/", "_").upper()
+        return os.path.join(self.root, f"{safe}_h{horizon}.npz")
+
+    def _load(self, symbol: str, horizon: int) -> Optional[_Entry]:
+        try:
+            with np.load(self._path(symbol, horizon)) as z:
+                meta = z["meta"]
+                return _Entry(z["ts"], z["X"], z["y_ret"], (float(z["rsi"][0]), float(z["rsi"][1])), int(meta[0]), int(meta[1]))
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _save(self, symbol: str, horizon: int, e: _Entry) -> None:
+        path = self._path(symbol, horizon)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            np.savez(tmp, ts=e.ts, X=e.X, y_ret=e.y_ret, rsi=np.asarray(e.rsi), meta=np.asarray([e.base_first, e.base_len]))
+            os.replace(tmp, path)
+        except OSError:
+            # disk yazılamazsa bellek içi önbellekle devam
+            pass
+
+    # ----------------------------------------------------------- hesaplama
+    @staticmethod
+    def _build(ts: np.ndarray, close: np.ndarray, horizon: int) -> Optional[_Entry]:
+        if len(close) <= WARMUP:
+            return None
+        X, state = feature_block(close, WARMUP, rsi_state(close, WARMUP))
+        return _Entry(ts[WARMUP:], X, _targets(close, WARMUP, horizon), state, int(ts[0]), len(close))
+
+    @staticmethod
+    def _extend(e: _Entry, ts: np.ndarray, close: np.ndarray, horizon: int) -> _Entry:
+        n0 = e.base_len
+        X_new, state = feature_block(close, n0, e.rsi)
+        y_ret = e.y_ret.copy()
+        # hedefi yeni barlarla belli olan son satırlar
+        k = min(horizon, len(y_ret))
+        y_ret[len(y_ret) - k:] = _targets(close, n0 - k, horizon)[:k]
+        return _Entry(
+            np.concatenate([e.ts, ts[n0:]]),
+            np.vstack([e.X, X_new]),
+            np.concatenate([y_ret, _targets(close, n0, horizon)]),
+            state,
+            e.base_first,
+            len(close),
+        )
+
+    def _entry(self, symbol: str, horizon: int, base: Optional[pd.DataFrame] = None) -> Optional[_Entry]:
+        if base is None:
+            base = load_ohlcv(symbol, days=HISTORY_DAYS)
+        key = (symbol, horizon)
+        with self._lock:
+            e = self._entries.get(key)
+            if e is not None:
+                self._entries.move_to_end(key)
+        if e is None:
+            e = self._load(symbol, horizon)
+        ts = base.index.as_unit("ns").asi8 if len(base) else np.empty(0, dtype=np.int64)
+        if e is not None and _covers(e, ts, len(base)) and e.base_len == len(base):
+            fresh = e
+        else:
+            close = base["close"].to_numpy(dtype=np.float64)
+            if e is not None and _covers(e, ts, len(base)):
+                fresh = self._extend(e, ts, close, horizon)
+            else:
+                fresh = self._build(ts, close, horizon)
+            if fresh is None:
+                return None
+            self._save(symbol, horizon, fresh)
+        with self._lock:
+            self._entries[key] = fresh
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fresh
+
+    # ---------------------------------------------------------------- okuma
+    def latest(self, symbol: str, horizon: int, base: Optional[pd.DataFrame] = None) -> Optional[pd.DataFrame]:
+        """
+        Son barın özellik satırı (1 x FEATURES); veri yetersizse None.
+        ``base`` verilirse taban OHLCV yeniden okunmaz.
+        """
+        e = self._entry(symbol, horizon, base)
+        if e is None or not len(e.ts):
+            return None
+        return pd.DataFrame(e.X[-1:], columns=FEATURES, index=pd.to_datetime(e.ts[-1:], utc=True))
+
+    def matrix(self, symbol: str, horizon: int, base: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Hedefi belli satırlar: FEATURES + ``y_ret_{h}`` + ``y_up_{h}``."""
+        e = self._entry(symbol, horizon, base)
+        cols = FEATURES + [f"y_ret_{horizon}", f"y_up_{horizon}"]
+        if e is None:
+            return pd.DataFrame(columns=cols)
+        ok = ~np.isnan(e.y_ret)
+        df = pd.DataFrame(e.X[ok], columns=FEATURES, index=pd.to_datetime(e.ts[ok], utc=True))
+        df[f"y_ret_{horizon}"] = e.y_ret[ok]
+        df[f"y_up_{horizon}"] = (e.y_ret[ok] > 0).astype(int)
+        return df
+
+
+def _targets(close: np.ndarray, start: int, horizon: int) -> np.ndarray:
+    """``close[start:]`` satırları için ileriye dönük getiri; gelecek yoksa NaN."""
+    n = len(close)
+    out = np.full(n - start, np.nan)
+    end = n - horizon
+    if end > start:
+        out[: end - start] = close[start + horizon:] / close[start:end] - 1.0
+    return out
+
+
+def _covers(e: _Entry, ts: np.ndarray, n: int) -> bool:
+    """Taban, kaydın üretildiği seriyi değiştirmeden uzatıyor mu?"""
+    return n >= e.base_len and n > 0 and int(ts[0]) == e.base_first and int(ts[e.base_len - 1]) == int(e.ts[-1])
+
+
+_store: Optional[FeatureStore] = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store() -> FeatureStore:
+    """Süreç genelinde paylaşılan özellik deposu."""
+    global _store  # pylint: disable=global-statement
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeatureStore()
+    return _store
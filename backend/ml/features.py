@@ -1,7 +1,13 @@
 from __future__ import annotations
+from typing import Tuple
 import numpy as np
 import pandas as pd
 
+FEATURES = ["ret_1", "ret_5", "ret_10", "vol_10", "sma_10", "sma_20", "rsi_14"]
+# tüm özelliklerin tanımlı olduğu ilk bar indeksi (sma_20)
+WARMUP = 19
+RSI_PERIOD = 14
+
 def rsi(series: pd.Series, period: int = 14) -> pd.Series:
     """Vanilla RSI (bağımlılık eklemeden)"""
     delta = series.diff()
@@ -32,3 +38,38 @@ def build_features(df: pd.DataFrame, horizon: int = 7) -> pd.DataFrame:
     out = out.dropna().copy()
     return out
 
+
+def feature_block(close: np.ndarray, start: int, rsi_state: Tuple[float, float]) -> Tuple[np.ndarray, Tuple[float, float]]:
+    """
+    ``build_features`` ile aynı özellikleri yalnızca ``close[start:]`` için
+    üretir (satır x FEATURES). RSI'nin EWM durumu (ortalama yükseliş/düşüş,
+    ``start - 1`` anındaki) dışarıdan verilip güncellenmiş hali döner; böylece
+    yeni barlar geçmişi yeniden hesaplamadan eklenebilir. ``start >= WARMUP``.
+    """
+    n = len(close)
+    idx = np.arange(start, n)
+    out = np.empty((len(idx), len(FEATURES)), dtype=np.float64)
+    for j, p in enumerate((1, 5, 10)):
+        out[:, j] = close[idx] / close[idx - p] - 1.0
+    ret_1 = close[start - 9:] / close[start - 10:-1] - 1.0
+    out[:, 3] = np.lib.stride_tricks.sliding_window_view(ret_1, 10).std(axis=1, ddof=1)
+    for j, w in ((4, 10), (5, 20)):
+        out[:, j] = np.lib.stride_tricks.sliding_window_view(close[start - w + 1:], w).mean(axis=1)
+
+    alpha = 1.0 / RSI_PERIOD
+    up, down = rsi_state
+    delta = np.diff(close[start - 1:])
+    for k, d in enumerate(delta):
+        up = (1 - alpha) * up + alpha * (d if d > 0 else 0.0)
+        down = (1 - alpha) * down + alpha * (-d if d < 0 else 0.0)
+        out[k, 6] = 100 - 100 / (1 + up / (down + 1e-12))
+    return out, (up, down)
+
+def rsi_state(close: np.ndarray, end: int) -> Tuple[float, float]:
+    """``close[:end]`` üzerinde RSI EWM durumunu baştan hesaplar (ilk kurulum)."""
+    alpha = 1.0 / RSI_PERIOD
+    up = down = 0.0
+    for d in np.diff(close[:end]):
+        up = (1 - alpha) * up + alpha * (d if d > 0 else 0.0)
+        down = (1 - alpha) * down + alpha * (-d if d < 0 else 0.0)
+    return up, down
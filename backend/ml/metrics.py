@@ -1,17 +1,162 @@
+"""
+ML varyantları için zaman kovalı A/B metrikleri.
+
+Her tahmin sonucu, varyantın o anki kovasına (``ML_METRICS_BUCKET_SECONDS``)
+ait Redis hash'inde sayaçları artırır: adet, doğru sayısı, olasılık taşıyan
+adet ve Brier/log-loss toplamları (mikro birimde tamsayı, HINCRBY). Brier ve
+log-loss yalnız olasılık taşıyan kayıtlar üzerinden ortalanır. Kayıt tek pipeline ile tek gidiş
+dönüştür. Kayan pencere metrikleri yalnızca penceredeki kova toplamlarından
+hesaplanır (O(kova)); tüm işçiler aynı sayıları görür.
+
+Redis'e ulaşılamazsa aynı kova yapısı süreç içinde tutulur (geliştirme/test).
+"""
+
 from __future__ import annotations
-from collections import deque
-from typing import Deque, Dict
 
-# Basit hafıza içi metrik kolektörü (prod'da DB'ye yazılabilir)
-_last_preds: Deque[Dict] = deque(maxlen=5000)
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import redis
+
+BUCKET_SECONDS = int(os.environ.get("ML_METRICS_BUCKET_SECONDS", "300"))
+RETENTION_SECONDS = int(os.environ.get("ML_METRICS_RETENTION_SECONDS", str(7 * 86400)))
+DEFAULT_WINDOW = int(os.environ.get("ML_METRICS_DEFAULT_WINDOW", "3600"))
+KEY_PREFIX = "ml:metrics"
+VARIANTS_KEY = f"{KEY_PREFIX}:variants"
+SCALE = 1_000_000  # Brier/log-loss toplamları mikro birimde tamsayı tutulur
+FIELDS = ("n", "correct", "n_prob", "brier", "logloss")
+_EPS = 1e-15
+
+_redis_client: Optional[redis.Redis] = None
+# Redis yoksa: (variant, kova başlangıcı) -> alan -> değer
+_local: Dict[tuple, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+_local_lock = threading.Lock()
+
+
+def _get_client() -> redis.Redis:
+    global _redis_client  # pylint: disable=global-statement
+    if _redis_client is None:
+        url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        _redis_client = redis.from_url(url, decode_responses=True)
+    return _redis_client
+
+
+def _bucket(ts: float) -> int:
+    return int(ts) // BUCKET_SECONDS * BUCKET_SECONDS
+
+
+def _key(variant: str, bucket: int) -> str:
+    return f"{KEY_PREFIX}:{variant}:{bucket}"
 
-def record_prediction(item: Dict) -> None:
-    _last_preds.append(item)
 
-def aggregate() -> Dict[str, float]:
-    if not _last_preds:
+def _increments(item: Dict) -> Dict[str, int]:
+    inc = {"n": 1, "correct": int(bool(item.get("correct")))}
+    p, up = item.get("prob_up"), item.get("up")
+    if p is not None and up is not None:
+        p = min(max(float(p), _EPS), 1 - _EPS)
+        y = 1.0 if up else 0.0
+        inc["n_prob"] = 1
+        inc["brier"] = round((p - y) ** 2 * SCALE)
+        inc["logloss"] = round(-(y * math.log(p) + (1 - y) * math.log(1 - p)) * SCALE)
+    return inc
+
+
+def record_prediction(item: Dict, client: Optional[redis.Redis] = None) -> None:
+    """
+    ``item``: variant, correct ve (varsa) prob_up ile gerçekleşen yön ``up``.
+    Tek pipeline: HINCRBY'lar + EXPIRE + varyant kümesi.
+    """
+    variant = str(item.get("variant") or "unknown")
+    bucket = _bucket(item.get("ts") or time.time())
+    inc = _increments(item)
+    try:
+        r = client or _get_client()
+        pipe = r.pipeline(transaction=False)
+        key = _key(variant, bucket)
+        for field, value in inc.items():
+            pipe.hincrby(key, field, value)
+        pipe.expire(key, RETENTION_SECONDS)
+        pipe.sadd(VARIANTS_KEY, variant)
+        pipe.execute()
+    except redis.RedisError:
+        with _local_lock:
+            row = _local[(variant, bucket)]
+            for field, value in inc.items():
+                row[field] += value
+
+
+def _buckets(window: int, now: float) -> List[int]:
+    last = _bucket(now)
+    n = max(1, math.ceil(window / BUCKET_SECONDS))
+    return [last - i * BUCKET_SECONDS for i in range(n)]
+
+
+def _sums(variants: Iterable[str], buckets: List[int], client: Optional[redis.Redis]) -> Dict[str, Dict[str, int]]:
+    variants = list(variants)
+    out = {v: dict.fromkeys(FIELDS, 0) for v in variants}
+    try:
+        r = client or _get_client()
+        pipe = r.pipeline(transaction=False)
+        for v in variants:
+            for b in buckets:
+                pipe.hgetall(_key(v, b))
+        rows = iter(pipe.execute())
+        for v in variants:
+            for _ in buckets:
+                for field, value in (next(rows) or {}).items():
+                    out[v][field if isinstance(field, str) else field.decode()] += int(value)
+    except redis.RedisError:
+        with _local_lock:
+            for v in variants:
+                for b in buckets:
+                    for field, value in _local.get((v, b), {}).items():
+                        out[v][field] += value
+    return out
+
+
+def _known_variants(client: Optional[redis.Redis]) -> List[str]:
+    try:
+        members = (client or _get_client()).smembers(VARIANTS_KEY)
+        return sorted(m if isinstance(m, str) else m.decode() for m in members)
+    except redis.RedisError:
+        with _local_lock:
+            return sorted({v for v, _ in _local})
+
+
+def _summary(s: Dict[str, int]) -> Dict[str, float]:
+    n = s["n"]
+    if not n:
         return {"count": 0}
-    n = len(_last_preds)
-    ok = sum(1 for x in _last_preds if x.get("correct") is True)
-    return {"count": n, "acc": ok / n if n else 0.0}
+    out = {"count": n, "acc": s["correct"] / n}
+    n_prob = s["n_prob"]
+    if n_prob:
+        out.update({"brier": s["brier"] / SCALE / n_prob, "logloss": s["logloss"] / SCALE / n_prob})
+    return out
+
 
+def aggregate(
+    variant: Optional[str] = None,
+    window: int = DEFAULT_WINDOW,
+    *,
+    now: Optional[float] = None,
+    client: Optional[redis.Redis] = None,
+) -> Dict:
+    """
+    Son ``window`` saniyedeki metrikler. Varyant verilirse yalnız onu, aksi
+    halde tüm varyantları ve birleşik ``count``/``acc`` değerini döndürür.
+    """
+    buckets = _buckets(window, now or time.time())
+    variants = [variant] if variant else _known_variants(client)
+    sums = _sums(variants, buckets, client)
+    if variant:
+        return {"variant": variant, "window": window, **_summary(sums[variant])}
+    total = {f: sum(s[f] for s in sums.values()) for f in FIELDS}
+    return {
+        "window": window,
+        **_summary(total),
+        "variants": {v: _summary(s) for v, s in sums.items()},
+    }
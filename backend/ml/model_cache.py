@@ -0,0 +1,152 @@
+"""
+Süreç içi çok sürümlü model önbelleği.
+
+ - Aynı anda birden çok (model, sürüm) tutulur: A/B ve canary için
+   ``get(name, version)`` ile sabit sürüm, ``get(name)`` ile en son sürüm.
+ - Toplam boyut ``ML_MODEL_CACHE_MB`` sınırını aşınca en az kullanılan sürüm
+   atılır; boyut, artefakt dosyalarının disk boyutundan tahmin edilir.
+ - Artefaktlar ``artifacts.load_model`` ile salt-okunur eşlenir; aynı sürümü
+   yükleyen işçiler sayfaları paylaşır.
+ - Registry değiştiğinde (mtime önbellekli okuma) yeni sürüm arka planda
+   yüklenir; o sırada istekler eski sürümle yanıtlanır, yükleme bitince
+   "en son" işaretçisi tek atamayla değiştirilir. Yürümekte olan istekler
+   ellerindeki ``LoadedModel`` referansını kullanmaya devam eder.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+from .artifacts import load_model
+from .registry import get_latest_version, get_model_path
+
+MODEL_CACHE_MB = int(os.environ.get("ML_MODEL_CACHE_MB", "1024"))
+ARTIFACTS = ("reg.joblib", "cls.joblib")
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    name: str
+    version: str
+    reg: object
+    cls: object
+    nbytes: int
+
+
+def _load(name: str, version: str) -> Optional[LoadedModel]:
+    path = get_model_path(name, version)
+    if not path:
+        return None
+    paths = [os.path.join(path, a) for a in ARTIFACTS]
+    if not all(os.path.exists(p) for p in paths):
+        return None
+    reg, cls = (load_model(p) for p in paths)
+    nbytes = sum(os.path.getsize(p) for p in paths)
+    logger.info("ML model yüklendi: {} {} ({} KB)", name, version, nbytes // 1024)
+    return LoadedModel(name, version, reg, cls, nbytes)
+
+
+class ModelCache:
+    def __init__(self, max_bytes: int = MODEL_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._models: "OrderedDict[Tuple[str, str], LoadedModel]" = OrderedDict()
+        self._latest: Dict[str, str] = {}
+        self._refreshing: Dict[str, threading.Thread] = {}
+
+    def _lookup(self, name: str, version: str) -> Optional[LoadedModel]:
+        with self._lock:
+            m = self._models.get((name, version))
+            if m is not None:
+                self._models.move_to_end((name, version))
+            return m
+
+    def _insert(self, m: LoadedModel) -> None:
+        with self._lock:
+            self._models[(m.name, m.version)] = m
+            self._models.move_to_end((m.name, m.version))
+            pinned = {(n, v) for n, v in self._latest.items()} | {(m.name, m.version)}
+            total = sum(x.nbytes for x in self._models.values())
+            for key in list(self._models):
+                if total <= self.max_bytes:
+                    break
+                if key in pinned:
+                    continue
+                total -= self._models.pop(key).nbytes
+                logger.info("ML model önbellekten atıldı: {} {}", *key)
+
+    def load(self, name: str, version: str) -> Optional[LoadedModel]:
+        """Sürümü (gerekirse diskten) yükler; eşzamanlı istekler tek yükleme paylaşır."""
+        m = self._lookup(name, version)
+        if m is not None:
+            return m
+        with self._load_lock:
+            m = self._lookup(name, version)
+            if m is None:
+                m = _load(name, version)
+                if m is not None:
+                    self._insert(m)
+            return m
+
+    def refresh(self, name: str) -> Optional[LoadedModel]:
+        """Registry'deki en son sürümü yükleyip "en son" işaretçisini ona çevirir."""
+        version = get_latest_version(name)
+        if not version:
+            return None
+        m = self.load(name, version)
+        if m is not None:
+            with self._lock:
+                self._latest[name] = version
+        return m
+
+    def _refresh_async(self, name: str) -> None:
+        with self._lock:
+            t = self._refreshing.get(name)
+            if t is not None and t.is_alive():
+                return
+            t = threading.Thread(target=self.refresh, args=(name,), name=f"ml-reload-{name}", daemon=True)
+            self._refreshing[name] = t
+        t.start()
+
+    def get(self, name: str, version: Optional[str] = None) -> Optional[LoadedModel]:
+        if version is not None:
+            return self.load(name, version)
+        current = self._latest.get(name)
+        if current is None:
+            return self.refresh(name)
+        if get_latest_version(name) != current:
+            self._refresh_async(name)
+        return self._lookup(name, current) or self.refresh(name)
+
+    def versions(self) -> Dict[str, list]:
+        with self._lock:
+            out: Dict[str, list] = {}
+            for n, v in self._models:
+                out.setdefault(n, []).append(v)
+            return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._latest.clear()
+
+
+_cache: Optional[ModelCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_model_cache() -> ModelCache:
+    """Süreç genelinde paylaşılan model önbelleği."""
+    global _cache  # pylint: disable=global-statement
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ModelCache()
+    return _cache
@@ -0,0 +1,203 @@
+"""
+Çok sembollü, paralel eğitim hattı.
+
+ - Sembollerin özellik matrisleri özellik deposundan alınır ve zamana göre
+   sıralanarak tek matriste birleştirilir (pooled). CV katmanları tarih
+   sınırlarından bölünür; bir katmanın test tarihleri hiçbir sembolde eğitime
+   sızmaz. Sıralı olduğu için her katman matrisin ardışık bir dilimidir.
+ - Birleşik matris bir kez ``ML_TRAIN_CACHE_DIR`` altına yazılır ve işçilere
+   ``mmap_mode="r"`` ile verilir: katman başına kopya yoktur, bellek katman
+   sayısıyla büyümez. Aynı (özellik seti, semboller, horizon, son bar)
+   için yeniden çalıştırmada önbellekten okunur. Yeni matris yazılınca aynı
+   evrenin eski matrisleri ve ``ML_TRAIN_CACHE_MAX_AGE`` saniyeden eski
+   diğer girdiler silinir; başka evrenlerin güncel matrislerine dokunulmaz.
+ - Katmanlar ve son modeller ``joblib`` loky havuzunda paralel eğitilir
+   (loky, Celery'nin daemon işçilerinde de alt süreç açabilir). Her görev
+   tek çekirdek kullanır; toplam paralellik ``ML_TRAIN_WORKERS`` ile sınırlıdır.
+ - İlerleme ``progress(done, total)`` geri çağrısıyla bildirilir; çalışma
+   sonunda tek bir model sürümü kaydedilir.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .artifacts import save_model
+from .feature_store import FEATURE_SET_VERSION, get_feature_store
+from .features import FEATURES
+from .registry import register_model_local
+from backend.utils.lazy import lazy_attr, lazy_import
+
+# sklearn/lightgbm yalnız eğitimde yüklenir (web işçisi açılışında değil)
+lgb = lazy_import("lightgbm")
+RandomForestClassifier = lazy_attr("sklearn.ensemble", "RandomForestClassifier")
+RandomForestRegressor = lazy_attr("sklearn.ensemble", "RandomForestRegressor")
+accuracy_score = lazy_attr("sklearn.metrics", "accuracy_score")
+r2_score = lazy_attr("sklearn.metrics", "r2_score")
+
+MODEL_NAME = os.environ.get("ML_MODEL_NAME", "oq_return")
+OUT_DIR = os.environ.get("ML_ARTIFACT_DIR", "storage/models")
+TRAIN_CACHE_DIR = os.environ.get("ML_TRAIN_CACHE_DIR", "storage/ml_train_cache")
+TRAIN_CACHE_MAX_AGE = int(os.environ.get("ML_TRAIN_CACHE_MAX_AGE", str(7 * 86400)))
+TRAIN_WORKERS = int(os.environ.get("ML_TRAIN_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+N_SPLITS = 5
+# Birleşik veride sınırsız derinlikteki ağaçlar satır sayısıyla büyür; yaprak
+# alt sınırı hem eğitim süresini hem de artefakt boyutunu sınırlar.
+MIN_SAMPLES_LEAF = int(os.environ.get("ML_MIN_SAMPLES_LEAF", "20"))
+
+Progress = Callable[[int, int], None]
+
+
+def _make_model(kind: str):
+    if kind == "reg":
+        if lgb:
+            return lgb.LGBMRegressor(n_estimators=200, learning_rate=0.05, subsample=0.9, colsample_bytree=0.9, n_jobs=1)
+        return RandomForestRegressor(n_estimators=300, min_samples_leaf=MIN_SAMPLES_LEAF, random_state=42, n_jobs=1)
+    if lgb:
+        return lgb.LGBMClassifier(n_estimators=300, learning_rate=0.05, subsample=0.9, colsample_bytree=0.9, n_jobs=1)
+    return RandomForestClassifier(n_estimators=300, min_samples_leaf=MIN_SAMPLES_LEAF, random_state=42, n_jobs=1)
+
+
+def _fit_task(kind: str, X: np.ndarray, y: np.ndarray, train_end: int, test_end: Optional[int]):
+    """Havuz görevi: ``[0, train_end)`` üzerinde eğitir; test dilimi varsa skor döner."""
+    model = _make_model(kind)
+    target = y if kind == "reg" else (y > 0).astype(int)
+    model.fit(X[:train_end], target[:train_end])
+    if test_end is None:
+        return kind, None, model
+    pred = model.predict(X[train_end:test_end])
+    score = r2_score(target[train_end:test_end], pred) if kind == "reg" else accuracy_score(target[train_end:test_end], pred)
+    return kind, float(score), None
+
+
+def stack_universe(symbols: Sequence[str], horizon: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sembol matrislerini zamana göre sıralı (ts, X, y_ret) olarak birleştirir."""
+    fs = get_feature_store()
+    frames: List[pd.DataFrame] = []
+    for symbol in symbols:
+        m = fs.matrix(symbol, horizon)
+        if len(m):
+            frames.append(m)
+    if not frames:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(FEATURES))), np.empty(0)
+    df = pd.concat(frames).sort_index(kind="stable")
+    return (
+        df.index.as_unit("ns").asi8,
+        df[FEATURES].to_numpy(dtype=np.float64),
+        df[f"y_ret_{horizon}"].to_numpy(dtype=np.float64),
+    )
+
+
+def date_folds(ts: np.ndarray, n_splits: int = N_SPLITS) -> List[Tuple[int, int]]:
+    """
+    Tarih bazlı genişleyen pencere katmanları: (eğitim sonu, test sonu) satır
+    sınırları. ``TimeSeriesSplit`` benzeri, ama bölme benzersiz tarihler üzerinde.
+    """
+    dates = np.unique(ts)
+    if len(dates) < n_splits + 1:
+        return []
+    test_size = len(dates) // (n_splits + 1)
+    folds = []
+    for i in range(n_splits):
+        cut = dates[len(dates) - (n_splits - i) * test_size]
+        stop = dates[len(dates) - (n_splits - i - 1) * test_size] if i < n_splits - 1 else None
+        train_end = int(np.searchsorted(ts, cut, "left"))
+        test_end = int(np.searchsorted(ts, stop, "left")) if stop is not None else len(ts)
+        folds.append((train_end, test_end))
+    return folds
+
+
+def _evict_cache(universe: str, keep: str) -> None:
+    """Aynı evrenin eski matrislerini ve yaşı dolan diğer girdileri siler."""
+    cutoff = time.time() - TRAIN_CACHE_MAX_AGE
+    for entry in os.scandir(TRAIN_CACHE_DIR):
+        if not entry.name.endswith(".joblib") or entry.name == keep:
+            continue
+        try:
+            if entry.name.startswith(f"{universe}_") or entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def _cached_matrix(symbols: Sequence[str], horizon: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ts, X, y = stack_universe(symbols, horizon)
+    if not len(ts):
+        return ts, X, y
+    universe = hashlib.sha256(
+        f"{FEATURE_SET_VERSION}|{horizon}|{','.join(sorted(symbols))}".encode("utf-8")
+    ).hexdigest()[:16]
+    snapshot = hashlib.sha256(f"{len(ts)}|{ts[-1]}".encode("utf-8")).hexdigest()[:12]
+    name = f"{universe}_{snapshot}.joblib"
+    path = os.path.join(TRAIN_CACHE_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(TRAIN_CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=TRAIN_CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                joblib.dump({"ts": ts, "X": X, "y": y}, fh)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        _evict_cache(universe, name)
+    cached = joblib.load(path, mmap_mode="r")
+    return cached["ts"], cached["X"], cached["y"]
+
+
+def train_universe(
+    symbols: Sequence[str],
+    horizon: int,
+    *,
+    n_splits: int = N_SPLITS,
+    workers: int = TRAIN_WORKERS,
+    progress: Optional[Progress] = None,
+) -> Dict[str, float]:
+    """Sembol evrenini birleşik veriyle eğitir ve tek bir model sürümü kaydeder."""
+    ts, X, y = _cached_matrix(symbols, horizon)
+    folds = date_folds(ts, n_splits)
+    if not folds:
+        raise ValueError("eğitim için yeterli veri yok")
+
+    jobs = [(kind, end, stop) for end, stop in folds for kind in ("reg", "cls")]
+    jobs += [("reg", len(ts), None), ("cls", len(ts), None)]
+    scores: Dict[str, List[float]] = {"reg": [], "cls": []}
+    final: Dict[str, object] = {}
+    done = 0
+    parallel = joblib.Parallel(n_jobs=max(1, workers), backend="loky", return_as="generator_unordered")
+    for kind, score, model in parallel(joblib.delayed(_fit_task)(k, X, y, e, s) for k, e, s in jobs):
+        if model is not None:
+            final[kind] = model
+        else:
+            scores[kind].append(score)
+        done += 1
+        if progress is not None:
+            progress(done, len(jobs))
+
+    version = f"v{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+    out_dir = os.path.join(OUT_DIR, MODEL_NAME, version)
+    os.makedirs(out_dir, exist_ok=True)
+    save_model(final["reg"], os.path.join(out_dir, "reg.joblib"))
+    save_model(final["cls"], os.path.join(out_dir, "cls.joblib"))
+    metrics = {
+        "r2_mean": float(np.mean(scores["reg"])),
+        "acc_cls": float(np.mean(scores["cls"])),
+        "n_symbols": len(symbols),
+        "n_rows": int(len(ts)),
+    }
+    register_model_local(MODEL_NAME, version, out_dir, metrics)
+    logger.info("ML evren eğitimi tamamlandı: {} {} sembol, {}", version, len(symbols), metrics)
+    return metrics
@@ -1,7 +1,9 @@
 from __future__ import annotations
 import os
+import copy
 import json
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, Tuple
 
 try:
     import mlflow  # type: ignore
@@ -12,25 +14,56 @@ ARTIFACT_DIR = os.environ.get("ML_ARTIFACT_DIR", "storage/models")
 os.makedirs(ARTIFACT_DIR, exist_ok=True)
 REG_FILE = os.path.join(ARTIFACT_DIR, "registry.json")
 
+# (dosya yolu, stat imzası) -> ayrıştırılmış içerik; dosya değişmedikçe yeniden okunmaz
+_cache: Tuple[Optional[tuple], Dict[str, Any]] = (None, {})
+_cache_lock = threading.Lock()
+
+def _signature() -> Optional[tuple]:
+    try:
+        st = os.stat(REG_FILE)
+    except OSError:
+        return None
+    return (REG_FILE, st.st_ino, st.st_mtime_ns, st.st_size)
+
 def _read_registry() -> Dict[str, Any]:
-    if os.path.exists(REG_FILE):
+    """
+    registry.json içeriği. Tahmin yolunda her çağrıda yalnızca bir ``stat``
+    yapılır; dosya değiştiğinde yeniden ayrıştırılır. Dönen sözlük paylaşılır,
+    değiştirilmemelidir.
+    """
+    global _cache  # pylint: disable=global-statement
+    sig = _signature()
+    if sig is None:
+        return {}
+    if _cache[0] == sig:
+        return _cache[1]
+    with _cache_lock:
+        if _cache[0] == sig:
+            return _cache[1]
         try:
             with open(REG_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
+                data = json.load(f)
         except Exception:
             return {}
-    return {}
+        _cache = (sig, data)
+        return data
 
 def _write_registry(data: Dict[str, Any]) -> None:
-    with open(REG_FILE, "w", encoding="utf-8") as f:
+    # okuyucular yarım yazılmış dosya görmesin diye tmp + os.replace
+    tmp = f"{REG_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, REG_FILE)
 
 def register_model_local(name: str, version: str, path: str, metrics: dict) -> None:
-    reg = _read_registry()
+    reg = copy.deepcopy(_read_registry())
     reg.setdefault(name, {})[version] = {"path": path, "metrics": metrics}
     reg[name]["latest"] = version
     _write_registry(reg)
 
+def get_latest_version(name: str) -> Optional[str]:
+    return _read_registry().get(name, {}).get("latest")
+
 def get_model_path(name: str, version: Optional[str] = None) -> Optional[str]:
     reg = _read_registry()
     if name not in reg:
@@ -1,17 +1,27 @@
 from __future__ import annotations
+import os
 from flask import Blueprint, request, jsonify
-from marshmallow import Schema, fields, ValidationError
-from .service import predict as ml_predict, warmup
+from marshmallow import Schema, fields, validate, ValidationError
+from .service import predict as ml_predict, predict_batch as ml_predict_batch, warmup
 from .train import train as ml_train
-from .metrics import record_prediction, aggregate
+from backend.marketdata import safe_symbol, timeframe_to_timedelta
+from .metrics import DEFAULT_WINDOW, RETENTION_SECONDS, record_prediction, aggregate
 from .abtest import pick_model_variant
 
 ml_bp = Blueprint("ml", __name__, url_prefix="/api/ml")
+MAX_BATCH_SYMBOLS = int(os.environ.get("ML_MAX_BATCH_SYMBOLS", "500"))
+
+def _valid_symbol(value: str) -> None:
+    try:
+        safe_symbol(value)
+    except ValueError as e:
+        raise ValidationError(str(e))
 
 class PredictSchema(Schema):
-    symbol = fields.Str(required=True)
+    symbol = fields.Str(required=True, validate=_valid_symbol)
     user_id = fields.Str(required=False)
     realized = fields.Float(required=False, allow_none=True)
+    debug = fields.Bool(required=False, load_default=False)
 
 @ml_bp.route("/predict", methods=["POST"])
 def predict():
@@ -22,17 +32,52 @@ def predict():
     symbol = data["symbol"]
     user_id = data.get("user_id")
     variant = pick_model_variant(user_id)
-    out = ml_predict(symbol=symbol, user_id=user_id)
-    if "variant" not in out:
-        out["variant"] = variant
+    debug = data["debug"] or request.args.get("debug") in {"1", "true"}
+    out = ml_predict(symbol=symbol, user_id=user_id, debug=debug, variant=variant)
     if data.get("realized") is not None:
         correct = (data["realized"] > 0 and out["prob_up"] >= 0.5) or (data["realized"] <= 0 and out["prob_up"] < 0.5)
-        record_prediction({"uid": user_id, "variant": out["variant"], "correct": bool(correct)})
+        record_prediction({
+            "uid": user_id,
+            "variant": out["variant"],
+            "correct": bool(correct),
+            "prob_up": out["prob_up"],
+            "up": data["realized"] > 0,
+        })
     return jsonify(out), 200
 
+class PredictBatchSchema(Schema):
+    symbols = fields.List(fields.Str(validate=_valid_symbol), required=True, validate=validate.Length(min=1, max=MAX_BATCH_SYMBOLS))
+    user_id = fields.Str(required=False)
+
+@ml_bp.route("/predict_batch", methods=["POST"])
+def predict_batch():
+    try:
+        data = PredictBatchSchema().load(request.get_json() or {})
+    except ValidationError as ve:
+        return jsonify({"error": ve.messages}), 400
+    variant = pick_model_variant(data.get("user_id"))
+    results = ml_predict_batch(data["symbols"], variant=variant)
+    # üst düzey variant gerçekte sunulanı yansıtır (model yoksa v1 -> v0)
+    served = next((r["variant"] for r in results if "variant" in r), variant)
+    return jsonify({"variant": served, "results": results}), 200
+
+def _parse_window(raw: str | None) -> int:
+    """Pencere: saniye (``3600``) veya süre (``15m``, ``1h``, ``1d``)."""
+    if not raw:
+        return DEFAULT_WINDOW
+    if raw.isdigit():
+        return int(raw)
+    return int(timeframe_to_timedelta(raw).total_seconds())
+
 @ml_bp.route("/metrics", methods=["GET"])
 def metrics():
-    return jsonify(aggregate()), 200
+    try:
+        window = _parse_window(request.args.get("window"))
+    except ValueError:
+        return jsonify({"error": {"window": ["Geçersiz pencere"]}}), 400
+    if window <= 0 or window > RETENTION_SECONDS:
+        return jsonify({"error": {"window": [f"1..{RETENTION_SECONDS} saniye olmalı"]}}), 400
+    return jsonify(aggregate(variant=request.args.get("variant") or None, window=window)), 200
 
 @ml_bp.route("/train", methods=["POST"])
 def train():
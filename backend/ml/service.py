@@ -1,62 +1,139 @@
 from __future__ import annotations
 import os
-import threading
-import joblib
+import numpy as np
 import pandas as pd
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+from loguru import logger
 from .data import load_ohlcv
-from .features import build_features
-from .registry import get_model_path
+from .feature_store import HISTORY_DAYS, get_feature_store
+from .model_cache import LoadedModel, get_model_cache
+from .timing import StageTimer
 
-_lock = threading.Lock()
-_loaded: Dict[str, Dict[str, object]] = {}
 MODEL_NAME = os.environ.get("ML_MODEL_NAME", "oq_return")
 HORIZON = int(os.environ.get("ML_HORIZON_DAYS", "7"))
+CONTROL_VARIANT = "v0"
 
-def _ensure_loaded() -> bool:
-    with _lock:
-        if MODEL_NAME in _loaded:
-            return True
-        path = get_model_path(MODEL_NAME, None)
-        if not path:
-            return False
-        reg_p = os.path.join(path, "reg.joblib")
-        cls_p = os.path.join(path, "cls.joblib")
-        if not (os.path.exists(reg_p) and os.path.exists(cls_p)):
-            return False
-        _loaded[MODEL_NAME] = {
-            "reg": joblib.load(reg_p),
-            "cls": joblib.load(cls_p),
-        }
-        return True
+def _parse_variant_versions(raw: str) -> Dict[str, Optional[str]]:
+    """``"v1=latest,canary=v20250101120000"`` -> {kol: sürüm}; ``latest`` None olur."""
+    out: Dict[str, Optional[str]] = {}
+    for part in raw.split(","):
+        name, sep, version = part.partition("=")
+        if sep and name.strip() and version.strip():
+            out[name.strip()] = None if version.strip() == "latest" else version.strip()
+    return out
+
+# A/B ve canary kollarının registry sürümleri (ML_AB_VARIANTS'taki adlarla);
+# eşlenmeyen ML kolları en son sürümü kullanır, ``v0`` klasik yoldur
+VARIANT_VERSIONS = _parse_variant_versions(os.environ.get("ML_VARIANT_VERSIONS", ""))
+
+def _get_model(version: Optional[str] = None) -> Optional[LoadedModel]:
+    return get_model_cache().get(MODEL_NAME, version)
 
 def warmup() -> bool:
-    return _ensure_loaded()
+    """En son sürümü ve kollara sabitlenmiş sürümleri belleğe alır."""
+    for v in set(VARIANT_VERSIONS.values()) - {None}:
+        get_model_cache().load(MODEL_NAME, v)
+    return _get_model() is not None
+
+def _model_for(variant: Optional[str]) -> Optional[LoadedModel]:
+    """A/B ataması: ``v0`` klasik yola gider, diğer kollar eşlendikleri sürümü kullanır."""
+    if variant == CONTROL_VARIANT:
+        return None
+    version = VARIANT_VERSIONS.get(variant) if variant else None
+    if version is None:
+        return _get_model()
+    model = _get_model(version)
+    if model is None:
+        logger.warning("ML kolu {} için sürüm {} yüklenemedi; en son sürüm sunuluyor", variant, version)
+        return _get_model()
+    return model
 
-def predict(symbol: str, user_id: Optional[str] = None) -> Dict:
+def _served(variant: Optional[str], model: Optional[LoadedModel]) -> Dict[str, str]:
+    if model is None:
+        return {"variant": CONTROL_VARIANT}
+    return {"variant": variant or "v1", "model_version": model.version}
+
+def predict(symbol: str, user_id: Optional[str] = None, debug: bool = False, variant: Optional[str] = None) -> Dict:
     """
+    ``variant`` (A/B ataması) ``v0`` ise model kullanılmaz, diğer kollar
+    ``ML_VARIANT_VERSIONS`` ile eşlendikleri sürümü kullanır. ``variant``
+    alanı her zaman gerçekte sunulan kolu gösterir (model yoksa ``v0`` olur),
+    ``model_version`` kullanılan sürümü.
+
     Dönenler:
       - y_hat: beklenen yüzde getiri (horizon günü)
       - prob_up: yön sınıflandırma ihtimali
+      - timings_ms: ``debug`` verilirse aşama bazında süreler
     """
-    ok = _ensure_loaded()
-    df = load_ohlcv(symbol, days=400)
-    feat = build_features(df, horizon=HORIZON)
-    X = feat[["ret_1", "ret_5", "ret_10", "vol_10", "sma_10", "sma_20", "rsi_14"]].iloc[[-1]]
-
-    if not ok:
-        # ML modeli yoksa basit fallback: son 10 gün ortalamasına göre naive tahmin
-        y_hat = float(feat["ret_10"].iloc[-1] or 0.0)
-        prob_up = 0.5 + (0.25 if y_hat > 0 else -0.25)
-        return {"variant": "v0", "y_hat": y_hat, "prob_up": prob_up}
-
-    reg = _loaded[MODEL_NAME]["reg"]
-    cls = _loaded[MODEL_NAME]["cls"]
-    # type: ignore[no-any-return]
-    y_hat = float(getattr(reg, "predict")(X)[0])
-    if hasattr(cls, "predict_proba"):
-        prob_up = float(getattr(cls, "predict_proba")(X)[0, 1])
+    with StageTimer("predict", MODEL_NAME) as timer:
+        with timer.stage("registry_read"):
+            model = _model_for(variant)
+        timer.version = model.version if model is not None else "none"
+        with timer.stage("data_load"):
+            base = load_ohlcv(symbol, days=HISTORY_DAYS)
+        with timer.stage("features"):
+            X = get_feature_store().latest(symbol, HORIZON, base=base)
+        if X is None:
+            raise ValueError(f"{symbol}: özellik üretmek için yeterli veri yok")
+
+        with timer.stage("predict"):
+            if model is None:
+                # ML modeli yoksa basit fallback: son 10 gün ortalamasına göre naive tahmin
+                y_hat = float(X["ret_10"].iloc[-1] or 0.0)
+                prob_up = 0.5 + (0.25 if y_hat > 0 else -0.25)
+                out = {**_served(variant, None), "y_hat": y_hat, "prob_up": prob_up}
+            else:
+                reg, cls = model.reg, model.cls
+                # type: ignore[no-any-return]
+                y_hat = float(getattr(reg, "predict")(X)[0])
+                if hasattr(cls, "predict_proba"):
+                    prob_up = float(getattr(cls, "predict_proba")(X)[0, 1])
+                else:
+                    prob_up = float(getattr(cls, "predict")(X)[0])
+                out = {**_served(variant, model), "y_hat": y_hat, "prob_up": prob_up}
+    if debug:
+        out["timings_ms"] = timer.breakdown()
+    return out
+
+
+def predict_batch(symbols: List[str], variant: Optional[str] = None) -> List[Dict]:
+    """
+    Çoklu sembol tahmini: her sembolün son özellik satırı tek matriste
+    toplanır, regresyon ve sınıflandırma modelleri birer kez çağrılır.
+    Sonuçlar giriş sırasıyla döner; verisi yetersiz semboller ``error`` taşır.
+    ``variant`` ``predict`` ile aynı anlamdadır; tüm öğeler aynı yoldan sunulur.
+    """
+    model = _model_for(variant)
+    rows: List[pd.DataFrame] = []
+    out: List[Dict] = []
+    fs = get_feature_store()
+    for symbol in symbols:
+        row = fs.latest(symbol, HORIZON)
+        if row is None:
+            out.append({"symbol": symbol, "error": "insufficient_data"})
+            continue
+        rows.append(row)
+        out.append({"symbol": symbol})
+    if not rows:
+        return out
+
+    X = pd.concat(rows, axis=0)
+    if model is None:
+        y_hat = X["ret_10"].fillna(0.0).to_numpy()
+        prob_up = np.where(y_hat > 0, 0.75, 0.25)
     else:
-        prob_up = float(getattr(cls, "predict")(X)[0])
-    return {"variant": "v1", "y_hat": y_hat, "prob_up": prob_up}
+        reg, cls = model.reg, model.cls
+        y_hat = np.asarray(getattr(reg, "predict")(X), dtype=float)
+        if hasattr(cls, "predict_proba"):
+            prob_up = np.asarray(getattr(cls, "predict_proba")(X), dtype=float)[:, 1]
+        else:
+            prob_up = np.asarray(getattr(cls, "predict")(X), dtype=float)
+    served = _served(variant, model)
 
+    i = 0
+    for item in out:
+        if "error" in item:
+            continue
+        item.update({**served, "y_hat": float(y_hat[i]), "prob_up": float(prob_up[i])})
+        i += 1
+    return out
@@ -0,0 +1,71 @@
+"""
+ML tahmin/eğitim aşamalarının süre ölçümü.
+
+Her aşama ``ml_stage_duration_seconds`` histogramına (op, stage, model,
+version) etiketleriyle yazılır. Sürüm, model çözülene kadar bilinmediğinden
+gözlemler ``finish`` ile topluca yapılır; zamanlayıcı ``with`` bloğu olarak
+kullanılır, böylece hata veren çağrıların aşamaları da kaydedilir. OpenTelemetry kuruluysa ve
+``ML_TRACING`` açıksa her aşama ayrıca bir span olarak yayınlanır.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Tuple
+
+from backend.observability.metrics import observe_ml_stage
+
+try:  # opsiyonel izleme
+    from opentelemetry import trace  # type: ignore
+except Exception:
+    trace = None
+
+TRACING_ENABLED = os.environ.get("ML_TRACING", "0").lower() in {"1", "true", "yes", "on"}
+_tracer = trace.get_tracer("orcaquant.ml") if trace is not None and TRACING_ENABLED else None
+
+
+class StageTimer:
+    def __init__(self, op: str, model: str, version: str = "none"):
+        self.op = op
+        self.model = model
+        self.version = version
+        self._stages: List[Tuple[str, float]] = []
+        self._finished = False
+
+    def __enter__(self) -> "StageTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.finish()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        span = (
+            _tracer.start_as_current_span(f"ml.{self.op}.{name}", attributes={"ml.model": self.model})
+            if _tracer is not None
+            else nullcontext()
+        )
+        t0 = time.perf_counter()
+        with span:
+            try:
+                yield
+            finally:
+                self._stages.append((name, time.perf_counter() - t0))
+
+    def finish(self) -> None:
+        """Aşamaları histograma yazar; yalnız ilk çağrıda etkilidir."""
+        if self._finished:
+            return
+        self._finished = True
+        for name, seconds in self._stages:
+            observe_ml_stage(self.op, name, self.model, self.version, seconds)
+
+    def breakdown(self) -> Dict[str, float]:
+        """Aşama -> milisaniye (debug yanıtı için)."""
+        out: Dict[str, float] = {}
+        for name, seconds in self._stages:
+            out[name] = round(out.get(name, 0.0) + seconds * 1000, 3)
+        out["total"] = round(sum(s for _, s in self._stages) * 1000, 3)
+        return out
@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 import time
 from contextlib import contextmanager
-from typing import Iterable, Optional
+from typing import Callable, Iterable, Optional
 
 from flask import Blueprint, Response, request
 from prometheus_client import (
@@ -130,6 +130,34 @@ OHLCV_CACHE_MISS = Counter(
     registry=REGISTRY,
 )
 
+ML_STAGE_LATENCY = Histogram(
+    "ml_stage_duration_seconds",
+    "Duration of ML inference/training stages.",
+    ["op", "stage", "model", "version"],
+    registry=REGISTRY,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+ARCHIVE_ROWS_TOTAL = Counter(
+    "abh_archive_rows_total",
+    "Raw data rows passed to the write-behind archiver.",
+    ["status"],
+    registry=REGISTRY,
+)
+
+ARCHIVE_QUEUE_DEPTH = Gauge(
+    "abh_archive_queue_depth",
+    "Rows waiting in the write-behind archive queue.",
+    registry=REGISTRY,
+)
+
+ARCHIVE_FLUSH_DURATION = Histogram(
+    "abh_archive_flush_duration_seconds",
+    "Duration of a single archive batch insert.",
+    registry=REGISTRY,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
 
 def inc_decision(status: str) -> None:
     DECISION_REQ_TOTAL.labels(status=str(status)).inc()
@@ -163,6 +191,23 @@ def inc_cache_miss(asset: str) -> None:
     OHLCV_CACHE_MISS.labels(asset=str(asset)).inc()
 
 
+def observe_ml_stage(op: str, stage: str, model: str, version: str, seconds: float) -> None:
+    ML_STAGE_LATENCY.labels(op=str(op), stage=str(stage), model=str(model), version=str(version)).observe(float(seconds))
+
+
+def inc_archive_rows(status: str, n: int = 1) -> None:
+    ARCHIVE_ROWS_TOTAL.labels(status=str(status)).inc(n)
+
+
+def track_archive_queue_depth(fn: Callable[[], float]) -> None:
+    """Sample the archive queue depth from ``fn`` at scrape time."""
+    ARCHIVE_QUEUE_DEPTH.set_function(fn)
+
+
+def observe_archive_flush(seconds: float) -> None:
+    ARCHIVE_FLUSH_DURATION.observe(float(seconds))
+
+
 @contextmanager
 def observe(route: str):
     """Context manager to time a section and observe into REQUEST_LATENCY."""
@@ -1,11 +1,11 @@
-from time import time
-
 import requests
 from flask import Blueprint, jsonify, request
 from pydantic import BaseModel, PositiveInt, ValidationError
 
+from backend.services.coingecko import RateLimited, get_coingecko_client
+from backend.services.price_snapshot import get_price_snapshot
+
 bp = Blueprint("product_v2_market", __name__)
-_CACHE: dict[str, tuple[float, list]] = {}
 
 
 class TopQuery(BaseModel):
@@ -18,24 +18,22 @@ def top():
         q = TopQuery(**request.args)
     except ValidationError as e:
         return jsonify(error="validation_error", details=e.errors()), 400
-    key, ttl, now = f"top::{q.limit}", 30, time()
-    if key in _CACHE and now - _CACHE[key][0] < ttl:
-        return jsonify(source="cache", data=_CACHE[key][1])
+    client = get_coingecko_client()
+    calls = client.upstream_calls
     try:
-        r = requests.get(
-            "https://api.coingecko.com/api/v3/coins/markets",
-            params={
+        # shared client: 30 s fresh, then served stale while revalidating
+        data = client.get_json(
+            "coins/markets",
+            {
                 "vs_currency": "usd",
                 "order": "market_cap_desc",
                 "per_page": q.limit,
                 "page": 1,
                 "sparkline": "false",
             },
-            timeout=5,
+            ttl=30,
         )
-        r.raise_for_status()
-        data = r.json()
-        _CACHE[key] = (now, data)
-        return jsonify(source="live", data=data)
-    except requests.RequestException:
+    except (requests.RequestException, RateLimited):
         return jsonify(error="upstream_unavailable"), 502
+    get_price_snapshot().record_markets(data)
+    return jsonify(source="live" if client.upstream_calls > calls else "cache", data=data)
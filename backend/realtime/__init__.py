@@ -1,69 +1,332 @@
-from flask_socketio import SocketIO
-import time, random, threading
+from flask_socketio import SocketIO, join_room, leave_room
+from flask import request
+import json
+import os
+import threading
+import time
+import uuid
 import logging
+from typing import Callable, Dict, Iterable, Optional
+
+from redis.exceptions import WatchError
+
+from backend.websocket.connection_registry import ConnectionRegistry
 
 logger = logging.getLogger(__name__)
 
+PRICE_BUS_CHANNEL = os.environ.get("PRICE_BUS_CHANNEL", "price_updates")
+PRICE_UPSTREAM_LOCK_KEY = os.environ.get("PRICE_UPSTREAM_LOCK_KEY", "price_stream:leader")
+PRICE_UPSTREAM_LOCK_TTL = int(os.environ.get("PRICE_UPSTREAM_LOCK_TTL", "15"))
+PRICE_UPSTREAM_SYNC_INTERVAL = float(os.environ.get("PRICE_UPSTREAM_SYNC_INTERVAL", "2"))
+
 # Production'da gevent kullanın
 socketio = SocketIO(async_mode="threading", cors_allowed_origins="*")
-_price_feeder_started = False
-_feeder_lock = threading.Lock()
+_upstream = None
+_leader: Optional["UpstreamLeader"] = None
+_relay = None
+_init_lock = threading.Lock()
+
+
+class UpstreamLeader:
+    """
+    Kümede tek upstream bağlantısı: Redis kilidini (``PRICE_UPSTREAM_LOCK_KEY``)
+    tutan süreç, küme çapındaki abone sayılarına (``ConnectionRegistry.counts``)
+    göre akar; diğer süreçlerin talebi boştur, bu yüzden Binance/CoinGecko'ya
+    bağlanmazlar ve bus'a aynı tick'in kopyaları düşmez.
+
+    Kilit ``PRICE_UPSTREAM_LOCK_TTL`` ile yaşar ve her ``sync`` turunda yenilenir;
+    lider çökerse kilidi TTL sonunda başka bir süreç alır. Redis'e
+    ulaşılamazsa süreç lider sayılmaz (kapalı kalır).
+    """
+
+    def __init__(
+        self,
+        manager,
+        redis_client,
+        counts: Callable[[], Dict[str, int]],
+        *,
+        key: str = PRICE_UPSTREAM_LOCK_KEY,
+        ttl: int = PRICE_UPSTREAM_LOCK_TTL,
+        token: Optional[str] = None,
+    ):
+        self.manager = manager
+        self.redis = redis_client
+        self.counts = counts
+        self.key = key
+        self.ttl = ttl
+        self.token = token or uuid.uuid4().hex
+        self._pid = os.getpid()
+        self.is_leader = False
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> bool:
+        if self._pid != os.getpid():
+            # fork'tan devralınan kimlik ebeveynindir
+            self.token, self._pid = uuid.uuid4().hex, os.getpid()
+        if self.redis.set(self.key, self.token, nx=True, ex=self.ttl):
+            return True
+        # kilit bizdeyse süresini uzat (WATCH ile karşılaştır-ve-ayarla)
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(self.key)
+                owner = pipe.get(self.key)
+                if isinstance(owner, bytes):
+                    owner = owner.decode()
+                if owner != self.token:
+                    return False
+                pipe.multi()
+                pipe.expire(self.key, self.ttl)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def sync(self) -> bool:
+        """Kilidi alır/yeniler ve talebi ayarlar; lider ise True döner."""
+        with self._lock:
+            try:
+                leader = self._acquire()
+            except Exception as e:
+                logger.warning(f"Price upstream lock unavailable: {e}")
+                leader = False
+            if leader != self.is_leader:
+                logger.info(f"Price upstream leadership {'acquired' if leader else 'lost'}")
+            self.is_leader = leader
+            self.manager.set_demand(sorted(self.counts()) if leader else [])
+            return leader
+
+    def run(self, sleep: Callable[[float], object] = time.sleep,
+            interval: float = PRICE_UPSTREAM_SYNC_INTERVAL) -> None:
+        while True:
+            try:
+                self.sync()
+            except Exception as e:  # pragma: no cover - defensive
+                logger.error(f"Price upstream sync error: {e}")
+            sleep(interval)
+
+    def release(self) -> None:
+        """Düzgün kapanışta kilidi bırakır (bizdeyse)."""
+        with self._lock:
+            try:
+                owner = self.redis.get(self.key)
+                if isinstance(owner, bytes):
+                    owner = owner.decode()
+                if owner == self.token:
+                    self.redis.delete(self.key)
+            except Exception:  # pragma: no cover - defensive
+                pass
+            self.is_leader = False
+            self.manager.set_demand([])
+
+
+def _update_upstream(started: Iterable[str], stopped: Iterable[str]) -> None:
+    """
+    İlk/son abone olaylarını fiyat akışlarına iletir (bağlıysa). Lider
+    kilidiyle çalışırken bu işçideki değişiklik hemen senkronlanır; diğer
+    işçilerinkini lider bir sonraki turda görür.
+    """
+    leader = _leader
+    if leader is not None:
+        leader.sync()
+        return
+    upstream = _upstream
+    if upstream is not None:
+        upstream.update_demand(started, stopped)
+
+
+def attach_upstream(manager, redis_client=None) -> Optional[UpstreamLeader]:
+    """
+    ``PriceStreamManager(on_demand=True)`` bağlar.
+
+    ``redis_client`` verilirse talep küme çapındaki abone sayılarından gelir ve
+    yalnız lider kilidini tutan süreç upstream'e bağlanır (her süreç kendi
+    akışını açsaydı bus'a her tick N kez düşerdi). Verilmezse (tek süreç) o
+    andaki yerel abonelikler hemen uygulanır, sonrakiler join/leave ile
+    artımlı gelir.
+    """
+    global _upstream, _leader
+    _upstream = manager
+    if redis_client is not None:
+        _leader = UpstreamLeader(manager, redis_client, lambda: _registry_counts(local=False))
+        _leader.sync()
+        socketio.start_background_task(_leader.run, socketio.sleep)
+        return _leader
+    _leader = None
+    counts = _registry_counts(local=True)
+    if counts:
+        manager.update_demand(sorted(counts), [])
+    return None
+
+
+def _registry_counts(local: bool) -> Dict[str, int]:
+    try:
+        if _relay is not None:
+            registry = _relay.registry
+        else:
+            from backend.websocket.socket_manager import websocket_manager
+            registry = websocket_manager.registry
+        return registry.local_counts() if local else registry.counts()
+    except Exception:  # pragma: no cover - defensive
+        return {}
+
+
+class PriceRelay:
+    """
+    Fiyat bus'ından (Redis ``price_updates``) gelen güncellemeleri yalnız
+    abonesi olan ``price_{symbol}`` odalarına ``price`` olayı olarak yayar.
 
-def _register_events(sock: SocketIO) -> None:
+    Abone sayıları join/leave'de artımlı tutulur. Bus dinleyicisi ilk abonede
+    başlar, son abone gidince kanaldan çıkar; abonesiz semboller emit edilmez
+    ve (on_demand akışlarda) upstream'den hiç istenmez.
+    """
+
+    def __init__(self, sock: SocketIO, redis_client=None, registry: Optional[ConnectionRegistry] = None):
+        self.sock = sock
+        self.redis_client = redis_client
+        self.registry = registry or ConnectionRegistry()
+        self._listening = False
+        self._lock = threading.Lock()
+        self.emitted = 0
+        self.skipped = 0
+
+    def join(self, sid: str, symbols: Iterable[str]) -> None:
+        started = self.registry.subscribe(sid, symbols)
+        if started:
+            _update_upstream(started, [])
+            self._ensure_listener()
+
+    def leave(self, sid: str, symbols: Optional[Iterable[str]] = None) -> None:
+        stopped = self.registry.unregister(sid) if symbols is None else self.registry.unsubscribe(sid, symbols)
+        if stopped:
+            _update_upstream([], stopped)
+
+    def dispatch(self, message) -> int:
+        """Bus mesajını (tekil ya da ``{'batch': [...]}``) abonesi olan odalara yayar"""
+        data = json.loads(message) if isinstance(message, (str, bytes)) else message
+        sent = 0
+        for item in data.get("batch") or [data]:
+            symbol = item.get("symbol")
+            price_data = item.get("data") or {}
+            if not symbol or not self.registry.has_subscribers(symbol):
+                self.skipped += 1
+                continue
+            self.sock.emit(
+                "price",
+                {
+                    "symbol": symbol,
+                    "price": price_data.get("price"),
+                    "ts": price_data.get("ts") or price_data.get("timestamp"),
+                    "volume": price_data.get("volume"),
+                },
+                to=f"price_{symbol}",
+            )
+            sent += 1
+        self.emitted += sent
+        return sent
+
+    def _ensure_listener(self) -> None:
+        if self.redis_client is None:
+            return
+        with self._lock:
+            if self._listening:
+                return
+            self._listening = True
+        self.sock.start_background_task(self._listen)
+
+    def _listen(self) -> None:
+        pubsub = self.redis_client.pubsub()
+        try:
+            pubsub.subscribe(PRICE_BUS_CHANNEL)
+            while True:
+                if self.registry.idle():
+                    with self._lock:
+                        if self.registry.idle():
+                            self._listening = False
+                            break
+                message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    try:
+                        self.dispatch(message["data"])
+                    except Exception as e:
+                        logger.error(f"Price relay dispatch error: {e}")
+        except Exception as e:
+            logger.error(f"Price relay listener error: {e}")
+            with self._lock:
+                self._listening = False
+        finally:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+
+def _register_events(sock: SocketIO, relay: PriceRelay) -> None:
     @sock.on('connect')
     def handle_connect():  # type: ignore[func-returns-value]
         logger.info("Client connected")
 
     @sock.on('disconnect')
     def handle_disconnect():  # type: ignore[func-returns-value]
+        relay.leave(request.sid)
         logger.info("Client disconnected")
 
-def _start_price_feeder():
-    """Demo price feeder - Production'da gerçek data source kullanın"""
-    def run():
-        btc_price = 50000 + random.random() * 1000
-        try:
-            while True:
-                # Realistic price movement
-                btc_price += (random.random() - 0.5) * 200
-                btc_price = max(30000, min(80000, btc_price))
-                
-                payload = {
-                    "symbol": "BTCUSDT",
-                    "price": round(btc_price, 2),
-                    "ts": int(time.time() * 1000),
-                    "volume": random.randint(100, 1000)
-                }
-                socketio.emit("price", payload)
-                time.sleep(1)
-        except Exception as e:
-            logger.error(f"Price feeder error: {e}")
-    
-    threading.Thread(target=run, daemon=True).start()
+    @sock.on('subscribe_price')
+    def handle_subscribe(data):  # type: ignore[func-returns-value]
+        symbols = [s for s in (data or {}).get('symbols', []) if isinstance(s, str)][:50]
+        for symbol in symbols:
+            join_room(f"price_{symbol}")
+        relay.join(request.sid, symbols)
+
+    @sock.on('unsubscribe_price')
+    def handle_unsubscribe(data):  # type: ignore[func-returns-value]
+        symbols = [s for s in (data or {}).get('symbols', []) if isinstance(s, str)]
+        for symbol in symbols:
+            leave_room(f"price_{symbol}")
+        relay.leave(request.sid, symbols)
+
+
+def _bus_client(app):
+    url = app.config.get("REDIS_URL") or os.environ.get("REDIS_URL")
+    if not url:
+        return None
+    try:
+        import redis
+        return redis.from_url(url)
+    except Exception as e:  # pragma: no cover - defensive
+        logger.warning(f"Price bus unavailable: {e}")
+        return None
+
 
 def init_realtime(app):
-    """SocketIO initialization"""
-    global _price_feeder_started, socketio
+    """
+    SocketIO initialization.
+
+    WebSocketManager varsa onun soketi kullanılır; bus'ı ilk abonelikte o
+    dinlemeye başlar ve yalnız abonesi olan sembolleri yayar. Burada yalnız
+    ilk/son abone olayları fiyat akışlarına bağlanır (manager'ın
+    connect/disconnect handler'ları ezilmez). Yoksa
+    ``PriceRelay`` aynı işi bu modülün soketi üzerinde yapar.
+    """
+    global socketio, _relay
 
     try:
         from backend.websocket.socket_manager import websocket_manager
         manager_socket = getattr(websocket_manager, 'socketio', None)
     except Exception:  # pragma: no cover - defensive
         manager_socket = None
-    
-    cors_origins = app.config.get("CORS_ORIGINS", "*")
-    
-    if manager_socket is not None:
-        socketio = manager_socket
-    else:
+
+    with _init_lock:
+        if manager_socket is not None:
+            socketio = manager_socket
+            websocket_manager.add_subscription_listener(_update_upstream)
+            return socketio
+
+        cors_origins = app.config.get("CORS_ORIGINS", "*")
         socketio.init_app(app, cors_allowed_origins=cors_origins)
-    
-    _register_events(socketio)
-    
-    # Start price feeder once
-    with _feeder_lock:
-        if not _price_feeder_started:
-            _start_price_feeder()
-            _price_feeder_started = True
-            
+        bus = _bus_client(app)
+        # abone sayıları bus Redis'inde paylaşılır; upstream lideri küme toplamını okur
+        _relay = PriceRelay(socketio, bus, ConnectionRegistry(bus))
+        if _relay.registry.distributed:
+            socketio.start_background_task(_relay.registry.run_heartbeat, socketio.sleep)
+        _register_events(socketio, _relay)
     return socketio
@@ -1,18 +1,48 @@
-"""Thin CoinGecko API client with Redis-backed rate limiting."""
+"""Shared CoinGecko API client.
+
+One process-wide client is used for all CoinGecko traffic:
+
+* a ``requests.Session`` with a pooled, keep-alive ``HTTPAdapter``;
+* a smooth token bucket (``COINGECKO_RPS`` refill, ``COINGECKO_BURST``
+  capacity) kept in Redis so every worker process draws from the same budget;
+  if Redis is unreachable a per-process bucket with the same maths is used;
+* a response cache with stale-while-revalidate: fresh entries are served
+  directly, stale ones are served while a single background refresh runs;
+  the in-process mirror is a bounded LRU and defers to Redis once its copy
+  is past the fresh TTL, so refreshes done by other workers are picked up;
+* ``simple/price`` lookups issued concurrently are merged: misses wait up to
+  ``COINGECKO_BATCH_WAIT_MS`` and are fetched with one multi-id request.
+"""
 from __future__ import annotations
 
+import json
 import os
+import threading
 import time
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import redis
 import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
 
 COINGECKO_BASE = os.getenv("COINGECKO_BASE", "https://api.coingecko.com/api/v3")
 COINGECKO_API_KEY = os.getenv("COINGECKO_API_KEY")
 COINGECKO_RPS = float(os.getenv("COINGECKO_RPS", 3))
+COINGECKO_BURST = float(os.getenv("COINGECKO_BURST", max(1.0, COINGECKO_RPS)))
+COINGECKO_MAX_WAIT = float(os.getenv("COINGECKO_MAX_WAIT", 2))
+COINGECKO_TIMEOUT = float(os.getenv("COINGECKO_TIMEOUT", 8))
+COINGECKO_POOL_SIZE = int(os.getenv("COINGECKO_POOL_SIZE", 10))
+COINGECKO_PRICE_TTL = float(os.getenv("COINGECKO_PRICE_TTL", 30))
+COINGECKO_STALE_TTL = float(os.getenv("COINGECKO_STALE_TTL", 300))
+COINGECKO_BATCH_WAIT_MS = float(os.getenv("COINGECKO_BATCH_WAIT_MS", 20))
+COINGECKO_MAX_IDS = int(os.getenv("COINGECKO_MAX_IDS", 100))
+COINGECKO_CACHE_SIZE = int(os.getenv("COINGECKO_CACHE_SIZE", 10000))
 
 _REDIS_CLIENT: Optional[redis.Redis] = None
+_REDIS_RETRY_AFTER = 30.0
 
 
 def _get_client() -> redis.Redis:
@@ -22,34 +52,418 @@ def _get_client() -> redis.Redis:
     return _REDIS_CLIENT
 
 
-def _rate_limit_ok(bucket: str) -> bool:
-    if COINGECKO_RPS <= 0:
-        return True
+class RateLimited(Exception):
+    """Raised when no token became available within the allowed wait."""
 
-    now = int(time.time())
-    key = f"cg:rl:{bucket}:{now}"
-    try:
-        client = _get_client()
-        count = client.incr(key)
-        if count == 1:
-            client.expire(key, 2)
-        return count <= int(COINGECKO_RPS)
-    except Exception:
-        # Fail-open if Redis is unavailable; request will go through but logged later.
-        return True
+
+# KEYS[1] bucket hash; ARGV: rate, capacity, now (s). Returns seconds to wait
+# (0 when a token was taken).
+_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+def _take(tokens: float, ts: float, now: float, rate: float, capacity: float) -> Tuple[float, float]:
+    """Refill and try to take one token. Returns ``(tokens_left, wait_seconds)``."""
+    tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class TokenBucket:
+    """Smooth token bucket, shared through Redis with a local fallback."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = COINGECKO_RPS,
+        capacity: float = COINGECKO_BURST,
+        redis_client: Any = "default",
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.key = f"cg:tb:{name}"
+        self.rate = rate
+        self.capacity = capacity
+        self._redis = redis_client
+        self._script = None
+        self._redis_down_until = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._ts = clock()
+        self._lock = threading.Lock()
+
+    def _redis_client(self):
+        if self._redis is None or self._clock() < self._redis_down_until:
+            return None
+        if self._redis == "default":
+            return _get_client()
+        return self._redis
+
+    def _try(self) -> float:
+        now = self._clock()
+        client = self._redis_client()
+        if client is not None:
+            try:
+                if self._script is None:
+                    self._script = client.register_script(_BUCKET_LUA)
+                return float(self._script(keys=[self.key], args=[self.rate, self.capacity, now]))
+            except Exception as exc:
+                logger.warning(f"CoinGecko token bucket falling back to local: {exc}")
+                self._redis_down_until = now + _REDIS_RETRY_AFTER
+        with self._lock:
+            self._tokens, wait = _take(self._tokens, self._ts, now, self.rate, self.capacity)
+            self._ts = now
+            return wait
+
+    def acquire(self, max_wait: float = COINGECKO_MAX_WAIT) -> bool:
+        """Take one token, sleeping up to ``max_wait`` seconds for a refill."""
+        if self.rate <= 0:
+            return True
+        deadline = self._clock() + max_wait
+        while True:
+            wait = self._try()
+            if wait <= 0:
+                return True
+            if self._clock() + wait > deadline:
+                return False
+            self._sleep(wait)
+
+
+class ResponseCache:
+    """In-process LRU mirrored to Redis; entries carry their fetch time."""
+
+    def __init__(
+        self,
+        redis_client: Any = "default",
+        clock: Callable[[], float] = time.time,
+        max_entries: int = COINGECKO_CACHE_SIZE,
+    ):
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = redis_client
+        self._redis_down_until = 0.0
+        self._clock = clock
+        self.max_entries = max_entries
+
+    def _redis_client(self):
+        if self._redis is None or self._clock() < self._redis_down_until:
+            return None
+        return _get_client() if self._redis == "default" else self._redis
+
+    def _redis_failed(self, exc: Exception) -> None:
+        logger.warning(f"CoinGecko cache Redis unavailable: {exc}")
+        self._redis_down_until = self._clock() + _REDIS_RETRY_AFTER
+
+    def _remember(self, key: str, entry: Tuple[float, Any]) -> None:
+        # caller holds self._lock
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def get_many(self, keys: List[str], max_age: Optional[float] = None) -> Dict[str, Tuple[float, Any]]:
+        """
+        Entries for ``keys``. Local copies older than ``max_age`` are checked
+        against Redis, and the newer of the two is returned.
+        """
+        now = self._clock()
+        out: Dict[str, Tuple[float, Any]] = {}
+        with self._lock:
+            for k in keys:
+                hit = self._local.get(k)
+                if hit is not None:
+                    self._local.move_to_end(k)
+                    out[k] = hit
+        missing = [k for k in keys if k not in out or (max_age is not None and now - out[k][0] > max_age)]
+        client = self._redis_client() if missing else None
+        if client is not None:
+            try:
+                for k, raw in zip(missing, client.mget([f"cg:cache:{k}" for k in missing])):
+                    if raw:
+                        fetched_at, value = json.loads(raw)
+                        if k in out and out[k][0] >= fetched_at:
+                            continue
+                        out[k] = (fetched_at, value)
+                        with self._lock:
+                            self._remember(k, out[k])
+            except Exception as exc:
+                self._redis_failed(exc)
+        return out
+
+    def set_many(self, items: Dict[str, Any], keep: float) -> None:
+        now = self._clock()
+        with self._lock:
+            for k, v in items.items():
+                self._remember(k, (now, v))
+        client = self._redis_client()
+        if client is not None and items:
+            try:
+                pipe = client.pipeline()
+                for k, v in items.items():
+                    pipe.set(f"cg:cache:{k}", json.dumps([now, v]), ex=max(1, int(keep)))
+                pipe.execute()
+            except Exception as exc:
+                self._redis_failed(exc)
+
+
+class CoinGeckoClient:
+    """Pooled, rate limited and cached access to the CoinGecko REST API."""
+
+    def __init__(
+        self,
+        base_url: str = COINGECKO_BASE,
+        api_key: Optional[str] = COINGECKO_API_KEY,
+        *,
+        session: Optional[requests.Session] = None,
+        bucket: Optional[TokenBucket] = None,
+        cache: Optional[ResponseCache] = None,
+        ttl: float = COINGECKO_PRICE_TTL,
+        stale_ttl: float = COINGECKO_STALE_TTL,
+        batch_wait_ms: float = COINGECKO_BATCH_WAIT_MS,
+        max_ids: int = COINGECKO_MAX_IDS,
+        timeout: float = COINGECKO_TIMEOUT,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.session = session or self._new_session()
+        self.bucket = bucket or TokenBucket("api")
+        self.cache = cache or ResponseCache(clock=clock)
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.max_ids = max_ids
+        self.timeout = timeout
+        self._clock = clock
+        self.upstream_calls = 0
+        self._refreshing: set = set()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], Future] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    @staticmethod
+    def _new_session() -> requests.Session:
+        s = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=COINGECKO_POOL_SIZE, pool_maxsize=COINGECKO_POOL_SIZE, max_retries=2
+        )
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        s.headers["User-Agent"] = "orcaquant"
+        return s
+
+    # ------------------------------------------------------------------ HTTP
+    def _request(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        if not self.bucket.acquire():
+            raise RateLimited("CoinGecko RPS exceeded")
+        headers = {"x-cg-pro-api-key": self.api_key} if self.api_key else {}
+        url = path if path.startswith("http") else f"{self.base_url}/{path.lstrip('/')}"
+        self.upstream_calls += 1
+        resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def _single_flight(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Concurrent callers with the same key share one upstream request."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+        if not owner:
+            return fut.result(timeout=self.timeout + COINGECKO_MAX_WAIT)
+        try:
+            value = fn()
+            fut.set_result(value)
+            return value
+        except Exception as exc:
+            fut.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _refresh_async(self, key: str, fn: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                fn()
+            except Exception as exc:
+                logger.warning(f"CoinGecko background refresh failed ({key}): {exc}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name="coingecko-refresh", daemon=True).start()
+
+    def get_json(
+        self, path: str, params: Optional[Dict[str, Any]] = None, ttl: Optional[float] = None
+    ) -> Any:
+        """Cached GET with stale-while-revalidate for any endpoint."""
+        ttl = self.ttl if ttl is None else ttl
+        key = f"{path}?{json.dumps(params or {}, sort_keys=True)}"
+
+        def fetch():
+            value = self._request(path, params)
+            self.cache.set_many({key: value}, ttl + self.stale_ttl)
+            return value
+
+        hit = self.cache.get_many([key], max_age=ttl).get(key)
+        if hit is not None:
+            age = self._clock() - hit[0]
+            if age <= ttl:
+                return hit[1]
+            if age <= ttl + self.stale_ttl:
+                self._refresh_async(key, lambda: self._single_flight(key, fetch))
+                return hit[1]
+        try:
+            return self._single_flight(key, fetch)
+        except RateLimited:
+            if hit is not None:
+                return hit[1]
+            raise
+
+    # ----------------------------------------------------------- simple/price
+    @staticmethod
+    def _price_key(coin: str, vs: str) -> str:
+        return f"simple:{vs}:{coin}"
+
+    def simple_price(self, ids: Iterable[str], vs_currency: str = "usd") -> Dict[str, Dict[str, Any]]:
+        """
+        ``/simple/price`` for ``ids``. Cached ids are answered locally (stale
+        ones refreshed in the background); the rest are merged with other
+        concurrent lookups into one multi-id request.
+        """
+        ids = list(dict.fromkeys(i for i in ids if i))
+        keys = {coin: self._price_key(coin, vs_currency) for coin in ids}
+        hits = self.cache.get_many(list(keys.values()), max_age=self.ttl)
+        now = self._clock()
+        out: Dict[str, Dict[str, Any]] = {}
+        stale: List[str] = []
+        missing: List[str] = []
+        for coin in ids:
+            hit = hits.get(keys[coin])
+            age = now - hit[0] if hit is not None else None
+            if hit is not None and age <= self.ttl + self.stale_ttl:
+                out[coin] = hit[1]
+                if age > self.ttl:
+                    stale.append(coin)
+            else:
+                missing.append(coin)
+        if stale:
+            key = f"refresh:{vs_currency}:{','.join(sorted(stale))}"
+            self._refresh_async(key, lambda: self._fetch_prices(stale, vs_currency))
+        if missing:
+            futures = [self._enqueue(coin, vs_currency) for coin in missing]
+            for coin, fut in zip(missing, futures):
+                value = fut.result(timeout=self.timeout + COINGECKO_MAX_WAIT + 1)
+                if value is not None:
+                    out[coin] = value
+        return out
+
+    def _fetch_prices(self, ids: List[str], vs_currency: str) -> Dict[str, Dict[str, Any]]:
+        data: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(ids), self.max_ids):
+            chunk = ids[i : i + self.max_ids]
+            data.update(self._request("simple/price", {"ids": ",".join(chunk), "vs_currencies": vs_currency}) or {})
+        self.cache.set_many(
+            {self._price_key(coin, vs_currency): value for coin, value in data.items()},
+            self.ttl + self.stale_ttl,
+        )
+        return data
+
+    def _enqueue(self, coin: str, vs_currency: str) -> Future:
+        self._ensure_worker()
+        with self._cond:
+            fut = self._pending.get((coin, vs_currency))
+            if fut is None:
+                fut = self._pending[(coin, vs_currency)] = Future()
+                self._cond.notify()
+            return fut
+
+    def _ensure_worker(self) -> None:
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                # requests inherited across fork belong to the parent
+                self._pending = {}
+                self._thread = None
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="coingecko-batcher", daemon=True)
+                self._thread.start()
+
+    def _take_batch(self) -> Dict[Tuple[str, str], Future]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # give concurrent callers a moment to join this request
+            self._cond.wait_for(lambda: len(self._pending) >= self.max_ids, timeout=self.batch_wait)
+            batch, self._pending = self._pending, {}
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            by_vs: Dict[str, List[str]] = {}
+            for coin, vs in batch:
+                by_vs.setdefault(vs, []).append(coin)
+            for vs, coins in by_vs.items():
+                try:
+                    data = self._fetch_prices(coins, vs)
+                except Exception as exc:
+                    for coin in coins:
+                        batch[(coin, vs)].set_exception(exc)
+                    continue
+                for coin in coins:
+                    batch[(coin, vs)].set_result(data.get(coin))
+
+
+_CG_CLIENT: Optional[CoinGeckoClient] = None
+_CG_LOCK = threading.Lock()
+
+
+def get_coingecko_client() -> CoinGeckoClient:
+    """Process-wide client (shared session, bucket, cache and batcher)."""
+    global _CG_CLIENT  # pylint: disable=global-statement
+    if _CG_CLIENT is None:
+        with _CG_LOCK:
+            if _CG_CLIENT is None:
+                _CG_CLIENT = CoinGeckoClient()
+    return _CG_CLIENT
 
 
 def get_simple_price(symbol: str, vs_currency: str = "usd") -> Dict[str, Any]:
     """Fetch ``/simple/price`` for a symbol."""
-    if not _rate_limit_ok("simple_price"):
+    try:
+        return get_coingecko_client().simple_price([symbol], vs_currency)
+    except RateLimited:
         return {"error": "rate_limited", "detail": "CoinGecko RPS exceeded"}
-
-    url = f"{COINGECKO_BASE}/simple/price"
-    params = {"ids": symbol, "vs_currencies": vs_currency}
-    headers = {}
-    if COINGECKO_API_KEY:
-        headers["x-cg-pro-api-key"] = COINGECKO_API_KEY
-
-    response = requests.get(url, params=params, headers=headers, timeout=8)
-    response.raise_for_status()
-    return response.json()
+    except FutureTimeout:
+        return {"error": "timeout", "detail": "CoinGecko price batch timed out"}
@@ -0,0 +1,298 @@
+"""Central latest-price snapshot.
+
+The price streamers (Binance websocket, CoinGecko polling) write every tick
+here. The latest tick per symbol is kept in one Redis hash (``prices:latest``)
+so every process sees it, and in an in-process mirror so repeated lookups in
+the feeding process cost no round trip. Readers in other processes re-read
+Redis once their mirror entry is older than ``PRICE_MIRROR_TTL`` seconds.
+Writes are a compare-and-set on ``ts`` inside Redis (a Lua script, or a
+WATCH/MULTI transaction where scripting is unavailable), so a late writer in
+another process never replaces a newer tick.
+
+Symbols are normalised to Binance pairs (``bitcoin``, ``btc`` and ``BTCUSDT``
+all map to ``BTCUSDT``). Every returned tick carries ``ts``, ``age`` and
+``stale`` (older than ``PRICE_STALE_AFTER``). Missing or stale USD prices are
+fetched with one merged ``simple/price`` request through the shared
+CoinGecko client and written back, unless ``fallback=False``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import redis
+from loguru import logger
+
+PRICE_HASH_KEY = os.getenv("PRICE_HASH_KEY", "prices:latest")
+PRICE_STALE_AFTER = float(os.getenv("PRICE_STALE_AFTER", 60))
+PRICE_MIRROR_TTL = float(os.getenv("PRICE_MIRROR_TTL", 1))
+_REDIS_RETRY_AFTER = 30.0
+
+# KEYS[1] price hash; ARGV: (field, tick json, ts) triples. Writes each tick
+# unless the stored one is newer; returns the fields that were rejected.
+_CAS_LUA = """
+local rejected = {}
+for i = 1, #ARGV, 3 do
+  local cur = redis.call('HGET', KEYS[1], ARGV[i])
+  local newer = false
+  if cur then
+    local ok, tick = pcall(cjson.decode, cur)
+    newer = ok and tonumber(tick.ts) ~= nil and tonumber(tick.ts) > tonumber(ARGV[i + 2])
+  end
+  if newer then
+    table.insert(rejected, ARGV[i])
+  else
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+  end
+end
+return rejected
+"""
+
+SYMBOL_TO_ID: Dict[str, str] = {
+    "BTCUSDT": "bitcoin",
+    "ETHUSDT": "ethereum",
+    "ADAUSDT": "cardano",
+    "DOTUSDT": "polkadot",
+    "LINKUSDT": "chainlink",
+    "BNBUSDT": "binancecoin",
+    "XRPUSDT": "ripple",
+    "LTCUSDT": "litecoin",
+    "BCHUSDT": "bitcoin-cash",
+    "SOLUSDT": "solana",
+    "DOGEUSDT": "dogecoin",
+}
+ID_TO_SYMBOL: Dict[str, str] = {v: k for k, v in SYMBOL_TO_ID.items()}
+
+
+def normalize_symbol(symbol: str) -> str:
+    """``bitcoin`` / ``btc`` / ``btcusdt`` -> ``BTCUSDT``; unknown ids are upper-cased."""
+    upper = symbol.strip().upper()
+    if upper in SYMBOL_TO_ID:
+        return upper
+    lower = symbol.strip().lower()
+    if lower in ID_TO_SYMBOL:
+        return ID_TO_SYMBOL[lower]
+    if f"{upper}USDT" in SYMBOL_TO_ID:
+        return f"{upper}USDT"
+    return upper
+
+
+def _epoch(value: Any) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def coin_id(symbol: str) -> str:
+    """CoinGecko id for a normalised symbol."""
+    return SYMBOL_TO_ID.get(symbol, symbol.lower())
+
+
+class PriceSnapshot:
+    """Latest tick per symbol in Redis plus an in-process mirror."""
+
+    def __init__(
+        self,
+        redis_client: Any = "default",
+        *,
+        stale_after: float = PRICE_STALE_AFTER,
+        mirror_ttl: float = PRICE_MIRROR_TTL,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._redis = redis_client
+        self._redis_down_until = 0.0
+        self.stale_after = stale_after
+        self.mirror_ttl = mirror_ttl
+        self._clock = clock
+        # symbol -> (mirror refreshed at, tick)
+        self._mirror: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._script = None
+        self._lua = True
+
+    def _redis_client(self):
+        if self._redis is None or self._clock() < self._redis_down_until:
+            return None
+        if self._redis == "default":
+            self._redis = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        return self._redis
+
+    def _redis_failed(self, exc: Exception) -> None:
+        logger.warning(f"Price snapshot Redis unavailable: {exc}")
+        self._redis_down_until = self._clock() + _REDIS_RETRY_AFTER
+
+    # ----------------------------------------------------------------- write
+    def update(self, symbol: str, data: Dict[str, Any], source: str = "stream") -> None:
+        self.update_many({symbol: data}, source)
+
+    def update_many(self, ticks: Dict[str, Dict[str, Any]], source: str = "stream") -> None:
+        """
+        Store ticks (each needs ``price``). Older ticks never overwrite newer
+        ones, neither in the local mirror nor in Redis.
+        """
+        now = self._clock()
+        fresh: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for symbol, data in ticks.items():
+                if data.get("price") is None:
+                    continue
+                key = normalize_symbol(symbol)
+                tick = {**data, "symbol": key, "price": float(data["price"]), "source": source}
+                tick["ts"] = float(data["ts"]) if data.get("ts") is not None else now
+                current = self._mirror.get(key)
+                if current is not None and current[1]["ts"] > tick["ts"]:
+                    continue
+                self._mirror[key] = (now, tick)
+                fresh[key] = tick
+        client = self._redis_client()
+        if client is not None and fresh:
+            try:
+                rejected = self._store(client, fresh)
+            except Exception as exc:
+                self._redis_failed(exc)
+                return
+            if rejected:
+                with self._lock:
+                    for key in rejected:
+                        # another process holds a newer tick: re-read on next lookup
+                        entry = self._mirror.get(key)
+                        if entry is not None:
+                            self._mirror[key] = (float("-inf"), entry[1])
+
+    def _store(self, client, fresh: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Compare-and-set ``fresh`` into the hash; returns the rejected symbols."""
+        if self._lua:
+            try:
+                if self._script is None:
+                    self._script = client.register_script(_CAS_LUA)
+                args: List[Any] = []
+                for key, tick in fresh.items():
+                    args += [key, json.dumps(tick), tick["ts"]]
+                rejected = self._script(keys=[PRICE_HASH_KEY], args=args)
+                return [k.decode() if isinstance(k, bytes) else k for k in rejected]
+            except redis.ResponseError as exc:
+                # no scripting (e.g. some managed/fake servers): use WATCH
+                logger.info(f"Price snapshot Lua CAS unavailable, using WATCH: {exc}")
+                self._lua = False
+        keys = list(fresh)
+        with client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(PRICE_HASH_KEY)
+                    stored = pipe.hmget(PRICE_HASH_KEY, keys)
+                    rejected = [
+                        k for k, raw in zip(keys, stored)
+                        if raw and json.loads(raw).get("ts", float("-inf")) > fresh[k]["ts"]
+                    ]
+                    write = {k: json.dumps(fresh[k]) for k in keys if k not in rejected}
+                    pipe.multi()
+                    if write:
+                        pipe.hset(PRICE_HASH_KEY, mapping=write)
+                    pipe.execute()
+                    return rejected
+                except redis.WatchError:
+                    continue
+
+    # ------------------------------------------------------------------ read
+    def _load(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        now = self._clock()
+        out: Dict[str, Dict[str, Any]] = {}
+        reread: List[str] = []
+        with self._lock:
+            for key in keys:
+                entry = self._mirror.get(key)
+                if entry is not None:
+                    out[key] = entry[1]
+                if entry is None or now - entry[0] > self.mirror_ttl:
+                    reread.append(key)
+        client = self._redis_client() if reread else None
+        if client is not None:
+            try:
+                raw = client.hmget(PRICE_HASH_KEY, reread)
+                loaded = {k: json.loads(v) for k, v in zip(reread, raw) if v}
+            except Exception as exc:
+                self._redis_failed(exc)
+                loaded = {}
+            with self._lock:
+                for key, tick in loaded.items():
+                    current = self._mirror.get(key)
+                    if current is None or tick["ts"] >= current[1]["ts"]:
+                        self._mirror[key] = (now, tick)
+                        out[key] = tick
+        return out
+
+    def _with_age(self, tick: Dict[str, Any]) -> Dict[str, Any]:
+        age = max(0.0, self._clock() - tick["ts"])
+        return {**tick, "age": age, "stale": age > self.stale_after}
+
+    def get_prices(
+        self, symbols: Iterable[str], *, fallback: bool = True
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Latest tick for each symbol, keyed by the symbol as given. Missing
+        symbols are absent from the result. With ``fallback`` missing or stale
+        symbols are refreshed by one merged CoinGecko request first.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        keys = {s: normalize_symbol(s) for s in symbols}
+        ticks = self._load(list(dict.fromkeys(keys.values())))
+        if fallback:
+            need = [
+                k for k in dict.fromkeys(keys.values())
+                if k not in ticks or self._clock() - ticks[k]["ts"] > self.stale_after
+            ]
+            if need:
+                ticks.update(self._refresh(need))
+        return {s: self._with_age(ticks[k]) for s, k in keys.items() if k in ticks}
+
+    def get_price(self, symbol: str, *, fallback: bool = True) -> Optional[float]:
+        tick = self.get_prices([symbol], fallback=fallback).get(symbol)
+        return tick["price"] if tick else None
+
+    def _refresh(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        from backend.services.coingecko import get_coingecko_client
+
+        ids = {coin_id(k): k for k in keys}
+        try:
+            data = get_coingecko_client().simple_price(list(ids), "usd")
+        except Exception as exc:
+            logger.warning(f"Price snapshot fallback failed: {exc}")
+            return {}
+        ticks = {ids[i]: {"price": v.get("usd")} for i, v in data.items() if i in ids and v.get("usd") is not None}
+        self.update_many(ticks, source="coingecko")
+        with self._lock:
+            return {k: self._mirror[k][1] for k in ticks if k in self._mirror}
+
+    def record_markets(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Feed ``coins/markets`` rows (``id`` + ``current_price``) into the snapshot."""
+        ticks = {
+            ID_TO_SYMBOL.get(r["id"], r["id"].upper()): {
+                "price": r.get("current_price"),
+                "change_percent": r.get("price_change_percentage_24h"),
+                "volume": r.get("total_volume"),
+                # cached rows keep their own age instead of looking fresh
+                "ts": _epoch(r.get("last_updated")),
+            }
+            for r in rows or []
+            if r.get("id")
+        }
+        self.update_many(ticks, source="coingecko")
+
+
+_SNAPSHOT: Optional[PriceSnapshot] = None
+_SNAPSHOT_LOCK = threading.Lock()
+
+
+def get_price_snapshot(redis_client: Any = None) -> PriceSnapshot:
+    """Process-wide snapshot; the first caller passing a Redis client wins."""
+    global _SNAPSHOT  # pylint: disable=global-statement
+    if _SNAPSHOT is None:
+        with _SNAPSHOT_LOCK:
+            if _SNAPSHOT is None:
+                _SNAPSHOT = PriceSnapshot(redis_client if redis_client is not None else "default")
+    return _SNAPSHOT
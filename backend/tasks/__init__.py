@@ -36,6 +36,9 @@ def init_celery(app):
 def autodiscover_tasks():
     """Import Celery task modules."""
     import backend.tasks.celery_tasks  # noqa
+    import backend.tasks.forecast_tasks  # noqa
+    import backend.tasks.ingest_tasks  # noqa
+    import backend.tasks.ml_tasks  # noqa
     import backend.tasks.plan_tasks  # noqa
 
 
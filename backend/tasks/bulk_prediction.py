@@ -5,7 +5,8 @@ from backend.db import db
 from backend.db.models import PredictionOpportunity
 from backend.tasks.strategic_recommender import \
     generate_ta_based_recommendation
-from backend.utils.price_fetcher import fetch_current_price
+from backend.services.price_snapshot import get_price_snapshot
+from backend.utils.price_fetcher import fetch_current_prices
 from pycoingecko import CoinGeckoAPI
 
 logger = logging.getLogger(__name__)
@@ -17,11 +18,14 @@ def generate_predictions_for_all_coins(limit=5):
     try:
         coins = cg.get_coins_markets(vs_currency="usd", per_page=limit, page=1)
         symbols = [coin["id"] for coin in coins]
+        # piyasa listesindeki fiyatlar anlık görüntüye yazılır; toplu okuma HTTP'siz
+        get_price_snapshot().record_markets(coins)
+        prices = fetch_current_prices(symbols)
 
         created = []
         for sym in symbols:
             data = generate_ta_based_recommendation(symbol=sym)
-            price = fetch_current_price(sym)
+            price = prices.get(sym)
             if data and price:
                 pred = PredictionOpportunity(
                     symbol=data["symbol"],
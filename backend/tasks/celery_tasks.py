@@ -6,6 +6,7 @@ from datetime import datetime
 # Celery broker configuration
 os.environ.setdefault("CELERY_BROKER_URL", "redis://localhost:6379/0")
 import json
+import time
 import traceback
 from dataclasses import asdict
 
@@ -27,6 +28,7 @@ try:
 except Exception:  # pragma: no cover
     YTDCryptoSystem = AnalysisResult = None
 from backend import db
+from backend.core.fanout import collect_analysis_inputs
 from backend.db.models import (CeleryTaskLog, CeleryTaskStatus,
                                SubscriptionPlan, User)
 
@@ -58,7 +60,8 @@ def run_full_analysis(
     logger.info(
         f"Celery: {coin_id.upper()} analizi arka planda baslatildi. Profil: {investor_profile}"
     )
-    with _get_app().app_context():
+    app = _get_app()
+    with app.app_context():
         system = YTDCryptoSystem()
         user = User.query.get(user_id) if user_id is not None else None
 
@@ -71,15 +74,12 @@ def run_full_analysis(
         db.session.commit()
 
         try:
-            price_data = system.collector.collect_price_data(coin_id)
-            onchain = system.collector.collect_onchain_data(coin_id)
-            social = system.collector.collect_social_data(coin_id)
-            news = system.collector.collect_news_data(coin_id)
-            all_news_text = " ".join(
-                f"{n.get('title','')} {n.get('description','')}" for n in news
-            )
-
-            _, news_score = system.ai.analyze_sentiment(all_news_text)
+            inputs, timings = collect_analysis_inputs(system, coin_id, app=app)
+            log.timings = json.dumps(timings)
+            price_data = inputs["price"]
+            onchain = inputs["onchain"]
+            social = inputs["social"]
+            _, news_score = inputs["sentiment"]
             (
                 forecast,
                 _method,
@@ -87,11 +87,7 @@ def run_full_analysis(
                 _dates,
                 _confidence,
                 forecast_exp,
-            ) = system.ai.forecast(
-                price_data["prices"],
-                price_data["times"],
-                coin_name=coin_id,
-            )
+            ) = inputs["forecast"]
 
             volatility = float(
                 np.std(price_data["prices"]) / np.mean(price_data["prices"])
@@ -110,7 +106,9 @@ def run_full_analysis(
                 "volatility": volatility,
             }
 
+            t0 = time.perf_counter()
             decision = system.engine.decide(decision_input, investor_profile)
+            timings["stages"]["decide"] = {"ms": round((time.perf_counter() - t0) * 1000.0, 1), "status": "ok"}
 
             analysis_result = AnalysisResult(
                 coin=coin_id,
@@ -143,11 +141,14 @@ def run_full_analysis(
                 suggested_position_size=decision["position_size_pct"],
             )
 
+            t0 = time.perf_counter()
             system.save_to_dbh(analysis_result)
+            timings["stages"]["save"] = {"ms": round((time.perf_counter() - t0) * 1000.0, 1), "status": "ok"}
 
             result_dict = asdict(analysis_result)
             log.status = CeleryTaskStatus.SUCCESS
             log.result = json.dumps(result_dict)
+            log.timings = json.dumps(timings)
             log.completed_at = datetime.utcnow()
             db.session.commit()
 
@@ -176,6 +177,57 @@ def analyze_coin_task(
     return run_full_analysis(coin_id, investor_profile, user_id)
 
 
+@celery_app.task(name="backend.tasks.celery_tasks.run_universe_analysis", bind=True)
+def run_universe_analysis(self, coin_ids: list, investor_profile: str = "moderate"):
+    """
+    Coin listesini tek görevde analiz eder: tek collector/interpreter, toplu
+    fiyat uç noktası, vektörel indikatör ve kararlar, tek toplu DBH yazımı.
+    """
+    logger.info(
+        f"Celery: {len(coin_ids)} coin icin toplu analiz baslatildi. Profil: {investor_profile}"
+    )
+    with _get_app().app_context():
+        system = YTDCryptoSystem()
+        log = CeleryTaskLog(
+            task_id=self.request.id,
+            task_name=self.name,
+            status=CeleryTaskStatus.STARTED,
+        )
+        db.session.add(log)
+        db.session.commit()
+
+        try:
+            results, timings = system.analyze_universe(list(coin_ids), investor_profile)
+            t0 = time.perf_counter()
+            system.save_many_to_dbh(results)
+            timings["save"] = round((time.perf_counter() - t0) * 1000.0, 1)
+
+            result_dict = {r.coin: asdict(r) for r in results}
+            missing = [c for c in coin_ids if c not in result_dict]
+            log.status = CeleryTaskStatus.SUCCESS
+            log.result = json.dumps({"results": result_dict, "missing": missing}, default=str)
+            log.timings = json.dumps(timings)
+            log.completed_at = datetime.utcnow()
+            db.session.commit()
+
+            if socketio:
+                for coin, result in result_dict.items():
+                    socketio.emit(
+                        "analysis_completed",
+                        {"coin": coin, "result": result},
+                        namespace="/",
+                    )
+
+            return result_dict
+        except Exception as e:  # pragma: no cover - logging
+            log.status = CeleryTaskStatus.FAILURE
+            log.traceback = traceback.format_exc()
+            log.completed_at = datetime.utcnow()
+            db.session.commit()
+            logger.error(f"Celery gorevi sirasinda hata: {e}")
+            raise
+
+
 @celery_app.task
 def check_and_downgrade_subscriptions():
     """Downgrade expired or trial subscriptions to BASIC."""
@@ -343,11 +395,7 @@ def analyze_crypto_symbol_enhanced(self, symbol: str, timeframe: str = "1d"):
                 news = system.collector.collect_news_data(symbol)
                 
                 # Analyze
-                all_news_text = " ".join(
-                    f"{n.get('title','')} {n.get('description','')}" for n in news
-                )
-                
-                _, news_score = system.ai.analyze_sentiment(all_news_text)
+                _, news_score = system.ai.analyze_news(news)
                 
                 # Create analysis result
                 analysis_result = {
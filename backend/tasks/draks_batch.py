@@ -24,6 +24,7 @@ from flask_socketio import SocketIO
 
 from backend import celery_app
 from backend.draks.engine_min import DRAKSEngine
+from backend.marketdata import read_or_fetch
 from backend.observability.metrics import (inc_batch_item, inc_cache_hit,
                                            inc_cache_miss,
                                            observe_batch_duration)
@@ -50,7 +51,6 @@ CFG = {
 ENGINE = DRAKSEngine(CFG)
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-OHLCV_TTL = int(os.getenv("OHLCV_CACHE_TTL", "600"))
 DECISION_TTL = int(os.getenv("DECISION_CACHE_TTL", "600"))
 BATCH_MAX_CANDLES = int(os.getenv("BATCH_MAX_CANDLES", "500"))
 BATCH_JOB_TIMEOUT = int(os.getenv("BATCH_JOB_TIMEOUT", "300"))
@@ -117,31 +117,18 @@ def _fetch_yf(symbol: str, timeframe: str, limit: int) -> pd.DataFrame:
 def _get_ohlcv_cached(
     asset: str, symbol: str, timeframe: str, limit: int
 ) -> pd.DataFrame:
-    r = _r()
-    safe = safe_cache_key("draks:ohlcv", asset, symbol, timeframe, str(limit))
-    val = r.get(safe)
-    if val:
+    """Geçmişi yerel OHLCV deposundan oku; depo eksik/bayatsa kaynaktan çek."""
+    fetch = _fetch_ccxt if asset == "crypto" else _fetch_yf
+    df, hit = read_or_fetch(
+        symbol,
+        timeframe,
+        min(limit, BATCH_MAX_CANDLES),
+        lambda n: fetch(symbol, timeframe, n),
+    )
+    if hit:
         inc_cache_hit(asset)
-        try:
-            arr = json.loads(val)
-            return _df_from_ohlcv_rows(arr)
-        except Exception:
-            r.delete(safe)
-    inc_cache_miss(asset)
-    if asset == "crypto":
-        df = _fetch_ccxt(symbol, timeframe, min(limit, BATCH_MAX_CANDLES))
     else:
-        df = _fetch_yf(symbol, timeframe, min(limit, BATCH_MAX_CANDLES))
-    rows = [
-        [int(ts.value / 10**6), float(o), float(h), float(l), float(c), float(v)]
-        for ts, (o, h, l, c, v) in zip(
-            df.index,
-            df[["open", "high", "low", "close", "volume"]].itertuples(
-                index=False, name=None
-            ),
-        )
-    ]
-    r.setex(safe, OHLCV_TTL, json.dumps(rows))
+        inc_cache_miss(asset)
     return df
 
 
@@ -0,0 +1,47 @@
+"""Popüler coinler için Prophet tahminlerini önceden hesaplayan beat görevi."""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, List
+
+from flask import current_app
+from loguru import logger
+
+from backend.core.forecast_cache import ForecastCache
+from backend.tasks import celery_app
+
+
+def _csv(name: str, default: str) -> List[str]:
+    return [x.strip() for x in os.getenv(name, default).split(",") if x.strip()]
+
+
+PRECOMPUTE_COINS = _csv("FORECAST_PRECOMPUTE_COINS", "bitcoin,ethereum")
+PRECOMPUTE_DAYS = [int(d) for d in _csv("FORECAST_PRECOMPUTE_DAYS", "1,7")]
+
+
+@celery_app.task(name="backend.tasks.forecast_tasks.precompute_forecasts")
+def precompute_forecasts() -> Dict[str, str]:
+    """
+    Her (coin, days) için önbelleği günceller; veri değişmediyse fit yapılmaz.
+    Web isteği aynı anahtarı okurken taze sonuç bulur.
+    """
+    from backend.core.services import DataCollector
+
+    collector = DataCollector()
+    cache = ForecastCache(current_app.extensions.get("redis_client"), inline=True)
+    out: Dict[str, str] = {}
+    for coin in PRECOMPUTE_COINS:
+        try:
+            data = collector.collect_price_data(coin)
+        except Exception as exc:  # pragma: no cover - ağ hatası
+            logger.warning(f"Tahmin ön hesaplaması için veri alınamadı ({coin}): {exc}")
+            continue
+        prices, times = data.get("prices") or [], data.get("times") or []
+        if len(prices) < 30:
+            continue
+        for days in PRECOMPUTE_DAYS:
+            _, status = cache.get(coin, prices, times, days)
+            out[f"{coin}:{days}"] = status
+    logger.info(f"Tahmin ön hesaplaması: {out}")
+    return out
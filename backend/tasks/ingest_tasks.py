@@ -0,0 +1,66 @@
+"""Celery beat ile periyodik artımlı OHLCV toplama görevleri."""
+
+from __future__ import annotations
+
+import os
+from typing import Dict, List, Optional
+
+from loguru import logger
+from redis import Redis
+
+from backend.marketdata.ingest import ccxt_fetcher, ingest, yf_fetcher
+from backend.tasks import celery_app
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+INGEST_LOCK_TTL = int(os.getenv("INGEST_LOCK_TTL", "900"))
+
+
+def _csv(name: str, default: str) -> List[str]:
+    return [x.strip() for x in os.getenv(name, default).split(",") if x.strip()]
+
+
+# kaynak -> (tür, semboller, timeframe'ler, eşzamanlılık)
+INGEST_SOURCES: Dict[str, dict] = {
+    "binance": {
+        "kind": "ccxt",
+        "symbols": _csv("INGEST_CCXT_SYMBOLS", "BTC/USDT,ETH/USDT"),
+        "timeframes": _csv("INGEST_CCXT_TIMEFRAMES", "1h,1d"),
+        "concurrency": int(os.getenv("INGEST_CONCURRENCY_BINANCE", "4")),
+    },
+    "yfinance": {
+        "kind": "yfinance",
+        "symbols": _csv("INGEST_YF_SYMBOLS", "XU100.IS,GARAN.IS"),
+        "timeframes": _csv("INGEST_YF_TIMEFRAMES", "1d"),
+        "concurrency": int(os.getenv("INGEST_CONCURRENCY_YFINANCE", "2")),
+    },
+}
+
+
+def run_source(
+    source: str,
+    symbols: Optional[List[str]] = None,
+    timeframes: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    cfg = INGEST_SOURCES[source]
+    fetch = ccxt_fetcher(source) if cfg["kind"] == "ccxt" else yf_fetcher()
+    pairs = [(s, tf) for s in (symbols or cfg["symbols"]) for tf in (timeframes or cfg["timeframes"])]
+    return ingest(source, pairs, fetch, concurrency=cfg["concurrency"])
+
+
+@celery_app.task(name="backend.tasks.ingest_tasks.ingest_source", bind=True)
+def ingest_source(
+    self,
+    source: str,
+    symbols: Optional[List[str]] = None,
+    timeframes: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """Bir kaynağı artımlı toplar; aynı kaynak için üst üste binen turlar atlanır."""
+    lock_key = f"ingest:lock:{source}"
+    r = Redis.from_url(REDIS_URL, decode_responses=True)
+    if not r.set(lock_key, self.request.id or "1", nx=True, ex=INGEST_LOCK_TTL):
+        logger.info(f"ingest {source}: önceki tur sürüyor, atlandı")
+        return {}
+    try:
+        return run_source(source, symbols, timeframes)
+    finally:
+        r.delete(lock_key)
@@ -1,9 +1,29 @@
 from __future__ import annotations
+import os
 from celery import shared_task
 from backend.ml.train import train as ml_train
+from backend.ml.pipeline import train_universe
+
+# Gece yeniden eğitilecek sembol evreni (virgülle ayrılmış)
+TRAIN_UNIVERSE = [s.strip() for s in os.environ.get("ML_TRAIN_UNIVERSE", "BTC/USDT,ETH/USDT").split(",") if s.strip()]
+TRAIN_TIME_LIMIT = int(os.environ.get("ML_TRAIN_TIME_LIMIT", "3600"))
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
 def train_model_task(self, symbol: str = "BTC/USDT", horizon: int = 7):
     return ml_train(symbol=symbol, horizon=horizon)
 
+
+@shared_task(
+    bind=True,
+    name="backend.tasks.ml_tasks.train_universe_task",
+    time_limit=TRAIN_TIME_LIMIT,
+    soft_time_limit=TRAIN_TIME_LIMIT - 60,
+)
+def train_universe_task(self, symbols: list[str] | None = None, horizon: int = 7):
+    """Sembol evrenini tek model sürümü olarak eğitir; ilerleme PROGRESS durumuyla yayınlanır."""
+
+    def _progress(done: int, total: int) -> None:
+        self.update_state(state="PROGRESS", meta={"done": done, "total": total})
+
+    return train_universe(symbols or TRAIN_UNIVERSE, horizon, progress=_progress)
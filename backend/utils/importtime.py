@@ -0,0 +1,127 @@
+"""
+Açılış (cold start) içe aktarma profilleyicisi.
+
+Hedef kodu temiz bir alt süreçte ``python -X importtime`` ile çalıştırır,
+stderr'deki ``import time: self | cumulative | name`` satırlarını ayrıştırır
+ve özetler: kümülatif/kendi süresine göre en pahalı modüller ve üst seviye
+paket toplamları. Ayrıca aynı alt süreçte toplam duvar saati süresi ölçülür.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+COLD_START_TARGET_MS = float(os.environ.get("COLD_START_TARGET_MS", "3000"))
+DEFAULT_TARGET = "backend:create_app"
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+_WALL_MARK = "__OQ_COLD_START_MS__="
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class ImportProfile:
+    records: List[ImportRecord]
+    wall_ms: Optional[float]
+
+    @property
+    def total_import_ms(self) -> float:
+        return sum(r.cumulative_us for r in self.records if r.depth == 0) / 1000.0
+
+    def top_cumulative(self, n: int = 20) -> List[ImportRecord]:
+        return sorted(self.records, key=lambda r: r.cumulative_us, reverse=True)[:n]
+
+    def top_self(self, n: int = 20) -> List[ImportRecord]:
+        return sorted(self.records, key=lambda r: r.self_us, reverse=True)[:n]
+
+    def by_package(self) -> Dict[str, float]:
+        """Üst seviye paket -> toplam kendi süresi (ms)."""
+        out: Dict[str, int] = defaultdict(int)
+        for r in self.records:
+            out[r.name.split(".", 1)[0]] += r.self_us
+        return {k: v / 1000.0 for k, v in sorted(out.items(), key=lambda kv: kv[1], reverse=True)}
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    records = []
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            records.append(ImportRecord(m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return records
+
+
+def _script(target: str, call: bool) -> str:
+    mod, _, attr = target.partition(":")
+    lines = [
+        "import time",
+        "_t0 = time.perf_counter()",
+        f"import importlib; _m = importlib.import_module({mod!r})",
+    ]
+    if attr:
+        lines.append(f"_o = getattr(_m, {attr!r})")
+        if call:
+            lines.append("_o = _o() if callable(_o) else _o")
+    lines.append(f"print({_WALL_MARK!r} + str((time.perf_counter() - _t0) * 1000.0))")
+    return "\n".join(lines)
+
+
+def profile_imports(
+    target: str = DEFAULT_TARGET,
+    *,
+    call: bool = True,
+    env: Optional[Dict[str, str]] = None,
+    timeout: float = 300,
+) -> ImportProfile:
+    """
+    ``target`` (``modül:öznitelik``) temiz bir yorumlayıcıda içe aktarılır;
+    ``call`` ise öznitelik çağrılır (ör. ``create_app()``).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _script(target, call)],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+        timeout=timeout,
+        check=False,
+    )
+    wall = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(_WALL_MARK):
+            wall = float(line[len(_WALL_MARK):])
+    if proc.returncode != 0 and wall is None:
+        tail = "\n".join(l for l in proc.stderr.splitlines() if not l.startswith("import time:"))[-2000:]
+        raise RuntimeError(f"profil alt süreci başarısız ({proc.returncode}): {tail}")
+    return ImportProfile(parse_importtime(proc.stderr), wall)
+
+
+def format_report(profile: ImportProfile, top: int = 20, target_ms: Optional[float] = None) -> str:
+    lines = []
+    if profile.wall_ms is not None:
+        status = ""
+        if target_ms is not None:
+            status = "  OK" if profile.wall_ms <= target_ms else f"  HEDEF AŞILDI (> {target_ms:.0f} ms)"
+        lines.append(f"cold start: {profile.wall_ms:.0f} ms{status}")
+    lines.append(f"imports: {len(profile.records)} modül, {profile.total_import_ms:.0f} ms")
+    lines.append("")
+    lines.append(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for r in profile.top_cumulative(top):
+        lines.append(f"{r.cumulative_us / 1000:>14.1f} {r.self_us / 1000:>9.1f}  {'  ' * r.depth}{r.name}")
+    lines.append("")
+    lines.append(f"{'self ms':>14}  package")
+    for name, ms in list(profile.by_package().items())[:top]:
+        lines.append(f"{ms:>14.1f}  {name}")
+    return "\n".join(lines)
@@ -0,0 +1,123 @@
+"""
+Ağır ve isteğe bağlı bağımlılıklar için tembel içe aktarma.
+
+``lazy_import("pandas_ta")`` ve ``lazy_attr("prophet", "Prophet")`` modülü
+hemen yüklemez; ilk öznitelik erişiminde (ya da çağrıda) ``importlib`` ile
+yükler. Böylece gunicorn işçileri ve Celery çocukları, hiç kullanmadıkları
+kütüphanelerin açılış maliyetini ödemez.
+
+Doğruluk değeri (``if ta:``) gerçek içe aktarmayı dener ve sonucu saklar;
+içe aktarma herhangi bir hatayla başarısız olursa (kurulu değil, kırık
+bağımlılık, derlenmiş uzantı hatası) ``False`` döner. Bu, eski
+``try: import ... except ImportError: x = None`` kalıbının yerine geçer ve
+yalnızca kullanılacağı yerde değerlendirilmelidir. Kurulu olmayan bir
+modüle erişim ``ImportError`` fırlatır. Yalnızca kurulu olup olmadığı
+sorulacaksa (asıl kullanım başka bir süreçteyse) ``module_available``
+modülü hiç yüklemeden ``find_spec`` ile bakar.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import threading
+from typing import Any, Optional
+
+_lock = threading.RLock()
+
+
+class LazyModule:
+    """İlk öznitelik erişiminde yüklenen modül vekili."""
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_available", None)
+
+    def _load(self):
+        mod = self._module
+        if mod is None:
+            with _lock:
+                mod = self._module
+                if mod is None:
+                    mod = importlib.import_module(self._name)
+                    object.__setattr__(self, "_module", mod)
+        return mod
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __bool__(self) -> bool:
+        if self._module is not None:
+            return True
+        if self._available is None:
+            try:
+                self._load()
+                ok = True
+            except Exception:  # pylint: disable=broad-except
+                ok = False
+            object.__setattr__(self, "_available", ok)
+        return self._available
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "lazy"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+class LazyAttr:
+    """``from module import attr`` karşılığı; çağrı veya öznitelik erişiminde yüklenir."""
+
+    def __init__(self, module: str, attr: str):
+        self._mod = LazyModule(module)
+        self._attr = attr
+        self._value: Optional[Any] = None
+        self._available: Optional[bool] = None
+
+    def resolve(self) -> Any:
+        if self._value is None:
+            self._value = getattr(self._mod, self._attr)
+        return self._value
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.resolve(), attr)
+
+    def __bool__(self) -> bool:
+        if self._available is None:
+            try:
+                self.resolve()
+                self._available = True
+            except Exception:  # pylint: disable=broad-except
+                self._available = False
+        return self._available
+
+    def __repr__(self) -> str:
+        return f"<LazyAttr {self._mod._name}.{self._attr}>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def lazy_attr(module: str, attr: str) -> LazyAttr:
+    return LazyAttr(module, attr)
+
+
+def module_available(name: str) -> bool:
+    """Modül kurulu mu? İçe aktarmaz; yalnızca ``find_spec`` ile arar."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
@@ -1,10 +1,14 @@
-"""Utility function to fetch real-time crypto prices from CoinGecko."""
+"""Current crypto prices, read from the central price snapshot."""
 
 from __future__ import annotations
 
-import requests
+from typing import Dict, Iterable
+
 from loguru import logger
 
+from backend.services.coingecko import get_coingecko_client
+from backend.services.price_snapshot import get_price_snapshot
+
 
 SYMBOL_MAP = {
     "BTCUSDT": "bitcoin",
@@ -16,16 +20,25 @@ SYMBOL_MAP = {
 def fetch_current_price(symbol: str = "bitcoin", currency: str = "usd") -> float | None:
     """Return the current price of ``symbol`` in the given ``currency``.
 
-    On any error or network issue ``None`` is returned instead of raising
-    an exception.
+    USD prices come from the streamer-fed snapshot (CoinGecko only when the
+    symbol is missing or stale). On any error or network issue ``None`` is
+    returned instead of raising an exception.
     """
-    symbol = SYMBOL_MAP.get(symbol.upper(), symbol)
-    url = "https://api.coingecko.com/api/v3/simple/price"
-    params = {"ids": symbol, "vs_currencies": currency}
     try:
-        res = requests.get(url, params=params, timeout=10)
-        res.raise_for_status()
-        return res.json().get(symbol, {}).get(currency)
+        if currency.lower() == "usd":
+            return get_price_snapshot().get_price(symbol)
+        coin = SYMBOL_MAP.get(symbol.upper(), symbol)
+        return get_coingecko_client().simple_price([coin], currency).get(coin, {}).get(currency)
     except Exception as exc:  # pragma: no cover - network calls
         logger.warning(f"Could not fetch price for {symbol}: {exc}")
         return None
+
+
+def fetch_current_prices(symbols: Iterable[str]) -> Dict[str, float]:
+    """USD prices for many symbols in one snapshot lookup; missing ones are omitted."""
+    try:
+        ticks = get_price_snapshot().get_prices(symbols)
+    except Exception as exc:  # pragma: no cover - network calls
+        logger.warning(f"Could not fetch prices: {exc}")
+        return {}
+    return {symbol: tick["price"] for symbol, tick in ticks.items()}
@@ -7,31 +7,153 @@ except Exception:
     HAS_WEBSOCKETS = False
 import json
 import logging
+import os
 import threading
-from typing import Dict, List, Callable
+from typing import Dict, Iterable, List, Callable, Optional, Set
 import redis
 from datetime import datetime
 import time
 import requests
 
+from backend.services.price_snapshot import get_price_snapshot
+
 logger = logging.getLogger(__name__)
 
+PRICE_FLUSH_INTERVAL_MS = float(os.environ.get("PRICE_FLUSH_INTERVAL_MS", "250"))
+PRICE_CONFLATE_BARS = os.environ.get("PRICE_CONFLATE_BARS", "1") == "1"
+
+
+class TickConflator:
+    """
+    Sembol başına yalnız son tick'i tutar; her ``flush`` çağrısında bekleyen
+    sembolleri tek parti olarak döndürür. İsteğe bağlı olarak pencere içindeki
+    fiyatlardan OHLC mini-barı (``bar``) üretir. Olay zamanı (``E``) daha eski
+    olan tick'ler son fiyatı ezmez.
+    """
+    
+    def __init__(self, bars: bool = PRICE_CONFLATE_BARS):
+        self.bars = bars
+        self._pending: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.received = 0
+        self.published = 0
+        self.flushes = 0
+    
+    def add(self, symbol: str, tick: Dict, event_time: Optional[int] = None):
+        price = tick['price']
+        with self._lock:
+            self.received += 1
+            entry = self._pending.get(symbol)
+            if entry is None:
+                entry = self._pending[symbol] = {
+                    'tick': tick, 'event_time': event_time,
+                    'open': price, 'high': price, 'low': price, 'ticks': 0,
+                }
+            elif event_time is None or entry['event_time'] is None or event_time >= entry['event_time']:
+                entry['tick'] = tick
+                entry['event_time'] = event_time
+            entry['high'] = max(entry['high'], price)
+            entry['low'] = min(entry['low'], price)
+            entry['ticks'] += 1
+    
+    def flush(self) -> List[Dict]:
+        """Bekleyen son tick'leri ``[{'symbol', 'data'}]`` olarak döndürür ve sıfırlar."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return []
+            self.flushes += 1
+            self.published += len(pending)
+        batch = []
+        for symbol, entry in pending.items():
+            data = dict(entry['tick'])
+            if self.bars:
+                data['bar'] = {
+                    'open': entry['open'],
+                    'high': entry['high'],
+                    'low': entry['low'],
+                    'close': data['price'],
+                    'ticks': entry['ticks'],
+                }
+            batch.append({'symbol': symbol, 'data': data})
+        return batch
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'received': self.received,
+                'published': self.published,
+                'flushes': self.flushes,
+                'pending': len(self._pending),
+                'conflation_ratio': (self.received / self.published) if self.published else None,
+            }
+
+
 class BinancePriceStreamer:
     """Binance WebSocket API'den real-time fiyat verileri çeker"""
     
-    def __init__(self, redis_client, symbols: List[str]):
+    def __init__(self, redis_client, symbols: List[str], snapshot=None,
+                 flush_interval_ms: float = PRICE_FLUSH_INTERVAL_MS, bars: bool = PRICE_CONFLATE_BARS):
         self.redis_client = redis_client
+        self.snapshot = snapshot or get_price_snapshot(redis_client)
         self.symbols = [s.lower() for s in symbols]
         self.ws_url = "wss://stream.binance.com:9443/ws/"
         self.is_running = False
         self.reconnect_delay = 5
         self.max_reconnect_attempts = 10
         self.callbacks: List[Callable] = []
+        # Tick'ler sembol başına birleştirilir; flush_interval_ms'de bir toplu yayın
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.conflator = TickConflator(bars=bars)
+        # Canlı abonelik değişiklikleri için bağlantı ve olay döngüsü
+        self._ws = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._symbols_changed: Optional[asyncio.Event] = None
+        self._request_id = 0
         
     def add_callback(self, callback: Callable):
         """Fiyat güncellemesi callback'i ekler"""
         self.callbacks.append(callback)
     
+    def set_symbols(self, symbols: Iterable[str]):
+        """
+        Akış sembollerini değiştirir. Bağlıyken SUBSCRIBE/UNSUBSCRIBE ile
+        bağlantı kopmadan uygulanır; sembol kalmazsa bağlantı kapatılır ve
+        yeni abone gelene kadar açılmaz.
+        """
+        new = [s.lower() for s in dict.fromkeys(symbols)]
+        added = [s for s in new if s not in self.symbols]
+        removed = [s for s in self.symbols if s not in new]
+        self.symbols = new
+        loop, ws = self._loop, self._ws
+        if loop is None or not (added or removed):
+            return
+        try:
+            if ws is not None and new:
+                for method, changed in (('SUBSCRIBE', added), ('UNSUBSCRIBE', removed)):
+                    if changed:
+                        asyncio.run_coroutine_threadsafe(self._send_control(method, changed), loop)
+            elif ws is not None:
+                asyncio.run_coroutine_threadsafe(ws.close(), loop)
+            if self._symbols_changed is not None:
+                loop.call_soon_threadsafe(self._symbols_changed.set)
+        except RuntimeError:
+            # döngü kapanmış; bir sonraki bağlantı güncel sembolleri kullanır
+            pass
+    
+    async def _send_control(self, method: str, symbols: List[str]):
+        """Açık bağlantıya abonelik komutu gönderir"""
+        ws = self._ws
+        if ws is None:
+            return
+        self._request_id += 1
+        await ws.send(json.dumps({
+            'method': method,
+            'params': [f"{symbol}@ticker" for symbol in symbols],
+            'id': self._request_id,
+        }))
+        logger.info(f"Binance {method}: {symbols}")
+    
     async def _create_stream_url(self):
         """WebSocket stream URL'sini oluşturur"""
         streams = [f"{symbol}@ticker" for symbol in self.symbols]
@@ -58,46 +180,78 @@ class BinancePriceStreamer:
                     'timestamp': datetime.utcnow().isoformat()
                 }
                 
-                # Redis'e publish et
-                if self.redis_client:
-                    try:
-                        self.redis_client.publish(
-                            'price_updates',
-                            json.dumps({
-                                'symbol': symbol,
-                                'data': price_update
-                            })
-                        )
-                    except Exception as e:
-                        logger.error(f"Redis publish error: {e}")
-                
-                # Callback'leri çağır
-                for callback in self.callbacks:
-                    try:
-                        callback(symbol, price_update)
-                    except Exception as e:
-                        logger.error(f"Callback error: {e}")
+                self.conflator.add(symbol, price_update, stream_data.get('E'))
+                if self.flush_interval <= 0:
+                    self.flush()
                         
         except json.JSONDecodeError:
             logger.error("Invalid JSON received from Binance WebSocket")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
     
+    def flush(self) -> int:
+        """Birleştirilmiş tick'leri tek parti halinde yayınlar; yayınlanan sembol sayısını döndürür."""
+        batch = self.conflator.flush()
+        if not batch:
+            return 0
+        
+        # Merkezi fiyat anlık görüntüsünü güncelle (tek HSET)
+        try:
+            self.snapshot.update_many({item['symbol']: item['data'] for item in batch}, source='binance')
+        except Exception as e:
+            logger.error(f"Price snapshot update error: {e}")
+        
+        # Redis'e tek mesaj olarak publish et
+        if self.redis_client:
+            try:
+                self.redis_client.publish('price_updates', json.dumps({'batch': batch}))
+            except Exception as e:
+                logger.error(f"Redis publish error: {e}")
+        
+        # Callback'leri sembol başına son tick ile çağır
+        for item in batch:
+            for callback in self.callbacks:
+                try:
+                    callback(item['symbol'], item['data'])
+                except Exception as e:
+                    logger.error(f"Callback error: {e}")
+        return len(batch)
+    
+    async def _flush_loop(self):
+        """Çalıştığı sürece flush_interval aralığıyla birleştirilmiş tick'leri yayınlar"""
+        while self.is_running:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+    
+    def get_stats(self) -> Dict:
+        """Alınan / yayınlanan mesaj sayıları"""
+        return {**self.conflator.get_stats(), 'flush_interval_ms': self.flush_interval * 1000.0}
+    
     async def _connect_and_listen(self):
         """WebSocket bağlantısı kurar ve dinler"""
         if not HAS_WEBSOCKETS:
             logger.warning("websockets package not available; Binance streamer disabled in this environment")
             return
-        url = await self._create_stream_url()
+        self._loop = asyncio.get_running_loop()
+        self._symbols_changed = asyncio.Event()
         attempt = 0
+        flusher = asyncio.ensure_future(self._flush_loop()) if self.flush_interval > 0 else None
         
         while self.is_running and attempt < self.max_reconnect_attempts:
+            if not self.symbols:
+                # Abone yokken bağlantı açılmaz; set_symbols/stop uyandırır
+                self._symbols_changed.clear()
+                if not self.symbols and self.is_running:
+                    await self._symbols_changed.wait()
+                continue
+            url = await self._create_stream_url()
             try:
                 async with websockets.connect(url) as websocket:
+                    self._ws = websocket
                     logger.info(f"Connected to Binance WebSocket: {self.symbols}")
                     attempt = 0  # Reset attempt counter on successful connection
                     
-                    while self.is_running:
+                    while self.is_running and self.symbols:
                         try:
                             message = await asyncio.wait_for(
                                 websocket.recv(),
@@ -110,11 +264,18 @@ class BinancePriceStreamer:
                             await websocket.ping()
                             
             except Exception as e:
+                if not self.is_running or not self.symbols:
+                    continue  # bilerek kapatıldı
                 attempt += 1
                 logger.error(f"WebSocket connection error (attempt {attempt}): {e}")
                 if self.is_running and attempt < self.max_reconnect_attempts:
                     await asyncio.sleep(self.reconnect_delay * attempt)
+            finally:
+                self._ws = None
                     
+        if flusher is not None:
+            flusher.cancel()
+        self.flush()
         if attempt >= self.max_reconnect_attempts:
             logger.error("Max reconnection attempts reached for Binance WebSocket")
     
@@ -134,13 +295,20 @@ class BinancePriceStreamer:
     def stop(self):
         """Price streamer'ı durdurur"""
         self.is_running = False
+        loop = self._loop
+        if loop is not None and self._symbols_changed is not None:
+            try:
+                loop.call_soon_threadsafe(self._symbols_changed.set)
+            except RuntimeError:
+                pass
         logger.info("Binance price streamer stopped")
 
 class CoinGeckoPriceStreamer:
     """CoinGecko API'den fiyat verileri çeker (fallback)"""
     
-    def __init__(self, redis_client, symbols: List[str]):
+    def __init__(self, redis_client, symbols: List[str], snapshot=None):
         self.redis_client = redis_client
+        self.snapshot = snapshot or get_price_snapshot(redis_client)
         self.symbols = symbols
         self.is_running = False
         self.update_interval = 30  # 30 saniye
@@ -158,6 +326,10 @@ class CoinGeckoPriceStreamer:
             'LTCUSDT': 'litecoin'
         }
     
+    def set_symbols(self, symbols: Iterable[str]):
+        """Sorgulanan sembolleri değiştirir; boşsa bir sonraki turda istek atılmaz"""
+        self.symbols = list(dict.fromkeys(symbols))
+    
     def start(self):
         """Polling tabanlı fiyat güncellemelerini başlatır"""
         
@@ -204,6 +376,9 @@ class CoinGeckoPriceStreamer:
                             'timestamp': datetime.utcnow().isoformat()
                         }
                         
+                        # Merkezi fiyat anlık görüntüsünü güncelle
+                        self.snapshot.update(symbol, price_update, source='coingecko')
+                        
                         # Redis'e publish et
                         if self.redis_client:
                             try:
@@ -237,24 +412,77 @@ class CoinGeckoPriceStreamer:
 class PriceStreamManager:
     """Birden fazla price streamer'ı yöneten manager"""
     
-    def __init__(self, redis_client, symbols: List[str]):
+    def __init__(self, redis_client, symbols: List[str], on_demand: bool = False):
         self.redis_client = redis_client
         self.symbols = symbols
         self.streamers = []
         self.is_running = False
+        # on_demand: yalnız abonesi olan semboller akışa alınır (symbols izin listesidir)
+        self.on_demand = on_demand
+        self.active: Set[str] = set() if on_demand else set(symbols)
+        self._demand: Dict[str, int] = {}
+        self._lock = threading.Lock()
         
     def add_binance_streamer(self):
         """Binance streamer ekler"""
-        binance_streamer = BinancePriceStreamer(self.redis_client, self.symbols)
+        binance_streamer = BinancePriceStreamer(self.redis_client, sorted(self.active))
         self.streamers.append(binance_streamer)
         return binance_streamer
         
     def add_coingecko_streamer(self):
         """CoinGecko streamer ekler (fallback)"""
-        coingecko_streamer = CoinGeckoPriceStreamer(self.redis_client, self.symbols)
+        coingecko_streamer = CoinGeckoPriceStreamer(self.redis_client, sorted(self.active))
         self.streamers.append(coingecko_streamer)
         return coingecko_streamer
     
+    def update_demand(self, started: Iterable[str] = (), stopped: Iterable[str] = ()):
+        """
+        Abone kaynağından (ör. bir Socket.IO işçisi) gelen ilk/son abone
+        olaylarını uygular. Birden çok kaynak aynı sembolü isteyebilir; sembol
+        ancak hepsi bıraktığında akıştan çıkar.
+        """
+        if not self.on_demand:
+            return
+        allowed = set(self.symbols)
+        with self._lock:
+            for symbol in started:
+                if symbol in allowed:
+                    self._demand[symbol] = self._demand.get(symbol, 0) + 1
+            for symbol in stopped:
+                if self._demand.get(symbol, 0) > 1:
+                    self._demand[symbol] -= 1
+                else:
+                    self._demand.pop(symbol, None)
+            active = set(self._demand)
+            if active == self.active:
+                return
+            self.active = active
+        self._apply(active)
+
+    def set_demand(self, symbols: Iterable[str]):
+        """
+        Talebi mutlak olarak ayarlar (ör. küme çapındaki abone sayılarından).
+        Boş küme akış bağlantılarını kapatır; streamer'lar çalışmaya devam eder.
+        """
+        if not self.on_demand:
+            return
+        allowed = set(self.symbols)
+        with self._lock:
+            self._demand = {s: 1 for s in symbols if s in allowed}
+            active = set(self._demand)
+            if active == self.active:
+                return
+            self.active = active
+        self._apply(active)
+
+    def _apply(self, active: Set[str]):
+        logger.info(f"Price stream demand changed: {sorted(active)}")
+        for streamer in self.streamers:
+            try:
+                streamer.set_symbols(sorted(active))
+            except Exception as e:
+                logger.error(f"Failed to update {streamer.__class__.__name__} symbols: {e}")
+    
     def start_all(self):
         """Tüm streamer'ları başlatır"""
         if not self.streamers:
@@ -285,6 +513,10 @@ class PriceStreamManager:
             'total_streamers': len(self.streamers),
             'running_streamers': len([s for s in self.streamers if getattr(s, 'is_running', False)]),
             'symbols': self.symbols,
+            'active_symbols': sorted(self.active),
+            'stream_stats': {
+                s.__class__.__name__: s.get_stats() for s in self.streamers if hasattr(s, 'get_stats')
+            },
             'timestamp': datetime.utcnow().isoformat()
         }
         return status
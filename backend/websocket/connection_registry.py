@@ -0,0 +1,327 @@
+"""
+WebSocket bağlantı kaydı: süreçler arası paylaşılan bağlantı ve abonelik durumu.
+
+Her işçi kendi bağlantılarının tek sahibidir; Redis'e yalnız kendi anahtarlarını
+yazar, bu yüzden yazımlar mutlak değerdir (artırım değil) ve her heartbeat
+işçinin durumunu baştan yazar. Redis yeniden başlasa bile kayıt bir heartbeat
+içinde kendini onarır.
+
+Redis düzeni (``WS_REDIS_PREFIX``, varsayılan ``ws``):
+
+ - ``ws:c:{sid}``      hash: w(orker), ip, e(ncoding), t(bağlanma), s(semboller, virgüllü)
+ - ``ws:s:{worker}``   hash: sembol -> o işçideki abone sayısı
+ - ``ws:n``            hash: işçi -> bağlantı sayısı
+ - ``ws:w``            zset: işçi -> son heartbeat zamanı
+ - ``ws:rl:{ip}:{n}``  sayaç: IP başına sabit pencereli bağlantı limiti
+
+Bağlantı ve işçi hash'leri ``WS_CONNECTION_TTL`` ile yaşar; heartbeat süresini
+yeniler. Çöken işçinin kayıtları kendiliğinden düşer, sayımlara yalnız son
+TTL içinde heartbeat atmış işçiler girer.
+
+Redis verilmezse aynı arayüz süreç içi sözlüklerle çalışır (tek süreç).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+WS_REDIS_PREFIX = os.environ.get("WS_REDIS_PREFIX", "ws")
+WS_CONNECTION_TTL = int(os.environ.get("WS_CONNECTION_TTL", "90"))
+WS_HEARTBEAT_INTERVAL = float(os.environ.get("WS_HEARTBEAT_INTERVAL", "30"))
+WS_MAX_CONNECTIONS_PER_IP = int(os.environ.get("WEBSOCKET_MAX_CONNECTIONS_PER_IP", "10"))
+WS_RATE_LIMIT_WINDOW = int(os.environ.get("WEBSOCKET_RATE_LIMIT_WINDOW", "60"))
+_REDIS_RETRY_AFTER = 30.0
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ConnectionRegistry:
+    """Bağlantı, abonelik sayıları ve IP limiti; Redis varsa işçiler arası paylaşılır."""
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        *,
+        worker_id: Optional[str] = None,
+        ttl: int = WS_CONNECTION_TTL,
+        prefix: str = WS_REDIS_PREFIX,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._redis = redis_client
+        self._redis_down_until = 0.0
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self.prefix = prefix
+        self._clock = clock
+        self._lock = threading.Lock()
+        # yerel durum her zaman tutulur; Redis'e yazılanın kaynağıdır
+        self._subs: Dict[str, Set[str]] = {}
+        self._counts: Dict[str, int] = {}
+        self._rate: Dict[str, tuple] = {}
+
+    # ---------------------------------------------------------------- redis
+    @property
+    def distributed(self) -> bool:
+        return self._redis is not None
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def _client(self):
+        if self._redis is None or self._clock() < self._redis_down_until:
+            return None
+        return self._redis
+
+    def _redis_failed(self, exc: Exception) -> None:
+        logger.warning(f"WebSocket registry Redis unavailable: {exc}")
+        self._redis_down_until = self._clock() + _REDIS_RETRY_AFTER
+
+    def _write(self, fn: Callable[[Any], None]) -> None:
+        client = self._client()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            fn(pipe)
+            pipe.execute()
+        except Exception as exc:
+            self._redis_failed(exc)
+
+    # ------------------------------------------------------------ rate limit
+    def allow_connect(
+        self, ip: str, limit: int = WS_MAX_CONNECTIONS_PER_IP, window: int = WS_RATE_LIMIT_WINDOW
+    ) -> bool:
+        """IP başına pencere içinde en fazla ``limit`` bağlantı (O(1) sayaç)."""
+        slot = int(self._clock() // window)
+        client = self._client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                key = self._key("rl", ip, str(slot))
+                pipe.incr(key)
+                pipe.expire(key, window)
+                count = pipe.execute()[0]
+                return int(count) <= limit
+            except Exception as exc:
+                self._redis_failed(exc)
+        with self._lock:
+            current_slot, count = self._rate.get(ip, (slot, 0))
+            count = count + 1 if current_slot == slot else 1
+            self._rate[ip] = (slot, count)
+            if len(self._rate) > 10000:
+                self._rate = {k: v for k, v in self._rate.items() if v[0] == slot}
+        return count <= limit
+
+    # ----------------------------------------------------------- connections
+    def register(self, sid: str, ip: str = "unknown", encoding: Optional[str] = None) -> None:
+        with self._lock:
+            self._subs.setdefault(sid, set())
+            total = len(self._subs)
+        fields = {"w": self.worker_id, "ip": ip, "t": int(self._clock())}
+        if encoding:
+            fields["e"] = encoding
+
+        def write(pipe):
+            pipe.hset(self._key("c", sid), mapping=fields)
+            pipe.expire(self._key("c", sid), self.ttl)
+            pipe.hset(self._key("n"), self.worker_id, total)
+
+        self._write(write)
+
+    def set_encoding(self, sid: str, encoding: str) -> None:
+        self._write(lambda pipe: pipe.hset(self._key("c", sid), "e", encoding))
+
+    def unregister(self, sid: str) -> List[str]:
+        """Bağlantıyı siler; abonesi kalmayan sembolleri döndürür."""
+        with self._lock:
+            symbols = self._subs.pop(sid, set())
+            emptied = self._release(symbols)
+            total = len(self._subs)
+            counts = {s: self._counts.get(s, 0) for s in symbols}
+
+        def write(pipe):
+            pipe.delete(self._key("c", sid))
+            pipe.hset(self._key("n"), self.worker_id, total)
+            self._write_counts(pipe, counts)
+
+        self._write(write)
+        return emptied
+
+    # ---------------------------------------------------------- subscriptions
+    def subscribe(self, sid: str, symbols: Iterable[str]) -> List[str]:
+        """Aboneliği ekler; bu işçide ilk abonesini alan sembolleri döndürür."""
+        with self._lock:
+            current = self._subs.setdefault(sid, set())
+            added = [s for s in dict.fromkeys(symbols) if s not in current]
+            current.update(added)
+            started = []
+            for symbol in added:
+                self._counts[symbol] = self._counts.get(symbol, 0) + 1
+                if self._counts[symbol] == 1:
+                    started.append(symbol)
+            counts = {s: self._counts[s] for s in added}
+            joined = ",".join(sorted(current))
+        if added:
+            def write(pipe):
+                pipe.hset(self._key("c", sid), "s", joined)
+                self._write_counts(pipe, counts)
+
+            self._write(write)
+        return started
+
+    def unsubscribe(self, sid: str, symbols: Iterable[str]) -> List[str]:
+        """Aboneliği kaldırır; bu işçide abonesi kalmayan sembolleri döndürür."""
+        with self._lock:
+            current = self._subs.get(sid, set())
+            removed = {s for s in symbols if s in current}
+            current.difference_update(removed)
+            emptied = self._release(removed)
+            counts = {s: self._counts.get(s, 0) for s in removed}
+            joined = ",".join(sorted(current))
+        if removed:
+            def write(pipe):
+                pipe.hset(self._key("c", sid), "s", joined)
+                self._write_counts(pipe, counts)
+
+            self._write(write)
+        return emptied
+
+    def subscriptions(self, sid: str) -> Set[str]:
+        with self._lock:
+            return set(self._subs.get(sid, ()))
+
+    def _release(self, symbols: Iterable[str]) -> List[str]:
+        # self._lock altında çağrılır
+        emptied = []
+        for symbol in symbols:
+            count = self._counts.get(symbol, 0) - 1
+            if count > 0:
+                self._counts[symbol] = count
+            else:
+                self._counts.pop(symbol, None)
+                emptied.append(symbol)
+        return emptied
+
+    def _write_counts(self, pipe, counts: Dict[str, int]) -> None:
+        key = self._key("s", self.worker_id)
+        live = {s: n for s, n in counts.items() if n > 0}
+        dead = [s for s, n in counts.items() if n <= 0]
+        if live:
+            pipe.hset(key, mapping=live)
+        if dead:
+            pipe.hdel(key, *dead)
+        pipe.expire(key, self.ttl)
+
+    # ----------------------------------------------------------------- reads
+    def has_subscribers(self, symbol: str) -> bool:
+        """Sıcak yol: kilitsiz tek sözlük araması"""
+        return symbol in self._counts
+
+    def idle(self) -> bool:
+        """Bu işçide hiç abonelik yoksa True"""
+        return not self._counts
+
+    def local_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def _live_workers(self, client) -> List[str]:
+        now = self._clock()
+        workers = client.zrangebyscore(self._key("w"), now - self.ttl, "+inf")
+        return [w.decode() if isinstance(w, bytes) else w for w in workers]
+
+    def counts(self) -> Dict[str, int]:
+        """Canlı işçilerin toplamı olarak sembol başına abone sayısı."""
+        client = self._client()
+        if client is None:
+            return self.local_counts()
+        try:
+            workers = set(self._live_workers(client)) | {self.worker_id}
+            pipe = client.pipeline(transaction=False)
+            for worker in workers:
+                pipe.hgetall(self._key("s", worker))
+            rows = pipe.execute()
+        except Exception as exc:
+            self._redis_failed(exc)
+            return self.local_counts()
+        total: Dict[str, int] = {}
+        for row in rows:
+            for symbol, count in row.items():
+                symbol = symbol.decode() if isinstance(symbol, bytes) else symbol
+                total[symbol] = total.get(symbol, 0) + int(count)
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            local = len(self._subs)
+        out = {"worker": self.worker_id, "distributed": self.distributed, "local_connections": local,
+               "workers": 1, "connections": local}
+        client = self._client()
+        if client is not None:
+            try:
+                workers = sorted(set(self._live_workers(client)) | {self.worker_id})
+                sizes = client.hmget(self._key("n"), workers)
+                out["workers"] = len(workers)
+                out["connections"] = sum(int(n or 0) for n in sizes)
+            except Exception as exc:
+                self._redis_failed(exc)
+        counts = self.counts()
+        out["subscriptions"] = sum(counts.values())
+        out["symbols"] = len(counts)
+        return out
+
+    # -------------------------------------------------------------- heartbeat
+    def heartbeat(self) -> None:
+        """İşçinin durumunu Redis'e yeniden yazar ve TTL'leri tazeler."""
+        client = self._client()
+        if client is None:
+            return
+        now = self._clock()
+        with self._lock:
+            sids = list(self._subs)
+            counts = dict(self._counts)
+        try:
+            # süresi geçen işçileri zset'ten ve bağlantı sayısı hash'inden düş
+            dead = client.zrangebyscore(self._key("w"), "-inf", f"({now - self.ttl}")
+            pipe = client.pipeline(transaction=False)
+            if dead:
+                pipe.zrem(self._key("w"), *dead)
+                pipe.hdel(self._key("n"), *dead)
+            pipe.zadd(self._key("w"), {self.worker_id: now})
+            pipe.hset(self._key("n"), self.worker_id, len(sids))
+            pipe.delete(self._key("s", self.worker_id))
+            if counts:
+                pipe.hset(self._key("s", self.worker_id), mapping=counts)
+                pipe.expire(self._key("s", self.worker_id), self.ttl)
+            for sid in sids:
+                pipe.expire(self._key("c", sid), self.ttl)
+            pipe.execute()
+        except Exception as exc:
+            self._redis_failed(exc)
+
+    def run_heartbeat(self, sleep: Callable[[float], Any] = time.sleep,
+                      interval: float = WS_HEARTBEAT_INTERVAL) -> None:
+        while True:
+            self.heartbeat()
+            sleep(interval)
+
+    def shutdown(self) -> None:
+        """Düzgün kapanışta işçinin kayıtlarını hemen siler."""
+        with self._lock:
+            sids = list(self._subs)
+
+        def write(pipe):
+            pipe.zrem(self._key("w"), self.worker_id)
+            pipe.hdel(self._key("n"), self.worker_id)
+            pipe.delete(self._key("s", self.worker_id), *[self._key("c", sid) for sid in sids])
+
+        self._write(write)
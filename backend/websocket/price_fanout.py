@@ -0,0 +1,169 @@
+"""
+Socket.IO fiyat yayını için pencere bazlı toplama ve kodlama.
+
+Gelen güncellemeler ``WS_FLUSH_INTERVAL_MS`` penceresi boyunca sembol başına
+son değer olarak tutulur. Her flush'ta:
+
+ - kodlama anlaşması yapmış bağlantılara, abone oldukları ve pencerede değişen
+   sembollerin tamamı tek ``price_batch`` olayıyla gider; aynı (kodlama,
+   sembol kümesi) grubundaki bağlantılar için yük bir kez kodlanır;
+ - anlaşma yapmamış (eski) istemciler oda başına tek ``price_update`` alır;
+ - ``snapshot`` verildiyse fiyat önbelleği yazımı tek ``update_many``
+   çağrısıdır; yalnız kendi tick'lerini ilk kez buradan geçiren kaynaklar
+   için verilmelidir (Redis bus'ından gelenler yayıncıda zaten yazılmıştır).
+
+Kodlama ``msgpack`` (kuruluysa) ya da ``json``'dur; zaman damgaları epoch
+milisaniye tamsayılarıdır.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Tuple
+
+from backend.utils.lazy import lazy_import
+
+msgpack = lazy_import("msgpack")
+
+logger = logging.getLogger(__name__)
+
+WS_FLUSH_INTERVAL_MS = float(os.environ.get("WS_FLUSH_INTERVAL_MS", "250"))
+BATCH_EVENT = "price_batch"
+LEGACY_EVENT = "price_update"
+
+
+def available_encodings() -> List[str]:
+    return ["msgpack", "json"] if msgpack else ["json"]
+
+
+def negotiate(requested: Any) -> str:
+    """İstemcinin tercih(ler)inden sunucunun desteklediği ilkini seçer; yoksa json."""
+    prefs = requested if isinstance(requested, (list, tuple)) else [requested]
+    supported = available_encodings()
+    for enc in prefs:
+        if isinstance(enc, str) and enc.lower() in supported:
+            return enc.lower()
+    return "json"
+
+
+def _ts_ms(data: Dict[str, Any], default: int) -> int:
+    ts = data.get("ts")
+    if isinstance(ts, (int, float)):
+        # saniye cinsinden epoch ise milisaniyeye çevir
+        return int(ts * 1000) if ts < 1e11 else int(ts)
+    return default
+
+
+def compact(symbol: str, data: Dict[str, Any], now_ms: int) -> Dict[str, Any]:
+    """Kısa anahtarlı güncelleme: s(ymbol), p(rice), c(hange %), v(olume), t(s ms), b(ar)."""
+    item = {"s": symbol, "p": data.get("price"), "t": _ts_ms(data, now_ms)}
+    if data.get("change_percent") is not None:
+        item["c"] = data["change_percent"]
+    if data.get("volume") is not None:
+        item["v"] = data["volume"]
+    bar = data.get("bar")
+    if bar:
+        item["b"] = [bar.get("open"), bar.get("high"), bar.get("low"), bar.get("close")]
+    return item
+
+
+def encode_batch(items: List[Dict[str, Any]], encoding: str, now_ms: int) -> Any:
+    payload = {"t": now_ms, "u": items}
+    if encoding == "msgpack":
+        return msgpack.packb(payload, use_bin_type=True)
+    return payload
+
+
+Connection = Tuple[str, str, FrozenSet[str]]
+
+
+class PriceFanout:
+    """
+    ``add`` yalnız sözlüğe yazar; ``flush`` pencerede biriken güncellemeleri
+    yayar. ``connections`` çağrısı (sid, kodlama, abonelikler) üçlülerini
+    döndürür (yalnız anlaşma yapmış bağlantılar).
+    """
+
+    def __init__(
+        self,
+        emit: Callable[..., Any],
+        connections: Callable[[], Iterable[Connection]],
+        *,
+        snapshot: Any = None,
+        interval_ms: float = WS_FLUSH_INTERVAL_MS,
+    ):
+        self._emit = emit
+        self._connections = connections
+        self.snapshot = snapshot
+        self.interval = interval_ms / 1000.0
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.received = 0
+        self.events = 0
+        self.encodes = 0
+
+    def add(self, symbol: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self.received += 1
+            self._pending[symbol] = data
+
+    def flush(self) -> int:
+        """Bekleyenleri yayar; gönderilen (bağlantı + oda) olay sayısını döndürür."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        if self.snapshot is not None:
+            try:
+                self.snapshot.update_many(pending, source="websocket")
+            except Exception as e:
+                logger.error(f"Price snapshot update error: {e}")
+
+        now_ms = int(time.time() * 1000)
+        items = {symbol: compact(symbol, data, now_ms) for symbol, data in pending.items()}
+        groups: Dict[Tuple[str, FrozenSet[str]], List[str]] = {}
+        for sid, encoding, subscriptions in self._connections():
+            symbols = frozenset(subscriptions).intersection(items)
+            if symbols:
+                groups.setdefault((encoding, symbols), []).append(sid)
+
+        # grup başına tek kodlama ve tek emit; Socket.IO paketi de bir kez kodlar
+        sent = 0
+        for (encoding, symbols), sids in groups.items():
+            payload = encode_batch([items[s] for s in sorted(symbols)], encoding, now_ms)
+            self.encodes += 1
+            self._emit(BATCH_EVENT, payload, to=sids)
+            sent += len(sids)
+
+        # eski istemciler: oda başına tek olay, pencere başına tek zaman damgası
+        timestamp = datetime.utcnow().isoformat()
+        for symbol, data in pending.items():
+            self._emit(
+                LEGACY_EVENT,
+                {"symbol": symbol, "data": data, "timestamp": timestamp},
+                room=f"price_{symbol}",
+            )
+            sent += 1
+        self.events += sent
+        return sent
+
+    def run(self, sleep: Callable[[float], Any] = time.sleep) -> None:
+        while True:
+            sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:  # pragma: no cover - beklenmeyen hata
+                logger.error(f"Price fan-out flush error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "events": self.events,
+            "encodes": self.encodes,
+            "interval_ms": self.interval * 1000.0,
+        }
@@ -3,21 +3,34 @@ from flask import request
 import redis
 import json
 import logging
-from typing import Dict, Set, Optional
-from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Set, Optional
+from datetime import datetime
+import os
 import threading
 import time
 
+from backend.websocket.connection_registry import ConnectionRegistry
+from backend.websocket.price_fanout import PriceFanout, available_encodings, negotiate
+
 logger = logging.getLogger(__name__)
 
+# Birden çok işçi için Redis kuyruğu (ör. redis://redis:6379/2); boşsa tek süreç
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+# threading | eventlet | gevent (gunicorn worker sınıfı buna göre seçilir)
+SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
+
 class WebSocketManager:
     def __init__(self, app=None, redis_client=None):
         self.socketio = None
         self.redis_client = redis_client
         self.active_connections: Dict[str, Set[str]] = {}
         self.connection_metadata: Dict[str, Dict] = {}
-        self.rate_limits: Dict[str, Dict] = {}
+        self.registry = ConnectionRegistry()
         self._lock = threading.Lock()
+        self.fanout: Optional[PriceFanout] = None
+        self._flusher_started = False
+        self._subscription_listeners: List[Callable[[List[str], List[str]], None]] = []
+        self._subscriber_started = False
         
         if app is not None:
             self.init_app(app)
@@ -25,25 +38,44 @@ class WebSocketManager:
     def init_app(self, app):
         """Flask uygulaması ile WebSocket manager'ı başlatır"""
         cors_origins = self._get_cors_origins(app)
+        message_queue = app.config.get('SOCKETIO_MESSAGE_QUEUE') or SOCKETIO_MESSAGE_QUEUE or None
         
         self.socketio = SocketIO(
             app,
             cors_allowed_origins=cors_origins,
             logger=True,
             engineio_logger=True,
-            # Use threading async mode for broad compatibility in tests/CI
-            async_mode='threading',
-            ping_timeout=60,
-            ping_interval=25,
+            # Testler/CI için threading; üretimde eventlet/gevent işçileri
+            async_mode=app.config.get('SOCKETIO_ASYNC_MODE') or SOCKETIO_ASYNC_MODE,
+            message_queue=message_queue,
+            ping_timeout=int(os.environ.get('WEBSOCKET_PING_TIMEOUT', 60)),
+            ping_interval=int(os.environ.get('WEBSOCKET_PING_INTERVAL', 25)),
             max_http_buffer_size=1000000
         )
         
+        # Bağlantı kaydı kuyrukla aynı Redis'i paylaşır; işçiler birbirini görür
+        self.registry = ConnectionRegistry(redis.from_url(message_queue) if message_queue else None)
+        if self.registry.distributed:
+            self.socketio.start_background_task(self.registry.run_heartbeat, self.socketio.sleep)
+        
+        # Fiyat güncellemeleri pencere bazında toplanıp tek seferde yayılır
+        self.fanout = PriceFanout(
+            # Her işçi price_updates kanalını kendisi dinler; kuyruk üzerinden
+            # yaymak aynı tick'i işçi sayısı kadar çoğaltırdı
+            lambda event, payload, **kwargs: self.socketio.emit(event, payload, ignore_queue=True, **kwargs),
+            self._batch_connections,
+            # bus tick'leri anlık görüntüye yayıncı (price_streamer) tarafından
+            # zaten yazılır; her işçinin ts=şimdi ile yeniden yazması eski
+            # fiyatı taze gösterirdi
+            snapshot=None,
+        )
+        self._flusher_started = False
+        
         # Event handlers'ı kaydet
         self._register_handlers()
         
-        # Redis subscription thread'ini başlat
-        if self.redis_client:
-            self._start_redis_subscriber()
+        # Redis fiyat bus'ı ilk abonelikte dinlenmeye başlar (_notify_subscriptions)
+        self._subscriber_started = False
     
     def _get_cors_origins(self, app):
         """CORS origins'i environment'a göre ayarlar"""
@@ -70,16 +102,27 @@ class WebSocketManager:
                 return False
             
             # Connection metadata'sını kaydet
-            self.connection_metadata[client_id] = {
+            metadata = {
                 'connected_at': datetime.utcnow(),
                 'ip_address': client_ip,
                 'user_agent': user_agent,
                 'subscriptions': set(),
                 'last_activity': datetime.utcnow()
             }
+            # İstemci auth içinde kodlama isterse toplu (price_batch) moda geçer
+            if isinstance(auth, dict) and auth.get('encoding'):
+                metadata['encoding'] = negotiate(auth['encoding'])
+            with self._lock:
+                self.connection_metadata[client_id] = metadata
+            self.registry.register(client_id, client_ip, metadata.get('encoding'))
             
             logger.info(f"Client connected: {client_id} from {client_ip}")
-            emit('connection_established', {'status': 'connected', 'id': client_id})
+            emit('connection_established', {
+                'status': 'connected',
+                'id': client_id,
+                'encodings': available_encodings(),
+                'encoding': metadata.get('encoding'),
+            })
         
         @self.socketio.on('disconnect')
         def handle_disconnect():
@@ -98,15 +141,29 @@ class WebSocketManager:
                 emit('error', {'message': 'Invalid symbols provided'})
                 return
             
+            metadata = self.connection_metadata.get(client_id)
+            if metadata is not None and data.get('encoding'):
+                metadata['encoding'] = negotiate(data['encoding'])
+                self.registry.set_encoding(client_id, metadata['encoding'])
+            batched = metadata is not None and 'encoding' in metadata
+            
             for symbol in symbols:
-                room_name = f"price_{symbol}"
-                join_room(room_name)
+                # Toplu moddaki istemciler odaya girmez; bağlantı başına tek olay alır
+                if not batched:
+                    room_name = f"price_{symbol}"
+                    join_room(room_name)
                 
                 # Client'ın subscription listesini güncelle
-                if client_id in self.connection_metadata:
-                    self.connection_metadata[client_id]['subscriptions'].add(symbol)
+                if metadata is not None:
+                    with self._lock:
+                        metadata['subscriptions'].add(symbol)
             
-            emit('subscription_confirmed', {'symbols': symbols})
+            self._notify_subscriptions(self.registry.subscribe(client_id, symbols), [])
+            
+            confirmation = {'symbols': symbols}
+            if batched:
+                confirmation['encoding'] = metadata['encoding']
+            emit('subscription_confirmed', confirmation)
             logger.info(f"Client {client_id} subscribed to: {symbols}")
         
         @self.socketio.on('unsubscribe_price')
@@ -121,7 +178,10 @@ class WebSocketManager:
                 
                 # Client'ın subscription listesinden çıkar
                 if client_id in self.connection_metadata:
-                    self.connection_metadata[client_id]['subscriptions'].discard(symbol)
+                    with self._lock:
+                        self.connection_metadata[client_id]['subscriptions'].discard(symbol)
+            
+            self._notify_subscriptions([], self.registry.unsubscribe(client_id, symbols))
             
             emit('unsubscription_confirmed', {'symbols': symbols})
             logger.info(f"Client {client_id} unsubscribed from: {symbols}")
@@ -132,32 +192,8 @@ class WebSocketManager:
             emit('pong', {'timestamp': time.time()})
     
     def _check_rate_limit(self, client_ip: str) -> bool:
-        """Rate limiting kontrolü yapar"""
-        now = datetime.utcnow()
-        limit_window = timedelta(minutes=1)
-        max_connections = 10
-        
-        with self._lock:
-            if client_ip not in self.rate_limits:
-                self.rate_limits[client_ip] = {
-                    'connections': [],
-                    'last_reset': now
-                }
-            
-            client_limits = self.rate_limits[client_ip]
-            
-            # Eski kayıtları temizle
-            client_limits['connections'] = [
-                conn_time for conn_time in client_limits['connections']
-                if now - conn_time < limit_window
-            ]
-            
-            # Limit kontrolü
-            if len(client_limits['connections']) >= max_connections:
-                return False
-            
-            client_limits['connections'].append(now)
-            return True
+        """Rate limiting kontrolü yapar (IP başına pencere sayacı, tüm işçilerde ortak)"""
+        return self.registry.allow_connect(client_ip)
     
     def _validate_symbols(self, symbols: list) -> bool:
         """Cryptocurrency sembollerini doğrular"""
@@ -181,32 +217,62 @@ class WebSocketManager:
             # Active connections'dan çıkar
             for symbol, clients in self.active_connections.items():
                 clients.discard(client_id)
+        self._notify_subscriptions([], self.registry.unregister(client_id))
     
-    def broadcast_price_update(self, symbol: str, price_data: dict):
-        """Fiyat güncellemesini ilgili room'a gönderir"""
-        room_name = f"price_{symbol}"
-        
-        # Redis'e de kaydet
-        if self.redis_client:
+    def add_subscription_listener(self, callback: Callable[[List[str], List[str]], None]):
+        """
+        Bu işçide ilk abonesini alan / son abonesini kaybeden semboller için
+        ``callback(started, stopped)`` çağrılır. Eklenirken mevcut abonelikler
+        ``started`` olarak bir kez bildirilir.
+        """
+        if callback in self._subscription_listeners:
+            return
+        self._subscription_listeners.append(callback)
+        current = sorted(self.registry.local_counts())
+        if current:
+            callback(current, [])
+    
+    def _notify_subscriptions(self, started: Iterable[str], stopped: Iterable[str]):
+        started, stopped = list(started), list(stopped)
+        if not (started or stopped):
+            return
+        if started and not self._subscriber_started and self.redis_client and self.socketio:
+            with self._lock:
+                if not self._subscriber_started:
+                    self._subscriber_started = True
+                    self._start_redis_subscriber()
+        for callback in self._subscription_listeners:
             try:
-                self.redis_client.setex(
-                    f"price:{symbol}",
-                    300,  # 5 dakika cache
-                    json.dumps(price_data)
-                )
+                callback(started, stopped)
             except Exception as e:
-                logger.error(f"Redis price cache error: {e}")
-        
-        if self.socketio:
-            self.socketio.emit(
-                'price_update',
-                {
-                    'symbol': symbol,
-                    'data': price_data,
-                    'timestamp': datetime.utcnow().isoformat()
-                },
-                room=room_name
-            )
+                logger.error(f"Subscription listener error: {e}")
+    
+    def broadcast_price_update(self, symbol: str, price_data: dict):
+        """Fiyat güncellemesini yayın penceresine ekler (önbellek yazımı ve emit flush'ta)"""
+        # Bu işçide abonesi olmayan sembol hiçbir iş doğurmaz
+        if self.fanout is None or not self.registry.has_subscribers(symbol):
+            return
+        self.fanout.add(symbol, price_data)
+        if self.fanout.interval <= 0:
+            self.fanout.flush()
+        elif not self._flusher_started:
+            with self._lock:
+                if not self._flusher_started:
+                    self._flusher_started = True
+                    self.socketio.start_background_task(self.fanout.run, self.socketio.sleep)
+    
+    def flush_prices(self) -> int:
+        """Bekleyen fiyat güncellemelerini hemen yayar"""
+        return self.fanout.flush() if self.fanout is not None else 0
+    
+    def _batch_connections(self):
+        """Kodlama anlaşması yapmış bağlantılar: (sid, kodlama, abonelikler)"""
+        with self._lock:
+            return [
+                (sid, metadata['encoding'], frozenset(metadata['subscriptions']))
+                for sid, metadata in self.connection_metadata.items()
+                if 'encoding' in metadata and metadata['subscriptions']
+            ]
     
     def _start_redis_subscriber(self):
         """Redis pub/sub için thread başlatır"""
@@ -222,11 +288,13 @@ class WebSocketManager:
                     if message['type'] == 'message':
                         try:
                             data = json.loads(message['data'])
-                            symbol = data.get('symbol')
-                            price_data = data.get('data')
-                            
-                            if symbol and price_data:
-                                self.broadcast_price_update(symbol, price_data)
+                            # Birleştirilmiş yayınlar {'batch': [...]} olarak gelir
+                            for item in data.get('batch') or [data]:
+                                symbol = item.get('symbol')
+                                price_data = item.get('data')
+                                
+                                if symbol and price_data:
+                                    self.broadcast_price_update(symbol, price_data)
                         except json.JSONDecodeError:
                             logger.error("Invalid JSON received from Redis")
                         except Exception as e:
@@ -234,12 +302,11 @@ class WebSocketManager:
             except Exception as e:
                 logger.error(f"Redis subscriber thread error: {e}")
         
-        thread = threading.Thread(target=redis_subscriber, daemon=True)
-        thread.start()
+        self.socketio.start_background_task(redis_subscriber)
         logger.info("Redis subscriber thread started")
     
     def get_connection_stats(self) -> dict:
-        """Bağlantı istatistiklerini döndürür"""
+        """Bağlantı istatistiklerini döndürür (bu işçi; 'cluster' tüm işçiler)"""
         total_connections = len(self.connection_metadata)
         active_subscriptions = sum(
             len(metadata['subscriptions'])
@@ -249,6 +316,8 @@ class WebSocketManager:
         return {
             'total_connections': total_connections,
             'active_subscriptions': active_subscriptions,
+            'fanout': self.fanout.get_stats() if self.fanout is not None else None,
+            'cluster': self.registry.stats(),
             'uptime': datetime.utcnow().isoformat()
         }
 
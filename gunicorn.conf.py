@@ -8,10 +8,23 @@ import os
 #
 bind = "127.0.0.1:5000"
 
+# Socket.IO async mode picks the worker class: eventlet/gevent serve thousands of
+# long-lived connections per process. Socket.IO needs sticky sessions, so in that
+# mode run one worker per instance and scale out with more instances sharing
+# SOCKETIO_MESSAGE_QUEUE behind the load balancer.
+_ASYNC_WORKERS = {
+    "eventlet": "eventlet",
+    "gevent": "geventwebsocket.gunicorn.workers.GeventWebSocketWorker",
+}
+_async_mode = os.getenv("SOCKETIO_ASYNC_MODE", "threading")
+
 # Workers: (2 * CPU) + 1 by default; can be overridden via env
-workers = int(os.getenv("GUNICORN_WORKERS", (multiprocessing.cpu_count() * 2) + 1))
+_default_workers = 1 if _async_mode in _ASYNC_WORKERS else (multiprocessing.cpu_count() * 2) + 1
+workers = int(os.getenv("GUNICORN_WORKERS", _default_workers))
 threads = int(os.getenv("GUNICORN_THREADS", 2))
-worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")  # For Socket.IO full WS, consider gevent*
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", _ASYNC_WORKERS.get(_async_mode, "gthread"))
+if worker_class in _ASYNC_WORKERS.values():
+    worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 10000))
 
 # Timeouts tuned for API workloads (seconds)
 timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
@@ -28,3 +41,16 @@ worker_tmp_dir = "/tmp"
 accesslog = "-"
 errorlog = "-"
 loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+def post_fork(server, worker):
+    """Warm the ML model cache so the first predict after a deploy is not a cold load."""
+    if os.getenv("ML_PRELOAD_ON_FORK", "1") != "1":
+        return
+    try:
+        from backend.ml.service import warmup
+
+        loaded = warmup()
+        server.log.info("worker %s: ML model preload %s", worker.pid, "ok" if loaded else "skipped (no model)")
+    except Exception as exc:  # pragma: no cover - preload must never block a worker
+        server.log.warning("worker %s: ML model preload failed: %s", worker.pid, exc)
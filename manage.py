@@ -298,6 +298,22 @@ def metrics():
         click.echo(f"Database metrics unavailable: {e}")
 
 
+@cli.command("import-profile")
+@click.option("--target", default="backend:create_app", help="module:attr to import (and call)")
+@click.option("--no-call", is_flag=True, help="Only import the target, do not call it")
+@click.option("--top", default=25, type=int, help="Rows per table")
+@click.option("--target-ms", default=None, type=float, help="Cold-start budget (default COLD_START_TARGET_MS)")
+def import_profile(target: str, no_call: bool, top: int, target_ms):
+    """Profile cold-start imports with python -X importtime in a fresh interpreter."""
+    from backend.utils.importtime import COLD_START_TARGET_MS, format_report, profile_imports
+
+    budget = COLD_START_TARGET_MS if target_ms is None else target_ms
+    profile = profile_imports(target, call=not no_call)
+    click.echo(format_report(profile, top=top, target_ms=budget))
+    if profile.wall_ms is not None and profile.wall_ms > budget:
+        raise SystemExit(1)
+
+
 @cli.command()
 @click.option("--host", default="0.0.0.0")
 @click.option("--port", default=5000, type=int)
@@ -0,0 +1,28 @@
+"""Add timings column to celery_task_logs
+
+Revision ID: 20261019_task_log_timings
+
+Revises: security_001
+
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261019_task_log_timings"
+
+down_revision = "security_001"
+
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("celery_task_logs", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("timings", sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("celery_task_logs", schema=None) as batch_op:
+        batch_op.drop_column("timings")
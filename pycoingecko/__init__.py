@@ -23,6 +23,15 @@ except Exception:  # pragma: no cover - küçük HTTP şimi devreye girer
     import urllib.request
     from urllib.error import HTTPError, URLError
 
+    def _shared_client():
+        """``backend`` paketi varsa ortak CoinGecko istemcisi, yoksa None."""
+        try:
+            from backend.services.coingecko import get_coingecko_client
+
+            return get_coingecko_client()
+        except Exception:
+            return None
+
     class _HTTP:
         """Basit HTTP GET yardımcı sınıfı."""
 
@@ -31,6 +40,18 @@ except Exception:  # pragma: no cover - küçük HTTP şimi devreye girer
             url: str, params: Optional[Dict[str, Any]] = None, timeout: int = 15
         ) -> Any:
             """JSON dönen HTTP GET isteği."""
+            client = _shared_client()
+            if client is not None:
+                # paylaşılan istemci: keep-alive havuzu, ortak hız sınırı ve önbellek
+                clean = {
+                    k: (",".join(v) if isinstance(v, (list, tuple)) else v)
+                    for k, v in (params or {}).items()
+                    if v is not None
+                }
+                try:
+                    return client.get_json(url, params=clean)
+                except Exception as exc:
+                    raise URLError(str(exc)) from exc
             if params:
                 qs = urllib.parse.urlencode(
                     {
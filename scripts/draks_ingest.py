@@ -2,54 +2,20 @@
 Basit otomatik veri çekici:
 - CCXT ile kripto OHLCV (Binance varsayılan)
 - yfinance ile BIST/hisse günlük
-Sonuçlar ohlcv tablosuna yazar (yoksa oluşturur).
+Her (kaynak, sembol, timeframe) için watermark'tan yeni barlar çekilir ve yerel
+kolonlu OHLCV deposuna (backend.marketdata) yazılır. Periyodik çalıştırma için
+Celery beat görevi: backend.tasks.ingest_tasks.ingest_source
 """
 
 from __future__ import annotations
 
-import os
-import time
-from datetime import datetime, timezone
+import sys
+from pathlib import Path
 
-import pandas as pd
-from sqlalchemy import create_engine, text
+# Proje kökünü import yoluna ekle
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-DB_URL = os.getenv("DATABASE_URL", "sqlite:///ytd.db")
-ENGINE = create_engine(DB_URL, future=True)
-
-DDL = """
-CREATE TABLE IF NOT EXISTS ohlcv (
-  symbol TEXT NOT NULL,
-  timeframe TEXT NOT NULL,
-  ts TIMESTAMP NOT NULL,
-  open REAL, high REAL, low REAL, close REAL, volume REAL,
-  source TEXT DEFAULT 'unknown',
-  PRIMARY KEY (symbol,timeframe,ts)
-);
-"""
-with ENGINE.begin() as con:
-    con.execute(text(DDL))
-
-
-def write_ohlcv(df: pd.DataFrame, *, symbol: str, timeframe: str, source: str):
-    if df.empty:
-        return
-    df = df.copy()
-    df["symbol"] = symbol
-    df["timeframe"] = timeframe
-    df["source"] = source
-    with ENGINE.begin() as con:
-        tmp = "ohlcv_tmp"
-        df.to_sql(tmp, con, if_exists="replace", index=False)
-        con.execute(
-            text(
-                f"""
-            INSERT OR IGNORE INTO ohlcv (symbol,timeframe,ts,open,high,low,close,volume,source)
-            SELECT '{symbol}','{timeframe}', ts, open, high, low, close, volume, '{source}' FROM {tmp};
-            DROP TABLE {tmp};
-        """
-            )
-        )
+from backend.marketdata import ingest as _ingest  # noqa: E402
 
 
 def collect_ccxt(
@@ -57,46 +23,29 @@ def collect_ccxt(
     timeframes=("1h", "1d"),
     limit=500,
     ex_id="binance",
+    concurrency=4,
 ):
-    import ccxt
-
-    ex = getattr(ccxt, ex_id)({"enableRateLimit": True})
-    for sym in symbols:
-        for tf in timeframes:
-            o = ex.fetch_ohlcv(sym, timeframe=tf, limit=limit)
-            df = pd.DataFrame(
-                o, columns=["ts", "open", "high", "low", "close", "volume"]
-            )
-            df["ts"] = pd.to_datetime(df["ts"], unit="ms", utc=True)
-            write_ohlcv(df, symbol=sym.replace(" ", ""), timeframe=tf, source=ex_id)
-            time.sleep(0.25)
+    """``limit`` yalnızca watermark'ı olmayan seriler için geriye bakış uzunluğudur."""
+    pairs = [(sym.replace(" ", ""), tf) for sym in symbols for tf in timeframes]
+    return _ingest.ingest(
+        ex_id,
+        pairs,
+        _ingest.ccxt_fetcher(ex_id),
+        concurrency=concurrency,
+        bootstrap_bars=limit,
+    )
 
 
 def collect_yf(symbols=("XU100.IS", "GARAN.IS"), interval="1d", period="720d"):
-    import yfinance as yf
-
-    for sym in symbols:
-        df = yf.download(sym, interval=interval, period=period, progress=False)
-        if df.empty:
-            continue
-        out = df.rename(
-            columns={
-                "Open": "open",
-                "High": "high",
-                "Low": "low",
-                "Close": "close",
-                "Volume": "volume",
-            }
-        )
-        out.reset_index(inplace=True)
-        out.rename(columns={out.columns[0]: "ts"}, inplace=True)
-        out["ts"] = pd.to_datetime(out["ts"], utc=True)
-        write_ohlcv(
-            out[["ts", "open", "high", "low", "close", "volume"]],
-            symbol=sym,
-            timeframe=interval,
-            source="yfinance",
-        )
+    """``period`` yalnızca watermark'ı olmayan seriler için geriye bakış uzunluğudur."""
+    pairs = [(sym, interval) for sym in symbols]
+    return _ingest.ingest(
+        "yfinance",
+        pairs,
+        _ingest.yf_fetcher(),
+        concurrency=2,
+        bootstrap_bars=_ingest.period_to_bars(period, interval),
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+ML model artefaktlarının işçi başına bellek maliyetini ölçer.
+
+300 ağaçlı bir RandomForest (regresyon + sınıflandırma) sentetik veride
+eğitilir, hem klasik joblib pickle'ı hem de eşlenebilir düz düzende
+kaydedilir. Ardından N işçi süreci modeli yükleyip tahmin yapar ve her biri
+/proc/self/smaps_rollup'tan RSS, PSS ve paylaşımlı sayfaları raporlar.
+
+Kullanım:
+  python scripts/ml_model_rss.py --workers 4 --trees 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _smaps() -> dict:
+    out = {}
+    with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                out[parts[0][:-1]] = int(parts[1])
+    return out
+
+
+def _worker(paths, mmap, barrier, q):
+    import joblib
+    import numpy as np
+    import sklearn.ensemble  # noqa: F401  - import maliyeti ölçüme girmesin
+    import backend.ml.artifacts  # noqa: F401
+
+    X = np.random.default_rng(0).normal(size=(64, 7))
+    base = _smaps()
+    models = [joblib.load(p, mmap_mode="r" if mmap else None) for p in paths]
+    for m in models:
+        m.predict(X)
+    barrier.wait()  # tüm işçiler yüklediğinde ölç, paylaşım görünür olsun
+    now = _smaps()
+    q.put({k: now.get(k, 0) - base.get(k, 0) for k in ("Rss", "Pss", "Shared_Clean", "Private_Dirty")})
+    barrier.wait()
+
+
+def _measure(paths, workers: int, mmap: bool) -> dict:
+    ctx = mp.get_context("spawn")
+    barrier, q = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(paths, mmap, barrier, q)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    rows = [q.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return {k: sum(r[k] for r in rows) // len(rows) for k in rows[0]}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--trees", type=int, default=300)
+    ap.add_argument("--rows", type=int, default=540)
+    args = ap.parse_args()
+
+    import joblib
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+    from backend.ml.artifacts import save_model
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(args.rows, 7))
+    y = X[:, 0] * 0.5 + rng.normal(size=args.rows)
+    reg = RandomForestRegressor(n_estimators=args.trees, random_state=42, n_jobs=-1).fit(X, y)
+    cls = RandomForestClassifier(n_estimators=args.trees, random_state=42, n_jobs=-1).fit(X, y > 0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickled = [os.path.join(tmp, f"{n}.pkl.joblib") for n in ("reg", "cls")]
+        flat = [os.path.join(tmp, f"{n}.flat.joblib") for n in ("reg", "cls")]
+        joblib.dump(reg, pickled[0])
+        joblib.dump(cls, pickled[1])
+        save_model(reg, flat[0])
+        save_model(cls, flat[1])
+
+        print(f"trees={args.trees} workers={args.workers}")
+        for label, paths, mmap in (("pickle", pickled, False), ("flat+mmap", flat, True)):
+            size = sum(os.path.getsize(p) for p in paths) // 1024
+            r = _measure(paths, args.workers, mmap)
+            print(
+                f"{label:10s} file={size:>7d} KB  rss/worker={r['Rss']:>7d} KB  "
+                f"pss/worker={r['Pss']:>7d} KB  shared={r['Shared_Clean']:>7d} KB  "
+                f"private_dirty={r['Private_Dirty']:>7d} KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Birden çok Socket.IO sunucu sürecine dağılmış eşzamanlı istemci yük testi.
+
+``--servers`` kadar ``run_with_socketio.py`` süreci ardışık portlarda, ortak
+``SOCKETIO_MESSAGE_QUEUE`` ve async (eventlet) modda başlatılır. Ardından
+``--client-procs`` istemci süreci toplam ``--clients`` bağlantıyı sunuculara
+sırayla dağıtır (yalnız websocket taşıması; yapışkan oturum gerekmez), her
+bağlantı sembollere abone olur ve ``--hold`` saniye açık kalır. Tutma sırasında
+her sunucunun ``/api/websocket/stats`` çıktısındaki ``cluster`` bölümü
+okunur: tüm işçiler aynı toplam bağlantı ve abonelik sayısını görmelidir.
+
+Kullanım:
+  python scripts/ws_cluster_load.py --servers 4 --clients 10000 --client-procs 8
+  python scripts/ws_cluster_load.py --no-spawn --urls http://a:5000,http://b:5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "ADAUSDT", "DOTUSDT", "LINKUSDT", "BNBUSDT"]
+
+
+def _spawn_servers(count: int, base_port: int, queue: str, clients: int) -> list:
+    procs = []
+    for i in range(count):
+        env = dict(
+            os.environ,
+            PORT=str(base_port + i),
+            SOCKETIO_MESSAGE_QUEUE=queue,
+            SOCKETIO_ASYNC_MODE=os.environ.get("SOCKETIO_ASYNC_MODE", "eventlet"),
+            # tüm istemciler aynı IP'den gelir
+            WEBSOCKET_MAX_CONNECTIONS_PER_IP=str(clients * 2),
+            FLASK_ENV="production",
+        )
+        procs.append(subprocess.Popen([sys.executable, os.path.join(ROOT, "run_with_socketio.py")], env=env))
+    return procs
+
+
+def _wait_ready(urls: list, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    for url in urls:
+        while True:
+            try:
+                urllib.request.urlopen(f"{url}/api/websocket/health", timeout=2)
+                break
+            except urllib.error.HTTPError:
+                break  # sunucu yanıt veriyor (ör. 503); hazır say
+            except Exception:
+                if time.time() > deadline:
+                    raise RuntimeError(f"server not ready: {url}")
+                time.sleep(0.5)
+
+
+async def _client_batch(urls: list, offset: int, count: int, hold: float, ramp: float) -> dict:
+    import socketio
+
+    received = 0
+    connected = 0
+    errors = 0
+    clients = []
+
+    async def one(n: int):
+        nonlocal received, connected, errors
+        client = socketio.AsyncClient(reconnection=False)
+
+        @client.on("price_batch")
+        async def _batch(data):
+            nonlocal received
+            received += 1
+
+        @client.on("price_update")
+        async def _update(data):
+            nonlocal received
+            received += 1
+
+        try:
+            await client.connect(urls[n % len(urls)], transports=["websocket"], auth={"encoding": "json"})
+            connected += 1
+            symbols = [SYMBOLS[n % len(SYMBOLS)], SYMBOLS[(n + 1) % len(SYMBOLS)]]
+            await client.emit("subscribe_price", {"symbols": symbols})
+            clients.append(client)
+        except Exception:
+            errors += 1
+
+    tasks = []
+    for i in range(count):
+        tasks.append(asyncio.create_task(one(offset + i)))
+        if ramp:
+            await asyncio.sleep(ramp / max(count, 1))
+    await asyncio.gather(*tasks)
+    await asyncio.sleep(hold)
+    for client in clients:
+        await client.disconnect()
+    return {"connected": connected, "errors": errors, "received": received}
+
+
+def _client_proc(urls, offset, count, hold, ramp, q):
+    q.put(asyncio.run(_client_batch(urls, offset, count, hold, ramp)))
+
+
+def _cluster_stats(urls: list) -> list:
+    rows = []
+    for url in urls:
+        try:
+            with urllib.request.urlopen(f"{url}/api/websocket/stats", timeout=5) as resp:
+                stats = json.load(resp)
+            rows.append((url, stats.get("total_connections"), stats.get("cluster")))
+        except Exception as exc:
+            rows.append((url, None, {"error": str(exc)}))
+    return rows
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--servers", type=int, default=4)
+    ap.add_argument("--base-port", type=int, default=5100)
+    ap.add_argument("--queue", default=os.environ.get("SOCKETIO_MESSAGE_QUEUE", "redis://localhost:6379/2"))
+    ap.add_argument("--clients", type=int, default=10000)
+    ap.add_argument("--client-procs", type=int, default=8)
+    ap.add_argument("--hold", type=float, default=30.0)
+    ap.add_argument("--ramp", type=float, default=20.0, help="bağlantıların yayıldığı süre (s)")
+    ap.add_argument("--no-spawn", action="store_true", help="sunucular zaten çalışıyor")
+    ap.add_argument("--urls", default="", help="virgüllü sunucu adresleri (--no-spawn ile)")
+    args = ap.parse_args()
+
+    servers = []
+    if args.no_spawn:
+        urls = [u.strip() for u in args.urls.split(",") if u.strip()]
+    else:
+        urls = [f"http://127.0.0.1:{args.base_port + i}" for i in range(args.servers)]
+        servers = _spawn_servers(args.servers, args.base_port, args.queue, args.clients)
+    try:
+        _wait_ready(urls)
+        ctx = mp.get_context("spawn")
+        q = ctx.Queue()
+        per_proc = -(-args.clients // args.client_procs)
+        procs = []
+        for i in range(args.client_procs):
+            count = min(per_proc, args.clients - i * per_proc)
+            if count <= 0:
+                break
+            procs.append(ctx.Process(target=_client_proc, args=(urls, i * per_proc, count, args.hold, args.ramp, q)))
+        for p in procs:
+            p.start()
+
+        time.sleep(args.ramp + args.hold / 2)
+        print(f"{'sunucu':<26}{'yerel':>8}{'küme bağlantı':>16}{'işçi':>6}{'abonelik':>10}")
+        for url, local, cluster in _cluster_stats(urls):
+            cluster = cluster or {}
+            print(f"{url:<26}{local!s:>8}{cluster.get('connections')!s:>16}"
+                  f"{cluster.get('workers')!s:>6}{cluster.get('subscriptions')!s:>10}")
+
+        rows = [q.get() for _ in procs]
+        for p in procs:
+            p.join()
+        total = {k: sum(r[k] for r in rows) for k in rows[0]}
+        print(f"istemci: bağlanan={total['connected']} hata={total['errors']} alınan olay={total['received']}")
+    finally:
+        for proc in servers:
+            proc.terminate()
+        for proc in servers:
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
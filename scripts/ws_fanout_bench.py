@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Socket.IO fiyat yayınının 1000 bağlı istemci başına CPU maliyetini ölçer.
+
+Gerçek bir ``socketio.Server`` üzerinde N sahte istemci bağlanır; Engine.IO
+gönderimi no-op'tur, yani ölçülen süre paket kodlama ve oda/bağlantı
+dolaşımıdır. İki yol karşılaştırılır:
+
+ - ``legacy``: her tick için oda başına ``price_update`` (eski davranış);
+ - ``batched``: ``PriceFanout`` ile pencere başına bağlantı başına tek
+   ``price_batch`` (msgpack kuruluysa ikili, değilse json).
+
+Kullanım:
+  python scripts/ws_fanout_bench.py --clients 1000 --symbols 10 --ticks 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _server(clients: int, symbols, per_client: int, batched: bool, encoding: str):
+    import socketio
+
+    sio = socketio.Server(async_mode="threading")
+    sio.eio.send = lambda *args, **kwargs: None
+    rng = random.Random(42)
+    connections = []
+    for i in range(clients):
+        sid = sio.manager.connect(f"eio{i}", "/")
+        subs = frozenset(rng.sample(symbols, per_client))
+        if batched:
+            connections.append((sid, encoding, subs))
+        else:
+            for symbol in subs:
+                sio.enter_room(sid, f"price_{symbol}")
+    return sio, connections
+
+
+def _ticks(symbols, ticks: int):
+    rng = random.Random(7)
+    for i in range(ticks):
+        for symbol in symbols:
+            yield symbol, {"price": 100 + rng.random(), "change_percent": 1.0, "volume": 10.0, "ts": time.time()}
+
+
+def run_legacy(args, symbols) -> float:
+    from datetime import datetime
+
+    sio, _ = _server(args.clients, symbols, args.per_client, False, "json")
+    start = time.process_time()
+    for symbol, data in _ticks(symbols, args.ticks):
+        sio.emit("price_update", {"symbol": symbol, "data": data, "timestamp": datetime.utcnow().isoformat()},
+                 room=f"price_{symbol}")
+    return time.process_time() - start
+
+
+def run_batched(args, symbols, encoding: str) -> float:
+    from backend.websocket.price_fanout import PriceFanout
+
+    sio, connections = _server(args.clients, symbols, args.per_client, True, encoding)
+    fanout = PriceFanout(sio.emit, lambda: connections, interval_ms=args.window_ms)
+    # her pencere ticks_per_window tick toplar (sembol başına bir güncelleme × pencere oranı)
+    per_window = max(1, int(len(symbols) * args.window_ms / args.tick_ms))
+    start = time.process_time()
+    for n, (symbol, data) in enumerate(_ticks(symbols, args.ticks), 1):
+        fanout.add(symbol, data)
+        if n % per_window == 0:
+            fanout.flush()
+    fanout.flush()
+    return time.process_time() - start
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--clients", type=int, default=1000)
+    ap.add_argument("--symbols", type=int, default=10)
+    ap.add_argument("--per-client", type=int, default=3)
+    ap.add_argument("--ticks", type=int, default=40, help="sembol başına tick")
+    ap.add_argument("--tick-ms", type=float, default=100.0, help="sembol başına tick aralığı")
+    ap.add_argument("--window-ms", type=float, default=250.0)
+    args = ap.parse_args()
+
+    from backend.websocket.price_fanout import available_encodings
+
+    symbols = [f"SYM{i}USDT" for i in range(args.symbols)]
+    scale = 1000.0 / args.clients
+    rows = [("legacy", run_legacy(args, symbols))]
+    for encoding in available_encodings():
+        rows.append((f"batched/{encoding}", run_batched(args, symbols, encoding)))
+    base = rows[0][1]
+    print(f"{'yol':<16}{'CPU s':>10}{'CPU s / 1k istemci':>22}{'oran':>8}")
+    for name, cpu in rows:
+        print(f"{name:<16}{cpu:>10.3f}{cpu * scale:>22.3f}{cpu / base if base else 0:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from backend.core import fanout
+from backend.core.fanout import collect_analysis_inputs
+
+PRICE = {"prices": [1.0, 2.0, 3.0], "times": ["a", "b", "c"], "current_price": 3.0}
+
+
+class FakeCollector:
+    def __init__(self, delays=None, fail=()):
+        self.delays = delays or {}
+        self.fail = set(fail)
+        self.started = {}
+
+    def _run(self, stage, value):
+        self.started[stage] = time.perf_counter()
+        time.sleep(self.delays.get(stage, 0.0))
+        if stage in self.fail:
+            raise RuntimeError(stage)
+        return value
+
+    def collect_price_data(self, coin):
+        return self._run("price", PRICE)
+
+    def collect_onchain_data(self, coin):
+        return self._run("onchain", {"active_addresses": 5, "exchange_inflow": 1.0, "exchange_outflow": 2.0})
+
+    def collect_social_data(self, coin):
+        return self._run("social", {"twitter_sentiment": 0.3, "social_volume": 7})
+
+    def collect_news_data(self, coin):
+        return self._run("news", [{"title": "up"}])
+
+
+class FakeAI:
+    def __init__(self):
+        self.sentiment_at = None
+
+    def analyze_news(self, news):
+        self.sentiment_at = time.perf_counter()
+        return ("positive", 0.8) if news else ("neutral", 0.5)
+
+    def forecast(self, prices, times, days=1, coin_name=None):
+        return (prices[-1] + 1, "prophet", {"upper": 5.0, "lower": 3.0}, ["d"], 0.9, "ok")
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.fixture(autouse=True)
+def short_timeouts(monkeypatch):
+    monkeypatch.setitem(fanout.STAGE_TIMEOUTS, "social", 0.2)
+
+
+def _system(**kw):
+    return SimpleNamespace(collector=FakeCollector(**kw), ai=FakeAI())
+
+
+def test_collects_all_sources_and_dependents(app):
+    inputs, timings = collect_analysis_inputs(_system(), "bitcoin", app=app)
+    assert inputs["price"] is PRICE
+    assert inputs["sentiment"] == ("positive", 0.8)
+    assert inputs["forecast"][0] == 4.0
+    assert set(timings["stages"]) == {"price", "onchain", "social", "news", "sentiment", "forecast"}
+    assert all(s["status"] == "ok" for s in timings["stages"].values())
+    assert timings["total_ms"] >= 0
+
+
+def test_sources_run_concurrently_and_sentiment_does_not_wait_for_price(app):
+    system = _system(delays={"price": 0.3, "onchain": 0.1, "social": 0.1, "news": 0.0})
+    t0 = time.perf_counter()
+    collect_analysis_inputs(system, "bitcoin", app=app)
+    # sıralı olsaydı >= 0.5 s sürerdi
+    assert time.perf_counter() - t0 < 0.45
+    assert system.ai.sentiment_at < system.collector.started["price"] + 0.3
+
+
+def test_timeout_and_error_fall_back_to_defaults(app):
+    system = _system(delays={"social": 1.0}, fail={"news"})
+    inputs, timings = collect_analysis_inputs(system, "bitcoin", app=app)
+    assert timings["stages"]["social"]["status"] == "timeout"
+    assert inputs["social"] == fanout.DEFAULTS["social"]
+    assert timings["stages"]["news"]["status"] == "error"
+    assert inputs["news"] == []
+    assert inputs["sentiment"] == ("neutral", 0.5)
+    assert timings["total_ms"] < 900
+
+
+def test_price_failure_raises(app):
+    with pytest.raises(RuntimeError):
+        collect_analysis_inputs(_system(fail={"price"}), "bitcoin", app=app)
+
+
+def test_error_reports_stage_duration(app):
+    system = _system(delays={"news": 0.2})
+
+    def broken(news):
+        raise RuntimeError("model")
+
+    system.ai.analyze_news = broken
+    _, timings = collect_analysis_inputs(system, "bitcoin", app=app)
+    # hata süresi analiz başından değil adımın kendisinden ölçülür
+    assert timings["stages"]["sentiment"]["status"] == "error"
+    assert timings["stages"]["sentiment"]["ms"] < 100
+
+
+def test_timed_out_stages_do_not_starve_other_analyses(app, monkeypatch):
+    monkeypatch.setitem(fanout.STAGE_TIMEOUTS, "onchain", 0.1)
+    stuck = [_system(delays={"onchain": 1.0, "social": 1.0}) for _ in range(5)]
+    for system in stuck:
+        collect_analysis_inputs(system, "bitcoin", app=app)
+    t0 = time.perf_counter()
+    _, timings = collect_analysis_inputs(_system(), "bitcoin", app=app)
+    assert time.perf_counter() - t0 < 0.15
+    assert all(s["status"] == "ok" for s in timings["stages"].values())
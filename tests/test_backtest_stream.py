@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.core.backtest import PnLAccumulator, run_backtest, save_result
+from backend.core.rule_plan import RuleBook
+from backend.marketdata.store import OHLCV_DTYPE, OHLCVStore
+
+H = 3600 * 10**9
+T0 = pd.Timestamp("2024-01-01", tz="UTC").value
+
+
+def _bars(closes, start=T0):
+    recs = np.zeros(len(closes), dtype=OHLCV_DTYPE)
+    recs["ts"] = start + np.arange(len(closes)) * H
+    for f in ("open", "high", "low", "close"):
+        recs[f] = closes
+    recs["volume"] = 1.0
+    return recs
+
+
+def test_known_round_trip():
+    acc = PnLAccumulator("1h", fee_bps=0)
+    bars = _bars([100.0, 110.0, 121.0, 110.0])
+    # BUY bar 0 açılışında, SELL bar 2 açılışında: yalnız 100 -> 110 taşınır
+    acc.update(np.array([T0, T0 + 2 * H]), np.array([1.0, 0.0]), bars)
+    out = acc.result()
+    assert out["profit_pct"] == pytest.approx(10.0)
+    assert (out["trades"], out["win_rate"]) == (1, 1.0)
+    assert out["max_drawdown"] == pytest.approx(0.0)
+
+
+def test_chunked_updates_match_single_pass():
+    rng = np.random.default_rng(3)
+    n = 2000
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    bars = _bars(closes)
+    sig_ts = np.sort(rng.choice(bars["ts"], 300, replace=False)) + 17
+    sig_pos = rng.choice([1.0, 0.0, np.nan], len(sig_ts))
+
+    one = PnLAccumulator("1h", fee_bps=10)
+    one.update(sig_ts, sig_pos, bars)
+    one.update(np.empty(0, dtype=np.int64), np.empty(0), bars[:0])
+
+    many = PnLAccumulator("1h", fee_bps=10)
+    last = None
+    for chunk in np.array_split(np.arange(len(sig_ts)), 37):
+        ts, pos = sig_ts[chunk], sig_pos[chunk]
+        sel = (bars["ts"] <= ts[-1]) if last is None else (bars["ts"] > last) & (bars["ts"] <= ts[-1])
+        many.update(ts, pos, bars[sel])
+        last = ts[-1] if not sel.any() else max(last or 0, int(bars["ts"][sel][-1]))
+    many.update(np.empty(0, dtype=np.int64), np.empty(0), bars[bars["ts"] > last])
+
+    a, b = one.result(), many.result()
+    assert a["trades"] > 10 and a["bars"] > 0
+    for k in ("profit_pct", "max_drawdown", "sharpe_ratio", "win_rate"):
+        assert b[k] == pytest.approx(a[k], rel=1e-9, abs=1e-9)
+    assert b["trades"] == a["trades"]
+
+
+def test_run_backtest_streams_dbh_and_saves(tmp_path):
+    from backend import create_app, db
+    from backend.db.models import BacktestResult, DBHData
+
+    app = create_app()
+    store = OHLCVStore(str(tmp_path))
+    closes = [100.0, 101.0, 103.0, 102.0, 105.0, 107.0, 104.0, 108.0]
+    store.append("BTC/USDT", "1h", pd.DataFrame(_bars(closes)).assign(ts=lambda d: pd.to_datetime(d["ts"], utc=True)))
+    book = RuleBook(None, {"moderate": {
+        "buy": [{"metric": "rsi", "operator": "<", "value": 30, "weight": 20}],
+        "sell": [{"metric": "rsi", "operator": ">", "value": 70, "weight": 20}],
+        "threshold": 1,
+    }})
+    engine = SimpleNamespace(decide_frame=lambda f, p: book.profile(p).decide_columns(f))
+
+    with app.app_context():
+        db.create_all()
+        for i, rsi in enumerate([20, 50, 80, 25, 50, 50, 75]):
+            ts = pd.Timestamp(T0 + i * H, tz="UTC").tz_localize(None).isoformat()
+            db.session.add(DBHData(coin="bitcoin", timestamp=ts, rsi=rsi, volatility=0.0))
+        db.session.commit()
+
+        full = run_backtest(engine, "bitcoin", "moderate", "2024-01-01", "2024-01-02", fee_bps=0, store=store)
+        chunked = run_backtest(engine, "bitcoin", "moderate", "2024-01-01", "2024-01-02", fee_bps=0, chunk_rows=2, store=store)
+        assert full["signals"] == 7 and full["bars"] == len(closes)
+        # giriş/çıkış bar açılışında (= önceki kapanış): BUY@0 SELL@2 100->101,
+        # BUY@3 SELL@6 103->107
+        expected = (101 / 100) * (107 / 103) - 1
+        assert full["profit_pct"] == pytest.approx(expected * 100)
+        assert full["trades"] == 2 and full["win_rate"] == 1.0
+        assert chunked["profit_pct"] == pytest.approx(full["profit_pct"])
+
+        rec_id = save_result("bitcoin", "moderate", "2024-01-01", "2024-01-02", full)
+        rec = db.session.get(BacktestResult, rec_id)
+        assert rec.total_trades == 2 and rec.sharpe_ratio == pytest.approx(full["sharpe_ratio"])
+        DBHData.query.delete()
+        BacktestResult.query.delete()
+        db.session.commit()
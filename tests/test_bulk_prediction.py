@@ -27,7 +27,9 @@ def test_generate_predictions_for_all_coins(monkeypatch):
             lambda symbol: {"symbol": symbol.upper()},
         )
         monkeypatch.setattr(
-            bulk_prediction, "fetch_current_price", lambda symbol: 100.0
+            bulk_prediction,
+            "fetch_current_prices",
+            lambda symbols: {s: 100.0 for s in symbols},
         )
 
         created = bulk_prediction.generate_predictions_for_all_coins(limit=2)
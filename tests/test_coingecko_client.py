@@ -0,0 +1,192 @@
+import threading
+import time
+
+import pytest
+
+from backend.services import coingecko
+from backend.services.coingecko import (CoinGeckoClient, RateLimited,
+                                        ResponseCache, TokenBucket, _take)
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        return None
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.price = 100.0
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls.append((url, dict(params or {})))
+        time.sleep(self.delay)
+        if url.endswith("simple/price"):
+            vs = params["vs_currencies"]
+            return FakeResponse({i: {vs: self.price} for i in params["ids"].split(",")})
+        return FakeResponse({"url": url, "n": len(self.calls)})
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _client(session, clock=time.time, **kw):
+    bucket = TokenBucket("test", rate=1000, capacity=1000, redis_client=None)
+    cache = ResponseCache(redis_client=None, clock=clock)
+    return CoinGeckoClient(session=session, bucket=bucket, cache=cache, clock=clock, **kw)
+
+
+def test_concurrent_lookups_merge_into_one_request():
+    session = FakeSession()
+    client = _client(session, batch_wait_ms=100)
+    coins = [f"coin{i}" for i in range(8)]
+    results = {}
+    barrier = threading.Barrier(len(coins))
+
+    def worker(coin):
+        barrier.wait()
+        results[coin] = client.simple_price([coin])
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in coins]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(session.calls) == 1
+    assert sorted(session.calls[0][1]["ids"].split(",")) == sorted(coins)
+    assert all(results[c] == {c: {"usd": 100.0}} for c in coins)
+
+    # önbellekten: yeni istek yok
+    assert client.simple_price(coins[:3]) == {c: {"usd": 100.0} for c in coins[:3]}
+    assert len(session.calls) == 1
+
+
+def test_large_batches_are_chunked():
+    session = FakeSession()
+    client = _client(session, batch_wait_ms=1, max_ids=3)
+    out = client.simple_price([f"c{i}" for i in range(7)])
+    assert len(out) == 7
+    assert [len(p["ids"].split(",")) for _, p in session.calls] == [3, 3, 1]
+
+
+def test_stale_entries_served_while_revalidating():
+    clock = Clock()
+    session = FakeSession(delay=0.05)
+    client = _client(session, clock=clock, ttl=30, stale_ttl=300, batch_wait_ms=1)
+    assert client.simple_price(["bitcoin"]) == {"bitcoin": {"usd": 100.0}}
+
+    session.price = 200.0
+    clock.now += 60  # bayat ama stale penceresi içinde
+    t0 = time.perf_counter()
+    assert client.simple_price(["bitcoin"]) == {"bitcoin": {"usd": 100.0}}
+    assert time.perf_counter() - t0 < 0.04  # arka plan isteğini beklemedi
+    deadline = time.time() + 2
+    while len(session.calls) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert client.simple_price(["bitcoin"]) == {"bitcoin": {"usd": 200.0}}
+
+    clock.now += 10_000  # stale penceresi de geçti: eşzamanlı çekilir
+    session.price = 300.0
+    assert client.simple_price(["bitcoin"]) == {"bitcoin": {"usd": 300.0}}
+
+
+def test_get_json_caches_and_single_flights():
+    session = FakeSession(delay=0.05)
+    client = _client(session)
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(client.get_json("coins/markets", {"page": 1}))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(session.calls) == 1
+    assert all(o == out[0] for o in out)
+    client.get_json("coins/markets", {"page": 1})
+    assert len(session.calls) == 1
+
+
+def test_token_bucket_refill_maths():
+    tokens, wait = _take(0.0, 0.0, 0.5, rate=2.0, capacity=5.0)
+    assert (tokens, wait) == (0.0, 0.0)
+    tokens, wait = _take(0.0, 0.0, 0.25, rate=2.0, capacity=5.0)
+    assert tokens == pytest.approx(0.5) and wait == pytest.approx(0.25)
+    tokens, _ = _take(3.0, 0.0, 100.0, rate=2.0, capacity=5.0)
+    assert tokens == pytest.approx(4.0)
+
+
+def test_token_bucket_waits_then_gives_up():
+    clock = Clock()
+    slept = []
+
+    def sleep(s):
+        slept.append(s)
+        clock.now += s
+
+    bucket = TokenBucket("t", rate=1.0, capacity=2.0, redis_client=None, clock=clock, sleep=sleep)
+    assert bucket.acquire(max_wait=0) and bucket.acquire(max_wait=0)
+    assert not bucket.acquire(max_wait=0.5)
+    assert bucket.acquire(max_wait=2)
+    assert slept and slept[-1] == pytest.approx(1.0)
+
+
+def test_get_simple_price_reports_rate_limit(monkeypatch):
+    class Denied(TokenBucket):
+        def acquire(self, max_wait=0):
+            return False
+
+    client = CoinGeckoClient(
+        session=FakeSession(),
+        bucket=Denied("d", redis_client=None),
+        cache=ResponseCache(redis_client=None),
+        batch_wait_ms=1,
+    )
+    monkeypatch.setattr(coingecko, "_CG_CLIENT", client)
+    assert coingecko.get_simple_price("bitcoin")["error"] == "rate_limited"
+    with pytest.raises(RateLimited):
+        client.get_json("ping")
+
+
+def test_cache_is_bounded_and_prefers_newer_redis_copy():
+    import fakeredis
+
+    clock = Clock()
+    r = fakeredis.FakeRedis()
+    worker_a = ResponseCache(redis_client=r, clock=clock, max_entries=2)
+    worker_b = ResponseCache(redis_client=r, clock=clock)
+    worker_a.set_many({"k1": 1, "k2": 2, "k3": 3}, keep=600)
+    assert list(worker_a._local) == ["k2", "k3"]
+
+    clock.now += 60
+    worker_b.set_many({"k3": 33}, keep=600)  # başka işçi yeniledi
+    assert worker_a.get_many(["k3"])["k3"][1] == 3  # taze sayılır: yerel kopya
+    assert worker_a.get_many(["k3"], max_age=30)["k3"] == (clock.now, 33)
+    assert worker_a.get_many(["k1"])["k1"][1] == 1  # Redis'ten geri gelir
+
+
+def test_get_simple_price_reports_batch_timeout(monkeypatch):
+    class Stuck(CoinGeckoClient):
+        def _enqueue(self, coin, vs_currency):
+            return coingecko.Future()  # parti hiç yanıtlanmaz
+
+    client = Stuck(
+        session=FakeSession(),
+        bucket=TokenBucket("s", redis_client=None),
+        cache=ResponseCache(redis_client=None),
+        timeout=0.01,
+    )
+    monkeypatch.setattr(coingecko, "COINGECKO_MAX_WAIT", -0.99)  # bekleme ~0.02 s
+    monkeypatch.setattr(coingecko, "_CG_CLIENT", client)
+    assert coingecko.get_simple_price("bitcoin")["error"] == "timeout"
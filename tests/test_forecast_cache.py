@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import fakeredis
+
+from backend.core import forecast_cache
+from backend.core.forecast_cache import ForecastCache
+
+
+def _series(n=40, start=0):
+    prices = [100.0 + i for i in range(start, start + n)]
+    times = [f"2024-01-{(i % 28) + 1:02d}T{i // 28:02d}:00:00" for i in range(start, start + n)]
+    return prices, times
+
+
+def _counting_fit(calls, delay=0.0):
+    def fit(prices, times, days):
+        calls.append(times[-1])
+        time.sleep(delay)
+        return {"yhat": [prices[-1]] * days, "upper": [prices[-1] + 1] * days, "lower": [prices[-1] - 1] * days, "dates": ["d"] * days}
+
+    return fit
+
+
+def test_fresh_hit_skips_fit():
+    calls = []
+    cache = ForecastCache(fakeredis.FakeRedis(), inline=True, fit=_counting_fit(calls))
+    prices, times = _series()
+    r1, s1 = cache.get("bitcoin", prices, times, 3)
+    r2, s2 = cache.get("bitcoin", prices, times, 3)
+    assert (s1, s2) == ("computed", "fresh")
+    assert r1 == r2 and len(calls) == 1
+    # farklı ufuk ayrı anahtar
+    assert cache.get("bitcoin", prices, times, 1)[1] == "computed"
+
+
+def test_shared_across_instances_via_redis():
+    r = fakeredis.FakeRedis()
+    calls = []
+    prices, times = _series()
+    ForecastCache(r, inline=True, fit=_counting_fit(calls)).get("eth", prices, times, 1)
+    _, status = ForecastCache(r, inline=True, fit=_counting_fit(calls)).get("eth", prices, times, 1)
+    assert status == "fresh" and len(calls) == 1
+
+
+def test_stale_served_and_revalidated_once():
+    calls = []
+    gate = threading.Event()
+
+    def slow_fit(prices, times, days):
+        gate.wait(5)
+        return _counting_fit(calls)(prices, times, days)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        cache = ForecastCache(fakeredis.FakeRedis(), fit=slow_fit, executor=pool)
+        prices, times = _series()
+        cache._store(cache._key("bitcoin", 1), times[-1], _counting_fit([])(prices, times, 1))
+
+        new_prices, new_times = _series(start=1)
+        old, status = cache.get("bitcoin", new_prices, new_times, 1)
+        assert status == "stale" and old["yhat"] == [prices[-1]]
+        # aynı anahtar yenilenirken ikinci istek yeni fit başlatmaz
+        assert cache.get("bitcoin", new_prices, new_times, 1)[1] == "stale"
+        gate.set()
+    assert calls == [new_times[-1]]
+    result, status = cache.get("bitcoin", new_prices, new_times, 1)
+    assert status == "fresh" and result["yhat"] == [new_prices[-1]]
+
+
+def test_timeout_returns_none(monkeypatch):
+    monkeypatch.setattr(forecast_cache, "FORECAST_FIT_TIMEOUT", 0.05)
+    gate = threading.Event()
+
+    def stuck(prices, times, days):
+        gate.wait(5)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        cache = ForecastCache(None, fit=stuck, executor=pool)
+        prices, times = _series()
+        assert cache.get("bitcoin", prices, times, 1) == (None, "timeout")
+        gate.set()
+
+
+def test_without_coin_name_not_cached():
+    calls = []
+    cache = ForecastCache(None, inline=True, fit=_counting_fit(calls))
+    prices, times = _series()
+    cache.get(None, prices, times, 1)
+    cache.get(None, prices, times, 1)
+    assert len(calls) == 2 and not cache._local
+
+
+def test_failed_submit_releases_key():
+    r = fakeredis.FakeRedis()
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.shutdown()
+    cache = ForecastCache(r, fit=_counting_fit([]), executor=pool)
+    prices, times = _series()
+    key = cache._key("bitcoin", 1)
+    cache._store(key, times[-1], _counting_fit([])(prices, times, 1))
+
+    new_prices, new_times = _series(start=1)
+    assert cache.get("bitcoin", new_prices, new_times, 1)[1] == "stale"
+    assert key not in cache._inflight and r.get(f"{key}:lock") is None
+
+
+def test_broken_pool_is_recreated(monkeypatch):
+    class Broken:
+        _broken = "child died"
+        shut = False
+
+        def shutdown(self, **kw):
+            Broken.shut = True
+
+    monkeypatch.setattr(forecast_cache, "_pool", Broken())
+    monkeypatch.setattr(forecast_cache, "_pool_pid", os.getpid())
+    pool = forecast_cache._get_pool()
+    try:
+        assert not isinstance(pool, Broken) and Broken.shut
+    finally:
+        pool.shutdown()
@@ -0,0 +1,79 @@
+import subprocess
+import sys
+
+import pytest
+
+from backend.utils.importtime import parse_importtime
+from backend.utils.lazy import lazy_attr, lazy_import, module_available
+
+
+def test_lazy_module_loads_on_first_attribute_access():
+    code = (
+        "import sys\n"
+        "from backend.utils.lazy import lazy_import\n"
+        "m = lazy_import('json.tool')\n"
+        "assert 'json.tool' not in sys.modules and not m.loaded\n"
+        "assert callable(m.main) and m.loaded and 'json.tool' in sys.modules\n"
+        "n = lazy_import('json.decoder')\n"
+        "assert bool(n) and n.loaded\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_missing_module_is_falsy_and_raises_on_use():
+    missing = lazy_import("oq_definitely_missing_mod")
+    assert not missing
+    with pytest.raises(ImportError):
+        missing.anything
+    attr = lazy_attr("oq_definitely_missing_mod", "Thing")
+    assert not attr
+    with pytest.raises(ImportError):
+        attr()
+
+
+def test_truthiness_tries_the_real_import(tmp_path, monkeypatch):
+    (tmp_path / "oq_broken_mod.py").write_text("raise RuntimeError('derlenmiş uzantı yüklenemedi')\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    broken = lazy_import("oq_broken_mod")
+    assert not broken and not broken  # sonuç saklanır
+    assert not lazy_attr("json", "oq_no_such_attr")
+
+
+def test_lazy_attr_calls_through():
+    dumps = lazy_attr("json", "dumps")
+    assert dumps and dumps({"a": 1}) == '{"a": 1}'
+
+
+def test_module_available_does_not_import():
+    code = (
+        "import sys\n"
+        "from backend.utils.lazy import module_available\n"
+        "assert module_available('json.tool') and 'json.tool' not in sys.modules\n"
+        "assert not module_available('oq_definitely_missing_mod')\n"
+        "assert not module_available('oq_definitely_missing_mod.sub')\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_heavy_modules_not_imported_by_services_modules():
+    code = (
+        "import sys\n"
+        "import backend.ml.train, backend.ml.pipeline, backend.core.sentiment\n"
+        "heavy = [m for m in ('sklearn', 'lightgbm', 'transformers', 'prophet') if m in sys.modules]\n"
+        "assert not heavy, heavy\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     json.decoder\n"
+        "import time:       300 |        420 |   json\n"
+        "noise\n"
+    )
+    recs = parse_importtime(stderr)
+    assert [(r.name, r.self_us, r.cumulative_us, r.depth) for r in recs] == [
+        ("json.decoder", 120, 120, 2),
+        ("json", 300, 420, 1),
+    ]
@@ -0,0 +1,95 @@
+import pandas as pd
+
+from backend.marketdata import OHLCVStore
+from backend.marketdata.ingest import Watermarks, fetch_ccxt_since, ingest
+
+HOUR_MS = 3_600_000
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.h = {}
+        self.hset_calls = 0
+
+    def hget(self, key, field):
+        return self.h.get(field)
+
+    def hset(self, key, mapping):
+        self.hset_calls += 1
+        self.h.update(mapping)
+
+
+class _FakeExchange:
+    def __init__(self, start_ms, n):
+        self.bars = [[start_ms + i * HOUR_MS, 1.0, 2.0, 0.5, float(i), 10.0] for i in range(n)]
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        self.calls.append(since)
+        return [b for b in self.bars if b[0] >= since][:limit]
+
+
+def _now_hour_ms():
+    return int(pd.Timestamp.now(tz="UTC").floor("h").value // 10**6)
+
+
+def test_fetch_ccxt_since_paginates():
+    start = _now_hour_ms() - 30 * HOUR_MS
+    ex = _FakeExchange(start, 30)
+    df = fetch_ccxt_since(ex, "BTC/USDT", "1h", start, page_limit=10, now_ms=start + 30 * HOUR_MS)
+    assert len(df) == 30
+    assert ex.calls == [start, start + 10 * HOUR_MS, start + 20 * HOUR_MS]
+
+
+def test_ingest_fetches_only_bars_after_watermark(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    redis = _FakeRedis()
+    wms = Watermarks(redis, store)
+    start = _now_hour_ms() - 49 * HOUR_MS
+    ex = _FakeExchange(start, 50)  # son bar henüz kapanmadı
+    fetch = lambda s, tf, since: fetch_ccxt_since(ex, s, tf, since)
+
+    counts = ingest("binance", [("BTC/USDT", "1h")], fetch, watermarks=wms, store=store, bootstrap_bars=100)
+    assert counts == {"BTC/USDT|1h": 49}
+    assert redis.hset_calls == 1
+    assert int(redis.h["binance|BTC/USDT|1h"]) == start + 48 * HOUR_MS
+
+    ex.calls.clear()
+    counts = ingest("binance", [("BTC/USDT", "1h")], fetch, watermarks=wms, store=store)
+    assert counts == {"BTC/USDT|1h": 0}
+    assert ex.calls == [start + 49 * HOUR_MS]
+    assert len(store.read("BTC/USDT", "1h")) == 49
+
+
+def test_watermark_falls_back_to_store(tmp_path):
+    class _Down:
+        def hget(self, *a):
+            raise ConnectionError
+
+    store = OHLCVStore(str(tmp_path))
+    idx = pd.date_range("2024-01-01", periods=3, freq="h", tz="UTC")
+    store.append("ETH/USDT", "1h", pd.DataFrame({"close": [1.0, 2.0, 3.0]}, index=idx))
+    wm = Watermarks(_Down(), store).get("binance", "ETH/USDT", "1h")
+    assert wm == int(idx[-1].value // 10**6)
+
+
+def test_empty_local_store_ignores_shared_watermark(tmp_path):
+    redis = _FakeRedis()
+    redis.h["binance|BTC/USDT|1h"] = str(_now_hour_ms())  # başka hostun watermark'ı
+    store = OHLCVStore(str(tmp_path))
+    wms = Watermarks(redis, store)
+    assert wms.get("binance", "BTC/USDT", "1h") is None
+
+    idx = pd.date_range("2024-01-01", periods=3, freq="h", tz="UTC")
+    store.append("BTC/USDT", "1h", pd.DataFrame({"close": [1.0, 2.0, 3.0]}, index=idx))
+    assert wms.get("binance", "BTC/USDT", "1h") == int(idx[-1].value // 10**6)
+
+
+def test_period_to_bars():
+    from backend.marketdata.ingest import period_to_bars
+
+    assert period_to_bars("720d", "1d") == 720
+    assert period_to_bars("1y", "1d") == 365
+    assert period_to_bars("6mo", "1d") == 180
+    assert period_to_bars("5d", "1h") == 120
+    assert period_to_bars("max", "1d") > 10_000
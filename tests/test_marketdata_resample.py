@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from backend.marketdata import OHLCVStore, Resampler, read_or_fetch, resample_records
+from backend.marketdata.store import frame_to_records
+
+
+def _hourly(start, n):
+    idx = pd.date_range(start, periods=n, freq="h", tz="UTC")
+    close = np.arange(n, dtype=float) + 100
+    return pd.DataFrame(
+        {"open": close - 0.5, "high": close + 1, "low": close - 1, "close": close, "volume": np.ones(n)},
+        index=idx,
+    )
+
+
+def test_resample_matches_pandas_aggregation():
+    df = _hourly("2024-01-01", 48)
+    out = resample_records(frame_to_records(df), "4h", base_tf="1h")
+    ref = df.resample("4h").agg({"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+    assert len(out) == 12
+    np.testing.assert_array_equal(out["open"], ref["open"].to_numpy())
+    np.testing.assert_array_equal(out["high"], ref["high"].to_numpy())
+    np.testing.assert_array_equal(out["close"], ref["close"].to_numpy())
+    np.testing.assert_array_equal(out["volume"], ref["volume"].to_numpy())
+
+
+def test_resample_drops_open_bucket_and_aligns_weeks():
+    df = _hourly("2024-01-01", 30)  # 2024-01-01 pazartesi
+    daily = resample_records(frame_to_records(df), "1d", base_tf="1h")
+    assert len(daily) == 1  # ikinci gün henüz kapanmadı
+    weekly = resample_records(frame_to_records(df), "1w", closed_only=False)
+    assert pd.Timestamp(weekly["ts"][0], tz="UTC") == pd.Timestamp("2024-01-01", tz="UTC")
+
+
+def test_resampler_extends_cache_incrementally(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    df = _hourly("2024-01-01", 72)
+    store.append("BTC/USDT", "1h", df.iloc[:48])
+    rs = Resampler(store)
+    assert rs.base_for("BTC/USDT", "1d") == "1h"
+    assert len(rs.read("BTC/USDT", "1d")) == 2
+    store.append("BTC/USDT", "1h", df.iloc[48:])
+    daily = rs.read("BTC/USDT", "1d")
+    assert len(daily) == 3
+    assert daily["close"][-1] == df["close"].iloc[-1]
+
+
+def test_resample_drops_partial_and_gapped_buckets():
+    df = _hourly("2024-01-01 02:00", 70)  # ilk gün 22 saatle yarım başlar
+    df = df.drop(df.index[30])  # ikinci günde bir saat eksik
+    daily = resample_records(frame_to_records(df), "1d", base_tf="1h")
+    assert [pd.Timestamp(t, tz="UTC").day for t in daily["ts"]] == [3]
+    assert len(resample_records(frame_to_records(df), "1d", closed_only=False)) == 3
+
+
+def test_resampler_rebuilds_after_backfill(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    df = _hourly("2024-01-01", 72)
+    store.append("BTC/USDT", "1h", df.drop(df.index[30]))
+    rs = Resampler(store)
+    assert len(rs.read("BTC/USDT", "1d")) == 2
+    # geri doldurma: ilk/son ts değişmeden ortadaki günü tamamlar
+    store.append("BTC/USDT", "1h", df.iloc[30:31])
+    daily = rs.read("BTC/USDT", "1d")
+    assert len(daily) == 3
+    assert daily["close"][1] == df["close"].iloc[47]
+    store.compact("BTC/USDT", "1h")
+    np.testing.assert_array_equal(rs.read("BTC/USDT", "1d"), daily)
+
+
+def test_read_or_fetch_derives_higher_timeframe_without_fetch(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    now = pd.Timestamp.now(tz="UTC").floor("4h")
+    store.append("ETH/USDT", "1h", _hourly(now - pd.Timedelta(hours=80), 80))
+
+    def fetch(n):
+        raise AssertionError("borsaya gidilmemeli")
+
+    df, hit = read_or_fetch("ETH/USDT", "4h", 10, fetch, store=store)
+    assert hit and len(df) == 10
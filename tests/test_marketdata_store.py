@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.marketdata import OHLCVStore, closed_bars, read_or_fetch, timeframe_to_timedelta
+
+
+def _mk_df(start="2024-01-30", n=72, freq="h"):
+    idx = pd.date_range(start, periods=n, freq=freq, tz="UTC")
+    return pd.DataFrame(
+        {
+            "open": np.arange(n, dtype=float),
+            "high": np.arange(n, dtype=float) + 1,
+            "low": np.arange(n, dtype=float) - 1,
+            "close": np.arange(n, dtype=float),
+            "volume": np.ones(n),
+        },
+        index=idx,
+    )
+
+
+def test_append_partitions_by_month_and_skips_duplicates(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    df = _mk_df()
+    assert store.append("BTC/USDT", "1h", df) == 72
+    assert store.append("BTC/USDT", "1h", df.iloc[60:]) == 0
+    months = sorted(p.name for p in (tmp_path / "BTC_USDT" / "1h").iterdir() if p.is_dir())
+    assert months == ["2024-01", "2024-02"]
+    assert store.last_ts("BTC/USDT", "1h") == df.index[-1]
+
+
+def test_range_read_within_segment_is_zero_copy(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    store.append("BTC/USDT", "1h", _mk_df())
+    recs = store.read("BTC/USDT", "1h", "2024-01-30 05:00", "2024-01-30 07:00")
+    assert isinstance(recs, np.memmap)
+    assert list(recs["close"]) == [5.0, 6.0, 7.0]
+    assert len(store.read("BTC/USDT", "1h")) == 72
+
+
+def test_tail_and_compact(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    df = _mk_df("2024-03-01", n=30)
+    for i in range(0, 30, 10):
+        store.append("ETH/USDT", "1h", df.iloc[i : i + 10])
+    assert len(store.segments("ETH/USDT", "1h")) == 3
+    assert store.compact("ETH/USDT", "1h") == 3
+    assert len(store.segments("ETH/USDT", "1h")) == 1
+    tail = store.tail_frame("ETH/USDT", "1h", 5)
+    assert list(tail["close"]) == [25.0, 26.0, 27.0, 28.0, 29.0]
+
+
+def test_closed_bars_drops_open_candle():
+    df = _mk_df("2024-01-01", n=3)
+    now = df.index[-1] + pd.Timedelta(minutes=30)
+    assert len(closed_bars(df, "1h", now=now)) == 2
+
+
+def test_read_or_fetch_serves_fresh_store(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    now = pd.Timestamp.now(tz="UTC").floor("h")
+    df = _mk_df(now - pd.Timedelta(hours=100), n=101)
+    calls = []
+
+    def fetch(n):
+        calls.append(n)
+        return df.iloc[-n:]
+
+    out, hit = read_or_fetch("SOL/USDT", "1h", 50, fetch, store=store)
+    assert not hit and calls == [50]
+    out, hit = read_or_fetch("SOL/USDT", "1h", 40, fetch, store=store)
+    assert hit and len(out) == 40 and calls == [50]
+
+
+def test_timeframe_parsing():
+    assert timeframe_to_timedelta("15m") == pd.Timedelta(minutes=15)
+    assert timeframe_to_timedelta("1w") == pd.Timedelta(days=7)
+    with pytest.raises(ValueError):
+        timeframe_to_timedelta("1M")
+
+
+@pytest.mark.parametrize("symbol", ["..", ".", "BTC\\USDT", ""])
+def test_symbols_cannot_escape_store_root(tmp_path, symbol):
+    store = OHLCVStore(str(tmp_path / "store"))
+    with pytest.raises(ValueError):
+        store.append(symbol, "1d", _mk_df(n=2))
+    with pytest.raises(ValueError):
+        store.append("BTC", "../..", _mk_df(n=2))
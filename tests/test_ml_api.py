@@ -7,3 +7,115 @@ def test_ml_predict_smoke(client):
     data = resp.get_json()
     assert "y_hat" in data and "prob_up" in data and "variant" in data
 
+
+
+def test_ml_predict_batch_smoke(client):
+    resp = client.post(
+        "/api/ml/predict_batch",
+        json={"symbols": ["BTC/USDT", "ETH/USDT"], "user_id": "u1"},
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["variant"] in {"v0", "v1"}
+    assert [r["symbol"] for r in data["results"]] == ["BTC/USDT", "ETH/USDT"]
+    assert all("y_hat" in r and "prob_up" in r for r in data["results"])
+
+
+def test_ml_predict_batch_requires_symbols(client):
+    resp = client.post("/api/ml/predict_batch", json={"symbols": []})
+    assert resp.status_code == 400
+
+
+def test_ml_predict_debug_returns_stage_timings(client):
+    resp = client.post("/api/ml/predict", json={"symbol": "BTC/USDT", "debug": True})
+    assert resp.status_code == 200
+    timings = resp.get_json()["timings_ms"]
+    assert {"registry_read", "data_load", "features", "predict", "total"} <= set(timings)
+
+    from backend.observability.metrics import REGISTRY
+
+    counts = [
+        s.value
+        for m in REGISTRY.collect()
+        if m.name == "ml_stage_duration_seconds"
+        for s in m.samples
+        if s.name.endswith("_count") and s.labels["op"] == "predict" and s.labels["stage"] == "features"
+    ]
+    assert sum(counts) >= 1
+
+
+def test_ml_predict_records_stages_of_failed_calls(monkeypatch):
+    import pytest
+
+    from backend.ml import service
+    from backend.observability.metrics import REGISTRY
+
+    def _data_load_count():
+        return sum(
+            s.value
+            for m in REGISTRY.collect()
+            if m.name == "ml_stage_duration_seconds"
+            for s in m.samples
+            if s.name.endswith("_count") and s.labels["op"] == "predict" and s.labels["stage"] == "data_load"
+        )
+
+    def _fail(symbol, days):
+        raise TimeoutError("depo yanıt vermedi")
+
+    before = _data_load_count()
+    monkeypatch.setattr(service, "load_ohlcv", _fail)
+    with pytest.raises(TimeoutError):
+        service.predict("BTC/USDT")
+    assert _data_load_count() == before + 1
+
+
+def test_ml_predict_rejects_path_like_symbols(client):
+    assert client.post("/api/ml/predict", json={"symbol": ".."}).status_code == 400
+    assert client.post("/api/ml/predict_batch", json={"symbols": ["BTC/USDT", ".."]}).status_code == 400
+
+
+def test_ml_predict_batch_serves_assigned_variant(client, monkeypatch):
+    import numpy as np
+    from backend.ml import service
+    from backend.ml.model_cache import LoadedModel
+
+    class _Const:
+        def predict(self, X):
+            return np.full(len(X), 0.9)
+
+    model = LoadedModel("oq_return", "t1", _Const(), _Const(), 0)
+    monkeypatch.setattr(service, "_get_model", lambda version=None: model)
+    for user_id, expected in (("u1", "v1"), ("u2", "v0")):
+        data = client.post(
+            "/api/ml/predict_batch", json={"symbols": ["BTC/USDT"], "user_id": user_id}
+        ).get_json()
+        assert data["variant"] == expected
+        assert {r["variant"] for r in data["results"]} == {expected}
+
+
+def test_ml_predict_batch_serves_version_pinned_to_variant(monkeypatch):
+    import numpy as np
+    from backend.ml import service
+    from backend.ml.model_cache import LoadedModel
+
+    class _Const:
+        def predict(self, X):
+            return np.full(len(X), 0.9)
+
+    models = {v: LoadedModel("oq_return", v or "latest", _Const(), _Const(), 0) for v in (None, "v2024")}
+    requested = []
+
+    def _get_model(version=None):
+        requested.append(version)
+        return models.get(version)
+
+    monkeypatch.setattr(service, "_get_model", _get_model)
+    monkeypatch.setattr(service, "VARIANT_VERSIONS", {"canary": "v2024", "gone": "v1999"})
+    res = service.predict_batch(["BTC/USDT"], variant="canary")
+    assert requested == ["v2024"]
+    assert {(r["variant"], r["model_version"]) for r in res} == {("canary", "v2024")}
+
+    requested.clear()
+    res = service.predict_batch(["BTC/USDT"], variant="gone")
+    assert requested == ["v1999", None]
+    assert {r["model_version"] for r in res} == {"latest"}
@@ -0,0 +1,38 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from backend.ml.artifacts import flatten, load_model, save_model
+
+
+def _data(n=300):
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(n, 7))
+    y = X[:, 0] - 0.5 * X[:, 3] + rng.normal(size=n) * 0.1
+    return X, y
+
+
+def test_flat_forest_matches_sklearn():
+    X, y = _data()
+    reg = RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y)
+    cls = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y > 0)
+    Xt = _data(50)[0] * 1.3
+    np.testing.assert_allclose(flatten(reg).predict(Xt), reg.predict(Xt))
+    np.testing.assert_allclose(flatten(cls).predict_proba(Xt), cls.predict_proba(Xt))
+    assert (flatten(cls).predict(Xt) == cls.predict(Xt)).all()
+
+
+def test_saved_forest_loads_memory_mapped(tmp_path):
+    X, y = _data()
+    reg = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+    path = str(tmp_path / "reg.joblib")
+    save_model(reg, path)
+    loaded = load_model(path)
+    assert isinstance(loaded.threshold, np.memmap)
+    assert not loaded.threshold.flags.writeable
+    np.testing.assert_allclose(loaded.predict(X[:5]), reg.predict(X[:5]))
+
+
+def test_unsupported_models_are_saved_as_is(tmp_path):
+    path = str(tmp_path / "m.joblib")
+    save_model({"kind": "other"}, path)
+    assert load_model(path) == {"kind": "other"}
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.marketdata import OHLCVStore
+from backend.ml import data
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = OHLCVStore(str(tmp_path / "md"))
+    monkeypatch.setattr(data, "get_store", lambda: s)
+    monkeypatch.setattr(data, "CACHE_DIR", str(tmp_path / "legacy"))
+    data._frames.clear()
+    return s
+
+
+def test_load_ohlcv_bootstraps_in_memory_only(store):
+    df1 = data.load_ohlcv("BTC/USDT", days=30)
+    assert len(df1) == 30
+    assert df1.index[-1] == pd.Timestamp.now(tz="UTC").floor("D") - pd.Timedelta(days=1)
+    assert data.load_ohlcv("BTC/USDT", days=30) is df1
+    # sentetik veri paylaşılan depoya yazılmaz
+    assert store.version("BTC/USDT", data.TIMEFRAME) == 0
+    assert store.timeframes("BTC/USDT") == []
+
+
+def test_load_ohlcv_never_writes_missing_days(store):
+    idx = pd.date_range(end=pd.Timestamp.now(tz="UTC").floor("D") - pd.Timedelta(days=3), periods=10, freq="D")
+    store.append("ETH/USDT", data.TIMEFRAME, pd.DataFrame({"close": range(10)}, index=idx, dtype=float))
+    version = store.version("ETH/USDT", data.TIMEFRAME)
+    df = data.load_ohlcv("ETH/USDT")
+    assert len(df) == 10 and df.index[-1] == idx[-1]
+    assert data.load_ohlcv("ETH/USDT") is df
+    assert store.version("ETH/USDT", data.TIMEFRAME) == version
+    # gerçek bar eklenince (ingest) yazılır ve önbellek geçersiz olur
+    today = idx[-1] + pd.Timedelta(days=3)
+    assert store.append("ETH/USDT", data.TIMEFRAME, pd.DataFrame({"close": [42.0]}, index=[today])) == 1
+    fresh = data.load_ohlcv("ETH/USDT")
+    assert len(fresh) == 11 and fresh["close"].iloc[-1] == 42.0
+
+
+def test_ml_reads_keep_other_readers_caches_valid(store, monkeypatch):
+    from backend.marketdata import Resampler
+
+    idx = pd.date_range(end=pd.Timestamp.now(tz="UTC").floor("D") - pd.Timedelta(days=5), periods=40, freq="D")
+    store.append("SOL/USDT", data.TIMEFRAME, pd.DataFrame({"close": range(40)}, index=idx, dtype=float))
+    rs = Resampler(store)
+    weekly = rs.read("SOL/USDT", "1w")
+    version = store.version("SOL/USDT", data.TIMEFRAME)
+    for _ in range(3):
+        data.load_ohlcv("SOL/USDT")
+    assert store.version("SOL/USDT", data.TIMEFRAME) == version
+    monkeypatch.setattr(store, "read", lambda *a, **k: pytest.fail("önbellek geçersiz kılınmamalı"))
+    np.testing.assert_array_equal(rs.read("SOL/USDT", "1w"), weekly)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.marketdata import OHLCVStore
+from backend.ml import data, feature_store
+from backend.ml.feature_store import FeatureStore
+from backend.ml.features import FEATURES, build_features
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = OHLCVStore(str(tmp_path / "md"))
+    monkeypatch.setattr(data, "get_store", lambda: s)
+    monkeypatch.setattr(data, "CACHE_DIR", str(tmp_path / "legacy"))
+    data._frames.clear()
+    return s
+
+
+def _bars(end, n, seed=0):
+    idx = pd.date_range(end=end, periods=n, freq="D")
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.02, n)))
+    return pd.DataFrame({"open": close, "high": close, "low": close, "close": close, "volume": 1.0}, index=idx)
+
+
+def test_incremental_rows_match_full_rebuild(store, tmp_path, monkeypatch):
+    bars = _bars(pd.Timestamp.now(tz="UTC").floor("D") + pd.Timedelta(days=20), 120)
+    store.append("BTC/USDT", data.TIMEFRAME, bars.iloc[:100])
+    fs = FeatureStore(str(tmp_path / "feat"), version="t")
+    assert len(fs.matrix("BTC/USDT", 7)) == 100 - 19 - 7
+    store.append("BTC/USDT", data.TIMEFRAME, bars.iloc[100:])
+    monkeypatch.setattr(feature_store, "rsi_state", lambda *a: pytest.fail("baştan hesaplanmamalı"))
+
+    full = build_features(bars, horizon=7)
+    got = fs.matrix("BTC/USDT", 7)
+    assert len(got) == len(full)
+    np.testing.assert_allclose(got[FEATURES].to_numpy(), full[FEATURES].to_numpy(), rtol=1e-10)
+    np.testing.assert_allclose(got["y_ret_7"].to_numpy(), full["y_ret_7"].to_numpy(), rtol=1e-10)
+    # çıkarım satırı hedefi henüz belli olmayan son bardır
+    last = build_features(bars, horizon=0)[FEATURES].iloc[-1].to_numpy()
+    np.testing.assert_allclose(fs.latest("BTC/USDT", 7).to_numpy()[0], last, rtol=1e-10)
+
+
+def test_latest_is_served_from_disk_by_new_instance(store, tmp_path, monkeypatch):
+    store.append("ETH/USDT", data.TIMEFRAME, _bars(pd.Timestamp.now(tz="UTC").floor("D"), 60))
+    root = str(tmp_path / "feat")
+    first = FeatureStore(root, version="t").latest("ETH/USDT", 7)
+    monkeypatch.setattr(feature_store, "feature_block", lambda *a: pytest.fail("yeniden hesaplanmamalı"))
+    again = FeatureStore(root, version="t").latest("ETH/USDT", 7)
+    pd.testing.assert_frame_equal(first, again)
+    assert FeatureStore(root, version="other").root != FeatureStore(root, version="t").root
@@ -0,0 +1,50 @@
+import pytest
+
+from backend.ml import metrics
+
+
+@pytest.fixture
+def r(redis_client):
+    redis_client.flushall()
+    return redis_client
+
+
+def test_window_metrics_per_variant(r):
+    now = 1_700_000_000
+    metrics.record_prediction({"variant": "v1", "correct": True, "prob_up": 0.8, "up": True, "ts": now}, client=r)
+    metrics.record_prediction({"variant": "v1", "correct": False, "prob_up": 0.6, "up": False, "ts": now}, client=r)
+    metrics.record_prediction({"variant": "v0", "correct": True, "prob_up": 0.75, "up": True, "ts": now}, client=r)
+    # pencere dışında kalan eski kova
+    metrics.record_prediction({"variant": "v1", "correct": True, "ts": now - 7200}, client=r)
+
+    v1 = metrics.aggregate("v1", window=3600, now=now, client=r)
+    assert v1["count"] == 2 and v1["acc"] == 0.5
+    assert v1["brier"] == pytest.approx((0.2**2 + 0.6**2) / 2)
+    everything = metrics.aggregate(window=3600, now=now, client=r)
+    assert everything["count"] == 3
+    assert set(everything["variants"]) == {"v0", "v1"}
+    wide = metrics.aggregate("v1", window=3 * 3600, now=now, client=r)
+    assert wide["count"] == 3
+    # olasılıksız kayıt Brier ortalamasını seyreltmez
+    assert wide["brier"] == pytest.approx(v1["brier"])
+
+
+def test_record_is_one_round_trip(r, monkeypatch):
+    calls = []
+    orig = r.pipeline
+
+    def pipeline(*a, **kw):
+        p = orig(*a, **kw)
+        execute = p.execute
+        p.execute = lambda: calls.append(1) or execute()
+        return p
+
+    monkeypatch.setattr(r, "pipeline", pipeline)
+    metrics.record_prediction({"variant": "v0", "correct": True, "prob_up": 0.5, "up": False}, client=r)
+    assert calls == [1]
+
+
+def test_metrics_endpoint_validates_window(client, r, monkeypatch):
+    monkeypatch.setattr(metrics, "_get_client", lambda: r)
+    assert client.get("/api/ml/metrics?window=1h&variant=v1").status_code == 200
+    assert client.get("/api/ml/metrics?window=abc").status_code == 400
@@ -0,0 +1,55 @@
+import json
+import os
+
+import joblib
+import pytest
+
+from backend.ml import registry
+from backend.ml.model_cache import ModelCache
+
+
+@pytest.fixture
+def reg_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "REG_FILE", str(tmp_path / "registry.json"))
+    return tmp_path
+
+
+def _publish(root, version, payload=b""):
+    out = root / "m" / version
+    out.mkdir(parents=True)
+    joblib.dump({"v": version, "pad": payload}, out / "reg.joblib")
+    joblib.dump({"v": version}, out / "cls.joblib")
+    registry.register_model_local("m", version, str(out), {})
+
+
+def test_registry_read_is_cached_until_file_changes(reg_dir, monkeypatch):
+    _publish(reg_dir, "v1")
+    calls = []
+    orig = json.load
+    monkeypatch.setattr(registry.json, "load", lambda f: calls.append(1) or orig(f))
+    registry.get_model_path("m")
+    registry.get_model_path("m")
+    assert len(calls) <= 1
+    _publish(reg_dir, "v2")
+    assert registry.get_latest_version("m") == "v2"
+
+
+def test_refresh_swaps_latest_and_keeps_pinned_versions(reg_dir):
+    _publish(reg_dir, "v1")
+    cache = ModelCache()
+    assert cache.get("m").reg["v"] == "v1"
+    _publish(reg_dir, "v2")
+    cache.refresh("m")
+    assert cache.get("m").reg["v"] == "v2"
+    assert cache.get("m", "v1").reg["v"] == "v1"
+    assert sorted(cache.versions()["m"]) == ["v1", "v2"]
+
+
+def test_lru_eviction_by_size_never_drops_latest(reg_dir):
+    for v in ("v1", "v2", "v3"):
+        _publish(reg_dir, v, payload=os.urandom(64 * 1024))
+    cache = ModelCache(max_bytes=150 * 1024)
+    cache.load("m", "v1")
+    cache.load("m", "v2")
+    cache.refresh("m")
+    assert cache.versions()["m"] == ["v2", "v3"]
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+from backend.marketdata import OHLCVStore
+from backend.ml import data, pipeline, registry
+from backend.ml.feature_store import FeatureStore
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    s = OHLCVStore(str(tmp_path / "md"))
+    monkeypatch.setattr(data, "get_store", lambda: s)
+    monkeypatch.setattr(data, "CACHE_DIR", str(tmp_path / "legacy"))
+    data._frames.clear()
+    fs = FeatureStore(str(tmp_path / "feat"), version="t")
+    monkeypatch.setattr(pipeline, "get_feature_store", lambda: fs)
+    monkeypatch.setattr(pipeline, "TRAIN_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(pipeline, "OUT_DIR", str(tmp_path / "models"))
+    monkeypatch.setattr(registry, "REG_FILE", str(tmp_path / "registry.json"))
+    monkeypatch.setattr(pipeline, "_make_model", _small_model)
+    return tmp_path
+
+
+def _small_model(kind):
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+    cls = RandomForestRegressor if kind == "reg" else RandomForestClassifier
+    return cls(n_estimators=5, random_state=0, n_jobs=1)
+
+
+def test_date_folds_never_leak_test_dates_into_training():
+    ts = np.repeat(np.arange(60), 3)  # 3 sembol, 60 gün
+    folds = pipeline.date_folds(ts, 5)
+    assert len(folds) == 5
+    for end, stop in folds:
+        assert ts[end - 1] < ts[end]
+        assert stop == len(ts) or ts[stop - 1] < ts[stop]
+    assert folds[-1][1] == len(ts)
+
+
+def test_train_universe_registers_one_version(env):
+    events = []
+    metrics = pipeline.train_universe(
+        ["BTC/USDT", "ETH/USDT", "SOL/USDT"], 7, n_splits=3, workers=1, progress=lambda d, t: events.append((d, t))
+    )
+    assert metrics["n_symbols"] == 3
+    assert events[-1] == (8, 8)
+    assert len(registry._read_registry()[pipeline.MODEL_NAME]) == 2  # sürüm + latest
+    assert len(list((env / "cache").iterdir())) == 1
+
+
+def test_cached_matrix_evicts_only_same_universe(env):
+    cache = env / "cache"
+    pipeline._cached_matrix(["BTC/USDT"], 7)
+    (btc,) = cache.glob("*.joblib")
+    pipeline._cached_matrix(["ETH/USDT"], 7)
+    (eth,) = set(cache.glob("*.joblib")) - {btc}
+    universe = btc.name.split("_")[0]
+
+    stale = cache / f"{universe}_old.joblib"
+    btc.rename(stale)  # aynı evrenin önceki anlık görüntüsü
+    pipeline._cached_matrix(["BTC/USDT"], 7)
+    names = sorted(p.name for p in cache.glob("*.joblib"))
+    assert eth.name in names and stale.name not in names
+    assert sum(n.startswith(universe) for n in names) == 1
+
+    os.utime(eth, (0, 0))
+    for p in cache.glob(f"{universe}_*.joblib"):
+        p.rename(stale)
+    pipeline._cached_matrix(["BTC/USDT"], 7)
+    names = [p.name for p in cache.glob("*.joblib")]
+    assert len(names) == 1 and names[0].startswith(universe) and names[0] != stale.name
+    assert not list(cache.glob("*.tmp"))
@@ -0,0 +1,113 @@
+import fakeredis
+import pytest
+
+from backend.services import coingecko, price_snapshot
+from backend.services.price_snapshot import PriceSnapshot, normalize_symbol
+from backend.utils import price_fetcher
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCoinGecko:
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def simple_price(self, ids, vs_currency="usd"):
+        self.calls.append(list(ids))
+        return {i: {vs_currency: self.prices[i]} for i in ids if i in self.prices}
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def fake_cg(monkeypatch):
+    cg = FakeCoinGecko({"bitcoin": 100.0, "ethereum": 10.0, "pepe": 0.001})
+    monkeypatch.setattr(coingecko, "_CG_CLIENT", cg)
+    return cg
+
+
+def test_normalize_symbol():
+    assert normalize_symbol("bitcoin") == "BTCUSDT"
+    assert normalize_symbol("btc") == "BTCUSDT"
+    assert normalize_symbol("ethusdt") == "ETHUSDT"
+    assert normalize_symbol("pepe") == "PEPE"
+
+
+def test_ticks_are_shared_through_redis_with_staleness(server, fake_cg):
+    clock = Clock()
+    writer = PriceSnapshot(fakeredis.FakeRedis(server=server), clock=clock, stale_after=60)
+    reader = PriceSnapshot(fakeredis.FakeRedis(server=server), clock=clock, stale_after=60)
+    writer.update("BTCUSDT", {"price": 50000.0, "volume": 3.0}, source="binance")
+
+    clock.now += 10
+    tick = reader.get_prices(["bitcoin"], fallback=False)["bitcoin"]
+    assert tick["price"] == 50000.0 and tick["source"] == "binance"
+    assert tick["age"] == pytest.approx(10.0) and tick["stale"] is False
+
+    clock.now += 100
+    tick = reader.get_prices(["BTCUSDT"], fallback=False)["BTCUSDT"]
+    assert tick["stale"] is True
+    assert fake_cg.calls == []
+
+
+def test_older_ticks_do_not_overwrite_newer(server):
+    clock = Clock()
+    snap = PriceSnapshot(fakeredis.FakeRedis(server=server), clock=clock)
+    snap.update("ETHUSDT", {"price": 2.0, "ts": clock.now})
+    snap.update("ETHUSDT", {"price": 1.0, "ts": clock.now - 5})
+    assert snap.get_price("ETHUSDT", fallback=False) == 2.0
+
+
+def test_late_writer_in_other_process_does_not_overwrite_redis(server):
+    clock = Clock()
+    fast = PriceSnapshot(fakeredis.FakeRedis(server=server), clock=clock)
+    late = PriceSnapshot(fakeredis.FakeRedis(server=server), clock=clock)
+    fast.update("ETHUSDT", {"price": 2.0, "ts": clock.now})
+    late.update("ETHUSDT", {"price": 1.0, "ts": clock.now - 5})  # yerel aynasında daha yeni yok
+    reader = PriceSnapshot(fakeredis.FakeRedis(server=server), clock=clock)
+    assert reader.get_price("ETHUSDT", fallback=False) == 2.0
+    # reddedilen yazarın aynası hemen Redis'ten yenilenir
+    assert late.get_price("ETHUSDT", fallback=False) == 2.0
+
+
+def test_missing_and_stale_symbols_refresh_in_one_request(server, fake_cg):
+    clock = Clock()
+    snap = PriceSnapshot(fakeredis.FakeRedis(server=server), clock=clock, stale_after=60)
+    snap.update("ETHUSDT", {"price": 9.0})
+    snap.update("ADAUSDT", {"price": 0.5})
+    clock.now += 120
+    snap.update("ADAUSDT", {"price": 0.6})
+
+    out = snap.get_prices(["bitcoin", "ETHUSDT", "ADAUSDT", "pepe", "unknown"])
+    assert fake_cg.calls == [["bitcoin", "ethereum", "pepe", "unknown"]]
+    assert {k: v["price"] for k, v in out.items()} == {
+        "bitcoin": 100.0, "ETHUSDT": 10.0, "ADAUSDT": 0.6, "pepe": 0.001,
+    }
+    assert out["bitcoin"]["source"] == "coingecko"
+
+
+def test_record_markets_keeps_row_age(server):
+    clock = Clock()
+    snap = PriceSnapshot(fakeredis.FakeRedis(server=server), clock=clock, stale_after=60)
+    snap.record_markets([{"id": "bitcoin", "current_price": 42.0, "last_updated": "1970-01-01T00:00:00Z"}])
+    tick = snap.get_prices(["BTCUSDT"], fallback=False)["BTCUSDT"]
+    assert tick["price"] == 42.0 and tick["stale"] is True
+
+
+def test_price_fetcher_reads_snapshot(monkeypatch, fake_cg):
+    snap = PriceSnapshot(None)
+    snap.update("BTCUSDT", {"price": 123.0})
+    monkeypatch.setattr(price_snapshot, "_SNAPSHOT", snap)
+    assert price_fetcher.fetch_current_price("BTCUSDT") == 123.0
+    assert price_fetcher.fetch_current_prices(["bitcoin", "ethereum"]) == {"bitcoin": 123.0, "ethereum": 10.0}
+    assert fake_cg.calls == [["ethereum"]]
@@ -0,0 +1,42 @@
+import threading
+
+from backend.core.archiver import RawArchiver
+
+
+def test_flush_writes_in_batches():
+    batches = []
+    arch = RawArchiver(writer=batches.append, max_queue=100, batch_size=10, autostart=False)
+    for i in range(25):
+        assert arch.submit({"coin": "btc", "i": i})
+    assert arch.flush() == 25
+    assert [len(b) for b in batches] == [10, 10, 5]
+
+
+def test_full_queue_drops_without_blocking():
+    release = threading.Event()
+    written = []
+
+    def slow_writer(rows):
+        release.wait(5)
+        written.extend(rows)
+
+    arch = RawArchiver(writer=slow_writer, max_queue=3, batch_size=1, flush_interval=0.01)
+    results = [arch.submit({"i": i}) for i in range(10)]
+    assert results.count(False) >= 10 - 3 - 1  # en fazla kuyruk + işlemdeki parti kabul edilir
+    release.set()
+    arch.stop()
+    assert len(written) == results.count(True)
+
+
+def test_shared_archiver_queue_depth_is_sampled_at_scrape(monkeypatch):
+    import backend.core.archiver as archiver
+    from backend.observability.metrics import REGISTRY
+
+    monkeypatch.setattr(archiver, "_archiver", None)
+    arch = archiver.get_archiver()
+    arch._writer, arch.autostart = (lambda rows: None), False
+    for i in range(3):
+        assert arch.submit({"i": i})
+    assert REGISTRY.get_sample_value("abh_archive_queue_depth") == 3
+    arch.flush()
+    assert REGISTRY.get_sample_value("abh_archive_queue_depth") == 0
@@ -0,0 +1,105 @@
+import json
+from unittest.mock import Mock
+
+import backend.realtime as realtime
+from backend.realtime import PriceRelay
+from backend.utils.price_streamer import BinancePriceStreamer, PriceStreamManager
+
+
+class FakeStreamer:
+    def __init__(self):
+        self.symbols = []
+
+    def set_symbols(self, symbols):
+        self.symbols = list(symbols)
+
+
+def _drive(coro):
+    try:
+        coro.send(None)
+    except StopIteration:
+        pass
+
+
+def test_stream_manager_follows_demand_across_sources():
+    manager = PriceStreamManager(None, ["BTCUSDT", "ETHUSDT"], on_demand=True)
+    streamer = FakeStreamer()
+    manager.streamers.append(streamer)
+
+    manager.update_demand(["BTCUSDT", "DOGEUSDT"], [])  # izin listesinde olmayan yok sayılır
+    assert streamer.symbols == ["BTCUSDT"]
+    manager.update_demand(["BTCUSDT", "ETHUSDT"], [])  # ikinci kaynak
+    manager.update_demand([], ["BTCUSDT"])
+    assert streamer.symbols == ["BTCUSDT", "ETHUSDT"]
+    manager.update_demand([], ["BTCUSDT", "ETHUSDT"])
+    assert streamer.symbols == []
+    assert manager.get_health_status()["active_symbols"] == []
+
+
+def test_binance_streamer_changes_streams_without_reconnect():
+    streamer = BinancePriceStreamer(Mock(), [])
+    sent = []
+
+    class WS:
+        async def send(self, message):
+            sent.append(json.loads(message))
+
+    streamer.set_symbols(["BTCUSDT"])  # bağlantı yokken yalnız liste güncellenir
+    assert streamer.symbols == ["btcusdt"]
+    streamer._ws = WS()
+    _drive(streamer._send_control("UNSUBSCRIBE", ["btcusdt"]))
+    assert sent == [{"method": "UNSUBSCRIBE", "params": ["btcusdt@ticker"], "id": 1}]
+
+
+def test_relay_emits_only_for_subscribed_rooms(monkeypatch):
+    upstream = Mock()
+    monkeypatch.setattr(realtime, "_upstream", upstream)
+    sock = Mock()
+    relay = PriceRelay(sock)
+
+    message = json.dumps({"batch": [
+        {"symbol": "BTCUSDT", "data": {"price": 1.0}},
+        {"symbol": "ETHUSDT", "data": {"price": 2.0}},
+    ]})
+    assert relay.dispatch(message) == 0
+    sock.emit.assert_not_called()
+
+    relay.join("a", ["BTCUSDT"])
+    relay.join("b", ["BTCUSDT"])
+    upstream.update_demand.assert_called_once_with(["BTCUSDT"], [])
+    assert relay.dispatch(message) == 1
+    event, payload = sock.emit.call_args.args
+    assert (event, payload["price"], sock.emit.call_args.kwargs["to"]) == ("price", 1.0, "price_BTCUSDT")
+
+    relay.leave("a")
+    relay.leave("b", ["BTCUSDT"])
+    upstream.update_demand.assert_called_with([], ["BTCUSDT"])
+    assert relay.registry.idle()
+
+
+def test_only_the_lock_holder_streams_cluster_wide_demand():
+    import fakeredis
+
+    from backend.realtime import UpstreamLeader
+
+    r = fakeredis.FakeRedis()
+    counts = {"BTCUSDT": 2, "ETHUSDT": 1}
+    managers, leaders = [], []
+    for name in ("a", "b"):
+        manager = PriceStreamManager(None, ["BTCUSDT", "ETHUSDT"], on_demand=True)
+        manager.streamers.append(FakeStreamer())
+        managers.append(manager)
+        leaders.append(UpstreamLeader(manager, r, lambda: counts, key="lead", ttl=15, token=name))
+
+    assert [leader.sync() for leader in leaders] == [True, False]
+    assert managers[0].streamers[0].symbols == ["BTCUSDT", "ETHUSDT"]
+    assert managers[1].streamers[0].symbols == []
+
+    counts.pop("ETHUSDT")  # başka bir işçideki son abone gitti
+    assert leaders[0].sync()  # kilit yenilenir, talep küme toplamını izler
+    assert managers[0].streamers[0].symbols == ["BTCUSDT"]
+
+    leaders[0].release()
+    assert managers[0].streamers[0].symbols == []
+    assert [leader.sync() for leader in reversed(leaders)] == [True, False]
+    assert managers[1].streamers[0].symbols == ["BTCUSDT"]
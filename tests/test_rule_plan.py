@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from backend.core.rule_plan import RuleBook, compile_profile
+
+RULES = {
+    "moderate": {
+        "buy": [
+            {"metric": "rsi", "operator": "<", "value": 30, "weight": 8},
+            {"metric": "macd", "operator": ">", "value": 0, "weight": 5},
+            {"metric": "pattern", "operator": "==", "value": "hammer", "weight": 3},
+        ],
+        "sell": [
+            {"metric": "rsi", "operator": ">", "value": 70, "weight": 8},
+            {"metric": "macd", "operator": "<", "value": 0, "weight": 5},
+            {"metric": "rsi", "operator": "~", "value": 1, "weight": 100},
+        ],
+        "threshold": 4,
+        "stop_loss_pct": 0.1,
+    },
+    "aggressive": {"buy": [{"metric": "rsi", "operator": "<", "value": 50, "weight": 20}], "threshold": 1},
+}
+
+
+def _legacy_decide(rules, analysis):
+    # önceki DecisionEngine.decide + _match
+    def match(cond):
+        m, op, val = cond.get("metric"), cond.get("operator"), cond.get("value")
+        if m not in analysis:
+            return False
+        a = analysis[m]
+        return {">": lambda: a > val, "<": lambda: a < val, "==": lambda: a == val}.get(op, lambda: False)()
+
+    factor = 1.0 / (1 + analysis.get("volatility", 1.0))
+    buy = sum(c.get("weight", 1) * factor for c in rules.get("buy", []) if match(c))
+    sell = sum(c.get("weight", 1) * factor for c in rules.get("sell", []) if match(c))
+    th = rules.get("threshold", 10)
+    if buy > sell and buy > th:
+        return "BUY", min(0.95, 0.5 + 0.01 * buy)
+    if sell > buy and sell > th:
+        return "SELL", min(0.95, 0.5 + 0.01 * sell)
+    return "HOLD", 0.5
+
+
+def _frame(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "rsi": rng.uniform(0, 100, n),
+            "macd": rng.normal(0, 1, n),
+            "pattern": rng.choice(["hammer", "doji", "none"], n),
+            "volatility": rng.uniform(0, 0.5, n),
+            "current_price": rng.uniform(10, 100, n),
+        }
+    )
+
+
+def test_scalar_and_vector_paths_match_legacy():
+    plan = compile_profile(RULES["moderate"])
+    df = _frame()
+    out = plan.decide_columns(df)
+    for i, row in enumerate(df.to_dict("records")):
+        exp_signal, exp_conf = _legacy_decide(RULES["moderate"], row)
+        single = plan.decide(row)
+        assert (single["signal"], single["confidence"]) == (exp_signal, exp_conf)
+        assert out["signal"].iat[i] == exp_signal
+        assert np.isclose(out["confidence"].iat[i], exp_conf)
+        assert np.isclose(out["stop_loss"].iat[i], single["stop_loss"])
+    assert set(out["signal"]) == {"BUY", "SELL", "HOLD"}
+
+
+def test_missing_columns_and_values_do_not_match():
+    plan = compile_profile(RULES["aggressive"])
+    assert plan.decide({"macd": 1})["signal"] == "HOLD"
+    assert plan.decide({"rsi": None})["signal"] == "HOLD"
+    out = plan.decide_columns({"rsi": [10.0, None, 90.0]})
+    assert list(out["signal"]) == ["BUY", "HOLD", "HOLD"]
+    assert (plan.decide_columns({"macd": [1.0, 2.0]})["signal"] == "HOLD").all()
+
+
+def test_rule_book_falls_back_and_reloads_on_file_change(tmp_path):
+    path = tmp_path / "rules.yaml"
+    path.write_text(yaml.safe_dump(RULES))
+    book = RuleBook(str(path), {})
+    assert book.profile("unknown") is book.profile("moderate")
+    assert book.profile("aggressive").decide({"rsi": 40})["signal"] == "BUY"
+
+    changed = dict(RULES, aggressive={"buy": [], "threshold": 1})
+    path.write_text(yaml.safe_dump(changed) + "\n# v2\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert book.profile("aggressive").decide({"rsi": 40})["signal"] == "HOLD"
+    assert book.raw["aggressive"]["buy"] == []
+
+
+def test_rule_book_uses_config_without_file():
+    book = RuleBook(None, RULES)
+    assert book.profile("aggressive").threshold == 1
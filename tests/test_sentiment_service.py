@@ -0,0 +1,96 @@
+import threading
+
+from backend.core.sentiment import KeywordScorer, SentimentService, aggregate
+
+KEYWORDS = {"positive": ["bull", "moon"], "negative": ["bear", "crash"]}
+
+
+class FakePipe:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return [{"label": "POSITIVE" if "up" in t else "NEGATIVE", "score": 0.8} for t in texts]
+
+
+def _reference(text, kw):
+    # AIInterpreter'ın eski tekil yedeği
+    lower = text.lower()
+    pos = sum(lower.count(w) for w in kw["positive"])
+    neg = sum(lower.count(w) for w in kw["negative"])
+    if pos > neg:
+        return "positive", min(0.9, 0.5 + 0.1 * pos)
+    if neg > pos:
+        return "negative", min(0.9, 0.5 + 0.1 * neg)
+    return "neutral", 0.5
+
+
+def test_keyword_scorer_matches_scalar_fallback():
+    texts = ["Bull run to the MOON", "bear bear crash", "flat", "", "bull bear", "moonmoonmoon bull"]
+    assert KeywordScorer(KEYWORDS).score_many(texts) == [_reference(t, KEYWORDS) for t in texts]
+
+
+def test_score_many_dedupes_and_caches():
+    pipe = FakePipe()
+    svc = SentimentService(KEYWORDS, pipe=pipe, batch_size=8)
+    out = svc.score_many(["up a", "down b", "up a"])
+    assert out == [("positive", 0.8), ("negative", 0.8), ("positive", 0.8)]
+    assert pipe.calls == [["up a", "down b"]]
+    svc.score_many(["down b", "up c"])
+    assert pipe.calls[-1] == ["up c"]
+
+
+def test_concurrent_scores_share_a_batch():
+    pipe = FakePipe()
+    svc = SentimentService(KEYWORDS, pipe=pipe, batch_size=16, batch_wait_ms=200)
+    results = {}
+    start = threading.Barrier(8)
+
+    def worker(i):
+        start.wait()
+        results[i] = svc.score(f"up {i}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(r == ("positive", 0.8) for r in results.values()) and len(results) == 8
+    assert len(pipe.calls) < 8 and sum(len(c) for c in pipe.calls) == 8
+
+
+def test_pipeline_error_falls_back_to_keywords():
+    def broken(texts, **kwargs):
+        raise RuntimeError("boom")
+
+    svc = SentimentService(KEYWORDS, pipe=broken)
+    assert svc.score_many(["bull"]) == [("positive", 0.6)]
+
+
+def test_articles_scored_individually():
+    svc = SentimentService(KEYWORDS, use_pipeline=False)
+    articles = [
+        {"title": "bull", "description": "moon"},
+        {"title": "crash", "description": ""},
+        {"title": "bull", "description": ""},
+    ]
+    overall, per = svc.score_articles(articles)
+    assert per == [("positive", 0.7), ("negative", 0.6), ("positive", 0.6)]
+    assert overall == aggregate(per) and overall[0] == "positive"
+    assert svc.score_articles([]) == (("neutral", 0.5), [])
+
+
+def test_score_times_out_to_neutral(monkeypatch):
+    from backend.core import sentiment
+
+    gate = threading.Event()
+
+    def slow(texts, **kwargs):
+        gate.wait(5)
+        return [{"label": "POSITIVE", "score": 0.8} for _ in texts]
+
+    monkeypatch.setattr(sentiment, "SENTIMENT_TIMEOUT", 0.05)
+    svc = SentimentService(KEYWORDS, pipe=slow, batch_wait_ms=0)
+    assert svc.score("up late") == sentiment.NEUTRAL
+    gate.set()
@@ -0,0 +1,70 @@
+import json
+from unittest.mock import Mock
+
+from backend.services.price_snapshot import PriceSnapshot
+from backend.utils.price_streamer import BinancePriceStreamer, TickConflator
+
+
+def _drive(coro):
+    # _handle_message hiç beklemez; olay döngüsü (ve soket çifti) gerekmez
+    try:
+        coro.send(None)
+    except StopIteration:
+        pass
+
+
+def _msg(symbol, price, event_time):
+    return json.dumps({
+        "stream": f"{symbol.lower()}@ticker",
+        "data": {"s": symbol, "c": str(price), "P": "1.0", "p": "1.0", "v": "10",
+                 "h": "0", "l": "0", "E": event_time},
+    })
+
+
+def test_conflator_keeps_latest_tick_and_bar():
+    c = TickConflator(bars=True)
+    for i, price in enumerate([10.0, 12.0, 9.0, 11.0]):
+        c.add("BTCUSDT", {"price": price}, event_time=i)
+    c.add("BTCUSDT", {"price": 99.0}, event_time=1)  # geç gelen eski tick
+    c.add("ETHUSDT", {"price": 2.0})
+    batch = {item["symbol"]: item["data"] for item in c.flush()}
+    assert batch["BTCUSDT"]["price"] == 11.0
+    assert batch["BTCUSDT"]["bar"] == {"open": 10.0, "high": 99.0, "low": 9.0, "close": 11.0, "ticks": 5}
+    assert batch["ETHUSDT"]["bar"]["ticks"] == 1
+    assert c.flush() == []
+    stats = c.get_stats()
+    assert (stats["received"], stats["published"], stats["flushes"]) == (6, 2, 1)
+    assert stats["conflation_ratio"] == 3.0
+
+
+def test_streamer_publishes_one_batch_per_flush():
+    redis_client = Mock()
+    snapshot = PriceSnapshot(None)
+    streamer = BinancePriceStreamer(redis_client, ["BTCUSDT", "ETHUSDT"], snapshot=snapshot, bars=False)
+    seen = []
+    streamer.add_callback(lambda symbol, data: seen.append((symbol, data["price"])))
+
+    for i in range(50):
+        _drive(streamer._handle_message(_msg("BTCUSDT", 100 + i, i)))
+        _drive(streamer._handle_message(_msg("ETHUSDT", 10 + i, i)))
+    redis_client.publish.assert_not_called()
+    assert seen == []
+
+    assert streamer.flush() == 2
+    redis_client.publish.assert_called_once()
+    channel, payload = redis_client.publish.call_args[0]
+    assert channel == "price_updates"
+    batch = {item["symbol"]: item["data"] for item in json.loads(payload)["batch"]}
+    assert batch["BTCUSDT"]["price"] == 149.0 and "bar" not in batch["BTCUSDT"]
+    assert sorted(seen) == [("BTCUSDT", 149.0), ("ETHUSDT", 59.0)]
+    assert snapshot.get_price("BTCUSDT", fallback=False) == 149.0
+    stats = streamer.get_stats()
+    assert (stats["received"], stats["published"]) == (100, 2)
+
+
+def test_zero_interval_flushes_every_message():
+    redis_client = Mock()
+    streamer = BinancePriceStreamer(redis_client, ["BTCUSDT"], snapshot=PriceSnapshot(None), flush_interval_ms=0)
+    _drive(streamer._handle_message(_msg("BTCUSDT", 1.5, 1)))
+    _drive(streamer._handle_message(_msg("BTCUSDT", 1.6, 2)))
+    assert redis_client.publish.call_count == 2
@@ -0,0 +1,149 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.core.sentiment import SentimentService
+from backend.core.universe import indicator_frame, sparkline_series, volatility
+
+
+def _walk(n, seed):
+    rng = np.random.default_rng(seed)
+    return list(100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))))
+
+
+def test_sparkline_series_builds_hourly_times():
+    markets = [
+        {"id": "bitcoin", "current_price": 4.0, "last_updated": "2024-01-01T12:00:00.000Z",
+         "sparkline_in_7d": {"price": [1.0, 2.0, 3.0]}},
+        {"id": "nospark", "current_price": 1.0, "sparkline_in_7d": {"price": []}},
+    ]
+    out = sparkline_series(markets)
+    assert list(out) == ["bitcoin"]
+    prices, times = out["bitcoin"]
+    assert prices == [1.0, 2.0, 3.0, 4.0]
+    assert times[0] == "2024-01-01T09:00:00" and times[-1] == "2024-01-01T12:00:00"
+
+
+def test_columns_match_single_coin_frames():
+    prices = {"a": _walk(720, 1), "b": _walk(168, 2), "c": _walk(60, 3)}
+    together = indicator_frame(prices)
+    for coin, p in prices.items():
+        alone = indicator_frame({coin: p})
+        pd.testing.assert_frame_equal(together.loc[[coin]], alone)
+
+
+def test_known_values_and_short_series_defaults():
+    rising = list(np.arange(1.0, 41.0))
+    out = indicator_frame({"up": rising, "short": [1.0, 2.0, 3.0]})
+    assert out.loc["up", "rsi"] == pytest.approx(100.0)
+    assert out.loc["up", "stochastic"] == pytest.approx(100.0)
+    window = np.array(rising[-20:])
+    assert out.loc["up", "bb_upper"] == pytest.approx(window.mean() + 2 * window.std())
+    assert out.loc["up", "macd"] > 0
+    short = out.loc["short"]
+    assert (short["rsi"], short["macd"], short["stochastic"]) == (50.0, 0.0, 50.0)
+    assert short["bb_upper"] == short["bb_lower"] == 3.0
+
+
+def test_volatility_matches_numpy():
+    prices = {"a": _walk(100, 4), "b": _walk(30, 5)}
+    vol = volatility(prices)
+    for coin, p in prices.items():
+        assert vol[coin] == pytest.approx(np.std(p) / np.mean(p))
+
+
+def test_score_article_groups_single_batch():
+    calls = []
+
+    def pipe(texts, **kwargs):
+        calls.append(list(texts))
+        return [{"label": "POSITIVE" if "up" in t else "NEGATIVE", "score": 0.7} for t in texts]
+
+    svc = SentimentService(pipe=pipe)
+    groups = [[{"title": "up"}], [], [{"title": "down"}, {"title": "down again"}]]
+    out = svc.score_article_groups(groups)
+    assert out == [("positive", 0.7), ("neutral", 0.5), ("negative", 0.7)]
+    assert len(calls) == 1
+
+
+def _ta_ema(close, n):
+    close = close.copy()
+    sma = close[:n].mean()
+    close[: n - 1] = np.nan
+    close.iloc[n - 1] = sma
+    return close.ewm(span=n, adjust=False).mean()
+
+
+def test_rsi_and_macd_follow_pandas_ta_definitions():
+    prices = {"a": _walk(200, 6), "b": _walk(40, 7)}
+    out = indicator_frame(prices)
+    for coin, p in prices.items():
+        s = pd.Series(p)
+        gain = s.diff().clip(lower=0).ewm(alpha=1 / 14, min_periods=14).mean()
+        loss = (-s.diff().clip(upper=0)).ewm(alpha=1 / 14, min_periods=14).mean()
+        assert out.loc[coin, "rsi"] == pytest.approx(float(100 * gain.iloc[-1] / (gain.iloc[-1] + loss.iloc[-1])))
+        assert out.loc[coin, "macd"] == pytest.approx(float((_ta_ema(s, 12) - _ta_ema(s, 26)).iloc[-1]))
+
+
+def test_rsi_and_macd_match_pandas_ta():
+    ta = pytest.importorskip("pandas_ta")
+    if not hasattr(ta, "macd"):
+        pytest.skip("pandas_ta yerine test taslağı yüklü")
+    prices = {"a": _walk(200, 8), "b": _walk(40, 9)}
+    out = indicator_frame(prices)
+    for coin, p in prices.items():
+        # ``DataCollector._calc_indicators`` ile aynı çağrılar
+        s = pd.Series(p)
+        assert out.loc[coin, "rsi"] == pytest.approx(float(ta.rsi(s, talib=False).iloc[-1]))
+        assert out.loc[coin, "macd"] == pytest.approx(float(ta.macd(s, talib=False)["MACD_12_26_9"].iloc[-1]))
+
+
+def test_batch_prices_do_not_share_single_coin_cache(monkeypatch):
+    import fakeredis
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.extensions["redis_client"] = r = fakeredis.FakeRedis()
+    r.set("price:bitcoin", '{"coin": "bitcoin", "prices": [1.0]}')
+    with app.app_context():
+        # modül, içe aktarılırken uygulama yapılandırmasını okur; başka
+        # testlerin bıraktığı taslak yerine gerçeğini yükle
+        monkeypatch.delitem(sys.modules, "backend.core.services", raising=False)
+        from backend.core.services import DataCollector
+
+        collector = DataCollector()
+        spark = (_walk(169, 10), [f"t{i}" for i in range(169)])
+        monkeypatch.setattr(collector, "_fetch_market_sparklines", lambda coins: {c: spark for c in coins})
+        out = collector.collect_price_batch(["bitcoin"])
+    assert len(out["bitcoin"]["prices"]) == 169
+    assert r.get("price:bitcoin") == b'{"coin": "bitcoin", "prices": [1.0]}'
+    assert r.exists("price7d:bitcoin")
+
+
+def test_market_calls_go_through_shared_coingecko_client(monkeypatch):
+    from flask import Flask
+
+    from backend.services.coingecko import RateLimited
+
+    calls = []
+
+    class _Client:
+        def get_json(self, path, params=None, ttl=None):
+            calls.append((path, params))
+            if path == "coins/markets":
+                raise RateLimited("CoinGecko RPS exceeded")
+            return {"prices": [[0, 1.0], [86_400_000, 2.0]]}
+
+    app = Flask(__name__)
+    with app.app_context():
+        monkeypatch.delitem(sys.modules, "backend.core.services", raising=False)
+        from backend.core import services
+
+        monkeypatch.setattr(services, "get_coingecko_client", lambda: _Client())
+        collector = services.DataCollector()
+        assert collector._fetch_market_sparklines(["bitcoin"]) == {}
+        prices, _ = collector._fetch_market_chart("bitcoin")
+    assert prices == [1.0, 2.0]
+    assert [p for p, _ in calls] == ["coins/markets", "coins/bitcoin/market_chart"]
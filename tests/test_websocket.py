@@ -89,10 +89,14 @@ class TestWebSocketManager:
         # Mock socketio emit
         websocket_manager.socketio.emit = Mock()
         
+        # Abonesi olmayan sembol yayılmaz
+        websocket_manager.broadcast_price_update('ETHUSDT', price_data)
+        websocket_manager.registry.subscribe('client1', [symbol])
         websocket_manager.broadcast_price_update(symbol, price_data)
+        websocket_manager.flush_prices()
         
-        # Redis cache kontrol
-        websocket_manager.redis_client.setex.assert_called()
+        # Bus tick'leri anlık görüntüye yayıncıda yazılır; işçi yeniden yazmaz
+        assert websocket_manager.fanout.snapshot is None
         
         # SocketIO emit kontrol
         websocket_manager.socketio.emit.assert_called_once()
@@ -213,6 +217,7 @@ class TestPriceStreamer:
         })
         
         await streamer._handle_message(test_message)
+        streamer.flush()
         
         # Redis publish kontrol
         mock_redis_client.publish.assert_called()
@@ -220,7 +225,7 @@ class TestPriceStreamer:
         assert call_args[0][0] == 'price_updates'
         
         # Published data kontrol
-        published_data = json.loads(call_args[0][1])
+        published_data = json.loads(call_args[0][1])['batch'][0]
         assert published_data['symbol'] == 'BTCUSDT'
         assert published_data['data']['price'] == 50000.0
     
@@ -0,0 +1,49 @@
+from unittest.mock import Mock
+
+from backend.services.price_snapshot import PriceSnapshot
+from backend.websocket import price_fanout
+from backend.websocket.price_fanout import BATCH_EVENT, LEGACY_EVENT, PriceFanout, compact, negotiate
+
+
+def _fanout(connections, snapshot=None):
+    emit = Mock()
+    return PriceFanout(emit, lambda: connections, snapshot=snapshot, interval_ms=250), emit
+
+
+def test_window_is_sent_once_per_connection_and_encoded_once_per_group():
+    connections = [
+        ("a", "json", frozenset({"BTCUSDT", "ETHUSDT"})),
+        ("b", "json", frozenset({"BTCUSDT", "ETHUSDT"})),
+        ("c", "json", frozenset({"ADAUSDT"})),
+    ]
+    snapshot = PriceSnapshot(None)
+    fanout, emit = _fanout(connections, snapshot)
+    for i in range(20):
+        fanout.add("BTCUSDT", {"price": 100 + i, "ts": 1_700_000_000 + i})
+        fanout.add("ETHUSDT", {"price": 10 + i})
+    emit.assert_not_called()
+
+    # iki toplu olay + sembol başına bir eski oda olayı; ADA değişmedi
+    assert fanout.flush() == 4
+    batch = [c for c in emit.call_args_list if c.args[0] == BATCH_EVENT]
+    assert [c.kwargs["to"] for c in batch] == [["a", "b"]]
+    payload = batch[0].args[1]
+    assert [u["s"] for u in payload["u"]] == ["BTCUSDT", "ETHUSDT"]
+    assert payload["u"][0]["p"] == 119 and payload["u"][0]["t"] == 1_700_000_019_000
+    legacy = sorted(c.kwargs["room"] for c in emit.call_args_list if c.args[0] == LEGACY_EVENT)
+    assert legacy == ["price_BTCUSDT", "price_ETHUSDT"]
+    assert snapshot.get_price("ETHUSDT", fallback=False) == 29
+    assert fanout.get_stats()["encodes"] == 1
+    assert fanout.flush() == 0
+
+
+def test_compact_keeps_bar_and_numeric_timestamp():
+    item = compact("BTCUSDT", {"price": 5.0, "change_percent": 1.2, "bar": {"open": 1, "high": 6, "low": 1, "close": 5}}, 42)
+    assert item == {"s": "BTCUSDT", "p": 5.0, "t": 42, "c": 1.2, "b": [1, 6, 1, 5]}
+
+
+def test_negotiate_falls_back_to_json_without_msgpack(monkeypatch):
+    monkeypatch.setattr(price_fanout, "msgpack", None)
+    assert negotiate(["msgpack", "json"]) == "json"
+    assert negotiate("cbor") == "json"
+    assert price_fanout.available_encodings() == ["json"]
@@ -0,0 +1,80 @@
+import fakeredis
+import pytest
+
+from backend.websocket.connection_registry import ConnectionRegistry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def _worker(server, name, clock):
+    return ConnectionRegistry(fakeredis.FakeRedis(server=server), worker_id=name, ttl=90, clock=clock)
+
+
+def test_counts_and_connections_span_workers(server):
+    clock = Clock()
+    a, b = _worker(server, "a", clock), _worker(server, "b", clock)
+    for reg in (a, b):
+        reg.heartbeat()
+    a.register("s1", "1.1.1.1")
+    a.register("s2", "1.1.1.2")
+    b.register("s3", "1.1.1.3", "msgpack")
+    assert a.subscribe("s1", ["BTCUSDT", "ETHUSDT"]) == ["BTCUSDT", "ETHUSDT"]
+    assert a.subscribe("s2", ["BTCUSDT"]) == []
+    b.subscribe("s3", ["BTCUSDT"])
+
+    assert b.counts() == {"BTCUSDT": 3, "ETHUSDT": 1}
+    stats = b.stats()
+    assert (stats["workers"], stats["connections"], stats["local_connections"]) == (2, 3, 1)
+
+    assert a.unsubscribe("s1", ["ETHUSDT"]) == ["ETHUSDT"]
+    assert a.unregister("s2") == []
+    assert b.counts() == {"BTCUSDT": 2}
+    r = fakeredis.FakeRedis(server=server)
+    assert r.hget("ws:c:s1", "s") == b"BTCUSDT"
+    assert r.hget("ws:c:s3", "e") == b"msgpack"
+    assert not r.exists("ws:c:s2")
+
+
+def test_dead_worker_drops_out_after_ttl(server):
+    clock = Clock()
+    a, b = _worker(server, "a", clock), _worker(server, "b", clock)
+    a.register("s1")
+    a.subscribe("s1", ["BTCUSDT"])
+    a.heartbeat()
+    b.heartbeat()
+    clock.now += 120
+    b.heartbeat()  # a artık heartbeat atmıyor
+    assert b.counts() == {}
+    assert b.stats()["workers"] == 1
+    # a geri döndüğünde heartbeat durumunu baştan yazar
+    a.heartbeat()
+    assert b.counts() == {"BTCUSDT": 1}
+
+
+def test_rate_limit_is_shared_and_windowed(server):
+    clock = Clock()
+    a, b = _worker(server, "a", clock), _worker(server, "b", clock)
+    assert all(reg.allow_connect("9.9.9.9", limit=4) for reg in (a, b, a, b))
+    assert not b.allow_connect("9.9.9.9", limit=4)
+    clock.now += 60
+    assert a.allow_connect("9.9.9.9", limit=4)
+
+
+def test_local_mode_without_redis():
+    reg = ConnectionRegistry()
+    reg.register("s1")
+    reg.subscribe("s1", ["BTCUSDT"])
+    assert reg.counts() == {"BTCUSDT": 1}
+    assert reg.unregister("s1") == ["BTCUSDT"]
+    assert reg.stats()["connections"] == 0